@@ -0,0 +1,301 @@
+import os
+
+# Benchmarks run offline: keep crewai from sending telemetry or prompting about traces.
+os.environ.setdefault('CREWAI_DISABLE_TELEMETRY', 'true')
+os.environ.setdefault('OTEL_SDK_DISABLED', 'true')
+os.environ.setdefault('CREWAI_TRACING_ENABLED', 'false')
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.stub_llm import StubLLM
+from benchmarks.synthetic import create_database, workload
+from main import CrewAIQuerySystem
+from src.column_stats import ColumnStatsIndex
+from src.knowledge_sources import DatabaseKnowledgeSource
+from src.pool import close_all_pools
+from src.tools import ExecuteSQLQuery
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+# Metric name suffixes where bigger is better; all other metrics are times or sizes.
+HIGHER_IS_BETTER = ('_qps', '_success_rate')
+
+# Run in a fresh interpreter, so imports are cold: time to import main, then to answer one question.
+_COLD_START_SCRIPT = '''
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from benchmarks.stub_llm import StubLLM
+db_path, mode, question, sql = sys.argv[1:5]
+db_config = {'db_type': 'sqlite', 'db_path': db_path}
+system = main.CrewAIQuerySystem(llm=StubLLM({question: sql}, db_config), prune_schema=True, use_query_cache=False)
+system.setup_database(**db_config)
+system.initialize_agents_and_tasks()
+system.create_crews()
+system.process_query(question, mode=mode, **db_config)
+print(json.dumps({'import': imported - started, 'first_request': time.perf_counter() - started}))
+'''
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(round(q * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def _latency_metrics(prefix: str, latencies: List[float], wall: float) -> Dict[str, float]:
+    return {
+        f"{prefix}_p50_s": _percentile(latencies, 0.5),
+        f"{prefix}_p95_s": _percentile(latencies, 0.95),
+        f"{prefix}_mean_s": statistics.fmean(latencies),
+        f"{prefix}_qps": len(latencies) / wall if wall else 0.0
+    }
+
+
+def bench_schema_load(db_path: str, repeats: int) -> Dict[str, float]:
+    """Median schema load time with introspection and from the warm on-disk cache."""
+    cold = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        DatabaseKnowledgeSource(db_type='sqlite', db_path=db_path, use_schema_cache=False).load_content()
+        cold.append(time.perf_counter() - started)
+
+    cached = []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        DatabaseKnowledgeSource(db_type='sqlite', db_path=db_path, schema_cache_dir=cache_dir).load_content()
+        for _ in range(repeats):
+            started = time.perf_counter()
+            DatabaseKnowledgeSource(db_type='sqlite', db_path=db_path, schema_cache_dir=cache_dir).load_content()
+            cached.append(time.perf_counter() - started)
+    return {'schema_load_cold_s': statistics.median(cold), 'schema_load_cached_s': statistics.median(cached)}
+
+
+def bench_value_index(db_path: str, pairs: List[Tuple[str, str]], repeats: int) -> Dict[str, float]:
+    """Column statistics build, a refresh with nothing changed, and value linking per question."""
+    source = DatabaseKnowledgeSource(db_type='sqlite', db_path=db_path, use_schema_cache=False)
+    source.load_content()
+    column_map = source.schema_model.to_column_map()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        index = ColumnStatsIndex('sqlite', source.schema_model, 'benchmark', db_path=db_path, cache_dir=cache_dir)
+        started = time.perf_counter()
+        index.refresh()
+        built = time.perf_counter()
+        index.refresh()
+        refreshed = time.perf_counter()
+        questions = [question for question, _ in pairs] * repeats
+        for question in questions:
+            index.hints(question, column_map)
+        linked = time.perf_counter()
+    return {
+        'value_index_build_s': built - started,
+        'value_index_refresh_s': refreshed - built,
+        'value_index_link_ms': (linked - refreshed) / len(questions) * 1000
+    }
+
+
+def _succeeded(result: Any) -> bool:
+    if isinstance(result, dict):
+        return result.get('status') == 'success'
+    return '"success"' in str(getattr(result, 'raw', result)).replace("'", '"')
+
+
+def bench_cold_start(db_path: str, pair: Tuple[str, str], mode: str, repeats: int) -> Dict[str, float]:
+    """Median ``import main`` time and time to the first answer in a new process."""
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')]))}
+    runs = []
+    for _ in range(repeats):
+        completed = subprocess.run(
+            [sys.executable, '-c', _COLD_START_SCRIPT, db_path, mode, *pair],
+            capture_output=True, text=True, check=True, cwd=ROOT, env=env
+        )
+        runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    return {
+        'cold_import_s': statistics.median(run['import'] for run in runs),
+        f"cold_first_request_{mode}_s": statistics.median(run['first_request'] for run in runs)
+    }
+
+
+def bench_process_query(db_path: str, pairs: List[Tuple[str, str]], mode: str, latency: float) -> Dict[str, float]:
+    """End-to-end ``process_query`` with the stub LLM; caches are off so every question runs the pipeline."""
+    db_config = {'db_type': 'sqlite', 'db_path': db_path}
+    llm = StubLLM(dict(pairs), db_config, latency=latency)
+    system = CrewAIQuerySystem(llm=llm, prune_schema=True, use_query_cache=False)
+    system.setup_database(**db_config)
+    if system.column_stats is not None:
+        # Measure the steady state, not the background statistics build.
+        system.column_stats.built.wait()
+    system.initialize_agents_and_tasks()
+    system.create_crews()
+    system.process_query(pairs[0][0], mode=mode, **db_config)
+
+    calls_before, tokens_before = llm.calls, llm.prompt_tokens
+    latencies, successes = [], 0
+    wall_started = time.perf_counter()
+    for question, _ in pairs:
+        started = time.perf_counter()
+        result = system.process_query(question, mode=mode, **db_config)
+        latencies.append(time.perf_counter() - started)
+        successes += _succeeded(result)
+    wall = time.perf_counter() - wall_started
+    system.close()
+
+    prefix = f"process_query_{mode}"
+    return {
+        **_latency_metrics(prefix, latencies, wall),
+        f"{prefix}_llm_calls": (llm.calls - calls_before) / len(pairs),
+        f"{prefix}_prompt_tokens": (llm.prompt_tokens - tokens_before) / len(pairs),
+        f"{prefix}_success_rate": successes / len(pairs)
+    }
+
+
+def bench_tool(db_path: str, pairs: List[Tuple[str, str]], repeats: int, wide_table: str) -> Dict[str, float]:
+    """``ExecuteSQLQuery`` throughput, then peak Python memory (row and columnar results) for the same calls plus one wide result."""
+    tool = ExecuteSQLQuery()
+    statements = [sql for _, sql in pairs] * repeats
+    tool._run({'sql': statements[0]}, db_path=db_path, db_type='sqlite')
+
+    latencies = []
+    wall_started = time.perf_counter()
+    for sql in statements:
+        started = time.perf_counter()
+        tool._run({'sql': sql}, db_path=db_path, db_type='sqlite')
+        latencies.append(time.perf_counter() - started)
+    metrics = _latency_metrics('tool', latencies, time.perf_counter() - wall_started)
+
+    for result_format, name in (('rows', 'tool_peak_bytes'), ('columnar', 'tool_columnar_peak_bytes')):
+        tracemalloc.start()
+        try:
+            for sql in statements[:len(pairs)] + [f"SELECT * FROM {wide_table}"]:
+                tool._run({'sql': sql}, db_path=db_path, db_type='sqlite', result_format=result_format)
+            metrics[name] = float(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+    return metrics
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=ROOT
+        ).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(tables: int = 10, columns: int = 8, rows: int = 1000, queries: int = 20, latency: float = 0.0,
+        repeats: int = 3, modes: Tuple[str, ...] = ('crew', 'express'), seed: int = 0) -> Dict[str, Any]:
+    """Build a synthetic database, run every benchmark and return the results document."""
+    params = {'tables': tables, 'columns': columns, 'rows': rows, 'queries': queries,
+              'latency': latency, 'repeats': repeats, 'modes': list(modes), 'seed': seed}
+    metrics: Dict[str, float] = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = os.path.join(work_dir, 'synthetic.sqlite')
+        started = time.perf_counter()
+        schema = create_database(db_path, tables=tables, columns=columns, rows=rows, seed=seed)
+        metrics['database_build_s'] = time.perf_counter() - started
+        pairs = workload(schema, queries, seed=seed)
+        try:
+            metrics.update(bench_schema_load(db_path, repeats))
+            metrics.update(bench_value_index(db_path, pairs, repeats))
+            metrics.update(bench_cold_start(db_path, pairs[0], modes[0] if modes else 'crew', repeats))
+            for mode in modes:
+                metrics.update(bench_process_query(db_path, pairs, mode, latency))
+            metrics.update(bench_tool(db_path, pairs, repeats, wide_table=next(iter(schema))))
+        finally:
+            close_all_pools()
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform()
+        },
+        'params': params,
+        'metrics': {name: round(value, 6) for name, value in metrics.items()}
+    }
+
+
+def save(result: Dict[str, Any], path: str = None) -> str:
+    """Write a results document, by default to ``benchmarks/results/<time>-<commit>.json``."""
+    if path is None:
+        stamp = result['meta']['created_at'].replace(':', '').replace('-', '').split('+')[0]
+        path = os.path.join(RESULTS_DIR, f"{stamp}-{result['meta']['commit'] or 'nocommit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(result, f, indent=2)
+    return path
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.1) -> List[Dict[str, Any]]:
+    """Per-metric change from ``baseline`` to ``current``; ``regressed`` marks changes worse than ``tolerance``."""
+    rows = []
+    for name, value in current['metrics'].items():
+        base = baseline['metrics'].get(name)
+        if base is None:
+            continue
+        change = (value - base) / base if base else 0.0
+        better_high = name.endswith(HIGHER_IS_BETTER)
+        rows.append({
+            'metric': name,
+            'baseline': base,
+            'current': value,
+            'change': change,
+            'regressed': change < -tolerance if better_high else change > tolerance
+        })
+    return rows
+
+
+def _print_comparison(rows: List[Dict[str, Any]]) -> None:
+    width = max(len(row['metric']) for row in rows)
+    for row in rows:
+        flag = '  REGRESSION' if row['regressed'] else ''
+        print(f"{row['metric']:<{width}}  {row['baseline']:>14.6g}  {row['current']:>14.6g}  {row['change']:>+8.1%}{flag}")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Offline benchmarks with synthetic SQLite databases and a stub LLM.')
+    parser.add_argument('--tables', type=int, default=10)
+    parser.add_argument('--columns', type=int, default=8)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.0, help='simulated seconds per LLM call')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--modes', default='crew,express', help='comma-separated SQL pipeline modes')
+    parser.add_argument('--output', help='results file (default: benchmarks/results/<time>-<commit>.json)')
+    parser.add_argument('--no-save', action='store_true')
+    parser.add_argument('--compare', help='baseline results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='relative change counted as a regression')
+    args = parser.parse_args(argv)
+
+    result = run(args.tables, args.columns, args.rows, args.queries, args.latency, args.repeats,
+                 tuple(mode for mode in args.modes.split(',') if mode))
+    for name, value in result['metrics'].items():
+        print(f"{name}: {value:.6g}")
+    if not args.no_save:
+        print(f"Saved results to {save(result, args.output)}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('params') != result['params']:
+            print('Warning: baseline was run with different parameters.')
+        rows = compare(baseline, result, args.tolerance)
+        _print_comparison(rows)
+        return 1 if any(row['regressed'] for row in rows) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+import json
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from crewai.llms.base_llm import BaseLLM
+
+_NUMBERED = re.compile(r"^\s*(\d+)\.\s", re.MULTILINE)
+_CONTEXT_SQL = re.compile(r'"sql":\s*"((?:[^"\\]|\\.)*)"')
+
+
+class StubLLM(BaseLLM):
+    """Deterministic offline stand-in for the OpenAI model, for benchmarks.
+
+    It answers by agent role in crewai's ReAct format: the Router routes every
+    question to SQL, the fetchers and generators return the SQL registered for
+    the question in ``answers``, and the validator calls the real SQL tool
+    once before returning its result. ``latency`` seconds are slept per call
+    to model network time; token usage is estimated at 4 characters a token.
+    """
+
+    def __init__(self, answers: Dict[str, str], db_config: Dict[str, Any], latency: float = 0.0, **kwargs: Any):
+        super().__init__(model='stub', **kwargs)
+        # Longest first, so a question that contains another one is matched correctly.
+        self._answers = sorted(answers.items(), key=lambda item: len(item[0]), reverse=True)
+        self._db_config = {key: value for key, value in db_config.items() if value is not None}
+        self._latency = latency
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+
+    def call(self, messages: Any, tools: Optional[List[Any]] = None, callbacks: Optional[List[Any]] = None,
+             available_functions: Optional[Dict[str, Any]] = None, from_task: Any = None, from_agent: Any = None,
+             response_model: Any = None) -> str:
+        text = messages if isinstance(messages, str) else '\n'.join(str(m.get('content', '')) for m in messages)
+        # crewai appends the tool call and its observation as an assistant message.
+        observed = next((str(m.get('content', '')) for m in reversed(messages)
+                         if m.get('role') == 'assistant'), None) if not isinstance(messages, str) else None
+        if self._latency:
+            time.sleep(self._latency)
+        reply = self._reply(getattr(from_agent, 'role', ''), text, observed)
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += len(text) // 4
+        self._track_token_usage_internal({
+            'prompt_tokens': len(text) // 4,
+            'completion_tokens': len(reply) // 4,
+            'total_tokens': (len(text) + len(reply)) // 4
+        })
+        return reply
+
+    def _sql_for(self, text: str) -> str:
+        for question, sql in self._answers:
+            if question in text:
+                return sql
+        return 'SELECT 1'
+
+    def _reply(self, role: str, text: str, observed: Optional[str]) -> str:
+        if role == 'Router':
+            numbers = _NUMBERED.findall(text.split('Begin!')[0])
+            if 'numbered queries' in text and numbers:
+                return _final({number: 'sql' for number in numbers})
+            return _final({'response': 'sql'})
+        if role == 'SQL Validator':
+            if observed is not None:
+                # The tool result is one line; crewai sometimes appends a tool reminder after it.
+                observation = observed.split('Observation:', 1)[-1].strip().split('\n')[0]
+                return f"Thought: I now know the final answer\nFinal Answer: {observation}"
+            # The validator sees the generated SQL as task context rather than the question.
+            generated = _CONTEXT_SQL.findall(text)
+            sql = json.loads(f'"{generated[-1]}"') if generated else self._sql_for(text)
+            arguments = {'query': {'sql': sql}, **self._db_config}
+            return f"Thought: I should run the query\nAction: SQL Query Executor\nAction Input: {json.dumps(arguments)}"
+        if role == 'Table Fetcher':
+            return _final({'relevant_tables': re.findall(r'FROM (\w+)', self._sql_for(text))})
+        if role == 'Forecasting Analyst':
+            return _final({'predicted': 0})
+        # Column Fetcher, SQL Generator and Express SQL Generator.
+        return _final({'sql': self._sql_for(text)})
+
+
+def _final(answer: Dict[str, Any]) -> str:
+    return f"Thought: I now know the final answer\nFinal Answer: {json.dumps(answer)}"
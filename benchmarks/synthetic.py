@@ -0,0 +1,91 @@
+import os
+import random
+import sqlite3
+from typing import Dict, List, Tuple
+
+_ENTITIES = [
+    'customer', 'product', 'supplier', 'employee', 'store', 'region', 'campaign', 'invoice',
+    'shipment', 'warehouse', 'ticket', 'contract', 'payment', 'vehicle', 'device', 'course'
+]
+_YEARS = list(range(2015, 2025))
+
+
+def table_names(count: int) -> List[str]:
+    """Deterministic, readable table names: customer, product, ..., customer_2, ..."""
+    names = []
+    for index in range(count):
+        entity = _ENTITIES[index % len(_ENTITIES)]
+        round_ = index // len(_ENTITIES)
+        names.append(entity if round_ == 0 else f"{entity}_{round_ + 1}")
+    return names
+
+
+def create_database(path: str, tables: int = 10, columns: int = 8, rows: int = 1000, seed: int = 0) -> Dict[str, List[str]]:
+    """Create (or replace) a synthetic SQLite database and return its ``{table: [column, ...]}`` map.
+
+    Every table has ``id``, ``name``, ``year`` and ``amount`` columns, a
+    foreign key to the previous table and ``columns - 5`` extra attribute
+    columns, so schema size and join paths grow with the parameters. The same
+    arguments always produce the same data.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    rng = random.Random(seed)
+    names = table_names(tables)
+    extra = max(columns - 5, 0)
+    schema: Dict[str, List[str]] = {}
+
+    conn = sqlite3.connect(path)
+    try:
+        for position, table in enumerate(names):
+            parent = names[position - 1] if position else None
+            column_defs = ['id INTEGER PRIMARY KEY', 'name TEXT', 'year INTEGER', 'amount REAL']
+            column_defs.append(f"{parent}_id INTEGER REFERENCES {parent}(id)" if parent else 'parent_id INTEGER')
+            column_defs += [f"{table}_attr_{k} {'TEXT' if k % 2 else 'INTEGER'}" for k in range(extra)]
+            conn.execute(f"CREATE TABLE {table} ({', '.join(column_defs)})")
+            schema[table] = [definition.split()[0] for definition in column_defs]
+
+            placeholders = ', '.join('?' * len(column_defs))
+            conn.executemany(
+                f"INSERT INTO {table} VALUES ({placeholders})",
+                (
+                    (
+                        row_id,
+                        f"{table} {row_id}",
+                        rng.choice(_YEARS),
+                        round(rng.uniform(1, 10000), 2),
+                        rng.randint(1, rows) if parent else None,
+                        *[f"value {rng.randint(0, 99)}" if k % 2 else rng.randint(0, 999) for k in range(extra)]
+                    )
+                    for row_id in range(1, rows + 1)
+                )
+            )
+        conn.commit()
+    finally:
+        conn.close()
+    return schema
+
+
+def workload(schema: Dict[str, List[str]], count: int, seed: int = 0) -> List[Tuple[str, str]]:
+    """``count`` (question, SQL) pairs over the synthetic schema, cycling through a few query shapes."""
+    rng = random.Random(seed)
+    tables = list(schema)
+    shapes = [
+        lambda t, y: (f"How many {t} records are there?", f"SELECT count(*) FROM {t}"),
+        lambda t, y: (f"What is the total {t} amount in {y}?", f"SELECT sum(amount) FROM {t} WHERE year = {y}"),
+        lambda t, y: (f"Which {t} has the highest amount?", f"SELECT name FROM {t} ORDER BY amount DESC LIMIT 1"),
+        lambda t, y: (f"What is the average {t} amount per year?", f"SELECT year, avg(amount) FROM {t} GROUP BY year ORDER BY year"),
+        lambda t, y: (f"List the {t} names from {y}", f"SELECT name FROM {t} WHERE year = {y}"),
+    ]
+    pairs = []
+    seen = set()
+    for index in range(count):
+        shape = shapes[index % len(shapes)]
+        # Prefer unseen questions; small schemas run out of them, so repeats are allowed eventually.
+        for _ in range(20):
+            question, sql = shape(rng.choice(tables), rng.choice(_YEARS))
+            if question not in seen:
+                break
+        seen.add(question)
+        pairs.append((question, sql))
+    return pairs
@@ -1,104 +1,743 @@
+import time
+_import_started = time.perf_counter()
+
+import asyncio
+import functools
 import os
-from crewai import Crew, Process
-from src.knowledge_sources import DatabaseKnowledgeSource
-from src.tools import execute_sql_query_tool
-from src.agents import create_agents
-from src.tasks import create_tasks
+import sys
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from src.schema_index import SchemaIndex, SchemaMatch, tokenize
+from src.column_stats import ColumnStatsIndex
+from src.schema_watch import SchemaWatcher
+from src.context import TABLE_VIEW_COLUMNS, estimate_tokens, record_context, render_schema
+from src.query_cache import QueryCache
+from src.output_parsing import parse_dict_output, extract_sql
+from src.streaming import returns_rows
+from src.router import FastRouter
+from src.batch import WorkerCrews, dedupe, format_numbered, parse_batch_routes
+from src.sql_validation import SQLValidationError, check_read_only, explain_error, static_errors, sql_guardrail
+from src.governor import CancelToken, cancel_scope
+from src.tracing import tracer, start_metrics_server
+from src.startup import LazyDict, startup
+from src.speculation import Speculator, after_confirmation
+from src.pool import attach_databases
+from src.replicas import register_replicas
+
+# crewai and the modules built on it (knowledge source, SQL tool, agents, tasks)
+# take seconds to import, so they are imported where first needed instead of here.
 
 class CrewAIQuerySystem:
     """Main class orchestrating the CrewAI database query and forecasting system."""
     
-    def __init__(self, llm: str = "gpt-4o-mini"):
+    def __init__(self, llm: str = "gpt-4o-mini", prune_schema: bool = None, use_query_cache: bool = None):
         self.llm = llm
+        self.prune_schema = Config.SCHEMA_INDEX_ENABLED if prune_schema is None else prune_schema
+        use_query_cache = Config.QUERY_CACHE_ENABLED if use_query_cache is None else use_query_cache
+        self.query_cache = QueryCache() if use_query_cache else None
         self.agents = None
         self.tasks = None
         self.crews = {}
+        self.schema_index = None
+        self.fast_router = None
+        self._query_slots = weakref.WeakKeyDictionary()
+        self._express_index = None
+        self.column_stats = None
+        self.schema_watcher = None
+        self.speculator = Speculator()
+        self._speculative_crews = None
         
-    def setup_database(self, db_type: str, db_path: str = None, conn_string: str = None):
-        """Setup database knowledge source and load schema."""
+    def setup_database(self, db_type: str, db_path: str = None, conn_string: str = None,
+                       attachments: dict = None, replicas: list = None):
+        """Setup database knowledge source and load schema.
+        
+        ``attachments`` (``{alias: path}``, default ``SQLITE_ATTACH``) are SQLite
+        files attached to ``db_path``, whose tables join the schema as
+        ``alias.table``. ``replicas`` (default ``SQLITE_REPLICA_PATHS`` or
+        ``POSTGRES_REPLICA_HOSTS``) serve the read-only SQL.
+        """
+        if db_type == 'sqlite' and db_path != ':memory:':
+            attach_databases(db_path, Config.get_sqlite_attachments() if attachments is None else attachments)
+        if replicas is None:
+            replicas = Config.get_replica_targets() if db_type == Config.get_db_type_enum().value else []
+        register_replicas(db_type, db_path or conn_string, replicas)
+        with startup.phase('import:crewai'):
+            from src.knowledge_sources import DatabaseKnowledgeSource
         self.db_source = DatabaseKnowledgeSource(
             db_path=db_path,
             db_type=db_type,
             conn_string=conn_string
         )
         self.schema_info = self.db_source.load_content()
+        if self.prune_schema:
+            self.schema_index = SchemaIndex(self.db_source.schema_model)
+        if Config.FAST_ROUTER_ENABLED:
+            self.fast_router = FastRouter(schema_terms=self._schema_terms(self.db_source.schema_model))
+        self.close()
+        self.column_stats = None
+        self.schema_watcher = None
+        if Config.VALUE_INDEX_ENABLED and db_path != ':memory:':
+            # Built off the request path; until the first build finishes, views carry no value hints.
+            self.column_stats = ColumnStatsIndex(
+                db_type,
+                self.db_source.schema_model,
+                self.db_source.database_key(),
+                db_path=db_path,
+                conn_string=conn_string
+            )
+            self.column_stats.start()
+        if Config.SCHEMA_WATCH_INTERVAL > 0 and db_path != ':memory:':
+            self.schema_watcher = SchemaWatcher(self.db_source, self.apply_schema_change)
+            self.schema_watcher.start()
+        
+    @staticmethod
+    def _schema_terms(model):
+        return {
+            term
+            for table, columns in model.to_column_map().items()
+            for name in [table, *columns]
+            for term in tokenize(name)
+        }
+        
+    def apply_schema_change(self, changed):
+        """Rebuild what is derived from the schema after ``db_source`` re-introspected the ``changed`` tables.
+        
+        Replacements are built first and then swapped in attribute by attribute;
+        requests already running keep using the objects they started with.
+        Generated SQL is cached per schema fingerprint, so old entries stop matching.
+        Runs on the watcher thread, so it reports through a tracer span rather than stdout.
+        """
+        with tracer.span('knowledge', 'schema_apply', changed=len(changed), tables=', '.join(changed)):
+            model = self.db_source.schema_model
+            schema_info = self.db_source.schema_content()
+            schema_index = SchemaIndex(model) if self.prune_schema else None
+            schema_terms = self._schema_terms(model)
+            self.schema_info = schema_info
+            self.schema_index = schema_index
+            self._express_index = None
+            if self.fast_router is not None:
+                self.fast_router.schema_terms = schema_terms
+            if self.column_stats is not None:
+                self.column_stats.schema = model
+                self.column_stats.refresh()
+        
+    def close(self):
+        """Stop background work (schema watching, column statistics refreshes and speculation threads)."""
+        if self.schema_watcher is not None:
+            self.schema_watcher.close()
+        if self.column_stats is not None:
+            self.column_stats.close()
+        self.speculator.close()
+        
+    @property
+    def sql_tool(self):
+        """The shared SQL Query Executor tool."""
+        from src.tools import execute_sql_query_tool
+        return execute_sql_query_tool
         
     def initialize_agents_and_tasks(self):
-        """Initialize all agents and tasks."""
-        self.agents = create_agents(self.llm, self.schema_info, execute_sql_query_tool)
-        self.tasks = create_tasks(self.agents)
+        """Declare all agents and tasks; each is built the first time a crew needs it."""
+        from src.agents import create_agents
+        from src.tasks import create_tasks
+        from src.tools import ExecuteSQLQuery, ForecastTimeSeries
+        # Agents see results summarized to the context budget; express mode and
+        # cached answers keep using sql_tool, which returns every row.
+        agent_sql_tool = ExecuteSQLQuery(
+            result_cache=self.sql_tool.result_cache,
+            max_context_tokens=Config.CONTEXT_RESULT_MAX_TOKENS
+        )
+        # Bound to this system's database, like the SQL guardrail below.
+        forecast_tool = ForecastTimeSeries(
+            db_type=self.db_source.db_type,
+            db_path=self.db_source.db_path,
+            conn_string=self.db_source.conn_string,
+            max_context_tokens=Config.CONTEXT_RESULT_MAX_TOKENS
+        )
+        self.agents = create_agents(self.llm, agent_sql_tool, forecast_tool=forecast_tool)
+        guardrail = None
+        if Config.SQL_VALIDATION_ENABLED:
+            guardrail = sql_guardrail(
+                self.db_source.db_type,
+                lambda: self.db_source.schema_model,
+                db_path=self.db_source.db_path,
+                conn_string=self.db_source.conn_string
+            )
+        self.tasks = create_tasks(self.agents, sql_guardrail=guardrail)
         
     def create_crews(self):
-        """Create specialized crews for different types of queries."""
-        self.crews['sql'] = Crew(
-            agents=[
-                self.agents['fetch_table'],
-                self.agents['fetch_column'],
-                self.agents['sql_generator'],
-                self.agents['sql_validator']
-            ],
-            tasks=[
-                self.tasks['fetch_tables'],
-                self.tasks['fetch_columns'],
-                self.tasks['generate_sql'],
-                self.tasks['validate_sql']
-            ],
-            process=Process.sequential
-        )
+        """Declare the specialized crews for different types of queries; each is built on first use."""
+        from crewai import Crew, Process
+        self.crews = LazyDict({
+            'sql': lambda: Crew(
+                agents=[
+                    self.agents['fetch_table'],
+                    self.agents['fetch_column'],
+                    self.agents['sql_generator'],
+                    self.agents['sql_validator']
+                ],
+                tasks=[
+                    self.tasks['fetch_tables'],
+                    self.tasks['fetch_columns'],
+                    self.tasks['generate_sql'],
+                    self.tasks['validate_sql']
+                ],
+                process=Process.sequential
+            ),
+            'sql_direct': lambda: Crew(
+                agents=[
+                    self.agents['sql_generator'],
+                    self.agents['sql_validator']
+                ],
+                tasks=[
+                    self.tasks['generate_sql_direct'],
+                    self.tasks['validate_sql_direct']
+                ],
+                process=Process.sequential
+            ),
+            'sql_express': lambda: Crew(
+                agents=[self.agents['sql_express']],
+                tasks=[self.tasks['generate_sql_express']],
+                process=Process.sequential
+            ),
+            'forecasting': lambda: Crew(
+                agents=[self.agents['forecasting']],
+                tasks=[self.tasks['forecasting']],
+                process=Process.sequential
+            ),
+            'router': lambda: Crew(
+                agents=[self.agents['router']],
+                tasks=[self.tasks['router']],
+                process=Process.sequential
+            ),
+            'router_batch': lambda: Crew(
+                agents=[self.agents['router']],
+                tasks=[self.tasks['router_batch']],
+                process=Process.sequential
+            )
+        }, phase='crew')
         
-        self.crews['forecasting'] = Crew(
-            agents=[self.agents['forecasting']],
-            tasks=[self.tasks['forecasting']],
-            process=Process.sequential
-        )
+    def schema_slice(self, query: str):
+        """Choose the SQL crew and the tables, columns and joins its agents see for a query.
         
-        self.crews['router'] = Crew(
-            agents=[self.agents['router']],
-            tasks=[self.tasks['router']],
-            process=Process.sequential
-        )
+        With the schema index, only the top-ranked tables are passed on; when the
+        ranking is unambiguous the fetcher agents are skipped via the 'sql_direct' crew.
+        Returns ``(crew_name, column_map, relationships, original)``, where ``original``
+        is the schema text agents were given before context budgets.
+        """
+        model = self.db_source.schema_model
+        match = self.linked_match(self.schema_index, query) if self.schema_index is not None else None
+        if match is None or not match.tables:
+            return 'sql', model.to_column_map(), model.relationships(), str(self.schema_info)
+        return ('sql_direct' if match.confident else 'sql'), match.to_schema_slice(), match.relationships, match.to_prompt()
+        
+    def linked_match(self, index: SchemaIndex, query: str) -> SchemaMatch:
+        """Schema index match for ``query``, plus the tables holding values the question names."""
+        match = index.search(query)
+        if self.column_stats is None:
+            return match
+        linked = {}
+        for value in self.column_stats.link(query):
+            linked.setdefault(value.table, []).append(value.column)
+        return index.include(match, linked)
+        
+    def schema_inputs(self, query: str):
+        """Choose the SQL crew and the schema views its agents get, each within ``Config.CONTEXT_SCHEMA_MAX_TOKENS``.
+        
+        'schema' lists the candidate tables with their columns and joins; 'tables'
+        is the shorter per-table overview the Table Fetcher needs (only in the 'sql' crew).
+        """
+        crew_name, columns, relationships, original = self.schema_slice(query)
+        budget = Config.CONTEXT_SCHEMA_MAX_TOKENS
+        model = self.db_source.schema_model
+        inputs = {'schema': self.render_view(query, columns, relationships), 'tables': ''}
+        record_context('schema', estimate_tokens(original), estimate_tokens(inputs['schema']))
+        if crew_name == 'sql':
+            inputs['tables'] = render_schema(columns, schema=model, max_tokens=budget, max_columns=TABLE_VIEW_COLUMNS)
+            record_context('tables', estimate_tokens(original), estimate_tokens(inputs['tables']))
+        return crew_name, inputs
+        
+    def render_view(self, query: str, columns, relationships, with_types: bool = False) -> str:
+        """Schema text within ``Config.CONTEXT_SCHEMA_MAX_TOKENS``, followed by the value hints for ``query``."""
+        hints = self.column_stats.hints(query, columns) if self.column_stats is not None else ''
+        budget = Config.CONTEXT_SCHEMA_MAX_TOKENS
+        if budget and hints:
+            budget = max(budget - estimate_tokens(hints) - 1, 1)
+        text = render_schema(columns, relationships, self.db_source.schema_model, max_tokens=budget, with_types=with_types)
+        return f"{text}\n{hints}" if hints else text
+        
+    def select_schema(self, query: str):
+        """Choose the SQL crew and the schema text its agents see for a query."""
+        crew_name, inputs = self.schema_inputs(query)
+        return crew_name, inputs['schema']
+        
+    def forecast_schema(self, query: str) -> str:
+        """Schema view for the Forecasting Analyst: candidate tables with column types, so time columns stand out."""
+        _, columns, relationships, original = self.schema_slice(query)
+        schema = self.render_view(query, columns, relationships, with_types=True)
+        record_context('forecast_schema', estimate_tokens(original), estimate_tokens(schema))
+        return schema
+        
+    def cache_namespace(self) -> str:
+        """Cache namespace tying generated SQL to this database and its current schema."""
+        return f"{self.db_source.database_key()}:{self.db_source.schema_fingerprint}"
+        
+    def run_cached_sql(self, query: str, db_path: str = None, db_type: str = 'sqlite', conn_string: str = None):
+        """Answer a repeated question by executing its cached SQL, without any LLM call."""
+        if self.query_cache is None:
+            return None
+        namespace = self.cache_namespace()
+        with tracer.span('stage', 'cache_lookup') as span:
+            sql = self.query_cache.get(query, namespace)
+            span.set(hit=sql is not None)
+        if sql is None:
+            return None
+        result = self.sql_tool._run({'sql': sql}, db_path=db_path, db_type=db_type, conn_string=conn_string)
+        if result['status'] == 'error':
+            self.query_cache.invalidate(query, namespace)
+            return None
+        # Timed out or cancelled: the SQL is still right, so it stays cached.
+        return {**result, 'sql': sql, 'cached': True}
+        
+    def remember_sql(self, query: str, crew_name: str, output) -> None:
+        """Cache the generated SQL once the validator reports it executed successfully."""
+        if self.query_cache is None:
+            return
+        validation = parse_dict_output(output)
+        if not validation or validation.get('status') != 'success':
+            return
+        sql = extract_sql(self.generator_output(crew_name, output))
+        # Only read-only statements are safe to replay for a repeated question.
+        if sql and returns_rows(sql):
+            after_confirmation(functools.partial(self.query_cache.put, query, sql, self.cache_namespace()))
+        
+    def generator_output(self, crew_name: str, output):
+        """The SQL Generator's answer from a crew run, preferring the run's own task outputs."""
+        for task_output in getattr(output, 'tasks_output', None) or []:
+            if getattr(task_output, 'agent', None) == self.agents['sql_generator'].role:
+                return task_output
+        return self.tasks['generate_sql_direct' if crew_name == 'sql_direct' else 'generate_sql'].output
+        
+    def route_query(self, query: str, crews=None, decision=None):
+        """Return 'sql', 'forecast' or None, asking the Router crew only when the local router is unsure.
+        
+        ``decision`` is the local router's answer, when the caller already has it.
+        """
+        crews = self.crews if crews is None else crews
+        with tracer.span('stage', 'route') as span:
+            if self.fast_router is not None:
+                decision = self.fast_router.route(query) if decision is None else decision
+                if self.fast_router.is_confident(decision):
+                    self.fast_router.record(decision.source, decision.response)
+                    span.set(source=decision.source, route=decision.response)
+                    return decision.response
+            
+            with tracer.span('crew', 'router') as crew_span:
+                result = crews['router'].kickoff(inputs={'query': query})
+                # The raw answer goes into the trace rather than stdout: this runs once per served request.
+                crew_span.set(output=str(result))
+            response = (parse_dict_output(result) or {}).get('response')
+            if self.fast_router is not None:
+                self.fast_router.record('llm', response)
+            span.set(source='llm', route=response)
+            return response
+        
+    def process_query(self, query: str, db_path: str = None, db_type: str = 'sqlite', conn_string: str = None, mode: str = None,
+                      cancel_token: CancelToken = None, crews=None):
+        """Process user query through appropriate crew.
+        
+        ``mode`` selects the SQL pipeline for this request: 'crew' (the four-agent
+        crew, most accurate) or 'express' (local schema pick and one LLM call);
+        it defaults to ``Config.SQL_MODE``. Cancelling ``cancel_token`` from another
+        thread stops the SQL this request runs, including SQL run by the agents.
+        Callers running queries on several threads pass per-thread ``crews``
+        (see ``WorkerCrews``), since crews keep per-run task outputs.
+        
+        When the Router crew has to be asked, the side-effect-free part of the SQL
+        pipeline (``prepare_sql``) may start at the same time (see ``Speculator``);
+        it is used if the route is SQL and dropped otherwise. The SQL itself only
+        runs once the route is confirmed.
+        """
+        with startup.phase('first_request'), cancel_scope(cancel_token), tracer.request('process_query', query=query, mode=mode or Config.SQL_MODE):
+            cached = self.run_cached_sql(query, db_path=db_path, db_type=db_type, conn_string=conn_string)
+            if cached is not None:
+                return cached
+            
+            db = {'db_path': db_path, 'db_type': db_type, 'conn_string': conn_string}
+            decision = self.fast_router.route(query) if self.fast_router is not None else None
+            branch = None
+            if (decision is None or not self.fast_router.is_confident(decision)) and self.speculator.should_speculate(decision):
+                branch = self.speculator.start(self.prepare_sql, query, crews=self.speculative_crews, mode=mode,
+                                               cancel_token=cancel_token, **db)
+            response = self.route_query(query, crews=crews, decision=decision)
+            prepared = None
+            if branch is not None:
+                if response == 'sql':
+                    prepared = branch.confirm()
+                else:
+                    branch.discard()
+            return self.run_route(query, response, crews=crews, mode=mode, prepared=prepared, **db)
+        
+    @property
+    def speculative_crews(self):
+        """Per-thread crew copies for speculative branches, made once per set of crews.
+        
+        A discarded branch may still be running when the next query starts, so branches never share the caller's crews.
+        """
+        if self._speculative_crews is None or self._speculative_crews[0] is not self.crews:
+            self._speculative_crews = (self.crews, WorkerCrews(self.crews))
+        return self._speculative_crews[1]
         
-    def process_query(self, query: str, db_path: str = None, db_type: str = 'sqlite', conn_string: str = None):
-        """Process user query through appropriate crew."""
-        result = self.crews['router'].kickoff(inputs={'query': query})
-        print(f"Router result: {result}")
+    def prepare_sql(self, query: str, db_path: str = None, db_type: str = 'sqlite', conn_string: str = None, crews=None, mode: str = None):
+        """The SQL pipeline up to, not including, running the query; the ``prepared`` argument of ``run_route``.
         
-        response = result.get('response')
+        Picks the schema for the crew pipeline, or in express mode generates and
+        checks the SQL (read-only check and EXPLAIN). Nothing is executed or cached,
+        so it can run before the route is confirmed.
+        """
+        crews = self.crews if crews is None else crews
+        if (mode or Config.SQL_MODE) == 'express':
+            with tracer.span('stage', 'express_generate'):
+                return {'express': self.generate_express_sql(query, db_path=db_path, db_type=db_type, conn_string=conn_string, crews=crews)}
+        with tracer.span('stage', 'schema_select') as span:
+            crew_name, schema_inputs = self.schema_inputs(query)
+            span.set(crew=crew_name)
+        return {'schema': (crew_name, schema_inputs)}
+        
+    def run_route(self, query: str, response, db_path: str = None, db_type: str = 'sqlite', conn_string: str = None, crews=None, mode: str = None,
+                  prepared=None):
+        """Answer an already routed query with the SQL or forecasting crew, reusing ``prepare_sql`` output when given."""
+        crews = self.crews if crews is None else crews
+        db = {'db_path': db_path, 'db_type': db_type, 'conn_string': conn_string}
+        if response == "sql" and prepared is None:
+            prepared = self.prepare_sql(query, crews=crews, mode=mode, **db)
+        if response == "sql" and 'express' in prepared:
+            with tracer.span('stage', 'express') as span:
+                result = self.run_express_sql(query, crews=crews, generated=prepared['express'], **db)
+                span.set(status=result['status'])
+            if result['status'] in ('success', 'cancelled') or not Config.EXPRESS_FALLBACK_TO_CREW:
+                return result
+            prepared = self.prepare_sql(query, crews=crews, mode='crew', **db)
         if response == "sql":
-            return self.crews['sql'].kickoff(inputs={
+            crew_name, schema_inputs = prepared['schema']
+            with tracer.span('crew', crew_name):
+                output = crews[crew_name].kickoff(inputs={
+                    'query': query,
+                    **schema_inputs,
+                    'db_path': db_path,
+                    'db_type': db_type,
+                    'conn_string': conn_string
+                })
+            self.remember_sql(query, crew_name, output)
+            return output
+        elif response == "forecast":
+            with tracer.span('crew', 'forecasting'):
+                return crews['forecasting'].kickoff(inputs={'query': query, 'schema': self.forecast_schema(query)})
+        else:
+            return {"error": "Query type not recognized", "result": response}
+        
+    def express_schema(self, query: str) -> str:
+        """Deterministic table/column pick for express mode, with join paths."""
+        index = self.schema_index
+        if index is None:
+            if self._express_index is None:
+                self._express_index = SchemaIndex(self.db_source.schema_model)
+            index = self._express_index
+        match = self.linked_match(index, query)
+        if not match.tables:
+            # Nothing matched lexically; let the model see every table.
+            column_map = self.db_source.schema_model.to_column_map()
+            match = SchemaMatch([(name, 0.0) for name in column_map], column_map, self.db_source.schema_model.relationships(), False)
+        schema = self.render_view(query, match.to_schema_slice(), match.relationships)
+        record_context('express_schema', estimate_tokens(match.to_prompt()), estimate_tokens(schema))
+        return schema
+        
+    def run_express_sql(self, query: str, db_path: str = None, db_type: str = 'sqlite', conn_string: str = None, crews=None,
+                        generated=None):
+        """Express SQL pipeline: ``generate_express_sql`` (unless ``generated`` is its result), then execution.
+        
+        Returns the SQL tool output plus 'sql' and 'mode'.
+        """
+        sql, error = generated or self.generate_express_sql(query, db_path=db_path, db_type=db_type, conn_string=conn_string, crews=crews)
+        if error is not None:
+            return {'status': 'error', 'message': error, 'data': None, 'sql': sql, 'mode': 'express'}
+        result = self.sql_tool._run({'sql': sql}, db_path=db_path, db_type=db_type, conn_string=conn_string)
+        if result['status'] == 'success' and self.query_cache is not None:
+            after_confirmation(functools.partial(self.query_cache.put, query, sql, self.cache_namespace()))
+        return {**result, 'sql': sql, 'mode': 'express'}
+        
+    def generate_express_sql(self, query: str, db_path: str = None, db_type: str = 'sqlite', conn_string: str = None, crews=None):
+        """One generation call and local checks, without running the SQL; returns ``(sql, error)``.
+        
+        SQL that fails the local checks (read-only, dialect, schema) or does not
+        compile under EXPLAIN is sent back with the errors for up to ``Config.EXPRESS_MAX_REPAIRS``
+        more calls. ``error`` is None once a read-only statement passed them.
+        """
+        crews = self.crews if crews is None else crews
+        inputs = {
+            'query': query,
+            'schema': self.express_schema(query),
+            'dialect': 'PostgreSQL' if db_type == 'postgres' else 'SQLite',
+            'feedback': ''
+        }
+        sql = None
+        error = 'No SQL statement was generated.'
+        for attempt in range(1 + max(Config.EXPRESS_MAX_REPAIRS, 0)):
+            with tracer.span('crew', 'sql_express', attempt=attempt):
+                output = crews['sql_express'].kickoff(inputs=inputs)
+            sql = extract_sql(output)
+            try:
+                if sql is None:
+                    raise SQLValidationError('No SQL statement was generated.')
+                errors = static_errors(sql, db_type, self.db_source.schema_model)
+                if errors:
+                    raise SQLValidationError(' '.join(errors))
+                sql = check_read_only(sql)
+                error = explain_error(sql, db_type, db_path=db_path, conn_string=conn_string)
+            except SQLValidationError as e:
+                error = str(e)
+            if error is None:
+                break
+            inputs['feedback'] = f"\nYour previous answer {sql!r} was rejected: {error.rstrip('.')}. Return a corrected query."
+        return sql, error
+        
+    def route_queries(self, queries, chunk_size: int = None, crews=None):
+        """Route many queries, sending those the local router is unsure about to the LLM in chunks."""
+        crews = self.crews if crews is None else crews
+        chunk_size = chunk_size or Config.BATCH_ROUTER_CHUNK_SIZE
+        routes = [None] * len(queries)
+        uncertain = []
+        for index, query in enumerate(queries):
+            if self.fast_router is not None:
+                decision = self.fast_router.route(query)
+                if self.fast_router.is_confident(decision):
+                    self.fast_router.record(decision.source, decision.response)
+                    routes[index] = decision.response
+                    continue
+            uncertain.append(index)
+        
+        for start in range(0, len(uncertain), chunk_size):
+            chunk = uncertain[start:start + chunk_size]
+            if len(chunk) == 1:
+                routes[chunk[0]] = self.route_query(queries[chunk[0]], crews=crews)
+                continue
+            result = crews['router_batch'].kickoff(inputs={'queries': format_numbered([queries[i] for i in chunk])})
+            answered = parse_batch_routes(parse_dict_output(result), len(chunk))
+            for position, index in enumerate(chunk):
+                if position in answered:
+                    routes[index] = answered[position]
+                    if self.fast_router is not None:
+                        self.fast_router.record('llm', routes[index])
+                else:
+                    # The batch answer skipped this question; ask about it on its own.
+                    routes[index] = self.route_query(queries[index], crews=crews)
+        return routes
+        
+    def process_queries(self, queries, db_path: str = None, db_type: str = 'sqlite', conn_string: str = None, max_workers: int = None, mode: str = None,
+                        cancel_token: CancelToken = None, crews=None):
+        """Answer a batch of queries, returning one result dict per input in input order.
+        
+        Identical and near-identical questions are answered once. Cached SQL is
+        tried first, the remaining questions are routed in bulk, and the crews run
+        on a pool of worker threads that each use their own copies of the crews.
+        Each item reports ``elapsed`` seconds spent on its unique question
+        (cache lookup, its share of the bulk routing call and the crew run) and
+        ``duplicate_of``, the input index whose answer it shares, if any.
+        ``cancel_token`` stops the SQL of every query in the batch. ``crews`` are
+        the caller's per-thread crews for the routing calls made on its thread.
+        """
+        with startup.phase('first_request'), tracer.request('process_queries', size=len(queries)):
+            return self._process_queries(list(queries), db_path, db_type, conn_string, max_workers, mode, cancel_token, crews)
+        
+    def _process_queries(self, queries, db_path, db_type, conn_string, max_workers, mode, cancel_token, crews):
+        db = {'db_path': db_path, 'db_type': db_type, 'conn_string': conn_string}
+        unique, mapping = dedupe(queries)
+        results = [None] * len(unique)
+        routes = [None] * len(unique)
+        elapsed = [0.0] * len(unique)
+        
+        trace_context = tracer.context()
+        
+        def timed(index, function, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                # Worker threads do not inherit the caller's context, so the scope and trace are set per call.
+                with cancel_scope(cancel_token), tracer.resume(trace_context):
+                    return function(*args, **kwargs)
+            except Exception as e:
+                return {"error": str(e), "result": None}
+            finally:
+                elapsed[index] += time.perf_counter() - started
+        
+        worker_crews = WorkerCrews(self.crews)
+        with ThreadPoolExecutor(max_workers=max_workers or Config.BATCH_MAX_WORKERS) as executor:
+            cached = list(executor.map(lambda i: timed(i, self.run_cached_sql, unique[i], **db), range(len(unique))))
+            pending = []
+            for index, result in enumerate(cached):
+                if result is None or 'error' in result:
+                    pending.append(index)
+                else:
+                    results[index], routes[index] = result, 'sql'
+            
+            if pending:
+                started = time.perf_counter()
+                for index, route in zip(pending, self.route_queries([unique[i] for i in pending], crews=crews)):
+                    routes[index] = route
+                share = (time.perf_counter() - started) / len(pending)
+                for index in pending:
+                    elapsed[index] += share
+            
+            answers = executor.map(
+                lambda i: timed(i, self.run_route, unique[i], routes[i], crews=worker_crews, mode=mode, **db),
+                pending
+            )
+            for index, answer in zip(pending, answers):
+                results[index] = answer
+        
+        first_seen = {}
+        items = []
+        for position, (query, index) in enumerate(zip(queries, mapping)):
+            duplicate_of = first_seen.setdefault(index, position)
+            items.append({
                 'query': query,
-                'db_path': db_path,
-                'db_type': db_type,
-                'conn_string': conn_string
+                'route': routes[index],
+                'result': results[index],
+                'elapsed': elapsed[index],
+                'duplicate_of': None if duplicate_of == position else duplicate_of
             })
+        return items
+        
+    def query_slots(self) -> asyncio.Semaphore:
+        """Semaphore bounding concurrent ``aprocess_query`` calls on the running event loop."""
+        loop = asyncio.get_running_loop()
+        slots = self._query_slots.get(loop)
+        if slots is None:
+            slots = self._query_slots[loop] = asyncio.Semaphore(Config.MAX_CONCURRENT_QUERIES)
+        return slots
+        
+    async def arun_cached_sql(self, query: str, db_path: str = None, db_type: str = 'sqlite', conn_string: str = None):
+        """Async ``run_cached_sql``."""
+        if self.query_cache is None:
+            return None
+        namespace = self.cache_namespace()
+        with tracer.span('stage', 'cache_lookup') as span:
+            sql = self.query_cache.get(query, namespace)
+            span.set(hit=sql is not None)
+        if sql is None:
+            return None
+        result = await self.sql_tool._arun({'sql': sql}, db_path=db_path, db_type=db_type, conn_string=conn_string)
+        if result['status'] == 'error':
+            self.query_cache.invalidate(query, namespace)
+            return None
+        return {**result, 'sql': sql, 'cached': True}
+        
+    async def aroute_query(self, query: str):
+        """Async ``route_query``; the Router crew is copied so concurrent calls do not share task state."""
+        with tracer.span('stage', 'route') as span:
+            if self.fast_router is not None:
+                decision = self.fast_router.route(query)
+                if self.fast_router.is_confident(decision):
+                    self.fast_router.record(decision.source, decision.response)
+                    span.set(source=decision.source, route=decision.response)
+                    return decision.response
+            
+            with tracer.span('crew', 'router'):
+                result = await self.crews['router'].copy().kickoff_async(inputs={'query': query})
+            response = (parse_dict_output(result) or {}).get('response')
+            if self.fast_router is not None:
+                self.fast_router.record('llm', response)
+            span.set(source='llm', route=response)
+            return response
+        
+    async def aprocess_query(self, query: str, db_path: str = None, db_type: str = 'sqlite', conn_string: str = None, mode: str = None):
+        """Async ``process_query`` for serving many users from one event loop.
+        
+        At most ``Config.MAX_CONCURRENT_QUERIES`` queries run at once; further
+        calls wait for a slot. Every call kicks off its own copy of the crew,
+        since crews keep per-run task outputs.
+        """
+        async with self.query_slots():
+            with startup.phase('first_request'), tracer.request('aprocess_query', query=query, mode=mode or Config.SQL_MODE):
+                return await self._aprocess_query(query, db_path, db_type, conn_string, mode)
+        
+    async def _aprocess_query(self, query, db_path, db_type, conn_string, mode):
+        cached = await self.arun_cached_sql(query, db_path=db_path, db_type=db_type, conn_string=conn_string)
+        if cached is not None:
+            return cached
+        
+        response = await self.aroute_query(query)
+        if response == "sql" and (mode or Config.SQL_MODE) == 'express':
+            with tracer.span('stage', 'express') as span:
+                result = await asyncio.to_thread(
+                    self.run_express_sql, query, db_path=db_path, db_type=db_type, conn_string=conn_string,
+                    crews={'sql_express': self.crews['sql_express'].copy()}
+                )
+                span.set(status=result['status'])
+            if result['status'] in ('success', 'cancelled') or not Config.EXPRESS_FALLBACK_TO_CREW:
+                return result
+        if response == "sql":
+            with tracer.span('stage', 'schema_select') as span:
+                crew_name, schema_inputs = self.schema_inputs(query)
+                span.set(crew=crew_name)
+            with tracer.span('crew', crew_name):
+                output = await self.crews[crew_name].copy().kickoff_async(inputs={
+                    'query': query,
+                    **schema_inputs,
+                    'db_path': db_path,
+                    'db_type': db_type,
+                    'conn_string': conn_string
+                })
+            self.remember_sql(query, crew_name, output)
+            return output
         elif response == "forecast":
-            return self.crews['forecasting'].kickoff(inputs={'query': query})
+            with tracer.span('crew', 'forecasting'):
+                return await self.crews['forecasting'].copy().kickoff_async(inputs={'query': query, 'schema': self.forecast_schema(query)})
         else:
-            return {"error": "Query type not recognized", "result": result}
+            return {"error": "Query type not recognized", "result": response}
 
 from src.config import Config, DBTypeEnum
 
-def main():
-    """Main function to run the system."""
+startup.record('import:main', time.perf_counter() - _import_started)
+
+def build_system(db_config: dict) -> CrewAIQuerySystem:
+    """Create a system with its database, agents, tasks and crews declared."""
+    system = CrewAIQuerySystem()
+    system.setup_database(**db_config)
+    system.initialize_agents_and_tasks()
+    system.create_crews()
+    return system
+
+def main(argv=None):
+    """Main function to run the system; ``python main.py serve`` starts the HTTP server instead."""
+    argv = sys.argv[1:] if argv is None else argv
     try:
         # Validate configuration first
         Config.validate()
         
         os.environ["OPENAI_API_KEY"] = Config.OPENAI_API_KEY
-        
-        system = CrewAIQuerySystem()
         db_config = Config.get_db_config()
         
         print(f"Using database type: {Config.get_db_type_enum().value}")
         
-        system.setup_database(**db_config)
-        system.initialize_agents_and_tasks()
-        system.create_crews()
+        if argv[:1] == ['serve']:
+            # The server exposes /metrics itself; worker processes are forked, so nothing starts threads before it.
+            from src.server import serve
+            serve(lambda: build_system(db_config), db_config)
+            return
+        
+        if Config.METRICS_PORT:
+            start_metrics_server(Config.METRICS_PORT)
+        system = build_system(db_config)
         
         query = "Which park had most attendances in 2008?"
         result = system.process_query(query, **db_config)
         print(f"Final result: {result}")
+        if tracer.enabled:
+            print(f"Trace: {tracer.last_trace().to_json(indent=2)}")
+        if Config.STARTUP_REPORT:
+            print(f"Startup:\n{startup.report()}")
         
     except Exception as e:
         print(f"Configuration Error: {str(e)}")
 
+if __name__ == "__main__":
+    main()
@@ -1,56 +1,58 @@
 from src.base_agent import BaseAgent
+from src.startup import LazyDict
 
-def create_agents(llm, schema_info, execute_sql_query_tool):
-    router_agent = BaseAgent(
-        role='Router',
-        goal='Route queries to appropriate specialized agents',
-        backstory="""You are an intelligent router that analyzes user queries and determines whether they need SQL analysis or forecasting analysis.""",
-        llm=llm
-    )
+def create_agents(llm, execute_sql_query_tool, forecast_tool=None):
+    # The fetchers get their schema view per query through the task inputs
+    # (see CrewAIQuerySystem.schema_inputs), compacted to the context budget.
 
-    fetch_table_agent = BaseAgent(
-        role='Table Fetcher',
-        goal='Fetch and understand available database tables',
-        backstory="""You are specialized in retrieving database table information and understanding table relationships.""",
-        knowledge_sources=[schema_info],
-        llm=llm
-    )
-
-    fetch_column_agent = BaseAgent(
-        role='Column Fetcher',
-        goal='Fetch and understand table columns',
-        backstory="""You are specialized in retrieving and understanding table columns and their data types.""",
-        knowledge_sources=[schema_info],
-        llm=llm
-    )
-
-    sql_generator_agent = BaseAgent(
-        role='SQL Generator',
-        goal='Generate accurate SQL queries',
-        backstory="""You are an expert in generating SQL queries based on natural language requests and database structure.""",
-        llm=llm
-    )
-
-    sql_validator_agent = BaseAgent(
-        role='SQL Validator',
-        goal='Validate SQL queries for correctness and execute them on the database',
-        backstory="""You are specialized in validating SQL queries for syntax and logical correctness, and executing them on the connected database.""",
-        llm=llm,
-        tools=[execute_sql_query_tool]
-    )
-
-    forecasting_agent = BaseAgent(
-        role='Forecasting Analyst',
-        goal='Generate accurate time series forecasts',
-        backstory="""You are an expert in time series analysis and forecasting, specialized in using Prophet for predictions.""",
-        llm=llm
-    )
-
-    return {
-        'router': router_agent,
-        'fetch_table': fetch_table_agent,
-        'fetch_column': fetch_column_agent,
-        'sql_generator': sql_generator_agent,
-        'sql_validator': sql_validator_agent,
-        'forecasting': forecasting_agent
-    }
+    # Agents are built on first use, so a process that only answers SQL never
+    # builds the forecasting agent (or its LLM client).
+    return LazyDict({
+        'router': lambda: BaseAgent(
+            role='Router',
+            goal='Route queries to appropriate specialized agents',
+            backstory="""You are an intelligent router that analyzes user queries and determines whether they need SQL analysis or forecasting analysis.""",
+            llm=llm
+        ),
+        'fetch_table': lambda: BaseAgent(
+            role='Table Fetcher',
+            goal='Fetch and understand available database tables',
+            backstory="""You are specialized in retrieving database table information and understanding table relationships.""",
+            llm=llm
+        ),
+        'fetch_column': lambda: BaseAgent(
+            role='Column Fetcher',
+            goal='Fetch and understand table columns',
+            backstory="""You are specialized in retrieving and understanding table columns and their data types.""",
+            llm=llm
+        ),
+        'sql_generator': lambda: BaseAgent(
+            role='SQL Generator',
+            goal='Generate accurate SQL queries',
+            backstory="""You are an expert in generating SQL queries based on natural language requests and database structure.""",
+            llm=llm
+        ),
+        'sql_validator': lambda: BaseAgent(
+            role='SQL Validator',
+            goal='Validate SQL queries for correctness and execute them on the database',
+            backstory="""You are specialized in validating SQL queries for syntax and logical correctness, and executing them on the connected database.""",
+            llm=llm,
+            tools=[execute_sql_query_tool]
+        ),
+        # Express mode: one LLM call per question, so no delegation and no tools;
+        # the schema slice is chosen locally and the SQL is checked and executed locally.
+        'sql_express': lambda: BaseAgent(
+            role='Express SQL Generator',
+            goal='Write a single correct SQL query in one step',
+            backstory="""You are an expert SQL writer who answers with one query that uses only the tables and columns you are given.""",
+            allow_delegation=False,
+            llm=llm
+        ),
+        'forecasting': lambda: BaseAgent(
+            role='Forecasting Analyst',
+            goal='Generate accurate time series forecasts',
+            backstory="""You are an expert in time series analysis and forecasting. You load series from the database and fit exponential smoothing and ARIMA-style models with the Time Series Forecaster instead of guessing numbers.""",
+            llm=llm,
+            tools=[forecast_tool] if forecast_tool is not None else []
+        )
+    }, phase='agent')
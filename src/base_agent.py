@@ -1,4 +1,5 @@
 from crewai import Agent
+from src.tracing import tracer, usage_delta
 from typing import Optional, List, Any
 
 class BaseAgent(Agent):
@@ -26,6 +27,29 @@ class BaseAgent(Agent):
             **kwargs
         )
 
+    def execute_task(self, task: Any, context: Optional[str] = None, tools: Optional[List[Any]] = None) -> Any:
+        if not tracer.enabled:
+            return super().execute_task(task, context, tools)
+        with tracer.span('agent', self.role) as span:
+            before = self.token_usage()
+            result = super().execute_task(task, context, tools)
+            span.set(**usage_delta(self.token_usage(), before))
+            return result
+
+    async def aexecute_task(self, task: Any, context: Optional[str] = None, tools: Optional[List[Any]] = None) -> Any:
+        if not tracer.enabled:
+            return await super().aexecute_task(task, context, tools)
+        with tracer.span('agent', self.role) as span:
+            before = self.token_usage()
+            result = await super().aexecute_task(task, context, tools)
+            span.set(**usage_delta(self.token_usage(), before))
+            return result
+
+    def token_usage(self) -> Any:
+        """Cumulative token counters of this agent's LLM (shared with other agents using the same LLM)."""
+        summary = getattr(self.llm, 'get_token_usage_summary', None)
+        return summary() if summary is not None else None
+
     def perform_action(self, action: str) -> str:
         """Placeholder for common agent actions, like logging or validation."""
         return f"{self.role} performing action: {action}"
@@ -1,3 +1,4 @@
+import asyncio
 from crewai.knowledge.source.base_knowledge_source import BaseKnowledgeSource
 from typing import Dict, List, Any, Optional
 from pydantic import Field
@@ -31,3 +32,7 @@ class BaseCustomKnowledgeSource(BaseKnowledgeSource):
             self._save_documents()
         else:
             raise ValueError("Invalid content loaded from source")
+
+    async def aadd(self) -> None:
+        """Async variant of add(), required by newer crewai releases."""
+        await asyncio.to_thread(self.add)
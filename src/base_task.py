@@ -1,4 +1,5 @@
 from crewai import Task
+from src.tracing import tracer
 from typing import Optional, Any
 
 class BaseTask(Task):
@@ -18,6 +19,31 @@ class BaseTask(Task):
             **kwargs
         )
 
+    @property
+    def stage(self) -> str:
+        """Stable label for traces; descriptions embed the user query, so the name or agent role is used."""
+        return self.name or (self.agent.role if self.agent is not None else 'task')
+
+    def execute_sync(self, agent: Any = None, context: Optional[str] = None, tools: Optional[list] = None) -> Any:
+        if not tracer.enabled:
+            return super().execute_sync(agent, context, tools)
+        with tracer.span('task', self.stage) as span:
+            retries = self.retry_count
+            try:
+                return super().execute_sync(agent, context, tools)
+            finally:
+                span.set(retries=self.retry_count - retries)
+
+    async def aexecute_sync(self, agent: Any = None, context: Optional[str] = None, tools: Optional[list] = None) -> Any:
+        if not tracer.enabled:
+            return await super().aexecute_sync(agent, context, tools)
+        with tracer.span('task', self.stage) as span:
+            retries = self.retry_count
+            try:
+                return await super().aexecute_sync(agent, context, tools)
+            finally:
+                span.set(retries=self.retry_count - retries)
+
     def validate_output(self, output: Any) -> bool:
         """Placeholder for output validation logic."""
         return True
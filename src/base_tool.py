@@ -1,13 +1,19 @@
 from crewai.tools import BaseTool
+from src.tracing import traced_tool_method
 from typing import Any
 
 class BaseCustomTool(BaseTool):
     """Base class for all custom tools in the system. Extends crewai.BaseTool with common methods."""
     
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Every custom tool call becomes a 'tool' span when tracing is on.
+        for method in ('_run', '_arun'):
+            if method in cls.__dict__:
+                setattr(cls, method, traced_tool_method(cls.__dict__[method]))
+
     def __init__(self, name: str, description: str, **kwargs):
-        super().__init__()
-        self.name = name
-        self.description = description
+        super().__init__(name=name, description=description, **kwargs)
 
     def validate_input(self, input_data: Any) -> bool:
         """Placeholder for common input validation logic."""
@@ -0,0 +1,75 @@
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.query_cache import normalize_query
+
+_DECIMAL_SAFE_PUNCTUATION = re.compile(r"[,;:!?\"]|\.(?!\d)")
+_ARTICLES = re.compile(r"\b(a|an|the)\b")
+_ROUTES = {'sql': 'sql', 'forecast': 'forecast'}
+
+
+def dedupe_key(query: str) -> str:
+    """Key under which near-identical questions share one answer.
+
+    On top of ``normalize_query`` this drops punctuation and articles, so
+    "Which park had the most attendances in 2008?" and "which park had most
+    attendances in 2008" collapse. Word order, numbers and every other word are
+    kept, so questions that could have different answers never merge.
+    """
+    query = _DECIMAL_SAFE_PUNCTUATION.sub(' ', normalize_query(query))
+    return ' '.join(_ARTICLES.sub(' ', query).split())
+
+
+def dedupe(queries: List[str]) -> Tuple[List[str], List[int]]:
+    """Return the unique questions (first spelling wins) and, per input, the index of its unique question."""
+    unique: List[str] = []
+    positions: Dict[str, int] = {}
+    mapping: List[int] = []
+    for query in queries:
+        key = dedupe_key(query)
+        if key not in positions:
+            positions[key] = len(unique)
+            unique.append(query)
+        mapping.append(positions[key])
+    return unique, mapping
+
+
+def format_numbered(queries: List[str]) -> str:
+    """Render questions as the numbered list the batch router task expects."""
+    return '\n'.join(f"{number}. {query}" for number, query in enumerate(queries, start=1))
+
+
+def parse_batch_routes(parsed: Optional[Dict[Any, Any]], count: int) -> Dict[int, Optional[str]]:
+    """Read the batch router's {number: route} answer into {0-based index: route}; missed numbers are absent."""
+    routes: Dict[int, Optional[str]] = {}
+    for key, value in (parsed or {}).items():
+        try:
+            number = int(str(key).strip().rstrip('.'))
+        except ValueError:
+            continue
+        if 1 <= number <= count:
+            routes[number - 1] = None if value is None else _ROUTES.get(str(value).strip().lower())
+    return routes
+
+
+class WorkerCrews:
+    """Per-thread copies of the system's crews for batch workers.
+
+    Crews keep the outputs of their last run on their tasks, so threads must
+    not share them. Each worker thread copies a crew the first time it needs
+    it and reuses that copy for every later item.
+    """
+
+    def __init__(self, crews: Dict[str, Any]):
+        self._crews = crews
+        self._local = threading.local()
+
+    def __getitem__(self, name: str) -> Any:
+        copies = getattr(self._local, 'copies', None)
+        if copies is None:
+            copies = self._local.copies = {}
+        crew = copies.get(name)
+        if crew is None:
+            crew = copies[name] = self._crews[name].copy()
+        return crew
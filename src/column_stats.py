@@ -0,0 +1,449 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import Counter, defaultdict
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from pydantic import BaseModel, Field
+
+from src.config import Config
+from src.governor import CancelToken, QueryCancelled, QueryGovernor, QueryTimeout
+from src.pool import get_pool
+from src.result_cache import sqlite_file_state
+from src.schema import SchemaModel, TableInfo, qualified_table_name
+from src.schema_index import STOPWORDS, tokenize
+from src.tracing import tracer
+
+_WORD = re.compile(r'[a-z0-9]+')
+# Longest question span, in words, compared against stored values.
+_MAX_SPAN_WORDS = 4
+# Longer text is prose rather than a name, and is not indexed.
+_MAX_VALUE_CHARS = 80
+# A span matching more distinct values than this is too generic to link.
+_MAX_VALUES_PER_SPAN = 3
+# Score of a span whose every trigram occurs in a longer value ("yankees" in "New York Yankees").
+_CONTAINMENT_WEIGHT = 0.9
+_MAX_LINKS = 8
+_MAX_RANGES = 6
+# Columns named like this get their range shown, so "in 2008" or "last season" can be resolved.
+_TIME_TERMS = frozenset(tokenize('year date season month week day quarter time period'))
+
+POSTGRES_TABLE_SIGNATURES_SQL = """
+SELECT schemaname, relname, n_tup_ins + n_tup_upd + n_tup_del, n_live_tup
+FROM pg_stat_user_tables
+"""
+
+
+class ColumnStats(BaseModel):
+    """Statistics of one column. ``values`` lists every distinct value of a low-cardinality text column."""
+
+    kind: Optional[str] = None
+    nulls: int = 0
+    distinct: Optional[int] = None
+    min: Any = None
+    max: Any = None
+    top: List[Tuple[Any, int]] = Field(default_factory=list)
+    values: Optional[List[str]] = None
+
+
+class TableStats(BaseModel):
+    """Statistics of one table, valid while the table's ``signature`` is unchanged."""
+
+    signature: str
+    rows: int = 0
+    columns: Dict[str, ColumnStats] = Field(default_factory=dict)
+
+
+class DatabaseStats(BaseModel):
+    tables: Dict[str, TableStats] = Field(default_factory=dict)
+
+
+def column_kind(data_type: Optional[str]) -> Optional[str]:
+    """'number', 'time' or 'text' for columns worth profiling; None for JSON, arrays, blobs and the like."""
+    data_type = (data_type or '').lower()
+    if data_type.endswith(']') or 'interval' in data_type or 'point' in data_type:
+        return None
+    if 'int' in data_type:
+        return 'number'
+    # SQLite columns without a declared type usually hold text.
+    if not data_type or data_type == 'name' or any(word in data_type for word in ('char', 'text', 'clob')):
+        return 'text'
+    if 'date' in data_type or 'time' in data_type:
+        return 'time'
+    if any(word in data_type for word in ('real', 'floa', 'doub', 'num', 'dec')):
+        return 'number'
+    return None
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _table_ref(table: TableInfo) -> str:
+    return f"{_quote(table.schema_name)}.{_quote(table.name)}" if table.schema_name else _quote(table.name)
+
+
+def _json_value(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def sql_literal(value: Any) -> str:
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return str(value)
+
+
+def _columns_digest(table: TableInfo) -> str:
+    names = '\x1f'.join(f"{column.name}:{column.data_type}" for column in table.columns)
+    return hashlib.sha256(names.encode('utf-8')).hexdigest()[:16]
+
+
+def table_signatures(conn: Any, db_type: str, schema: SchemaModel, db_path: str = None) -> Dict[str, str]:
+    """Cheap change markers; a table whose marker moved has its statistics rebuilt.
+
+    PostgreSQL uses the per-table insert, update and delete counters of
+    ``pg_stat_user_tables`` (one catalog query). SQLite has no per-table
+    counter short of scanning, so every table carries the database files'
+    state (``sqlite_file_state``): without writes a refresh reads nothing,
+    and any commit, updates included, re-profiles every table. Both include
+    the column list, so schema changes count as well. Views get no
+    signature and are not profiled.
+    """
+    tables = {name: table for name, table in schema.tables.items() if table.kind == 'table'}
+    if db_type == 'sqlite':
+        state = hashlib.sha256(repr(sqlite_file_state(db_path)).encode('utf-8')).hexdigest()[:16]
+        return {name: f"{state}:{_columns_digest(table)}" for name, table in tables.items()}
+    signatures = {}
+    cursor = conn.cursor()
+    try:
+        cursor.execute(POSTGRES_TABLE_SIGNATURES_SQL)
+        for schema_name, relname, modifications, live in cursor.fetchall():
+            name = qualified_table_name(schema_name, relname, 'public')
+            if name in tables:
+                signatures[name] = f"{modifications}:{live}:{_columns_digest(tables[name])}"
+        return signatures
+    finally:
+        cursor.close()
+
+
+def collect_table_stats(conn: Any, table: TableInfo, signature: str, max_distinct: int = None,
+                        top_values: int = None) -> TableStats:
+    """Profile one table: one aggregate scan for counts and ranges, then one grouped query per text column.
+
+    Text columns with at most ``max_distinct`` distinct values keep all of
+    them (for the value index); others only keep their ``top_values`` most
+    common values, and unique columns none.
+    """
+    max_distinct = Config.VALUE_INDEX_MAX_DISTINCT if max_distinct is None else max_distinct
+    top_values = Config.VALUE_INDEX_TOP_VALUES if top_values is None else top_values
+    ref = _table_ref(table)
+    kinds = {column.name: column_kind(column.data_type) for column in table.columns}
+    select = ['count(*)']
+    for column in table.columns:
+        name = _quote(column.name)
+        select.append(f"count({name})")
+        if kinds[column.name]:
+            select.append(f"count(DISTINCT {name})")
+        if kinds[column.name] in ('number', 'time'):
+            select += [f"min({name})", f"max({name})"]
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT {', '.join(select)} FROM {ref}")
+        values = iter(cursor.fetchone())
+        rows = next(values)
+        result = TableStats(signature=signature, rows=rows)
+        for column in table.columns:
+            kind = kinds[column.name]
+            non_null = next(values)
+            stats = ColumnStats(kind=kind, nulls=rows - non_null)
+            if kind:
+                stats.distinct = next(values)
+            if kind in ('number', 'time'):
+                stats.min, stats.max = _json_value(next(values)), _json_value(next(values))
+            if kind == 'text' and stats.distinct and (stats.distinct <= max_distinct or stats.distinct < non_null):
+                name = _quote(column.name)
+                limit = max_distinct if stats.distinct <= max_distinct else top_values
+                cursor.execute(
+                    f"SELECT {name}, count(*) FROM {ref} WHERE {name} IS NOT NULL "
+                    f"GROUP BY {name} ORDER BY count(*) DESC, {name} LIMIT {int(limit)}"
+                )
+                counted = cursor.fetchall()
+                if stats.distinct < non_null:
+                    stats.top = [(_json_value(value), count) for value, count in counted[:top_values]]
+                if stats.distinct <= max_distinct:
+                    stats.values = [str(value) for value, _ in counted if len(str(value)) <= _MAX_VALUE_CHARS]
+            result.columns[column.name] = stats
+        return result
+    finally:
+        cursor.close()
+
+
+def _trigrams(text: str) -> Set[str]:
+    """pg_trgm-style trigrams: each lower-cased word padded with two spaces in front and one behind."""
+    grams = set()
+    for word in _WORD.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class ValueMatch:
+    """A phrase of the question resolved to a value stored in ``table.column``."""
+
+    def __init__(self, table: str, column: str, value: str, score: float, text: str):
+        self.table = table
+        self.column = column
+        self.value = value
+        self.score = score
+        self.text = text
+
+    def __repr__(self) -> str:
+        return f"ValueMatch({self.table}.{self.column} = {self.value!r}, score={self.score:.2f}, text={self.text!r})"
+
+
+class ValueIndex:
+    """Trigram index over the distinct values of low-cardinality text columns.
+
+    Every span of up to four words in the question is scored against the
+    values sharing its trigrams, by trigram Jaccard similarity or, when the
+    whole span occurs in a longer value, by containment. Spans made only of
+    schema words ("park", "team") or matching many values are not literals
+    and are skipped.
+    """
+
+    def __init__(self, stats: DatabaseStats):
+        self.entries: List[Tuple[str, str, str]] = []
+        self._sizes: List[int] = []
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        self._schema_terms = set()
+        for table, table_stats in stats.tables.items():
+            self._schema_terms.update(tokenize(table))
+            for column, column_stats in table_stats.columns.items():
+                self._schema_terms.update(tokenize(column))
+                for value in column_stats.values or ():
+                    grams = _trigrams(value)
+                    if not grams:
+                        continue
+                    entry = len(self.entries)
+                    self.entries.append((table, column, value))
+                    self._sizes.append(len(grams))
+                    for gram in grams:
+                        self._postings[gram].append(entry)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _spans(self, words: List[str]) -> Iterable[Tuple[int, int]]:
+        for start in range(len(words)):
+            for end in range(start + 1, min(start + _MAX_SPAN_WORDS, len(words)) + 1):
+                span = words[start:end]
+                if span[0] in STOPWORDS or span[-1] in STOPWORDS or all(word.isdigit() for word in span):
+                    continue
+                if len(''.join(span)) < 3 or all(term in self._schema_terms for term in tokenize(' '.join(span))):
+                    continue
+                yield start, end
+
+    def match(self, question: str, tables: Iterable[str] = None, min_similarity: float = None,
+              limit: int = None) -> List[ValueMatch]:
+        """Values the question mentions, best first; overlapping phrases are resolved in favour of the best."""
+        min_similarity = Config.VALUE_INDEX_MIN_SIMILARITY if min_similarity is None else min_similarity
+        limit = limit or _MAX_LINKS
+        tables = set(tables) if tables is not None else None
+        words = _WORD.findall(question.lower())
+        candidates = []
+        for start, end in self._spans(words):
+            text = ' '.join(words[start:end])
+            grams = _trigrams(text)
+            shared = Counter()
+            for gram in grams:
+                for entry in self._postings.get(gram, ()):
+                    shared[entry] += 1
+            scored = []
+            for entry, count in shared.items():
+                if tables is not None and self.entries[entry][0] not in tables:
+                    continue
+                score = count / (len(grams) + self._sizes[entry] - count)
+                if count == len(grams):
+                    score = max(score, _CONTAINMENT_WEIGHT)
+                if score >= min_similarity:
+                    scored.append((score, entry))
+            if not scored:
+                continue
+            best = max(score for score, _ in scored)
+            entries = [entry for score, entry in scored if score >= best]
+            if len({self.entries[entry][2] for entry in entries}) > _MAX_VALUES_PER_SPAN:
+                continue
+            candidates.append((best, end - start, start, text, entries))
+
+        matches = []
+        covered: Set[int] = set()
+        for score, length, start, text, entries in sorted(candidates, key=lambda c: (-c[0], -c[1], c[2])):
+            if covered.intersection(range(start, start + length)):
+                continue
+            covered.update(range(start, start + length))
+            for entry in sorted(entries, key=lambda e: self.entries[e]):
+                table, column, value = self.entries[entry]
+                matches.append(ValueMatch(table, column, value, score, text))
+        return matches[:limit]
+
+
+class ColumnStatsIndex:
+    """Column statistics and the value index of one database, built and refreshed in the background.
+
+    ``refresh`` profiles only the tables whose signature changed since the
+    last build (see ``table_signatures``) and saves the statistics next to the
+    schema cache, so a restart begins from the previous build. Each table gets
+    ``VALUE_INDEX_TABLE_TIMEOUT`` seconds; one that needs longer keeps its
+    previous statistics and is tried again on the next refresh. Lookups
+    (``link``, ``hints``) read the in-memory index and never touch the
+    database.
+    """
+
+    def __init__(self, db_type: str, schema: SchemaModel, db_key: str, db_path: str = None, conn_string: str = None,
+                 cache_dir: str = None):
+        self.db_type = db_type
+        self.schema = schema
+        self.db_key = db_key
+        self.db_path = db_path
+        self.conn_string = conn_string
+        self.cache_dir = os.path.expanduser(cache_dir or Config.SCHEMA_CACHE_DIR)
+        self.stats = self._load() or DatabaseStats()
+        self.index = ValueIndex(self.stats)
+        self.last_error: Optional[BaseException] = None
+        # Set once the first refresh has finished (successfully or not).
+        self.built = threading.Event()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        # Cancelled by ``close``, which interrupts a profiling query in flight.
+        self._cancel = CancelToken()
+        self._thread: Optional[threading.Thread] = None
+
+    def _path(self) -> str:
+        return os.path.join(self.cache_dir, f"{self.db_key}.stats.json")
+
+    def _load(self) -> Optional[DatabaseStats]:
+        try:
+            with open(self._path(), 'r', encoding='utf-8') as f:
+                return DatabaseStats.model_validate(json.load(f))
+        except Exception:
+            return None
+
+    def _save(self) -> None:
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(self.stats.model_dump(mode='json'), f, separators=(',', ':'))
+                os.replace(tmp_path, self._path())
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        except OSError:
+            # Without a writable cache the next start rebuilds from scratch.
+            pass
+
+    def refresh(self) -> List[str]:
+        """Re-profile changed tables and swap in a new index; returns the refreshed table names."""
+        with self._refresh_lock, tracer.span('stats', 'refresh', db_type=self.db_type) as span:
+            pool = get_pool(self.db_type, db_path=self.db_path, conn_string=self.conn_string)
+            if self.db_type == 'sqlite':
+                # Read from the database files; no query runs.
+                signatures = table_signatures(None, self.db_type, self.schema, self.db_path)
+            else:
+                with pool.connection() as conn, QueryGovernor(Config.VALUE_INDEX_TABLE_TIMEOUT, self._cancel).attach(conn, self.db_type):
+                    signatures = table_signatures(conn, self.db_type, self.schema)
+            tables = {name: stats for name, stats in self.stats.tables.items() if name in signatures}
+            changed = [name for name, signature in signatures.items()
+                       if name not in tables or tables[name].signature != signature]
+            refreshed = []
+            timed_out = 0
+            for name in changed:
+                if self._stop.is_set():
+                    break
+                governor = QueryGovernor(Config.VALUE_INDEX_TABLE_TIMEOUT, self._cancel)
+                try:
+                    # One pooled connection per table, so requests are not starved during a long build.
+                    with pool.connection() as conn, governor.attach(conn, self.db_type):
+                        tables[name] = collect_table_stats(conn, self.schema.tables[name], signatures[name])
+                except QueryTimeout:
+                    timed_out += 1
+                    tracer.metrics.inc('crewai_column_stats_timeouts_total', db_type=self.db_type)
+                    continue
+                except QueryCancelled:
+                    break
+                refreshed.append(name)
+            if refreshed or len(tables) != len(self.stats.tables):
+                self.stats = DatabaseStats(tables=tables)
+                self.index = ValueIndex(self.stats)
+                self._save()
+            span.set(tables=len(tables), refreshed=len(refreshed), timed_out=timed_out, values=len(self.index))
+        return refreshed
+
+    def start(self, interval: float = None) -> None:
+        """Refresh now and then every ``interval`` seconds (once when 0) on a daemon thread."""
+        interval = Config.VALUE_INDEX_REFRESH_INTERVAL if interval is None else interval
+
+        def run():
+            while True:
+                try:
+                    self.refresh()
+                    self.last_error = None
+                except Exception as e:
+                    # Lookups keep using the previous build.
+                    self.last_error = e
+                finally:
+                    self.built.set()
+                if interval <= 0 or self._stop.wait(interval):
+                    return
+
+        self._thread = threading.Thread(target=run, name='crewai-column-stats', daemon=True)
+        self._thread.start()
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop background refreshes, interrupting a table being profiled; waits at most ``timeout`` seconds."""
+        self._stop.set()
+        self._cancel.cancel()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def column(self, table: str, column: str) -> Optional[ColumnStats]:
+        table_stats = self.stats.tables.get(table)
+        return table_stats.columns.get(column) if table_stats is not None else None
+
+    def link(self, question: str, tables: Iterable[str] = None) -> List[ValueMatch]:
+        """Values the question refers to, resolved locally against the value index."""
+        return self.index.match(question, tables=tables)
+
+    def hints(self, question: str, column_map: Dict[str, List[str]]) -> str:
+        """Prompt lines with the values the question refers to and the ranges of time-like columns.
+
+        Only tables and columns in ``column_map`` (the agent's schema view) are used.
+        """
+        lines = []
+        matches = self.link(question, tables=column_map)
+        if matches:
+            lines.append("Values: " + '; '.join(
+                f"{match.table}.{match.column} = {sql_literal(match.value)}" for match in matches
+            ))
+        ranges = []
+        for table, columns in column_map.items():
+            for column in columns:
+                stats = self.column(table, column)
+                if stats is None or stats.kind not in ('number', 'time') or stats.min is None:
+                    continue
+                if stats.kind == 'time' or _TIME_TERMS.intersection(tokenize(column)):
+                    ranges.append(f"{table}.{column} {stats.min}..{stats.max}")
+        if ranges:
+            lines.append("Ranges: " + '; '.join(ranges[:_MAX_RANGES]))
+        return '\n'.join(lines)
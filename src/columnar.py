@@ -0,0 +1,313 @@
+import json
+import pickle
+import struct
+import sys
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_MAGIC = b'CTSQCOL1'
+_ALIGN = 8
+
+# Text encodings for object columns holding one kind of value, so they cross
+# process boundaries as an offsets buffer plus UTF-8 (or raw) data, like Arrow.
+_TEXT_CODECS: Dict[type, Tuple[str, Callable[[Any], bytes]]] = {
+    str: ('str', lambda value: value.encode('utf-8')),
+    bytes: ('bytes', bytes),
+    datetime: ('datetime', lambda value: value.isoformat().encode()),
+    date: ('date', lambda value: value.isoformat().encode()),
+    time: ('time', lambda value: value.isoformat().encode()),
+    Decimal: ('decimal', lambda value: str(value).encode())
+}
+_TEXT_DECODERS: Dict[str, Callable[[bytes], Any]] = {
+    'str': lambda raw: raw.decode('utf-8'),
+    'bytes': bytes,
+    'datetime': lambda raw: datetime.fromisoformat(raw.decode()),
+    'date': lambda raw: date.fromisoformat(raw.decode()),
+    'time': lambda raw: time.fromisoformat(raw.decode()),
+    'decimal': lambda raw: Decimal(raw.decode())
+}
+
+
+def _objects(values: Sequence[Any]) -> np.ndarray:
+    # fromiter keeps list/tuple values (e.g. PostgreSQL arrays) as single elements.
+    return np.fromiter(values, dtype=object, count=len(values))
+
+
+def _chunk(values: List[Any]) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+    """One batch of one column as ``(array, null_mask)``; ``array`` is None when every value is NULL."""
+    nulls = [value is None for value in values]
+    has_nulls = any(nulls)
+    present = [value for value in values if value is not None] if has_nulls else values
+    if not present:
+        return None, np.ones(len(values), dtype=bool)
+    kinds = {type(value) for value in present}
+    if kinds == {bool}:
+        dtype, fill = np.bool_, False
+    elif kinds == {int}:
+        dtype, fill = np.int64, 0
+    elif kinds <= {int, float}:
+        dtype, fill = np.float64, np.nan
+    else:
+        return _objects(values), None
+    try:
+        array = np.array([fill if value is None else value for value in values] if has_nulls else values, dtype=dtype)
+    except OverflowError:
+        # Integers beyond int64 stay Python ints.
+        return _objects(values), None
+    return array, np.array(nulls, dtype=bool) if has_nulls else None
+
+
+def _narrowest(array: np.ndarray) -> np.ndarray:
+    """Integer array cast to the smallest integer type that holds its values, for serialization."""
+    if array.dtype.kind != 'i' or not len(array):
+        return array
+    low, high = array.min(), array.max()
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return array.astype(dtype)
+    return array
+
+
+def _concatenate(chunks: List[Tuple[Optional[np.ndarray], Optional[np.ndarray], int]]) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    arrays = [array for array, _, _ in chunks if array is not None]
+    if not arrays:
+        dtype = np.dtype(object)
+    elif any(array.dtype == object for array in arrays):
+        dtype = np.dtype(object)
+    else:
+        dtype = np.result_type(*arrays)
+    parts, masks = [], []
+    for array, mask, length in chunks:
+        if array is None:
+            array = np.full(length, None if dtype == object else np.nan if dtype.kind == 'f' else 0, dtype=dtype)
+        parts.append(array.astype(dtype, copy=False))
+        masks.append(mask if mask is not None else np.zeros(length, dtype=bool))
+    values = parts[0] if len(parts) == 1 else np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+    if dtype == object:
+        return values, None
+    mask = np.concatenate(masks) if masks else np.zeros(0, dtype=bool)
+    return values, mask if mask.any() else None
+
+
+class ColumnarResult:
+    """Query result stored as one NumPy array per column instead of a list of row tuples.
+
+    Integer, float and boolean columns are packed arrays (8 or 1 bytes per
+    value, with a separate null mask only when the column has NULLs); other
+    values stay in object arrays. ``types`` holds the database type names when
+    the driver reports them (PostgreSQL), else the NumPy dtype.
+    """
+
+    def __init__(self, columns: List[str], arrays: Sequence[np.ndarray], masks: Sequence[Optional[np.ndarray]] = None,
+                 types: Sequence[Optional[str]] = None):
+        self.columns = list(columns)
+        self.arrays = list(arrays)
+        self.masks = list(masks) if masks is not None else [None] * len(self.arrays)
+        self.types = [
+            db_type or str(array.dtype)
+            for db_type, array in zip(types or [None] * len(self.arrays), self.arrays)
+        ]
+        self._length = len(self.arrays[0]) if self.arrays else 0
+
+    @classmethod
+    def from_rows(cls, columns: List[str], rows: Sequence[Sequence[Any]], types: Sequence[Optional[str]] = None) -> 'ColumnarResult':
+        builder = ColumnarBuilder(columns, types)
+        builder.append(rows)
+        return builder.build()
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __repr__(self) -> str:
+        return f"ColumnarResult({self._length} rows, columns={self.columns})"
+
+    def column(self, name: str) -> np.ndarray:
+        """The column's values (no copy); NULLs in numeric columns are 0/NaN, see ``null_mask``."""
+        return self.arrays[self.columns.index(name)]
+
+    def null_mask(self, name: str) -> Optional[np.ndarray]:
+        return self.masks[self.columns.index(name)]
+
+    def iter_rows(self) -> Iterator[Tuple[Any, ...]]:
+        """Rows as tuples of Python values, with None for NULL."""
+        columns = []
+        for array, mask in zip(self.arrays, self.masks):
+            values = array.tolist()
+            if mask is not None:
+                values = [None if null else value for value, null in zip(values, mask.tolist())]
+            columns.append(values)
+        return zip(*columns) if columns else iter(())
+
+    def rows(self) -> List[Tuple[Any, ...]]:
+        return list(self.iter_rows())
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the result."""
+        size = 0
+        for array, mask in zip(self.arrays, self.masks):
+            size += array.nbytes + (mask.nbytes if mask is not None else 0)
+            if array.dtype == object:
+                size += sum(sys.getsizeof(value) for value in array if value is not None)
+        return size
+
+    def to_pandas(self) -> Any:
+        """A DataFrame over the same buffers where pandas allows it (numeric columns are not copied)."""
+        import pandas as pd
+        data = {}
+        for name, array, mask in zip(self.columns, self.arrays, self.masks):
+            if mask is None or array.dtype.kind == 'f':
+                data[name] = array
+            elif array.dtype.kind == 'b':
+                data[name] = pd.arrays.BooleanArray(array, mask)
+            else:
+                data[name] = pd.arrays.IntegerArray(array, mask)
+        return pd.DataFrame(data, copy=False)
+
+    def to_arrow(self) -> Any:
+        """A ``pyarrow.Table`` (requires pyarrow); NULL masks become Arrow validity bitmaps."""
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError("to_arrow() requires pyarrow: pip install pyarrow") from e
+        return pa.table({
+            name: pa.array(array, mask=mask) if mask is not None else pa.array(array)
+            for name, array, mask in zip(self.columns, self.arrays, self.masks)
+        })
+
+    def to_bytes(self) -> bytes:
+        """Compact binary form: a JSON header followed by the raw, 8-byte aligned column buffers.
+
+        Float and boolean columns are written as-is and ``from_bytes`` maps them
+        without copying; integer columns are stored in the narrowest integer
+        type that fits and widened again on load. Object columns holding one kind of value (text, bytes, dates,
+        decimals) become an offsets buffer plus their encoded bytes; anything
+        else is pickled, so only load bytes this system produced.
+        """
+        buffers: List[bytes] = []
+        specs = []
+
+        def add(buffer: bytes) -> List[int]:
+            buffers.append(buffer)
+            return [len(buffer)]
+
+        for array, mask in zip(self.arrays, self.masks):
+            spec: Dict[str, Any] = {}
+            if array.dtype != object:
+                stored = _narrowest(array)
+                spec['dtype'] = array.dtype.str
+                spec['stored'] = stored.dtype.str
+                spec['data'] = add(np.ascontiguousarray(stored).tobytes())
+                if mask is not None:
+                    spec['mask'] = add(np.packbits(mask).tobytes())
+            else:
+                present = [value for value in array if value is not None]
+                kinds = {type(value) for value in present}
+                codec = _TEXT_CODECS.get(next(iter(kinds))) if len(kinds) == 1 else None
+                if codec is None and not kinds:
+                    codec = _TEXT_CODECS[str]
+                if codec is None:
+                    spec['codec'] = 'pickle'
+                    spec['data'] = add(pickle.dumps(array.tolist(), protocol=pickle.HIGHEST_PROTOCOL))
+                else:
+                    name, encode = codec
+                    encoded = [b'' if value is None else encode(value) for value in array]
+                    lengths = [len(item) for item in encoded]
+                    offsets = np.zeros(len(encoded) + 1, dtype=np.int32 if sum(lengths) < 2 ** 31 else np.int64)
+                    np.cumsum(lengths, out=offsets[1:])
+                    spec['offsets_dtype'] = offsets.dtype.str
+                    spec['codec'] = name
+                    spec['offsets'] = add(offsets.tobytes())
+                    spec['data'] = add(b''.join(encoded))
+                    if len(present) < len(array):
+                        spec['mask'] = add(np.packbits(np.equal(array, None)).tobytes())
+            specs.append(spec)
+
+        header = json.dumps({'columns': self.columns, 'types': self.types, 'length': self._length, 'specs': specs}).encode()
+        parts = [_MAGIC, struct.pack('<Q', len(header)), header]
+        position = sum(len(part) for part in parts)
+        for buffer in buffers:
+            padding = -position % _ALIGN
+            parts.append(b'\0' * padding)
+            parts.append(buffer)
+            position += padding + len(buffer)
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'ColumnarResult':
+        """Inverse of ``to_bytes``; float and boolean columns are read-only views of ``data``."""
+        if data[:len(_MAGIC)] != _MAGIC:
+            raise ValueError("Not a serialized ColumnarResult")
+        (header_size,) = struct.unpack_from('<Q', data, len(_MAGIC))
+        position = len(_MAGIC) + 8
+        header = json.loads(data[position:position + header_size])
+        position += header_size
+        view = memoryview(data)
+        length = header['length']
+
+        def take(spec_size: List[int]) -> memoryview:
+            nonlocal position
+            position += -position % _ALIGN
+            chunk = view[position:position + spec_size[0]]
+            position += spec_size[0]
+            return chunk
+
+        arrays, masks = [], []
+        for spec in header['specs']:
+            if 'dtype' in spec:
+                array = np.frombuffer(take(spec['data']), dtype=np.dtype(spec['stored']), count=length)
+                array = array.astype(np.dtype(spec['dtype']), copy=False)
+                mask = np.unpackbits(np.frombuffer(take(spec['mask']), dtype=np.uint8), count=length).astype(bool) if 'mask' in spec else None
+            elif spec['codec'] == 'pickle':
+                array = _objects(pickle.loads(take(spec['data'])))
+                mask = None
+            else:
+                offsets = np.frombuffer(take(spec['offsets']), dtype=np.dtype(spec['offsets_dtype']), count=length + 1)
+                raw = bytes(take(spec['data']))
+                nulls = np.unpackbits(np.frombuffer(take(spec['mask']), dtype=np.uint8), count=length).astype(bool) if 'mask' in spec else None
+                decode = _TEXT_DECODERS[spec['codec']]
+                bounds = offsets.tolist()
+                array = _objects([
+                    None if nulls is not None and nulls[i] else decode(raw[bounds[i]:bounds[i + 1]])
+                    for i in range(length)
+                ])
+                mask = None
+            arrays.append(array)
+            masks.append(mask)
+        return cls(header['columns'], arrays, masks, header['types'])
+
+    def __reduce__(self):
+        # Pickling (e.g. to a worker process) uses the compact binary form.
+        return (ColumnarResult.from_bytes, (self.to_bytes(),))
+
+
+class ColumnarBuilder:
+    """Builds a ``ColumnarResult`` from fetched row batches, converting each batch as it arrives.
+
+    Only one batch of row tuples is alive at a time; a column's type is
+    widened across batches (int to float, anything mixed to object).
+    """
+
+    def __init__(self, columns: List[str], types: Sequence[Optional[str]] = None):
+        self.columns = list(columns)
+        self.types = list(types) if types is not None else None
+        self._chunks: List[List[Tuple[Optional[np.ndarray], Optional[np.ndarray], int]]] = [[] for _ in self.columns]
+
+    def append(self, rows: Sequence[Sequence[Any]]) -> None:
+        if not rows:
+            return
+        for chunks, values in zip(self._chunks, zip(*rows)):
+            array, mask = _chunk(list(values))
+            chunks.append((array, mask, len(values)))
+
+    def build(self) -> ColumnarResult:
+        arrays, masks = [], []
+        for chunks in self._chunks:
+            array, mask = _concatenate(chunks)
+            arrays.append(array)
+            masks.append(mask)
+        return ColumnarResult(self.columns, arrays, masks, self.types)
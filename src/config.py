@@ -25,6 +25,124 @@ class Config:
     POSTGRES_USER = os.getenv("POSTGRES_USER")
     POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
     
+    # Connection Pool Configuration
+    POOL_MIN_SIZE = int(os.getenv("POOL_MIN_SIZE", "1"))
+    POOL_MAX_SIZE = int(os.getenv("POOL_MAX_SIZE", "10"))
+    POOL_ACQUIRE_TIMEOUT = float(os.getenv("POOL_ACQUIRE_TIMEOUT", "30"))
+    POOL_IDLE_TIMEOUT = float(os.getenv("POOL_IDLE_TIMEOUT", "300"))
+    POOL_HEALTH_CHECK_INTERVAL = float(os.getenv("POOL_HEALTH_CHECK_INTERVAL", "30"))
+    
+    # Result Fetching Configuration
+    MAX_RESULT_ROWS = int(os.getenv("MAX_RESULT_ROWS", "1000"))
+    MAX_RESULT_BYTES = int(os.getenv("MAX_RESULT_BYTES", "1000000"))
+    FETCH_BATCH_SIZE = int(os.getenv("FETCH_BATCH_SIZE", "500"))
+    RESULT_COUNT_SCAN_LIMIT = int(os.getenv("RESULT_COUNT_SCAN_LIMIT", "100000"))
+    
+    # Schema Cache Configuration
+    SCHEMA_CACHE_ENABLED = os.getenv("SCHEMA_CACHE_ENABLED", "true").lower() == "true"
+    SCHEMA_CACHE_DIR = os.getenv(
+        "SCHEMA_CACHE_DIR",
+        os.path.join(os.path.expanduser("~"), ".cache", "crewai-text2sql", "schema")
+    )
+    
+    # Schema Retrieval Index Configuration
+    SCHEMA_INDEX_ENABLED = os.getenv("SCHEMA_INDEX_ENABLED", "true").lower() == "true"
+    SCHEMA_INDEX_TOP_TABLES = int(os.getenv("SCHEMA_INDEX_TOP_TABLES", "5"))
+    SCHEMA_INDEX_TOP_COLUMNS = int(os.getenv("SCHEMA_INDEX_TOP_COLUMNS", "12"))
+    SCHEMA_INDEX_RELATIVE_CUTOFF = float(os.getenv("SCHEMA_INDEX_RELATIVE_CUTOFF", "0.35"))
+    SCHEMA_INDEX_CONFIDENCE_MARGIN = float(os.getenv("SCHEMA_INDEX_CONFIDENCE_MARGIN", "0.5"))
+    
+    # Question-to-SQL Cache Configuration
+    QUERY_CACHE_ENABLED = os.getenv("QUERY_CACHE_ENABLED", "true").lower() == "true"
+    QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "1024"))
+    QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "86400"))
+    QUERY_CACHE_PATH = os.getenv("QUERY_CACHE_PATH")
+    
+    # Query Result Cache Configuration (opt-in)
+    RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "false").lower() == "true"
+    RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    RESULT_CACHE_VERSION_MAX_AGE = float(os.getenv("RESULT_CACHE_VERSION_MAX_AGE", "0"))
+    
+    # Fast Router Configuration
+    FAST_ROUTER_ENABLED = os.getenv("FAST_ROUTER_ENABLED", "true").lower() == "true"
+    ROUTER_UNCERTAINTY_THRESHOLD = float(os.getenv("ROUTER_UNCERTAINTY_THRESHOLD", "0.2"))
+    
+    # Async Query Configuration
+    MAX_CONCURRENT_QUERIES = int(os.getenv("MAX_CONCURRENT_QUERIES", "8"))
+    
+    # Batch Processing Configuration
+    BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "4"))
+    BATCH_ROUTER_CHUNK_SIZE = int(os.getenv("BATCH_ROUTER_CHUNK_SIZE", "20"))
+    
+    # SQL Pipeline Mode Configuration
+    SQL_MODE = os.getenv("SQL_MODE", "crew").lower()  # 'crew' (four agents) or 'express' (one LLM call)
+    EXPRESS_MAX_REPAIRS = int(os.getenv("EXPRESS_MAX_REPAIRS", "1"))
+    EXPRESS_FALLBACK_TO_CREW = os.getenv("EXPRESS_FALLBACK_TO_CREW", "true").lower() == "true"
+    
+    # SQL Validation Configuration
+    SQL_VALIDATION_ENABLED = os.getenv("SQL_VALIDATION_ENABLED", "true").lower() == "true"
+    SQL_COST_POLICY = os.getenv("SQL_COST_POLICY", "limit").lower()  # 'limit', 'reject' or 'off'
+    SQL_MAX_PLAN_COST = float(os.getenv("SQL_MAX_PLAN_COST", "1000000"))
+    SQL_MAX_SCAN_ROWS = int(os.getenv("SQL_MAX_SCAN_ROWS", "5000000"))
+    
+    # Query Governor Configuration
+    QUERY_TIMEOUT = float(os.getenv("QUERY_TIMEOUT", "30"))  # seconds per query, 0 disables
+    SQLITE_PROGRESS_INTERVAL = int(os.getenv("SQLITE_PROGRESS_INTERVAL", "10000"))  # VM steps between SQLite budget checks
+    
+    # Tracing Configuration
+    TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+    TRACE_DIR = os.getenv("TRACE_DIR")  # write each request's trace here as JSON
+    TRACE_HISTORY = int(os.getenv("TRACE_HISTORY", "100"))  # recent traces kept in memory
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # serve Prometheus /metrics on this port, 0 disables
+    STARTUP_REPORT = os.getenv("STARTUP_REPORT", "false").lower() == "true"  # print startup phase times after the first request
+    
+    # Forecasting Configuration
+    FORECAST_HORIZON = int(os.getenv("FORECAST_HORIZON", "6"))  # periods forecast when the agent does not say
+    FORECAST_MODEL = os.getenv("FORECAST_MODEL", "auto")  # auto, ets, arima, linear, naive or prophet (if installed)
+    FORECAST_WORKERS = int(os.getenv("FORECAST_WORKERS", "0"))  # worker processes for many series, 0 means one per CPU
+    FORECAST_PARALLEL_MIN_SERIES = int(os.getenv("FORECAST_PARALLEL_MIN_SERIES", "16"))  # fewer series are fitted in-process
+    FORECAST_CACHE_SIZE = int(os.getenv("FORECAST_CACHE_SIZE", "256"))  # cached fits and requests, 0 disables
+    FORECAST_MAX_POINTS = int(os.getenv("FORECAST_MAX_POINTS", "100000"))  # aggregated rows one forecast may load
+    
+    # Context Budget Configuration
+    CONTEXT_SCHEMA_MAX_TOKENS = int(os.getenv("CONTEXT_SCHEMA_MAX_TOKENS", "1500"))  # schema text per agent prompt, 0 = unlimited
+    CONTEXT_RESULT_MAX_TOKENS = int(os.getenv("CONTEXT_RESULT_MAX_TOKENS", "1000"))  # tool result shown to agents, 0 = unlimited
+    CONTEXT_RESULT_SAMPLE_ROWS = int(os.getenv("CONTEXT_RESULT_SAMPLE_ROWS", "20"))  # rows kept when a result is summarized
+    CONTEXT_CHARS_PER_TOKEN = float(os.getenv("CONTEXT_CHARS_PER_TOKEN", "4"))  # characters per token for estimates
+    
+    # Column Statistics Configuration
+    # Full-table scans are cheap on local SQLite files but not on a shared PostgreSQL server, so it is opt-in there.
+    VALUE_INDEX_ENABLED = os.getenv("VALUE_INDEX_ENABLED", "true" if DB_TYPE.lower() == DBTypeEnum.SQLITE.value else "false").lower() == "true"
+    VALUE_INDEX_MAX_DISTINCT = int(os.getenv("VALUE_INDEX_MAX_DISTINCT", "1000"))  # text columns with at most this many values are indexed
+    VALUE_INDEX_TOP_VALUES = int(os.getenv("VALUE_INDEX_TOP_VALUES", "5"))  # most common values kept per column
+    VALUE_INDEX_MIN_SIMILARITY = float(os.getenv("VALUE_INDEX_MIN_SIMILARITY", "0.6"))  # trigram similarity to link a phrase to a value
+    VALUE_INDEX_REFRESH_INTERVAL = float(os.getenv("VALUE_INDEX_REFRESH_INTERVAL", "600"))  # seconds between incremental refreshes, 0 = build once
+    VALUE_INDEX_TABLE_TIMEOUT = float(os.getenv("VALUE_INDEX_TABLE_TIMEOUT", "60"))  # seconds to profile one table before it is skipped, 0 disables
+    
+    # Schema Watch Configuration
+    SCHEMA_WATCH_INTERVAL = float(os.getenv("SCHEMA_WATCH_INTERVAL", "30"))  # seconds between DDL checks, 0 disables
+    
+    # Server Configuration
+    SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+    SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+    SERVER_PROCESSES = int(os.getenv("SERVER_PROCESSES", "1"))  # forked workers sharing the port, each with warm crews
+    SERVER_CACHED_WORKERS = int(os.getenv("SERVER_CACHED_WORKERS", "8"))  # threads per process answering from the SQL cache
+    SERVER_CREW_WORKERS = int(os.getenv("SERVER_CREW_WORKERS", "4"))  # threads per process running crews
+    SERVER_CACHED_QUEUE_SIZE = int(os.getenv("SERVER_CACHED_QUEUE_SIZE", "256"))  # waiting requests per lane before new ones get 503
+    SERVER_CREW_QUEUE_SIZE = int(os.getenv("SERVER_CREW_QUEUE_SIZE", "16"))
+    SERVER_REQUEST_TIMEOUT = float(os.getenv("SERVER_REQUEST_TIMEOUT", "120"))  # seconds queued plus running before 504, 0 = no limit
+    
+    # Speculation Configuration
+    SPECULATION_POLICY = os.getenv("SPECULATION_POLICY", "likely").lower()  # 'off', 'likely' or 'always': run the SQL branch while the Router crew decides
+    SPECULATION_MIN_SQL_PROBABILITY = float(os.getenv("SPECULATION_MIN_SQL_PROBABILITY", "0.5"))  # 'likely' speculates at or above this local SQL probability
+    SPECULATION_MAX_BRANCHES = int(os.getenv("SPECULATION_MAX_BRANCHES", "4"))  # speculative SQL runs in flight; beyond this routing is serial
+    
+    # Data Source Configuration
+    SQLITE_ATTACH = os.getenv("SQLITE_ATTACH", "")  # 'alias=path,...' SQLite files attached to SQLITE_DB_PATH, queried as alias.table
+    SQLITE_REPLICA_PATHS = os.getenv("SQLITE_REPLICA_PATHS", "")  # comma-separated read-only copies of SQLITE_DB_PATH
+    POSTGRES_REPLICA_HOSTS = os.getenv("POSTGRES_REPLICA_HOSTS", "")  # 'host:port,...' read replicas of the primary, same database and credentials
+    REPLICA_RETRY_INTERVAL = float(os.getenv("REPLICA_RETRY_INTERVAL", "30"))  # seconds a replica that failed to connect gets no reads
+    
     @classmethod
     def get_db_type_enum(cls) -> DBTypeEnum:
         """Get validated DB type as enum."""
@@ -39,6 +157,28 @@ class Config:
         """Build PostgreSQL connection string from individual parameters."""
         return f"host={cls.POSTGRES_HOST} port={cls.POSTGRES_PORT} dbname={cls.POSTGRES_DB} user={cls.POSTGRES_USER} password={cls.POSTGRES_PASSWORD}"
     
+    @classmethod
+    def get_sqlite_attachments(cls) -> dict:
+        """Parse SQLITE_ATTACH into ``{alias: path}``."""
+        attachments = {}
+        for item in filter(None, (part.strip() for part in cls.SQLITE_ATTACH.split(','))):
+            alias, separator, path = item.partition('=')
+            if not separator or not alias.strip() or not path.strip():
+                raise ValueError(f"Invalid SQLITE_ATTACH entry {item!r}; expected alias=path")
+            attachments[alias.strip()] = path.strip()
+        return attachments
+    
+    @classmethod
+    def get_replica_targets(cls) -> list:
+        """Read replicas for DB_TYPE: SQLite file paths or PostgreSQL connection strings."""
+        if cls.get_db_type_enum() == DBTypeEnum.SQLITE:
+            return [path.strip() for path in cls.SQLITE_REPLICA_PATHS.split(',') if path.strip()]
+        targets = []
+        for host in filter(None, (part.strip() for part in cls.POSTGRES_REPLICA_HOSTS.split(','))):
+            host, _, port = host.partition(':')
+            targets.append(f"host={host} port={port or cls.POSTGRES_PORT} dbname={cls.POSTGRES_DB} user={cls.POSTGRES_USER} password={cls.POSTGRES_PASSWORD}")
+        return targets
+    
     @classmethod
     def get_db_config(cls) -> dict:
         """Get database configuration based on DB_TYPE."""
@@ -57,6 +197,17 @@ class Config:
                 'conn_string': cls.get_postgres_connection_string()
             }
     
+    @classmethod
+    def get_pool_config(cls) -> dict:
+        """Get connection pool sizing and maintenance settings."""
+        return {
+            'min_size': cls.POOL_MIN_SIZE,
+            'max_size': cls.POOL_MAX_SIZE,
+            'acquire_timeout': cls.POOL_ACQUIRE_TIMEOUT,
+            'idle_timeout': cls.POOL_IDLE_TIMEOUT,
+            'health_check_interval': cls.POOL_HEALTH_CHECK_INTERVAL
+        }
+    
     @classmethod
     def validate(cls):
         """Validate required environment variables."""
@@ -73,3 +224,12 @@ class Config:
             required_postgres_vars = [cls.POSTGRES_DB, cls.POSTGRES_USER, cls.POSTGRES_PASSWORD]
             if not all(required_postgres_vars):
                 raise ValueError("POSTGRES_DB, POSTGRES_USER, and POSTGRES_PASSWORD are required when DB_TYPE is 'postgres'")
+        
+        if cls.SQL_MODE not in ('crew', 'express'):
+            raise ValueError("SQL_MODE must be 'crew' or 'express'")
+        
+        if cls.SQL_COST_POLICY not in ('limit', 'reject', 'off'):
+            raise ValueError("SQL_COST_POLICY must be 'limit', 'reject' or 'off'")
+        
+        if cls.SPECULATION_POLICY not in ('off', 'likely', 'always'):
+            raise ValueError("SPECULATION_POLICY must be 'off', 'likely' or 'always'")
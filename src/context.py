@@ -0,0 +1,201 @@
+import math
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.config import Config
+from src.schema import SchemaModel
+from src.tracing import tracer
+
+# Columns per table in the table overview given to the Table Fetcher.
+TABLE_VIEW_COLUMNS = 5
+# Longest text value kept in a summarized result.
+_MAX_VALUE_CHARS = 64
+
+_SHORT_TYPES = {
+    'character varying': 'varchar',
+    'character': 'char',
+    'timestamp without time zone': 'timestamp',
+    'timestamp with time zone': 'timestamptz',
+    'time without time zone': 'time',
+    'double precision': 'float8',
+    'integer': 'int'
+}
+
+
+def estimate_tokens(text: Any) -> int:
+    """Approximate prompt tokens of ``text`` (``Config.CONTEXT_CHARS_PER_TOKEN`` characters each)."""
+    text = text if isinstance(text, str) else str(text)
+    return math.ceil(len(text) / Config.CONTEXT_CHARS_PER_TOKEN)
+
+
+def record_context(kind: str, original_tokens: int, tokens: int) -> None:
+    """Count prompt tokens before and after compaction, so the savings show up in ``/metrics``."""
+    tracer.metrics.inc('crewai_context_tokens_total', original_tokens, kind=kind, form='original')
+    tracer.metrics.inc('crewai_context_tokens_total', tokens, kind=kind, form='compact')
+
+
+def _fits(text: str, max_tokens: Optional[int]) -> bool:
+    return not max_tokens or estimate_tokens(text) <= max_tokens
+
+
+def _short_type(data_type: str) -> str:
+    data_type = (data_type or '').lower()
+    base = data_type.split('(')[0].strip()
+    return _SHORT_TYPES.get(base, base)
+
+
+def _table_line(table: str, columns: List[str], schema: Optional[SchemaModel], with_types: bool, limit: Optional[int]) -> str:
+    info = schema.tables.get(table) if schema is not None else None
+    shown = columns
+    if limit is not None and len(columns) > limit:
+        # Key columns stay, since joins need them.
+        keys = set(info.primary_key) | {column for fk in info.foreign_keys for column in fk.columns} if info else set()
+        keep = set([column for column in columns if column in keys][:limit])
+        for column in columns:
+            if len(keep) >= limit:
+                break
+            keep.add(column)
+        shown = [column for column in columns if column in keep]
+    names = []
+    for column in shown:
+        detail = info.column(column) if info is not None and with_types else None
+        names.append(f"{column} {_short_type(detail.data_type)}" if detail is not None and detail.data_type else column)
+    if len(shown) < len(columns):
+        names.append(f"+{len(columns) - len(shown)} more")
+    return f"{table}({', '.join(names)})"
+
+
+def _render(column_map: Dict[str, List[str]], relationships: Sequence[str], schema: Optional[SchemaModel],
+            with_types: bool, limit: Optional[int]) -> str:
+    lines = [_table_line(table, columns, schema, with_types, limit) for table, columns in column_map.items()]
+    if relationships:
+        lines.append("Joins: " + '; '.join(relationships))
+    return '\n'.join(lines)
+
+
+def render_schema(
+    column_map: Dict[str, List[str]],
+    relationships: Sequence[str] = None,
+    schema: SchemaModel = None,
+    max_tokens: int = None,
+    with_types: bool = False,
+    max_columns: int = None
+) -> str:
+    """Compact ``table(column, ...)`` lines plus a ``Joins:`` line, within ``max_tokens``.
+
+    When the full rendering is over budget it degrades step by step: column
+    types are dropped, then each table keeps fewer columns (key columns
+    first, the rest counted as "+N more"), then joins are dropped, and finally
+    only as many table names are listed as fit. ``schema`` supplies column
+    types and keys; ``max_columns`` caps the columns shown per table.
+    """
+    relationships = list(relationships or [])
+    candidates = [(with_types, relationships), (False, relationships)] if with_types and schema is not None else [(False, relationships)]
+    for types, joins in candidates:
+        text = _render(column_map, joins, schema, types, max_columns)
+        if _fits(text, max_tokens):
+            return text
+
+    widest = max((len(columns) for columns in column_map.values()), default=0)
+    for joins in (relationships, []):
+        # Largest per-table column count that fits.
+        low, high, best = 1, min(widest, max_columns or widest), None
+        while low <= high:
+            middle = (low + high) // 2
+            text = _render(column_map, joins, schema, False, middle)
+            if _fits(text, max_tokens):
+                best, low = text, middle + 1
+            else:
+                high = middle - 1
+        if best is not None:
+            return best
+
+    tables = list(column_map)
+    listed: List[str] = []
+    for table in tables:
+        text = "Tables: " + ', '.join(listed + [table]) + (f" (+{len(tables) - len(listed) - 1} more)" if len(listed) + 1 < len(tables) else '')
+        if not _fits(text, max_tokens) and listed:
+            break
+        listed.append(table)
+    hidden = len(tables) - len(listed)
+    return "Tables: " + ', '.join(listed) + (f" (+{hidden} more)" if hidden else '')
+
+
+def _clip(value: Any) -> Any:
+    if isinstance(value, str) and len(value) > _MAX_VALUE_CHARS:
+        return value[:_MAX_VALUE_CHARS] + '...'
+    return value
+
+
+def _column_summaries(columns: List[str], rows: Any) -> Dict[str, Dict[str, Any]]:
+    # numpy is only needed once a result is too large for the prompt.
+    import numpy as np
+    from src.columnar import ColumnarResult
+    table = rows if isinstance(rows, ColumnarResult) else ColumnarResult.from_rows(columns, rows)
+    summaries = {}
+    for name, array, mask in zip(table.columns, table.arrays, table.masks):
+        nulls = int(mask.sum()) if mask is not None else int(sum(value is None for value in array)) if array.dtype == object else 0
+        if array.dtype.kind in 'iuf':
+            values = array[~mask] if mask is not None else array
+            values = values[~np.isnan(values)] if array.dtype.kind == 'f' else values
+            if len(values):
+                summaries[name] = {
+                    'min': values.min().item(), 'max': values.max().item(),
+                    'mean': round(float(values.mean()), 4), 'nulls': nulls
+                }
+                continue
+        counts = Counter(value for value in array.tolist() if value is not None and not isinstance(value, (list, dict)))
+        summaries[name] = {
+            'distinct': len(counts),
+            'top': [[_clip(value), count] for value, count in counts.most_common(3)],
+            'nulls': nulls
+        }
+    return summaries
+
+
+def summarize_result(output: Dict[str, Any], max_tokens: int = None, sample_rows: int = None) -> Dict[str, Any]:
+    """Tool output that fits the prompt budget: unchanged when small, else a sample plus column statistics.
+
+    Oversized ``data`` is replaced by its first ``sample_rows`` rows (so the
+    head of an ORDER BY result survives) and ``summary`` holds per-column
+    min/max/mean or distinct counts and most common values over every row.
+    The sample shrinks until the output fits ``max_tokens``.
+    """
+    max_tokens = Config.CONTEXT_RESULT_MAX_TOKENS if max_tokens is None else max_tokens
+    sample_rows = Config.CONTEXT_RESULT_SAMPLE_ROWS if sample_rows is None else sample_rows
+    data = output.get('data')
+    if data is None or not max_tokens:
+        return output
+    # A ColumnarResult repr says nothing about the rows the agent would read.
+    columnar = hasattr(data, 'arrays')
+    rows = data.rows() if columnar else data
+    original_tokens = estimate_tokens({**output, 'data': rows} if columnar else output)
+    if original_tokens <= max_tokens:
+        record_context('result', original_tokens, original_tokens)
+        return output
+
+    with tracer.span('context', 'result', original_tokens=original_tokens) as span:
+        rows = list(rows)
+        columns = output.get('columns')
+        tabular = bool(columns) and all(isinstance(row, (tuple, list)) for row in rows)
+        summary = _column_summaries(columns, data if columnar else rows) if tabular else None
+        compact = {key: value for key, value in output.items() if key != 'data'}
+        compact['row_count'] = len(rows)
+        count = min(sample_rows, len(rows))
+        while True:
+            sample = [tuple(_clip(value) for value in row) if tabular else row for row in rows[:count]]
+            compact['message'] = f"{output.get('message', '')} (summarized for context: {len(rows)} rows, showing the first {count})".strip()
+            compact['data'] = sample
+            if summary is not None:
+                compact['summary'] = summary
+            tokens = estimate_tokens(compact)
+            if tokens <= max_tokens or count == 0:
+                break
+            count //= 2
+        if tokens > max_tokens and summary is not None:
+            for stats in summary.values():
+                stats.pop('top', None)
+            tokens = estimate_tokens(compact)
+        span.set(tokens=tokens, rows=len(rows), sample=count)
+    record_context('result', original_tokens, tokens)
+    return compact
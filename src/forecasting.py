@@ -0,0 +1,511 @@
+import atexit
+import copy
+import hashlib
+import importlib.util
+import multiprocessing
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.columnar import ColumnarResult
+from src.config import Config
+from src.governor import QueryGovernor
+from src.pool import get_pool
+from src.result_cache import canonicalize_sql, data_version
+from src.sql_validation import check_read_only, strip_literals
+from src.streaming import fetch_bounded
+from src.tracing import tracer
+
+AGGREGATES = ('sum', 'avg', 'count', 'min', 'max')
+BUCKETS = ('day', 'week', 'month', 'quarter', 'year')
+MODELS = ('auto', 'ets', 'arima', 'linear', 'naive', 'prophet')
+
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)?$')
+_SUBQUERY = re.compile(r'\b(select|with|values)\b', re.IGNORECASE)
+
+# Calendar buckets computed by the database, so only one row per series and period comes back.
+_SQLITE_BUCKETS = {
+    'day': "date({column})",
+    'week': "date({column}, 'weekday 0', '-6 days')",
+    'month': "strftime('%Y-%m-01', {column})",
+    'quarter': "printf('%s-%02d-01', strftime('%Y', {column}), (CAST(strftime('%m', {column}) AS INTEGER) - 1) / 3 * 3 + 1)",
+    'year': "strftime('%Y-01-01', {column})"
+}
+_POSTGRES_BUCKET = "date_trunc('{bucket}', {column})::date"
+# pandas frequency of each bucket, for labelling future periods.
+BUCKET_FREQUENCIES = {'day': 'D', 'week': 'W-MON', 'month': 'MS', 'quarter': 'QS', 'year': 'YS'}
+
+# z-score of a two-sided 95% interval.
+_Z95 = 1.96
+
+# Smoothing grid for the ETS model; every combination is updated together at each time step.
+_ETS_GRID = np.array(np.meshgrid(
+    np.linspace(0.05, 0.95, 10),       # alpha: level smoothing
+    (0.0, 0.05, 0.1, 0.2, 0.3, 0.5),   # beta: trend smoothing
+    (0.8, 0.9, 0.98, 1.0),             # phi: trend damping
+    indexing='ij'
+)).reshape(3, -1)
+
+_MAX_AR_ORDER = 3
+
+
+class ForecastError(ValueError):
+    """The forecast request is invalid or the series cannot be forecast."""
+
+
+def _identifier(name: str, what: str) -> str:
+    if not isinstance(name, str) or not _IDENTIFIER.match(name):
+        raise ForecastError(f"Invalid {what} {name!r}: use a plain table or column name.")
+    return name
+
+
+def _condition(where: str) -> str:
+    # One condition on the series table: no other statements, no subqueries and no closing the parentheses around it.
+    scannable = strip_literals(where)
+    depth = 0
+    for char in scannable:
+        depth += {'(': 1, ')': -1}.get(char, 0)
+        if depth < 0:
+            break
+    if ';' in scannable or _SUBQUERY.search(scannable) or depth != 0:
+        raise ForecastError(f"Invalid where {where!r}: use a single condition on the table's columns, without subqueries.")
+    return where
+
+
+def series_sql(table: str, time_column: str, value_column: str = None, aggregate: str = 'sum', group_by: str = None,
+               bucket: str = None, where: str = None, db_type: str = 'sqlite') -> str:
+    """Aggregating SELECT that returns ``([series,] period, value)`` rows ordered by series and period.
+
+    Grouping and aggregation are pushed down to the database, so a table of
+    millions of rows comes back as one point per series and period.
+    ``where`` is an optional SQL condition on ``table``; subqueries are refused.
+    """
+    aggregate = (aggregate or 'sum').lower()
+    if aggregate not in AGGREGATES:
+        raise ForecastError(f"Unsupported aggregate {aggregate!r}; use one of {', '.join(AGGREGATES)}.")
+    if bucket is not None and bucket not in BUCKETS:
+        raise ForecastError(f"Unsupported bucket {bucket!r}; use one of {', '.join(BUCKETS)}.")
+    table = _identifier(table, 'table')
+    time_column = _identifier(time_column, 'time column')
+    value = '*' if aggregate == 'count' and value_column in (None, '', '*') else _identifier(value_column, 'value column')
+
+    if bucket is None:
+        period = time_column
+    elif db_type == 'postgres':
+        period = _POSTGRES_BUCKET.format(bucket=bucket, column=time_column)
+    else:
+        period = _SQLITE_BUCKETS[bucket].format(column=time_column)
+
+    columns = [f"{period} AS period", f"{aggregate}({value}) AS value"]
+    if group_by:
+        columns.insert(0, f"{_identifier(group_by, 'group_by column')} AS series")
+    conditions = [f"{time_column} IS NOT NULL"] + ([f"({_condition(where)})"] if where else [])
+    positions = '1, 2' if group_by else '1'
+    return check_read_only(
+        f"SELECT {', '.join(columns)} FROM {table} WHERE {' AND '.join(conditions)} "
+        f"GROUP BY {positions} ORDER BY {positions}"
+    )
+
+
+def columnar_to_series(table: ColumnarResult, grouped: bool) -> Dict[Any, Tuple[List[Any], np.ndarray]]:
+    """``{series: (periods, values)}`` from a columnar ``series_sql`` result; NULL aggregates are skipped.
+
+    Values stay float64 arrays; for float results each series is a slice of
+    the fetched column, so nothing is copied on the way to the models.
+    """
+    values = table.column('value')
+    keep = ~table.null_mask('value') if table.null_mask('value') is not None else None
+    if values.dtype.kind in 'iub':
+        values = values.astype(float)
+    elif values.dtype != np.float64:
+        # Decimals from PostgreSQL numeric sums.
+        values = np.array([np.nan if value is None else value for value in values.tolist()], dtype=float)
+        keep = ~np.isnan(values) if keep is None else keep & ~np.isnan(values)
+    periods = table.column('period')
+    keys = table.column('series') if grouped else None
+    if keep is not None and not keep.all():
+        values, periods = values[keep], periods[keep]
+        keys = keys[keep] if keys is not None else None
+
+    if keys is None:
+        return OrderedDict([(None, (periods.tolist(), values))] if len(values) else [])
+    # Rows come ordered by series, so each series is one contiguous run.
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1]))) if len(keys) else []
+    bounds = list(starts) + [len(keys)]
+    return OrderedDict(
+        (keys[start].item() if isinstance(keys[start], np.generic) else keys[start],
+         (periods[start:end].tolist(), values[start:end]))
+        for start, end in zip(bounds, bounds[1:])
+    )
+
+
+def _naive(y: np.ndarray, horizon: int) -> Tuple[np.ndarray, float, Dict[str, Any]]:
+    sigma = float(np.std(np.diff(y), ddof=1)) if len(y) > 2 else 0.0
+    return np.full(horizon, y[-1]), sigma, {}
+
+
+def _linear(y: np.ndarray, horizon: int) -> Tuple[np.ndarray, float, Dict[str, Any]]:
+    t = np.arange(len(y), dtype=float)
+    slope, intercept = np.polyfit(t, y, 1)
+    residuals = y - (intercept + slope * t)
+    sigma = float(np.sqrt(residuals @ residuals / (len(y) - 2))) if len(y) > 2 else 0.0
+    future = np.arange(len(y), len(y) + horizon, dtype=float)
+    return intercept + slope * future, sigma, {'slope': float(slope), 'intercept': float(intercept)}
+
+
+def _ets(y: np.ndarray, horizon: int) -> Tuple[np.ndarray, float, Dict[str, Any]]:
+    """Damped-trend exponential smoothing (Holt), parameters picked by in-sample SSE over ``_ETS_GRID``."""
+    alpha, beta, phi = _ETS_GRID
+    level = np.full(alpha.shape, y[0])
+    trend = np.full(alpha.shape, y[1] - y[0])
+    sse = np.zeros(alpha.shape)
+    for value in y[1:]:
+        fitted = level + phi * trend
+        error = value - fitted
+        sse += error * error
+        new_level = fitted + alpha * error
+        trend = beta * (new_level - level) + (1 - beta) * phi * trend
+        level = new_level
+    best = int(np.argmin(sse))
+    damping = np.cumsum(phi[best] ** np.arange(1, horizon + 1))
+    sigma = float(np.sqrt(sse[best] / (len(y) - 1)))
+    params = {'alpha': round(float(alpha[best]), 3), 'beta': round(float(beta[best]), 3), 'phi': round(float(phi[best]), 3)}
+    return level[best] + damping * trend[best], sigma, params
+
+
+def _arima(y: np.ndarray, horizon: int) -> Tuple[np.ndarray, float, Dict[str, Any]]:
+    """ARIMA(p,1,0) with drift: least-squares AR fit on first differences, p chosen by AIC."""
+    d = np.diff(y)
+    max_p = min(_MAX_AR_ORDER, (len(d) - 2) // 3)
+    # Compare orders on the same sample so their AICs are comparable.
+    target = d[max_p:]
+    best = None
+    for p in range(max_p + 1):
+        design = np.column_stack([np.ones(len(target))] + [d[max_p - i:len(d) - i] for i in range(1, p + 1)])
+        coef = np.linalg.lstsq(design, target, rcond=None)[0]
+        residuals = target - design @ coef
+        rss = float(residuals @ residuals)
+        aic = len(target) * np.log(rss / len(target) + 1e-12) + 2 * (p + 1)
+        if best is None or aic < best[0]:
+            best = (aic, p, coef, rss)
+    _, p, coef, rss = best
+    history = list(d[len(d) - p:]) if p else []
+    steps = []
+    for _ in range(horizon):
+        step = coef[0] + sum(coef[i] * history[-i] for i in range(1, p + 1))
+        steps.append(step)
+        history.append(step)
+    sigma = float(np.sqrt(rss / max(len(target) - p - 1, 1)))
+    return y[-1] + np.cumsum(steps), sigma, {'p': p, 'd': 1, 'drift': round(float(coef[0]), 6)}
+
+
+_FITTERS = {'naive': _naive, 'linear': _linear, 'ets': _ets, 'arima': _arima}
+# Fewest points each model needs; shorter series fall back to a simpler model.
+_MIN_POINTS = {'naive': 1, 'linear': 2, 'ets': 3, 'arima': 5, 'prophet': 3}
+
+
+def _select_model(y: np.ndarray, horizon: int) -> str:
+    """Pick the model with the lowest error on a holdout of the last points."""
+    if len(y) < 8:
+        return 'linear' if len(y) >= 2 else 'naive'
+    holdout = max(1, min(horizon, len(y) // 4))
+    train, test = y[:-holdout], y[-holdout:]
+    errors = {
+        name: float(np.mean(np.abs(_FITTERS[name](train, holdout)[0] - test)))
+        for name in ('ets', 'arima', 'linear')
+    }
+    return min(errors, key=errors.get)
+
+
+def _as_datetimes(times: Sequence[Any]) -> Any:
+    # pandas is only needed for calendar periods, so it is imported on first use.
+    import pandas as pd
+    try:
+        return pd.DatetimeIndex(pd.to_datetime(list(times)))
+    except (ValueError, TypeError) as e:
+        raise ForecastError(f"Time values are not dates: {e}") from e
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float, np.number)) and not isinstance(value, bool)
+
+
+def future_times(times: Sequence[Any], horizon: int, frequency: str = None) -> List[Any]:
+    """Labels of the next ``horizon`` periods after ``times`` (numbers or dates).
+
+    Dates step by ``frequency`` (a pandas offset alias) when given, else by the
+    frequency inferred from ``times`` or their average spacing.
+    """
+    if len(times) == 0:
+        return list(range(1, horizon + 1))
+    if all(_is_number(value) for value in times):
+        step = float(np.median(np.diff(times))) if len(times) > 1 else 1.0
+        step = step or 1.0
+        labels = [times[-1] + step * i for i in range(1, horizon + 1)]
+        if all(isinstance(value, int) for value in times) and step.is_integer():
+            labels = [int(label) for label in labels]
+        return labels
+    try:
+        import pandas as pd
+        index = _as_datetimes(times)
+        frequency = frequency or (pd.infer_freq(index) if len(index) >= 3 else None)
+        if frequency is not None:
+            future = pd.date_range(index[-1], periods=horizon + 1, freq=frequency)[1:]
+        else:
+            step = (index[-1] - index[0]) / max(len(index) - 1, 1) if len(index) > 1 else pd.Timedelta(days=1)
+            future = pd.DatetimeIndex([index[-1] + step * i for i in range(1, horizon + 1)])
+        dates_only = all(stamp == stamp.normalize() for stamp in index)
+        return [str(stamp.date()) if dates_only else stamp.isoformat() for stamp in future]
+    except ForecastError:
+        return [f"{times[-1]}+{i}" for i in range(1, horizon + 1)]
+
+
+def _prophet(times: Sequence[Any], y: np.ndarray, horizon: int, frequency: str = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    if importlib.util.find_spec('prophet') is None:
+        raise ForecastError("Prophet is not installed; use 'auto', 'ets', 'arima' or 'linear'.")
+    import pandas as pd
+    from prophet import Prophet
+    history = pd.DataFrame({'ds': _as_datetimes(times), 'y': y})
+    model = Prophet()
+    model.fit(history)
+    future = pd.DataFrame({'ds': pd.to_datetime(future_times(list(times), horizon, frequency))})
+    prediction = model.predict(future)
+    return prediction['yhat'].to_numpy(), prediction['yhat_lower'].to_numpy(), prediction['yhat_upper'].to_numpy()
+
+
+def fit_forecast(times: Sequence[Any], values: Sequence[float], horizon: int, model: str = 'auto',
+                 frequency: str = None) -> Dict[str, Any]:
+    """Fit ``model`` to one series and forecast ``horizon`` periods with approximate 95% intervals.
+
+    'auto' chooses between ETS, ARIMA-style and linear trend by holdout error.
+    Series too short for the requested model use the next simpler one; the
+    model actually used is reported.
+    """
+    if model not in MODELS:
+        raise ForecastError(f"Unsupported model {model!r}; use one of {', '.join(MODELS)}.")
+    if horizon < 1:
+        raise ForecastError("horizon must be at least 1.")
+    y = np.asarray(values, dtype=float)
+    if len(y) == 0:
+        raise ForecastError("The series has no points.")
+    times = times.tolist() if isinstance(times, np.ndarray) else list(times)
+
+    chosen = _select_model(y, horizon) if model == 'auto' else model
+    if len(y) < _MIN_POINTS[chosen]:
+        chosen = 'linear' if len(y) >= 2 else 'naive'
+    params: Dict[str, Any] = {}
+    if chosen == 'prophet':
+        point, lower, upper = _prophet(times, y, horizon, frequency)
+    else:
+        point, sigma, params = _FITTERS[chosen](y, horizon)
+        # Uncertainty grows with the horizon, as for a random walk.
+        width = _Z95 * sigma * np.sqrt(np.arange(1, horizon + 1))
+        lower, upper = point - width, point + width
+
+    labels = future_times(times, horizon, frequency)
+    return {
+        'model': chosen,
+        'params': params,
+        'history_points': len(y),
+        'last_time': times[-1] if len(times) else None,
+        'forecast': [
+            {'time': label, 'value': round(float(value), 6), 'lower': round(float(low), 6), 'upper': round(float(high), 6)}
+            for label, value, low, high in zip(labels, point, lower, upper)
+        ]
+    }
+
+
+def _fit_item(item: Tuple[Sequence[Any], Sequence[float], int, str, Optional[str]]) -> Dict[str, Any]:
+    # Module-level so worker processes can unpickle it; errors come back as values.
+    times, values, horizon, model, frequency = item
+    try:
+        return fit_forecast(times, values, horizon, model, frequency)
+    except ForecastError as e:
+        return {'error': str(e)}
+
+
+class ForecastCache:
+    """LRU cache of fitted forecasts.
+
+    Values are copied on the way in and out, so callers may change the
+    results they get back. Request entries are keyed by database, canonical series SQL, model and
+    horizon, and remember the data version they were computed at, so an
+    unchanged database is answered without running the query. Series fits
+    are keyed by a digest of the points themselves, so after the data changes
+    only the series whose points moved are refitted.
+    """
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = Config.FORECAST_CACHE_SIZE if max_entries is None else max_entries
+        self._entries: 'OrderedDict[Tuple, Tuple[Hashable, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def series_key(model: str, horizon: int, times: Sequence[Any], values: Sequence[float], frequency: str = None) -> Tuple:
+        digest = hashlib.sha1(repr(list(times)).encode())
+        digest.update(np.ascontiguousarray(values, dtype=float).tobytes())
+        return ('series', model, horizon, frequency, digest.hexdigest())
+
+    def get(self, key: Tuple, version: Hashable = None) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+
+    def put(self, key: Tuple, value: Any, version: Hashable = None) -> None:
+        if self.max_entries <= 0:
+            return
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'entries': len(self._entries), 'max_entries': self.max_entries, 'hits': self.hits, 'misses': self.misses}
+
+
+_executors: Dict[int, ProcessPoolExecutor] = {}
+_executor_lock = threading.Lock()
+
+
+def _process_pool(workers: int) -> ProcessPoolExecutor:
+    """Shared worker processes, started on first use and kept for later batches.
+
+    There is one pool per worker count: another thread may still be mapping
+    over a pool when a batch asks for a different size, so none is replaced.
+    """
+    with _executor_lock:
+        executor = _executors.get(workers)
+        if executor is None:
+            if not _executors:
+                atexit.register(shutdown_forecast_pool)
+            # spawn, not fork: the parent runs crewai and pool threads that a fork would copy mid-flight.
+            executor = _executors[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context('spawn')
+            )
+        return executor
+
+
+def shutdown_forecast_pool() -> None:
+    """Stop the forecasting worker processes (they are restarted on demand)."""
+    with _executor_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=True)
+
+
+def forecast_many(series: Dict[Any, Tuple[Sequence[Any], Sequence[float]]], horizon: int, model: str = 'auto',
+                  workers: int = None, cache: ForecastCache = None, frequency: str = None) -> Dict[Any, Dict[str, Any]]:
+    """Forecast every series, reusing cached fits; ``{series: result}`` in input order.
+
+    When at least ``Config.FORECAST_PARALLEL_MIN_SERIES`` series need fitting,
+    they are fitted on a pool of ``workers`` processes (default
+    ``Config.FORECAST_WORKERS``, 0 meaning one per CPU). A series that cannot be
+    forecast gets ``{'error': ...}`` instead of failing the batch.
+    """
+    results: Dict[Any, Dict[str, Any]] = {}
+    pending = []
+    for key, (times, values) in series.items():
+        fit_key = ForecastCache.series_key(model, horizon, times, values, frequency)
+        cached = cache.get(fit_key) if cache is not None else None
+        if cached is not None:
+            results[key] = cached
+        else:
+            pending.append((key, fit_key, (list(times), np.asarray(values, dtype=float), horizon, model, frequency)))
+
+    workers = Config.FORECAST_WORKERS if workers is None else workers
+    workers = workers or os.cpu_count() or 1
+    parallel = workers > 1 and len(pending) >= max(Config.FORECAST_PARALLEL_MIN_SERIES, 2)
+    with tracer.span('forecast', 'fit', series=len(pending), cached=len(results), parallel=parallel):
+        items = [item for _, _, item in pending]
+        if parallel:
+            fitted = _process_pool(workers).map(_fit_item, items, chunksize=max(1, len(items) // (workers * 4)))
+        else:
+            fitted = map(_fit_item, items)
+        for (key, fit_key, _), result in zip(pending, fitted):
+            results[key] = result
+            if cache is not None and 'error' not in result:
+                cache.put(fit_key, result)
+    return {key: results[key] for key in series}
+
+
+def forecast(
+    table: str,
+    time_column: str,
+    value_column: str = None,
+    aggregate: str = 'sum',
+    group_by: str = None,
+    bucket: str = None,
+    where: str = None,
+    horizon: int = None,
+    model: str = None,
+    db_type: str = 'sqlite',
+    db_path: str = None,
+    conn_string: str = None,
+    timeout: float = None,
+    workers: int = None,
+    cache: ForecastCache = None
+) -> Dict[str, Any]:
+    """Load one series (or one per ``group_by`` value) with an aggregating query and forecast it.
+
+    Returns ``{'sql', 'forecasts': [{'series', 'model', 'forecast': [...], ...}], 'cached'}``.
+    Raises ``ForecastError`` for invalid requests and the governor's
+    ``QueryTimeout``/``QueryCancelled`` when the query is stopped.
+    """
+    horizon = Config.FORECAST_HORIZON if horizon is None else int(horizon)
+    model = model or Config.FORECAST_MODEL
+    if model not in MODELS:
+        raise ForecastError(f"Unsupported model {model!r}; use one of {', '.join(MODELS)}.")
+    sql = series_sql(table, time_column, value_column, aggregate, group_by, bucket, where, db_type)
+    db_key = f"{db_type}:{db_path or conn_string}"
+    request_key = ('request', db_key, canonicalize_sql(sql), model, horizon)
+
+    governor = QueryGovernor(timeout)
+    pool = get_pool(db_type, db_path=db_path, conn_string=conn_string)
+    with pool.connection() as conn, governor.attach(conn, db_type):
+        version = data_version(conn, db_type, db_key, db_path=db_path)
+        cached = cache.get(request_key, version) if cache is not None else None
+        if cached is not None:
+            return {**cached, 'cached': True}
+        result = fetch_bounded(
+            conn, sql, db_type, max_rows=Config.FORECAST_MAX_POINTS, max_bytes=Config.FORECAST_MAX_POINTS * 256,
+            count_scan_limit=0, checkpoint=governor.check, columnar=True
+        )
+        conn.commit()
+    if result['truncated']:
+        raise ForecastError(
+            f"The series has more than {Config.FORECAST_MAX_POINTS} points; use a coarser bucket, fewer groups or a where filter."
+        )
+
+    series = columnar_to_series(result['rows'], grouped=bool(group_by))
+    if not series:
+        raise ForecastError("The query returned no data points to forecast.")
+    fitted = forecast_many(series, horizon, model, workers=workers, cache=cache, frequency=BUCKET_FREQUENCIES.get(bucket))
+    output = {
+        'sql': sql,
+        'forecasts': [{'series': key, **value} for key, value in fitted.items()],
+        'cached': False
+    }
+    if cache is not None:
+        cache.put(request_key, output, version)
+    return output
@@ -0,0 +1,212 @@
+import asyncio
+import contextvars
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Callable, Iterator, List, Optional
+
+from src.config import Config
+
+# SQLSTATE PostgreSQL reports for both statement_timeout and cancel requests.
+_QUERY_CANCELED = '57014'
+
+
+class QueryTimeout(RuntimeError):
+    """The query ran past its time budget and was stopped."""
+
+
+class QueryCancelled(RuntimeError):
+    """The caller cancelled the query."""
+
+
+class CancelToken:
+    """Thread-safe flag a caller hands to the queries it starts so it can stop them.
+
+    ``cancel()`` interrupts whatever query is running under the token right
+    now (SQLite ``interrupt``, PostgreSQL cancel request); queries also check
+    the flag between fetched batches, so cancellation is prompt either way.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                # The connection may already be gone; the flag still stops the query.
+                pass
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Call ``callback`` on cancellation (right away if already cancelled); returns an unregister function."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._discard(callback)
+        callback()
+        return lambda: None
+
+    def _discard(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+
+_current_token: contextvars.ContextVar[Optional[CancelToken]] = contextvars.ContextVar('crewai_cancel_token', default=None)
+
+
+@contextmanager
+def cancel_scope(token: Optional[CancelToken]) -> Iterator[Optional[CancelToken]]:
+    """Make ``token`` the default for queries started in this context.
+
+    This is how a caller cancels SQL that an agent runs through the tool,
+    where it cannot pass the token itself.
+    """
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
+
+
+def current_cancel_token() -> Optional[CancelToken]:
+    return _current_token.get()
+
+
+class QueryGovernor:
+    """Time and cancellation budget for one query execution.
+
+    The budget covers everything run while a connection is attached: the
+    cost-gate EXPLAIN, the query itself and fetching its rows. PostgreSQL
+    enforces it server-side with a transaction-local ``statement_timeout``,
+    SQLite with a progress handler that aborts the running statement, and
+    both are checked again between fetched batches (``check``).
+    """
+
+    def __init__(self, timeout: float = None, cancel_token: CancelToken = None):
+        self.timeout = Config.QUERY_TIMEOUT if timeout is None else timeout
+        self.cancel_token = current_cancel_token() if cancel_token is None else cancel_token
+        self.started = time.monotonic()
+        self.deadline = self.started + self.timeout if self.timeout and self.timeout > 0 else None
+        # 'timeout' or 'cancelled' once the governor has stopped the query.
+        self.stopped: Optional[str] = None
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left in the budget, or None without a timeout."""
+        return None if self.deadline is None else max(self.deadline - time.monotonic(), 0.0)
+
+    def _cancelled(self) -> bool:
+        return self.cancel_token is not None and self.cancel_token.cancelled
+
+    def _expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def timeout_error(self) -> QueryTimeout:
+        return QueryTimeout(f"Query exceeded the {self.timeout:g}s time limit and was stopped after {self.elapsed():.1f}s.")
+
+    def cancelled_error(self) -> QueryCancelled:
+        return QueryCancelled(f"Query cancelled by the caller after {self.elapsed():.1f}s.")
+
+    def check(self) -> None:
+        """Cooperative checkpoint: raise if the query was cancelled or ran out of time."""
+        if self._cancelled():
+            self.stopped = 'cancelled'
+            raise self.cancelled_error()
+        if self._expired():
+            self.stopped = 'timeout'
+            raise self.timeout_error()
+
+    def _sqlite_progress(self) -> int:
+        # A non-zero return aborts the statement with OperationalError('interrupted').
+        if self._cancelled():
+            self.stopped = 'cancelled'
+            return 1
+        if self._expired():
+            self.stopped = 'timeout'
+            return 1
+        return 0
+
+    def _statement_timeout_ms(self) -> str:
+        return str(max(int(self.remaining() * 1000), 1))
+
+    def translate(self, error: BaseException) -> BaseException:
+        """Map the driver error raised when the governor stopped a query to QueryTimeout/QueryCancelled."""
+        if isinstance(error, (QueryTimeout, QueryCancelled)):
+            return error
+        if self.stopped == 'cancelled' or self._cancelled():
+            return self.cancelled_error()
+        if self.stopped == 'timeout' or self._expired() or getattr(error, 'sqlstate', None) == _QUERY_CANCELED:
+            self.stopped = 'timeout'
+            return self.timeout_error()
+        return error
+
+    def _interrupt(self, conn: Any, db_type: str) -> None:
+        self.stopped = 'cancelled'
+        if db_type == 'sqlite':
+            conn.interrupt()
+        elif db_type == 'postgres':
+            conn.cancel_safe()
+
+    @contextmanager
+    def attach(self, conn: Any, db_type: str) -> Iterator['QueryGovernor']:
+        """Enforce the budget on ``conn`` for the duration of the block."""
+        self.check()
+        if db_type == 'sqlite':
+            conn.set_progress_handler(self._sqlite_progress, Config.SQLITE_PROGRESS_INTERVAL)
+        elif db_type == 'postgres' and self.deadline is not None:
+            # is_local=true: the setting ends with the transaction, so pooled connections stay clean.
+            conn.execute("SELECT set_config('statement_timeout', %s, true)", (self._statement_timeout_ms(),))
+        unregister = self.cancel_token.on_cancel(lambda: self._interrupt(conn, db_type)) if self.cancel_token else None
+        try:
+            yield self
+        except Exception as e:
+            translated = self.translate(e)
+            if translated is e:
+                raise
+            raise translated from e
+        finally:
+            if unregister is not None:
+                unregister()
+            if db_type == 'sqlite':
+                conn.set_progress_handler(None, 0)
+
+    @asynccontextmanager
+    async def aattach(self, aconn: Any) -> AsyncIterator['QueryGovernor']:
+        """``attach`` for a PostgreSQL ``AsyncConnection``; a cancelled awaiting task also cancels the query."""
+        self.check()
+        if self.deadline is not None:
+            await aconn.execute("SELECT set_config('statement_timeout', %s, true)", (self._statement_timeout_ms(),))
+        # AsyncConnection.cancel() is a plain blocking call, usable from the cancelling thread.
+        unregister = self.cancel_token.on_cancel(aconn.cancel) if self.cancel_token else None
+        try:
+            yield self
+        except asyncio.CancelledError:
+            self.stopped = 'cancelled'
+            try:
+                await aconn.cancel_safe()
+            except Exception:
+                pass
+            raise
+        except Exception as e:
+            translated = self.translate(e)
+            if translated is e:
+                raise
+            raise translated from e
+        finally:
+            if unregister is not None:
+                unregister()
@@ -1,7 +1,26 @@
+import asyncio
+import os
 from src.base_knowledge_source import BaseCustomKnowledgeSource
-import sqlite3
-import psycopg
-from typing import Dict, List, Optional
+from src.config import Config
+from src.pool import get_pool, get_async_pool, redact_conn_string, sqlite_attachments
+from src.schema import (
+    SchemaModel,
+    SQLITE_COLUMNS_SQL,
+    SQLITE_FOREIGN_KEYS_SQL,
+    SQLITE_FINGERPRINT_SQL,
+    SQLITE_TABLE_COLUMNS_SQL,
+    SQLITE_TABLE_FOREIGN_KEYS_SQL,
+    SQLITE_TABLE_SIGNATURES_SQL,
+    POSTGRES_SCHEMA_SQL,
+    POSTGRES_FINGERPRINT_SQL,
+    POSTGRES_TABLE_SIGNATURES_SQL,
+    qualified_table_name,
+    build_sqlite_schema,
+    build_postgres_schema
+)
+from src.schema_cache import SchemaCache
+from src.tracing import tracer
+from typing import Any, Dict, List, Optional
 from pydantic import Field
 
 class DatabaseKnowledgeSource(BaseCustomKnowledgeSource):
@@ -10,15 +29,235 @@ class DatabaseKnowledgeSource(BaseCustomKnowledgeSource):
     db_path: Optional[str] = Field(default=None, description="Path to SQLite database")
     db_type: str = Field(description="Database type: 'sqlite' or 'postgres'")
     conn_string: Optional[str] = Field(default=None, description="Connection string for PostgreSQL")
+    schemas: Optional[List[str]] = Field(default=None, description="PostgreSQL schemas to introspect (default: all user schemas)")
+    use_schema_cache: bool = Field(default_factory=lambda: Config.SCHEMA_CACHE_ENABLED, description="Reuse schemas cached on disk")
+    schema_cache_dir: Optional[str] = Field(default=None, description="Directory for the on-disk schema cache")
+    schema_model: Optional[SchemaModel] = Field(default=None, description="Detailed schema from the last load")
+    schema_fingerprint: Optional[str] = Field(default=None, description="Fingerprint of the schema from the last load")
+    loaded_from_cache: bool = Field(default=False, description="Whether the last load skipped introspection")
+    table_signatures: Optional[Dict[str, str]] = Field(default=None, description="Per-table DDL signatures behind schema_model")
 
-    def load_content(self) -> Dict[str, Dict[str, List[str]]]:
+    def load_content(self) -> Dict[str, Any]:
         try:
-            schema = self._fetch_schema()
-            return self.format_schema(schema)
+            with tracer.span('knowledge', 'schema_load', db_type=self.db_type) as span:
+                self.schema_model = self._load_schema()
+                span.set(from_cache=self.loaded_from_cache, tables=len(self.schema_model.tables))
+            return self.schema_content()
         except Exception as e:
             self.handle_connection_error(e)
 
-    def _fetch_schema(self) -> Dict[str, List[str]]:
+    async def aload_content(self) -> Dict[str, Any]:
+        """Async ``load_content``: PostgreSQL catalog queries run on the async pool."""
+        if self.db_type != 'postgres':
+            return await asyncio.to_thread(self.load_content)
+        try:
+            with tracer.span('knowledge', 'schema_load', db_type=self.db_type) as span:
+                self.schema_model = await self._aload_schema()
+                span.set(from_cache=self.loaded_from_cache, tables=len(self.schema_model.tables))
+            return self.schema_content()
+        except Exception as e:
+            self.handle_connection_error(e)
+
+    def schema_content(self) -> Dict[str, Any]:
+        """``{table: [columns]}`` knowledge of the current schema, plus its foreign keys."""
+        content = self.format_schema(self.schema_model.to_column_map())
+        relationships = self.schema_model.relationships()
+        if relationships:
+            content["Foreign Keys"] = relationships
+        return content
+
+    def _load_schema(self) -> SchemaModel:
+        """Return the schema from the disk cache when its fingerprint is current, else introspect."""
+        self.loaded_from_cache = False
+        self.schema_fingerprint = self._fetch_fingerprint()
+        schema = self._cached_schema()
+        if schema is None:
+            with tracer.span('db', 'introspect'):
+                schema = self._fetch_schema()
+            self._store_schema(schema)
+        return schema
+
+    async def _aload_schema(self) -> SchemaModel:
+        self.loaded_from_cache = False
+        if not self.conn_string:
+            raise ValueError("PostgreSQL requires conn_string.")
+        async with get_async_pool(self.conn_string).connection() as conn:
+            cursor = conn.cursor()
+            try:
+                await cursor.execute(POSTGRES_FINGERPRINT_SQL, {})
+                self.schema_fingerprint = f"postgres:{(await cursor.fetchone())[0]}"
+                schema = self._cached_schema()
+                if schema is not None:
+                    return schema
+                await cursor.execute(POSTGRES_SCHEMA_SQL, {'schemas': self.schemas, 'tables': None})
+                rows = await cursor.fetchall()
+            finally:
+                await cursor.close()
+        schema = build_postgres_schema(rows)
+        self._store_schema(schema)
+        return schema
+
+    def _cached_schema(self) -> Optional[SchemaModel]:
+        if not self.use_schema_cache or self.schema_fingerprint is None:
+            return None
+        schema = SchemaCache(self.schema_cache_dir).get(self.database_key(), self.schema_fingerprint)
+        self.loaded_from_cache = schema is not None
+        return schema
+
+    def _store_schema(self, schema: SchemaModel) -> None:
+        if not self.use_schema_cache or self.schema_fingerprint is None:
+            return
+        try:
+            SchemaCache(self.schema_cache_dir).put(self.database_key(), self.schema_fingerprint, schema)
+        except OSError:
+            # An unwritable cache directory only costs the next start its warm cache.
+            pass
+
+    def track_changes(self) -> None:
+        """Take the per-table signatures ``refresh_schema`` compares against.
+
+        Signatures are read before the fingerprint: if the schema changed since
+        the last load, no baseline is kept and the next refresh re-introspects
+        every table.
+        """
+        signatures = self.fetch_table_signatures()
+        self.table_signatures = signatures if self._fetch_fingerprint() == self.schema_fingerprint else None
+
+    def refresh_schema(self) -> List[str]:
+        """Re-introspect the tables whose DDL changed since the last load or refresh; returns their names.
+
+        The fingerprint is checked first, so an unchanged schema costs one
+        catalog query. Otherwise per-table signatures pick the tables to
+        re-introspect (plus tables with foreign keys to them). ``schema_model``
+        is replaced by a new object, never modified, so readers holding the old
+        one are unaffected.
+        """
+        with tracer.span('knowledge', 'schema_refresh', db_type=self.db_type) as span:
+            fingerprint = self._fetch_fingerprint()
+            if fingerprint == self.schema_fingerprint:
+                span.set(changed=0)
+                return []
+            previous = self.schema_model or SchemaModel()
+            signatures = self.fetch_table_signatures()
+            if self.table_signatures is None:
+                with tracer.span('db', 'introspect'):
+                    schema = self._fetch_schema()
+            else:
+                stale = {name for name in set(signatures) | set(self.table_signatures)
+                         if signatures.get(name) != self.table_signatures.get(name)}
+                stale |= {name for name, table in previous.tables.items()
+                          if any(fk.ref_table in stale for fk in table.foreign_keys)}
+                fresh = self._fetch_tables(sorted(name for name in stale if name in signatures))
+                tables = {}
+                for name in signatures:
+                    table = fresh.tables.get(name) if name in stale else previous.tables.get(name)
+                    if table is not None:
+                        tables[name] = table
+                schema = SchemaModel(tables=tables)
+                _resolve_implicit_references(schema, fresh)
+            changed = [name for name in sorted(set(previous.tables) | set(schema.tables))
+                       if previous.tables.get(name) != schema.tables.get(name)]
+            self.schema_model = schema
+            self.schema_fingerprint = fingerprint
+            self.table_signatures = signatures
+            self._store_schema(schema)
+            span.set(changed=len(changed), tables=len(schema.tables))
+        if changed:
+            tracer.metrics.inc('crewai_schema_tables_refreshed_total', len(changed), db_type=self.db_type)
+        return changed
+
+    def fetch_table_signatures(self) -> Dict[str, str]:
+        """``{table: signature}`` for every table and view, from one catalog query."""
+        if self.db_type == 'sqlite':
+            queries = [(SQLITE_TABLE_SIGNATURES_SQL.format(schema=schema), ()) for schema in self._sqlite_schemas()]
+            default_schema = 'main'
+        else:
+            queries = [(POSTGRES_TABLE_SIGNATURES_SQL, {'schemas': self.schemas})]
+            default_schema = 'public'
+        pool = get_pool(self.db_type, db_path=self.db_path, conn_string=self.conn_string)
+        rows = []
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                for sql, params in queries:
+                    cursor.execute(sql, params)
+                    rows += cursor.fetchall()
+            finally:
+                cursor.close()
+        return {qualified_table_name(schema_name, name, default_schema): signature for schema_name, name, signature in rows}
+
+    def _fetch_tables(self, names: List[str]) -> SchemaModel:
+        """Introspect only the named tables (those that no longer exist are left out)."""
+        if not names:
+            return SchemaModel()
+        with tracer.span('db', 'introspect', tables=len(names)):
+            pool = get_pool(self.db_type, db_path=self.db_path, conn_string=self.conn_string)
+            with pool.connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    if self.db_type == 'sqlite':
+                        grouped: Dict[str, List[str]] = {}
+                        attached = self._sqlite_schemas()
+                        for name in names:
+                            schema, _, table = name.partition('.')
+                            if schema not in attached or not table:
+                                schema, table = 'main', name
+                            grouped.setdefault(schema, []).append(table)
+                        model = SchemaModel()
+                        for schema, tables in grouped.items():
+                            placeholders = ', '.join('?' * len(tables))
+                            cursor.execute(SQLITE_TABLE_COLUMNS_SQL.format(schema=schema, names=placeholders), tables)
+                            column_rows = cursor.fetchall()
+                            cursor.execute(SQLITE_TABLE_FOREIGN_KEYS_SQL.format(schema=schema, names=placeholders), tables)
+                            model.tables.update(build_sqlite_schema(column_rows, cursor.fetchall(), schema).tables)
+                        return model
+                    relations = [name if '.' in name else f"public.{name}" for name in names]
+                    cursor.execute(POSTGRES_SCHEMA_SQL, {'schemas': self.schemas, 'tables': relations})
+                    return build_postgres_schema(cursor.fetchall())
+                finally:
+                    cursor.close()
+
+    def database_key(self) -> str:
+        """Stable identity of the database (without credentials), used to namespace caches."""
+        if self.db_type == 'sqlite':
+            attachments = sqlite_attachments(self.db_path)
+            return SchemaCache.make_key(
+                self.db_type,
+                os.path.realpath(self.db_path),
+                ','.join(f"{alias}={os.path.realpath(path)}" for alias, path in sorted(attachments.items())) or None
+            )
+        return SchemaCache.make_key(
+            self.db_type,
+            redact_conn_string(self.conn_string),
+            ','.join(sorted(self.schemas)) if self.schemas else None
+        )
+
+    def _fetch_fingerprint(self) -> Optional[str]:
+        """Cheap schema version check; None when the database cannot be fingerprinted."""
+        if self.db_type == 'sqlite':
+            if not self.db_path:
+                raise ValueError("SQLite requires db_path.")
+            if self.db_path == ':memory:':
+                return None
+            with get_pool('sqlite', db_path=self.db_path).connection() as conn:
+                versions = [conn.execute(SQLITE_FINGERPRINT_SQL.format(schema=schema)).fetchone()[0]
+                            for schema in self._sqlite_schemas()]
+            return f"sqlite:{','.join(map(str, versions))}"
+        elif self.db_type == 'postgres':
+            if not self.conn_string:
+                raise ValueError("PostgreSQL requires conn_string.")
+            with get_pool('postgres', conn_string=self.conn_string).connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(POSTGRES_FINGERPRINT_SQL, {})
+                    digest = cursor.fetchone()[0]
+                finally:
+                    cursor.close()
+            return f"postgres:{digest}"
+        else:
+            raise ValueError("Unsupported db_type. Use 'sqlite' or 'postgres'.")
+
+    def _fetch_schema(self) -> SchemaModel:
         """Fetch schema based on database type."""
         if self.db_type == 'sqlite':
             return self._fetch_sqlite_schema()
@@ -27,40 +266,49 @@ class DatabaseKnowledgeSource(BaseCustomKnowledgeSource):
         else:
             raise ValueError("Unsupported db_type. Use 'sqlite' or 'postgres'.")
 
-    def _fetch_sqlite_schema(self) -> Dict[str, List[str]]:
-        """Fetch schema from SQLite database."""
+    def _fetch_sqlite_schema(self) -> SchemaModel:
+        """Fetch schema from SQLite database with two catalog queries per attached file, independent of table count."""
         if not self.db_path:
             raise ValueError("SQLite requires db_path.")
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        tables = [row[0] for row in cursor.fetchall()]
-
-        schema = {}
-        for table in tables:
-            cursor.execute(f"PRAGMA table_info({table});")
-            columns = [col[1] for col in cursor.fetchall()]
-            schema[table] = columns
-
-        conn.close()
+        schema = SchemaModel()
+        with get_pool('sqlite', db_path=self.db_path).connection() as conn:
+            cursor = conn.cursor()
+            try:
+                for name in self._sqlite_schemas():
+                    cursor.execute(SQLITE_COLUMNS_SQL.format(schema=name))
+                    column_rows = cursor.fetchall()
+                    cursor.execute(SQLITE_FOREIGN_KEYS_SQL.format(schema=name))
+                    schema.tables.update(build_sqlite_schema(column_rows, cursor.fetchall(), name).tables)
+            finally:
+                cursor.close()
         return schema
 
-    def _fetch_postgres_schema(self) -> Dict[str, List[str]]:
-        """Fetch schema from PostgreSQL database."""
+    def _sqlite_schemas(self) -> List[str]:
+        """'main' followed by the aliases of the databases attached to it (see ``src.pool.attach_databases``)."""
+        return ['main', *sqlite_attachments(self.db_path)]
+
+    def _fetch_postgres_schema(self) -> SchemaModel:
+        """Fetch schema from PostgreSQL database with a single pg_catalog query."""
         if not self.conn_string:
             raise ValueError("PostgreSQL requires conn_string.")
         
-        conn = psycopg.connect(self.conn_string)
-        cursor = conn.cursor()
-        cursor.execute("SELECT table_name FROM information_schema.tables WHERE table_schema = 'public';")
-        tables = [row[0] for row in cursor.fetchall()]
-
-        schema = {}
-        for table in tables:
-            cursor.execute("SELECT column_name FROM information_schema.columns WHERE table_name = %s;", (table,))
-            columns = [col[0] for col in cursor.fetchall()]
-            schema[table] = columns
-
-        conn.close()
-        return schema
+        with get_pool('postgres', conn_string=self.conn_string).connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(POSTGRES_SCHEMA_SQL, {'schemas': self.schemas, 'tables': None})
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+        return build_postgres_schema(rows)
+
+
+def _resolve_implicit_references(schema: SchemaModel, fresh: SchemaModel) -> None:
+    """Fill SQLite foreign keys that omit their target columns, now that the referenced tables are known."""
+    for name in fresh.tables:
+        table = schema.tables.get(name)
+        for fk in table.foreign_keys if table is not None else []:
+            target = schema.tables.get(fk.ref_table)
+            if target is not None and '' in fk.ref_columns:
+                fk.ref_columns = [ref or (target.primary_key[i] if i < len(target.primary_key) else '')
+                                  for i, ref in enumerate(fk.ref_columns)]
@@ -0,0 +1,64 @@
+import ast
+import json
+import re
+from typing import Any, Dict, Optional
+
+_FENCED_BLOCK = re.compile(r"```(?:[a-zA-Z]+)?\s*(.*?)```", re.DOTALL)
+_DICT_LITERAL = re.compile(r"\{.*\}", re.DOTALL)
+_BARE_SQL = re.compile(r"\b(SELECT|WITH)\b.*", re.DOTALL | re.IGNORECASE)
+
+
+def output_text(output: Any) -> str:
+    """Raw text of a crew/task output, a dict or a plain string."""
+    if output is None:
+        return ''
+    raw = getattr(output, 'raw', None)
+    if isinstance(raw, str):
+        return raw
+    return str(output)
+
+
+def parse_dict_output(output: Any) -> Optional[Dict[str, Any]]:
+    """Parse the dictionary an agent was asked to return.
+
+    Agents answer with JSON, Python dict literals (single quotes, None) or
+    either wrapped in a Markdown code fence, so all of those are accepted.
+    """
+    if isinstance(output, dict):
+        return output
+    json_dict = getattr(output, 'json_dict', None)
+    if isinstance(json_dict, dict):
+        return json_dict
+
+    text = output_text(output).strip()
+    fenced = _FENCED_BLOCK.search(text)
+    if fenced:
+        text = fenced.group(1).strip()
+    literal = _DICT_LITERAL.search(text)
+    if literal is None:
+        return None
+    candidate = literal.group(0)
+    for parse in (json.loads, ast.literal_eval):
+        try:
+            value = parse(candidate)
+        except (ValueError, SyntaxError, TypeError):
+            continue
+        if isinstance(value, dict):
+            return value
+    return None
+
+
+def extract_sql(output: Any) -> Optional[str]:
+    """Pull the generated SQL statement out of an SQL Generator answer."""
+    parsed = parse_dict_output(output)
+    if parsed and isinstance(parsed.get('sql'), str) and parsed['sql'].strip():
+        return parsed['sql'].strip()
+
+    text = output_text(output)
+    fenced = _FENCED_BLOCK.search(text)
+    if fenced:
+        text = fenced.group(1)
+    bare = _BARE_SQL.search(text)
+    if bare:
+        return bare.group(0).strip().rstrip(';').strip()
+    return None
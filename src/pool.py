@@ -0,0 +1,734 @@
+import asyncio
+import importlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from types import ModuleType
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional, Tuple
+
+from src.config import Config, DBTypeEnum
+from src.startup import startup
+
+# DB-API driver per db_type. Drivers are imported on first use, so SQLite-only
+# deployments never pay for importing psycopg.
+_DRIVERS = {'sqlite': 'sqlite3', 'postgres': 'psycopg'}
+
+
+def load_driver(db_type: Any = None) -> ModuleType:
+    """Import and return the driver module for ``db_type`` (default: ``Config.get_db_type_enum()``)."""
+    db_type = Config.get_db_type_enum() if db_type is None else db_type
+    name = _DRIVERS[db_type.value if isinstance(db_type, DBTypeEnum) else db_type]
+    module = sys.modules.get(name)
+    if module is None:
+        with startup.phase(f"driver:{name}"):
+            module = importlib.import_module(name)
+    return module
+
+
+def __getattr__(name: str) -> Any:
+    # Keeps ``src.pool.psycopg`` working (e.g. for patching in tests) without an eager import.
+    if name == 'psycopg':
+        return load_driver('postgres')
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class PoolTimeoutError(RuntimeError):
+    """Raised when no connection becomes available within the acquire timeout."""
+
+
+class _PooledConnection:
+    """Book-keeping wrapper around a raw DB-API connection."""
+
+    __slots__ = ('conn', 'created_at', 'last_used', 'last_checked')
+
+    def __init__(self, conn: Any):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+        self.last_checked = now
+
+
+class BaseConnectionPool:
+    """Common sizing, health check and statistics logic for connection pools."""
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        min_size: int = 1,
+        max_size: int = 10,
+        acquire_timeout: float = 30.0,
+        idle_timeout: float = 300.0,
+        health_check_interval: float = 30.0
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1.")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self._cond = threading.Condition()
+        self._closed = False
+        self._counters = {
+            'connections_created': 0,
+            'connections_closed': 0,
+            'acquired': 0,
+            'reused': 0,
+            'evicted_idle': 0,
+            'failed_health_checks': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'timeouts': 0
+        }
+
+    def _open(self) -> _PooledConnection:
+        entry = _PooledConnection(self._connect())
+        self._counters['connections_created'] += 1
+        return entry
+
+    def _close_entry(self, entry: _PooledConnection) -> None:
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
+        self._counters['connections_closed'] += 1
+
+    def _is_healthy(self, entry: _PooledConnection) -> bool:
+        """Ping the connection if it has not been checked recently."""
+        now = time.monotonic()
+        if now - entry.last_checked < self.health_check_interval:
+            return True
+        try:
+            entry.conn.execute("SELECT 1")
+            entry.last_checked = now
+            return True
+        except Exception:
+            self._counters['failed_health_checks'] += 1
+            return False
+
+    def _reset(self, conn: Any) -> bool:
+        """Roll back any open transaction before a connection is reused."""
+        try:
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Borrow a connection for the duration of a ``with`` block."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            # Uncommitted work never leaks into the next borrower.
+            self.release(conn, discard=not self._reset(conn))
+
+    def acquire(self) -> Any:
+        raise NotImplementedError("Subclasses must implement acquire method")
+
+    def release(self, conn: Any, discard: bool = False) -> None:
+        raise NotImplementedError("Subclasses must implement release method")
+
+    def evict_idle(self) -> int:
+        raise NotImplementedError("Subclasses must implement evict_idle method")
+
+    def close(self) -> None:
+        raise NotImplementedError("Subclasses must implement close method")
+
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError("Subclasses must implement stats method")
+
+
+class ConnectionPool(BaseConnectionPool):
+    """Bounded pool of connections shared between threads (used for PostgreSQL)."""
+
+    def __init__(self, connect: Callable[[], Any], **kwargs):
+        super().__init__(connect, **kwargs)
+        self._idle = deque()
+        self._in_use: Dict[int, _PooledConnection] = {}
+        self._opening = 0
+        with self._cond:
+            for _ in range(self.min_size):
+                self._idle.append(self._open())
+
+    def _size(self) -> int:
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def acquire(self) -> Any:
+        deadline = time.monotonic() + self.acquire_timeout
+        waited_since = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed.")
+                self._evict_idle_locked()
+                while self._idle:
+                    entry = self._idle.pop()
+                    if self._is_healthy(entry):
+                        self._counters['reused'] += 1
+                        return self._checkout(entry, waited_since)
+                    self._close_entry(entry)
+                if self._size() < self.max_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters['timeouts'] += 1
+                    raise PoolTimeoutError(
+                        f"No connection available after {self.acquire_timeout}s (max_size={self.max_size})."
+                    )
+                if waited_since is None:
+                    waited_since = time.monotonic()
+                    self._counters['waits'] += 1
+                self._cond.wait(remaining)
+            self._opening += 1
+        # Connect outside the lock so other threads can reuse and release meanwhile.
+        try:
+            entry = _PooledConnection(self._connect())
+        except BaseException:
+            with self._cond:
+                self._opening -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._opening -= 1
+            self._counters['connections_created'] += 1
+            return self._checkout(entry, waited_since)
+
+    def _checkout(self, entry: _PooledConnection, waited_since: Optional[float]) -> Any:
+        if waited_since is not None:
+            self._counters['wait_time_total'] += time.monotonic() - waited_since
+        entry.last_used = time.monotonic()
+        self._in_use[id(entry.conn)] = entry
+        self._counters['acquired'] += 1
+        return entry.conn
+
+    def release(self, conn: Any, discard: bool = False) -> None:
+        with self._cond:
+            entry = self._in_use.pop(id(conn), None)
+            if entry is None:
+                return
+            if discard or self._closed or getattr(conn, 'closed', False) is True:
+                self._close_entry(entry)
+            else:
+                entry.last_used = time.monotonic()
+                self._idle.append(entry)
+            self._cond.notify()
+
+    def _evict_idle_locked(self) -> int:
+        if self.idle_timeout <= 0:
+            return 0
+        now = time.monotonic()
+        evicted = 0
+        # Oldest idle connections sit at the left end of the deque.
+        while self._idle and self._size() > self.min_size and now - self._idle[0].last_used > self.idle_timeout:
+            self._close_entry(self._idle.popleft())
+            evicted += 1
+        self._counters['evicted_idle'] += evicted
+        return evicted
+
+    def evict_idle(self) -> int:
+        """Close connections idle for longer than ``idle_timeout``, keeping ``min_size``."""
+        with self._cond:
+            return self._evict_idle_locked()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                self._close_entry(self._idle.pop())
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'kind': 'shared',
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size(),
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                **self._counters
+            }
+
+
+class SQLiteConnectionPool(BaseConnectionPool):
+    """Pool handing each thread its own long-lived SQLite connection.
+
+    SQLite connections must not be shared between threads, so instead of a
+    shared free list every thread keeps one connection that is reused for all
+    of its queries. ``max_size`` bounds the number of threads holding a
+    connection at the same time. Connections of finished or idle threads are
+    swept at most once per ``health_check_interval``, or when a new thread
+    finds every slot taken, so reusing a connection stays O(1).
+    """
+
+    def __init__(self, connect: Callable[[], Any], **kwargs):
+        super().__init__(connect, **kwargs)
+        self._by_thread: Dict[int, _PooledConnection] = {}
+        self._busy: Dict[int, int] = {}
+        self._next_sweep = 0.0
+
+    def acquire(self) -> Any:
+        ident = threading.get_ident()
+        deadline = time.monotonic() + self.acquire_timeout
+        waited_since = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed.")
+                full = ident not in self._by_thread and len(self._by_thread) >= self.max_size
+                if full or time.monotonic() >= self._next_sweep:
+                    self._evict_idle_locked()
+                entry = self._by_thread.get(ident)
+                if entry is not None:
+                    if self._is_healthy(entry):
+                        self._counters['reused'] += 1
+                        break
+                    del self._by_thread[ident]
+                    self._close_entry(entry)
+                    continue
+                if len(self._by_thread) < self.max_size:
+                    entry = self._open()
+                    self._by_thread[ident] = entry
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters['timeouts'] += 1
+                    raise PoolTimeoutError(
+                        f"No SQLite connection slot available after {self.acquire_timeout}s (max_size={self.max_size})."
+                    )
+                if waited_since is None:
+                    waited_since = time.monotonic()
+                    self._counters['waits'] += 1
+                self._cond.wait(remaining)
+            if waited_since is not None:
+                self._counters['wait_time_total'] += time.monotonic() - waited_since
+            entry.last_used = time.monotonic()
+            self._busy[ident] = self._busy.get(ident, 0) + 1
+            self._counters['acquired'] += 1
+            return entry.conn
+
+    def release(self, conn: Any, discard: bool = False) -> None:
+        ident = threading.get_ident()
+        with self._cond:
+            depth = self._busy.get(ident, 0) - 1
+            if depth > 0:
+                self._busy[ident] = depth
+            else:
+                self._busy.pop(ident, None)
+            entry = self._by_thread.get(ident)
+            if entry is None or entry.conn is not conn:
+                return
+            entry.last_used = time.monotonic()
+            if discard or self._closed:
+                del self._by_thread[ident]
+                self._close_entry(entry)
+            self._cond.notify()
+
+    def _evict_idle_locked(self) -> int:
+        alive = {thread.ident for thread in threading.enumerate()}
+        now = time.monotonic()
+        self._next_sweep = now + self.health_check_interval
+        evicted = 0
+        for ident, entry in list(self._by_thread.items()):
+            if ident in self._busy:
+                continue
+            # Connections of finished threads can never be reused again.
+            dead = ident not in alive
+            idle = self.idle_timeout > 0 and now - entry.last_used > self.idle_timeout
+            if dead or (idle and len(self._by_thread) > self.min_size):
+                del self._by_thread[ident]
+                self._close_entry(entry)
+                evicted += 1
+        self._counters['evicted_idle'] += evicted
+        return evicted
+
+    def evict_idle(self) -> int:
+        """Close connections of finished threads and connections idle past ``idle_timeout``."""
+        with self._cond:
+            return self._evict_idle_locked()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            for ident, entry in list(self._by_thread.items()):
+                if ident not in self._busy:
+                    del self._by_thread[ident]
+                    self._close_entry(entry)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'kind': 'per-thread',
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': len(self._by_thread),
+                'idle': len(self._by_thread) - len(self._busy),
+                'in_use': len(self._busy),
+                **self._counters
+            }
+
+
+class AsyncConnectionPool:
+    """Bounded pool of ``psycopg.AsyncConnection`` objects for one event loop.
+
+    Mirrors ``ConnectionPool`` (LIFO reuse, health checks, idle eviction,
+    acquire timeout) but waits on an ``asyncio.Condition`` so coroutines
+    never block the loop while the pool is exhausted.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Awaitable[Any]],
+        min_size: int = 1,
+        max_size: int = 10,
+        acquire_timeout: float = 30.0,
+        idle_timeout: float = 300.0,
+        health_check_interval: float = 30.0
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1.")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self._cond = asyncio.Condition()
+        self._idle = deque()
+        self._in_use: Dict[int, _PooledConnection] = {}
+        self._opening = 0
+        self._closed = False
+        self._counters = {
+            'connections_created': 0,
+            'connections_closed': 0,
+            'acquired': 0,
+            'reused': 0,
+            'evicted_idle': 0,
+            'failed_health_checks': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'timeouts': 0
+        }
+
+    def _size(self) -> int:
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    async def _close_entry(self, entry: _PooledConnection) -> None:
+        try:
+            await entry.conn.close()
+        except Exception:
+            pass
+        self._counters['connections_closed'] += 1
+
+    async def _is_healthy(self, entry: _PooledConnection) -> bool:
+        now = time.monotonic()
+        if now - entry.last_checked < self.health_check_interval:
+            return True
+        try:
+            await entry.conn.execute("SELECT 1")
+            entry.last_checked = now
+            return True
+        except Exception:
+            self._counters['failed_health_checks'] += 1
+            return False
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[Any]:
+        """Borrow a connection for the duration of an ``async with`` block."""
+        conn = await self.acquire()
+        try:
+            yield conn
+        finally:
+            try:
+                await conn.rollback()
+                healthy = True
+            except Exception:
+                healthy = False
+            await self.release(conn, discard=not healthy)
+
+    async def acquire(self) -> Any:
+        deadline = time.monotonic() + self.acquire_timeout
+        waited_since = None
+        async with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed.")
+                await self._evict_idle_locked()
+                while self._idle:
+                    entry = self._idle.pop()
+                    if await self._is_healthy(entry):
+                        self._counters['reused'] += 1
+                        return self._checkout(entry, waited_since)
+                    await self._close_entry(entry)
+                if self._size() < self.max_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters['timeouts'] += 1
+                    raise PoolTimeoutError(
+                        f"No connection available after {self.acquire_timeout}s (max_size={self.max_size})."
+                    )
+                if waited_since is None:
+                    waited_since = time.monotonic()
+                    self._counters['waits'] += 1
+                try:
+                    await asyncio.wait_for(self._cond.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            self._opening += 1
+        # Connect outside the lock so other coroutines can release meanwhile.
+        try:
+            entry = _PooledConnection(await self._connect())
+        except BaseException:
+            async with self._cond:
+                self._opening -= 1
+                self._cond.notify()
+            raise
+        async with self._cond:
+            self._opening -= 1
+            self._counters['connections_created'] += 1
+            return self._checkout(entry, waited_since)
+
+    def _checkout(self, entry: _PooledConnection, waited_since: Optional[float]) -> Any:
+        if waited_since is not None:
+            self._counters['wait_time_total'] += time.monotonic() - waited_since
+        entry.last_used = time.monotonic()
+        self._in_use[id(entry.conn)] = entry
+        self._counters['acquired'] += 1
+        return entry.conn
+
+    async def release(self, conn: Any, discard: bool = False) -> None:
+        async with self._cond:
+            entry = self._in_use.pop(id(conn), None)
+            if entry is None:
+                return
+            if discard or self._closed or getattr(conn, 'closed', False) is True:
+                await self._close_entry(entry)
+            else:
+                entry.last_used = time.monotonic()
+                self._idle.append(entry)
+            self._cond.notify()
+
+    async def _evict_idle_locked(self) -> int:
+        if self.idle_timeout <= 0:
+            return 0
+        now = time.monotonic()
+        evicted = 0
+        while self._idle and self._size() > self.min_size and now - self._idle[0].last_used > self.idle_timeout:
+            await self._close_entry(self._idle.popleft())
+            evicted += 1
+        self._counters['evicted_idle'] += evicted
+        return evicted
+
+    async def evict_idle(self) -> int:
+        """Close connections idle for longer than ``idle_timeout``, keeping ``min_size``."""
+        async with self._cond:
+            return await self._evict_idle_locked()
+
+    async def close(self) -> None:
+        async with self._cond:
+            self._closed = True
+            while self._idle:
+                await self._close_entry(self._idle.pop())
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'kind': 'async',
+            'min_size': self.min_size,
+            'max_size': self.max_size,
+            'size': self._size(),
+            'idle': len(self._idle),
+            'in_use': len(self._in_use),
+            **self._counters
+        }
+
+
+_pools: Dict[Tuple[str, str], BaseConnectionPool] = {}
+_pools_lock = threading.Lock()
+# Async pools per event loop: {loop: {conn_string: pool}}.
+_async_pools: Dict[asyncio.AbstractEventLoop, Dict[str, AsyncConnectionPool]] = {}
+# SQLite databases ATTACHed to every connection opened for a path: {db_path: {alias: path}}.
+_attachments: Dict[str, Dict[str, str]] = {}
+
+_ALIAS = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+def attach_databases(db_path: str, attachments: Dict[str, str]) -> None:
+    """ATTACH ``attachments`` (``{alias: path}``) to every connection opened for the SQLite ``db_path``.
+
+    Their tables become ``alias.table`` in SQL and in the introspected schema,
+    so one query can join across files. An existing pool for ``db_path`` is
+    closed so new connections pick the change up.
+    """
+    attachments = dict(attachments or {})
+    for alias, path in attachments.items():
+        if not _ALIAS.match(alias) or alias.lower() in ('main', 'temp'):
+            raise ValueError(f"Invalid SQLite attachment alias {alias!r}")
+        if path != ':memory:' and not os.path.exists(path):
+            raise ValueError(f"SQLite attachment {alias!r} does not exist: {path}")
+    with _pools_lock:
+        if _attachments.get(db_path, {}) == attachments:
+            return
+        if attachments:
+            _attachments[db_path] = attachments
+        else:
+            _attachments.pop(db_path, None)
+        pool = _pools.pop(('sqlite', db_path), None)
+    if pool is not None:
+        pool.close()
+
+
+def sqlite_attachments(db_path: Optional[str]) -> Dict[str, str]:
+    """The ``{alias: path}`` databases attached to connections for ``db_path``."""
+    return dict(_attachments.get(db_path, {}))
+
+
+class PooledSQLiteConnection(sqlite3.Connection):
+    """``sqlite3.Connection`` opened by the pools; unlike the base class it can be weakly referenced."""
+
+
+def _connect_sqlite(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, check_same_thread=False, factory=PooledSQLiteConnection)
+    for alias, path in sqlite_attachments(db_path).items():
+        conn.execute(f'ATTACH DATABASE ? AS "{alias}"', (path,))
+    return conn
+
+
+def _pool_key(db_type: str, db_path: Optional[str], conn_string: Optional[str]) -> Tuple[str, str]:
+    if db_type == 'sqlite':
+        if not db_path:
+            raise ValueError("SQLite requires db_path.")
+        return db_type, db_path
+    elif db_type == 'postgres':
+        if not conn_string:
+            raise ValueError("PostgreSQL requires conn_string.")
+        return db_type, conn_string
+    raise ValueError("Unsupported db_type. Use 'sqlite' or 'postgres'.")
+
+
+def get_pool(db_type: str, db_path: str = None, conn_string: str = None, **overrides) -> BaseConnectionPool:
+    """Return the shared pool for a database, creating it on first use.
+
+    Pools are keyed by the same settings returned from ``Config.get_db_config()``,
+    so the SQL tool and the knowledge source reuse each other's connections.
+    """
+    key = _pool_key(db_type, db_path, conn_string)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            settings = {**Config.get_pool_config(), **overrides}
+            if db_type == 'sqlite':
+                pool = SQLiteConnectionPool(lambda: _connect_sqlite(db_path), **settings)
+            else:
+                pool = ConnectionPool(lambda: load_driver('postgres').connect(conn_string), **settings)
+            _pools[key] = pool
+        return pool
+
+
+def get_async_pool(conn_string: str, **overrides) -> AsyncConnectionPool:
+    """Return the async PostgreSQL pool for ``conn_string`` on the running event loop.
+
+    Async connections are bound to the loop that created them, so each loop
+    gets its own pool; the sizing settings are the same as for ``get_pool``.
+    Await ``aclose_all_pools()`` before the loop ends (e.g. at the end of the
+    coroutine passed to ``asyncio.run``) to close its connections cleanly.
+    """
+    if not conn_string:
+        raise ValueError("PostgreSQL requires conn_string.")
+    loop = asyncio.get_running_loop()
+    with _pools_lock:
+        for stale in [other for other in _async_pools if other.is_closed()]:
+            # Its loop ended without aclose_all_pools(); nothing can run on it any more, so just forget them.
+            _async_pools.pop(stale)
+        pools = _async_pools.setdefault(loop, {})
+        pool = pools.get(conn_string)
+        if pool is None:
+            settings = {**Config.get_pool_config(), **overrides}
+            pool = AsyncConnectionPool(lambda: load_driver('postgres').AsyncConnection.connect(conn_string), **settings)
+            pools[conn_string] = pool
+        return pool
+
+
+async def _close_async_pools(pools: Dict[str, AsyncConnectionPool]) -> None:
+    with _pools_lock:
+        owned = list(pools.values())
+        pools.clear()
+    for pool in owned:
+        await pool.close()
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Statistics for every open pool, keyed by ``"<db_type>:<target>"``."""
+    with _pools_lock:
+        pools = list(_pools.items())
+        async_pools = [(loop, target, pool) for loop, pools in _async_pools.items() for target, pool in pools.items()]
+    # Never expose the PostgreSQL password that is part of the key.
+    stats = {
+        f"{db_type}:{target if db_type == 'sqlite' else redact_conn_string(target)}": pool.stats()
+        for (db_type, target), pool in pools
+    }
+    for loop, target, pool in async_pools:
+        stats[f"postgres-async:{redact_conn_string(target)}@{id(loop):x}"] = pool.stats()
+    return stats
+
+
+def redact_conn_string(conn_string: str) -> str:
+    """Strip the password from a key/value or URI style PostgreSQL connection string."""
+    conn_string = re.sub(r'(://[^:/@]*):[^@]*@', r'\1:***@', conn_string)
+    return re.sub(r'(password\s*=\s*)\S+', r'\1***', conn_string)
+
+
+def close_all_pools(timeout: float = 5.0) -> None:
+    """Close and forget every pool (e.g. on shutdown or in tests).
+
+    Async pools are closed on their own loop: directly if it is idle, or
+    scheduled on it if it is running (waiting up to ``timeout`` seconds when
+    it runs in another thread). Pools of closed loops are just dropped.
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+        async_pools = list(_async_pools.items())
+        _async_pools.clear()
+    for pool in pools:
+        pool.close()
+    try:
+        current = asyncio.get_running_loop()
+    except RuntimeError:
+        current = None
+    for loop, owned in async_pools:
+        if loop.is_closed():
+            continue
+        if loop is current:
+            # Cannot block the loop we are running on; the close runs as soon as we yield.
+            loop.create_task(_close_async_pools(owned))
+        elif loop.is_running():
+            try:
+                asyncio.run_coroutine_threadsafe(_close_async_pools(owned), loop).result(timeout)
+            except Exception:
+                pass
+        else:
+            loop.run_until_complete(_close_async_pools(owned))
+
+
+async def aclose_all_pools() -> None:
+    """Close and forget the async pools belonging to the running event loop.
+
+    Call it before the loop ends; ``aprocess_query`` callers do so once their
+    queries are done (see the README's async example).
+    """
+    loop = asyncio.get_running_loop()
+    with _pools_lock:
+        pools = _async_pools.pop(loop, {})
+    await _close_async_pools(pools)
@@ -0,0 +1,147 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from src.config import Config
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?.!;]+$")
+_QUOTES = str.maketrans({'‘': "'", '’': "'", '“': '"', '”': '"'})
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a question: case, whitespace, quote style and trailing punctuation folded."""
+    query = query.translate(_QUOTES).strip().lower()
+    query = _WHITESPACE.sub(' ', query)
+    return _TRAILING_PUNCTUATION.sub('', query)
+
+
+class QueryCache:
+    """LRU + TTL cache from natural-language questions to generated SQL.
+
+    Entries are keyed by the normalized question, the database identity and
+    the schema fingerprint, so a schema change never serves SQL written for
+    the old schema. An optional SQLite file backend shares entries between
+    processes and survives restarts; the in-memory LRU sits in front of it.
+    """
+
+    def __init__(self, max_entries: int = None, ttl: float = None, path: str = None):
+        self.max_entries = max_entries or Config.QUERY_CACHE_MAX_ENTRIES
+        self.ttl = Config.QUERY_CACHE_TTL if ttl is None else ttl
+        self.path = path if path is not None else Config.QUERY_CACHE_PATH
+        self._entries: 'OrderedDict[str, Tuple[str, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+        self._db = None
+        if self.path:
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS query_cache ("
+                "key TEXT PRIMARY KEY, sql TEXT NOT NULL, expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(query: str, namespace: str = '') -> str:
+        return hashlib.sha256(f"{namespace}\x1f{normalize_query(query)}".encode('utf-8')).hexdigest()
+
+    def get(self, query: str, namespace: str = '') -> Optional[str]:
+        key = self.make_key(query, namespace)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                sql, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._counters['hits'] += 1
+                    return sql
+                del self._entries[key]
+                self._counters['expirations'] += 1
+
+            sql = self._backend_get(key, now)
+            if sql is None:
+                self._counters['misses'] += 1
+                return None
+            self._remember(key, sql[0], sql[1])
+            self._counters['hits'] += 1
+            return sql[0]
+
+    def put(self, query: str, sql: str, namespace: str = '') -> None:
+        key = self.make_key(query, namespace)
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl > 0 else float('inf')
+        with self._lock:
+            self._remember(key, sql, expires_at)
+            self._counters['stores'] += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO query_cache (key, sql, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                    (key, sql, min(expires_at, 1e18), now)
+                )
+                # Keep the file bounded the same way as the in-memory LRU.
+                self._db.execute(
+                    "DELETE FROM query_cache WHERE expires_at <= ? OR key IN ("
+                    "SELECT key FROM query_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (now, self.max_entries)
+                )
+                self._db.commit()
+
+    def invalidate(self, query: str, namespace: str = '') -> None:
+        """Drop an entry, e.g. when its cached SQL no longer executes."""
+        key = self.make_key(query, namespace)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._counters['invalidations'] += 1
+            if self._db is not None:
+                self._db.execute("DELETE FROM query_cache WHERE key = ?", (key,))
+                self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM query_cache")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hit_rate': self._counters['hits'] / lookups if lookups else 0.0,
+                'backend': 'sqlite' if self._db is not None else 'memory',
+                **self._counters
+            }
+
+    def _remember(self, key: str, sql: str, expires_at: float) -> None:
+        self._entries[key] = (sql, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters['evictions'] += 1
+
+    def _backend_get(self, key: str, now: float) -> Optional[Tuple[str, float]]:
+        if self._db is None:
+            return None
+        row = self._db.execute("SELECT sql, expires_at FROM query_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            self._db.execute("DELETE FROM query_cache WHERE key = ?", (key,))
+            self._db.commit()
+            self._counters['expirations'] += 1
+            return None
+        self._db.execute("UPDATE query_cache SET last_used = ? WHERE key = ?", (now, key))
+        self._db.commit()
+        return row[0], row[1]
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,184 @@
+import os
+import threading
+import time
+from contextlib import AsyncExitStack, ExitStack, asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from src.config import Config
+from src.governor import QueryCancelled, QueryTimeout
+from src.pool import PoolTimeoutError, attach_databases, get_async_pool, get_pool, redact_conn_string, sqlite_attachments
+from src.tracing import tracer
+
+# DB-API errors that blame the statement, not the node that ran it.
+_STATEMENT_ERRORS = {'ProgrammingError', 'DataError', 'IntegrityError', 'NotSupportedError'}
+
+
+def _node_at_fault(error: Exception) -> bool:
+    # An exhausted pool means busy, not broken; timeouts and cancellations are the request's.
+    if isinstance(error, (PoolTimeoutError, QueryTimeout, QueryCancelled)):
+        return False
+    return not any(cls.__name__ in _STATEMENT_ERRORS for cls in type(error).__mro__)
+
+
+class ReplicaNode:
+    """One database a ReplicaSet can read from, with its load and health."""
+
+    def __init__(self, target: str, primary: bool = False):
+        self.target = target
+        self.primary = primary
+        self.outstanding = 0
+        self.served = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.down_until = 0.0
+
+    @property
+    def label(self) -> str:
+        return redact_conn_string(self.target)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'primary': self.primary,
+            'healthy': time.monotonic() >= self.down_until,
+            'outstanding': self.outstanding,
+            'served': self.served,
+            'failures': self.failures,
+            'last_error': self.last_error
+        }
+
+
+class ReplicaSet:
+    """Spreads read-only queries over a primary's read replicas.
+
+    Each read goes to the healthy replica with the fewest requests in flight
+    (ties go to the one that served fewest), so a slow node stops receiving
+    new work while it catches up. A replica that fails to hand out a
+    connection is skipped for ``retry_interval`` seconds and the read moves
+    on to the next one; the primary only serves reads when no replica can.
+    A read that fails on the node counts as a failure, not as served, and
+    benches the replica the same way unless the statement itself was at fault.
+    Replicas are SQLite files or PostgreSQL connection strings, like the primary.
+    """
+
+    def __init__(self, db_type: str, primary: str, replicas: List[str], retry_interval: float = None):
+        if db_type not in ('sqlite', 'postgres'):
+            raise ValueError("Unsupported db_type. Use 'sqlite' or 'postgres'.")
+        self.db_type = db_type
+        self.primary = ReplicaNode(primary, primary=True)
+        self.replicas = [ReplicaNode(target) for target in replicas]
+        self.retry_interval = Config.REPLICA_RETRY_INTERVAL if retry_interval is None else retry_interval
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self) -> Iterator[Tuple[str, Any]]:
+        """Borrow a connection for one read; yields ``(target, conn)`` for the node that serves it."""
+        tried: List[ReplicaNode] = []
+        while True:
+            node = self._pick(tried)
+            borrowed = ExitStack()
+            try:
+                if self.db_type == 'sqlite' and not os.path.exists(node.target):
+                    # sqlite3 would create an empty database instead of failing.
+                    raise FileNotFoundError(f"SQLite replica {node.target} does not exist")
+                target = {'db_path': node.target} if self.db_type == 'sqlite' else {'conn_string': node.target}
+                conn = borrowed.enter_context(get_pool(self.db_type, **target).connection())
+            except Exception as e:
+                self._finish(node, e)
+                if node.primary:
+                    raise
+                tried.append(node)
+                continue
+            try:
+                with borrowed:
+                    yield node.target, conn
+            except Exception as e:
+                self._finish(node, e)
+                raise
+            self._finish(node)
+            return
+
+    @asynccontextmanager
+    async def aconnection(self) -> AsyncIterator[Tuple[str, Any]]:
+        """``connection`` for async PostgreSQL reads."""
+        if self.db_type != 'postgres':
+            raise ValueError("Async replica reads require PostgreSQL.")
+        tried: List[ReplicaNode] = []
+        while True:
+            node = self._pick(tried)
+            borrowed = AsyncExitStack()
+            try:
+                conn = await borrowed.enter_async_context(get_async_pool(node.target).connection())
+            except Exception as e:
+                self._finish(node, e)
+                if node.primary:
+                    raise
+                tried.append(node)
+                continue
+            try:
+                async with borrowed:
+                    yield node.target, conn
+            except Exception as e:
+                self._finish(node, e)
+                raise
+            self._finish(node)
+            return
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Load and health per node, keyed by its label (passwords redacted)."""
+        with self._lock:
+            return {node.label: node.stats() for node in [self.primary, *self.replicas]}
+
+    def _pick(self, tried: List[ReplicaNode]) -> ReplicaNode:
+        now = time.monotonic()
+        with self._lock:
+            healthy = [node for node in self.replicas if node not in tried and node.down_until <= now]
+            node = min(healthy, key=lambda node: (node.outstanding, node.served)) if healthy else self.primary
+            node.outstanding += 1
+        tracer.metrics.inc('crewai_replica_requests_total', node=node.label)
+        return node
+
+    def _finish(self, node: ReplicaNode, error: Exception = None) -> None:
+        with self._lock:
+            node.outstanding -= 1
+            if error is None:
+                node.served += 1
+                return
+            node.failures += 1
+            node.last_error = str(error)
+            if not node.primary and _node_at_fault(error):
+                node.down_until = time.monotonic() + self.retry_interval
+        tracer.metrics.inc('crewai_replica_failures_total', node=node.label)
+
+
+_replica_sets: Dict[Tuple[str, str], ReplicaSet] = {}
+_replica_sets_lock = threading.Lock()
+
+
+def register_replicas(db_type: str, primary: str, replicas: List[str], retry_interval: float = None) -> Optional[ReplicaSet]:
+    """Route read-only queries for ``primary`` (a SQLite path or connection string) to ``replicas``.
+
+    No replicas removes the routing. SQLite replicas get the primary's
+    attached databases as well, so register after ``attach_databases``.
+    """
+    with _replica_sets_lock:
+        if not replicas:
+            _replica_sets.pop((db_type, primary), None)
+            return None
+        replica_set = _replica_sets[(db_type, primary)] = ReplicaSet(db_type, primary, replicas, retry_interval)
+    if db_type == 'sqlite':
+        for replica in replicas:
+            attach_databases(replica, sqlite_attachments(primary))
+    return replica_set
+
+
+def replicas_for(db_type: str, primary: Optional[str]) -> Optional[ReplicaSet]:
+    """The ReplicaSet registered for ``primary``, if any."""
+    with _replica_sets_lock:
+        return _replica_sets.get((db_type, primary))
+
+
+def replica_stats() -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """``ReplicaSet.stats`` for every registered primary."""
+    with _replica_sets_lock:
+        replica_sets = list(_replica_sets.values())
+    return {replica_set.primary.label: replica_set.stats() for replica_set in replica_sets}
@@ -0,0 +1,237 @@
+import os
+import re
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from src.config import Config
+from src.pool import sqlite_attachments
+from src.streaming import estimate_row_bytes
+
+_SQL_TOKENS = re.compile(
+    r"('(?:[^']|'')*')"          # string literal, kept verbatim
+    r'|("(?:[^"]|"")*")'         # quoted identifier, kept verbatim
+    r"|(--[^\n]*|/\*.*?\*/)"     # comment, dropped
+    r"|(\s+)"                    # whitespace, collapsed
+    r"|([^'\"\s\-/]+|[\-/])",    # everything else, case-folded
+    re.DOTALL
+)
+
+
+def canonicalize_sql(sql: str) -> str:
+    """Fold case, whitespace and comments outside literals so equivalent SQL shares a key."""
+    parts = []
+    for literal, quoted, comment, space, other in _SQL_TOKENS.findall(sql):
+        if literal or quoted:
+            parts.append(literal or quoted)
+        elif comment or space:
+            if parts and parts[-1] != ' ':
+                parts.append(' ')
+        else:
+            parts.append(other.lower())
+    return ''.join(parts).strip().rstrip(';').strip()
+
+
+# SQLite reports other connections' commits through a per-connection
+# ``PRAGMA data_version`` counter. Each pooled connection remembers the last
+# value it saw and bumps a per-database generation when it changes, so every
+# thread observes the same version. Entries go away with their connection.
+_sqlite_seen: 'weakref.WeakKeyDictionary[Any, Tuple[int, ...]]' = weakref.WeakKeyDictionary()
+_sqlite_generation: Dict[str, int] = {}
+_sqlite_lock = threading.Lock()
+_postgres_versions: Dict[str, Tuple[Hashable, float]] = {}
+
+POSTGRES_DATA_VERSION_SQL = """
+SELECT
+    CASE WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn() ELSE pg_current_wal_lsn() END::text,
+    (SELECT COALESCE(sum(n_tup_ins + n_tup_upd + n_tup_del), 0)::text FROM pg_stat_user_tables)
+"""
+
+
+def bump_data_version(db_key: str) -> None:
+    """Record a write made through this process (our own commits do not move data_version)."""
+    with _sqlite_lock:
+        _sqlite_generation[db_key] = _sqlite_generation.get(db_key, 0) + 1
+        _postgres_versions.pop(db_key, None)
+
+
+def data_version(conn: Any, db_type: str, db_key: str, db_path: str = None, max_age: float = None) -> Hashable:
+    """Cheap token that changes whenever the data in the database may have changed.
+
+    SQLite combines ``PRAGMA data_version`` with the database and WAL file
+    mtimes/sizes, for the main file and every attached one. PostgreSQL combines the current WAL position (which moves on
+    every logged write) with the table modification counters from
+    ``pg_stat_user_tables`` (which also cover unlogged tables). Because that
+    costs a round trip, a PostgreSQL version younger than ``max_age`` seconds
+    is reused, trading that much staleness for hits served without the server.
+    """
+    if db_type == 'sqlite':
+        attachments = sqlite_attachments(db_path)
+        value = tuple(conn.execute(f'PRAGMA "{schema}".data_version').fetchone()[0] for schema in ['main', *attachments])
+        with _sqlite_lock:
+            try:
+                previous = _sqlite_seen.get(conn)
+                _sqlite_seen[conn] = value
+            except TypeError:
+                # A plain sqlite3.Connection (not from the pools) cannot be weakly referenced;
+                # the file state below still moves with its commits.
+                previous = None
+            if previous is not None and previous != value:
+                _sqlite_generation[db_key] = _sqlite_generation.get(db_key, 0) + 1
+            generation = _sqlite_generation.get(db_key, 0)
+        return ('sqlite', generation, sqlite_file_state(db_path, attachments))
+    recent = _recent_postgres_version(db_key, max_age)
+    if recent is not None:
+        return recent
+    cursor = conn.cursor()
+    try:
+        cursor.execute(POSTGRES_DATA_VERSION_SQL)
+        version = ('postgres',) + tuple(cursor.fetchone())
+    finally:
+        cursor.close()
+    _postgres_versions[db_key] = (version, time.monotonic())
+    return version
+
+
+def sqlite_file_state(db_path: str, attachments: Dict[str, str] = None) -> Tuple:
+    """``(mtime, size)`` of a SQLite database's file and WAL, and of its attached databases'.
+
+    The main files also contribute the header's file change counter, which
+    rollback-journal commits increment even when mtime and size stay put
+    (in WAL mode the WAL file grows instead). Any commit moves it, and so can
+    a WAL checkpoint; unlike ``PRAGMA data_version`` it means the same thing
+    to every connection and process.
+    """
+    attachments = sqlite_attachments(db_path) if attachments is None else attachments
+    files = []
+    for database in (db_path, *attachments.values()):
+        try:
+            with open(database, 'rb') as f:
+                files.append(f.read(28)[24:])
+        except (OSError, TypeError):
+            files.append(None)
+        for path in (database, f"{database}-wal"):
+            try:
+                stat = os.stat(path)
+                files.append((stat.st_mtime_ns, stat.st_size))
+            except (OSError, TypeError):
+                files.append(None)
+    return tuple(files)
+
+
+async def adata_version(aconn: Any, db_key: str, max_age: float = None) -> Hashable:
+    """``data_version`` for a PostgreSQL ``AsyncConnection``."""
+    recent = _recent_postgres_version(db_key, max_age)
+    if recent is not None:
+        return recent
+    cursor = aconn.cursor()
+    try:
+        await cursor.execute(POSTGRES_DATA_VERSION_SQL)
+        version = ('postgres',) + tuple(await cursor.fetchone())
+    finally:
+        await cursor.close()
+    _postgres_versions[db_key] = (version, time.monotonic())
+    return version
+
+
+def _recent_postgres_version(db_key: str, max_age: Optional[float]) -> Optional[Hashable]:
+    max_age = Config.RESULT_CACHE_VERSION_MAX_AGE if max_age is None else max_age
+    if max_age > 0:
+        recent = _postgres_versions.get(db_key)
+        if recent is not None and time.monotonic() - recent[1] < max_age:
+            return recent[0]
+    return None
+
+
+def estimate_result_bytes(output: Dict[str, Any]) -> int:
+    """Approximate in-memory footprint of a tool output dict."""
+    size = sys.getsizeof(output) + len(output.get('message') or '')
+    rows = output.get('data')
+    if hasattr(rows, 'nbytes'):
+        size += rows.nbytes
+    else:
+        size += sum(estimate_row_bytes(row) + sys.getsizeof(row) for row in rows or [])
+    size += sum(len(column) + 50 for column in output.get('columns') or [])
+    return size
+
+
+class ResultCache:
+    """Memory-budgeted LRU cache of executed query results.
+
+    Entries are keyed by database and canonical SQL (plus the fetch limits) and
+    remember the data version they were computed at; a lookup under any other
+    version is a miss and drops the stale entry. Eviction is size-aware: the
+    least recently used entries are removed until the total estimated size fits
+    ``max_bytes``, and results larger than ``max_entry_bytes`` are never cached.
+    """
+
+    def __init__(self, max_bytes: int = None, max_entry_bytes: int = None):
+        self.max_bytes = max_bytes or Config.RESULT_CACHE_MAX_BYTES
+        self.max_entry_bytes = max_entry_bytes or max(self.max_bytes // 4, 1)
+        self._entries: 'OrderedDict[Tuple, Tuple[Hashable, Dict[str, Any], int]]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'stale': 0, 'stores': 0, 'evictions': 0, 'too_large': 0}
+
+    @staticmethod
+    def make_key(db_key: str, sql: str, *limits: Any) -> Tuple:
+        return (db_key, canonicalize_sql(sql)) + limits
+
+    def get(self, key: Tuple, version: Hashable) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters['misses'] += 1
+                return None
+            cached_version, output, size = entry
+            if cached_version != version:
+                self._drop(key)
+                self._counters['stale'] += 1
+                self._counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return output
+
+    def put(self, key: Tuple, version: Hashable, output: Dict[str, Any]) -> bool:
+        size = estimate_result_bytes(output)
+        with self._lock:
+            if size > self.max_entry_bytes:
+                self._counters['too_large'] += 1
+                return False
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (version, output, size)
+            self._bytes += size
+            self._counters['stores'] += 1
+            while self._bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._counters['evictions'] += 1
+            return True
+
+    def invalidate_database(self, db_key: str) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == db_key]:
+                self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                **self._counters
+            }
+
+    def _drop(self, key: Tuple) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
@@ -0,0 +1,208 @@
+import datetime
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from src.config import Config
+from src.schema_index import tokenize
+
+SQL = 'sql'
+FORECAST = 'forecast'
+NONE = 'none'
+
+_FORECAST_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r'\b(forecast|forecasting|predict|prediction|projection|project(?:ed)?)\b',
+    r'\b(next|coming|upcoming|following) (day|week|month|quarter|year|season|\d+ (days|weeks|months|quarters|years))\b',
+    r'\bwill (be|have|there|the|we|it)\b',
+    r'\b(expected|anticipated|future|extrapolate|outlook)\b',
+)]
+_SQL_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r'^\s*(which|who|list|show|how many|count|what (is|was|are|were) the|find|give me)\b',
+    r'\b(top \d+|most|least|highest|lowest|average|total|sum of|maximum|minimum|per|group by)\b',
+    r'\b(last|previous|past) (day|week|month|quarter|year|season)\b',
+)]
+_OFF_TOPIC = re.compile(r'^\s*(hi|hello|hey|thanks|thank you|tell me a joke|who are you)\b', re.IGNORECASE)
+_YEAR = re.compile(r'\b(19|20)\d\d\b')
+
+SEED_EXAMPLES: List[Tuple[str, str]] = [
+    ("Which park had most attendances in 2008?", SQL),
+    ("Show me the top 5 teams by wins last season", SQL),
+    ("What's the average salary by position?", SQL),
+    ("How many players were born in 1980?", SQL),
+    ("List all parks in Boston", SQL),
+    ("Who hit the most home runs in 2015?", SQL),
+    ("What was the total attendance per team in 2010?", SQL),
+    ("Give me the players with the highest salary", SQL),
+    ("Count the games played at each park", SQL),
+    ("Which team had the lowest payroll last year?", SQL),
+    ("Find customers who ordered more than 10 items", SQL),
+    ("What is the maximum price of a product?", SQL),
+    ("Show revenue by region for the previous quarter", SQL),
+    ("How many orders were placed between 2019 and 2021?", SQL),
+    ("What were the sales in March 2020?", SQL),
+    ("Compare wins of the Yankees and the Red Sox in 2004", SQL),
+    ("Predict next quarter's sales", FORECAST),
+    ("Forecast visitor trends for next month", FORECAST),
+    ("What will be the expected growth rate?", FORECAST),
+    ("Forecast attendance for every park next season", FORECAST),
+    ("Predict how many fans will attend in 2030", FORECAST),
+    ("What will revenue look like over the next 6 months?", FORECAST),
+    ("Project the number of orders for the coming year", FORECAST),
+    ("Estimate future demand for tickets", FORECAST),
+    ("What is the outlook for salaries next year?", FORECAST),
+    ("Extrapolate the attendance trend into the future", FORECAST),
+    ("How many visitors do we expect next week?", FORECAST),
+    ("Give me a prediction of sales for the upcoming season", FORECAST),
+    ("Hello there", NONE),
+    ("Tell me a joke", NONE),
+    ("Who are you?", NONE),
+    ("What's the weather like today?", NONE),
+    ("Write a poem about baseball", NONE),
+    ("Thanks for your help", NONE),
+]
+
+
+class RouteDecision:
+    """Outcome of the local router for one query."""
+
+    def __init__(self, route: Optional[str], confidence: float, source: str, probabilities: Dict[str, float] = None):
+        self.route = route
+        self.confidence = confidence
+        self.source = source
+        self.probabilities = probabilities or {}
+
+    @property
+    def uncertainty(self) -> float:
+        return 1.0 - self.confidence
+
+    @property
+    def response(self) -> Optional[str]:
+        """The value the LLM router would return: 'sql', 'forecast' or None."""
+        return None if self.route == NONE else self.route
+
+    def __repr__(self) -> str:
+        return f"RouteDecision(route={self.route!r}, confidence={self.confidence:.2f}, source={self.source!r})"
+
+
+class FastRouter:
+    """Deterministic router placed in front of the Router LLM crew.
+
+    Queries are first matched against keyword/regex rules; when exactly one
+    family of rules fires the decision is final. Otherwise a multinomial naive
+    Bayes model over word unigrams/bigrams and derived features (schema terms
+    mentioned, past vs. future years) scores the query. Callers should fall back
+    to the LLM router when ``decision.uncertainty`` exceeds the threshold.
+    """
+
+    RULE_CONFIDENCE = 0.97
+
+    def __init__(
+        self,
+        schema_terms: Iterable[str] = (),
+        examples: Iterable[Tuple[str, str]] = None,
+        uncertainty_threshold: float = None,
+        alpha: float = 0.5
+    ):
+        self.schema_terms: Set[str] = set(schema_terms)
+        self.uncertainty_threshold = (
+            Config.ROUTER_UNCERTAINTY_THRESHOLD if uncertainty_threshold is None else uncertainty_threshold
+        )
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._class_docs: Counter = Counter()
+        self._feature_counts: Dict[str, Counter] = defaultdict(Counter)
+        self._vocabulary: Set[str] = set()
+        self._totals: Dict[str, int] = {}
+        self.fit(SEED_EXAMPLES if examples is None else examples)
+
+    def features(self, query: str) -> List[str]:
+        tokens = tokenize(query)
+        features = list(tokens)
+        features += [f"{a}_{b}" for a, b in zip(tokens, tokens[1:])]
+        schema_hits = sum(1 for token in tokens if token in self.schema_terms)
+        features += ['__schema_term__'] * schema_hits
+        current_year = datetime.date.today().year
+        for match in _YEAR.finditer(query):
+            features.append('__future_year__' if int(match.group(0)) > current_year else '__past_year__')
+        if query.strip().endswith('?'):
+            features.append('__question__')
+        return features
+
+    def fit(self, examples: Iterable[Tuple[str, str]]) -> 'FastRouter':
+        """Add labelled examples (label is 'sql', 'forecast' or 'none'); can be called repeatedly."""
+        for text, label in examples:
+            label = label or NONE
+            self._class_docs[label] += 1
+            for feature in self.features(text):
+                self._feature_counts[label][feature] += 1
+                self._vocabulary.add(feature)
+        self._totals = {label: sum(counts.values()) for label, counts in self._feature_counts.items()}
+        return self
+
+    def _rules(self, query: str) -> Optional[str]:
+        if _OFF_TOPIC.search(query):
+            return NONE
+        forecast = any(pattern.search(query) for pattern in _FORECAST_PATTERNS)
+        sql = any(pattern.search(query) for pattern in _SQL_PATTERNS)
+        # Explicit years point at stored history or at the future.
+        current_year = datetime.date.today().year
+        for match in _YEAR.finditer(query):
+            if int(match.group(0)) > current_year:
+                forecast = True
+            else:
+                sql = True
+        if forecast and not sql:
+            return FORECAST
+        if sql and not forecast:
+            return SQL
+        return None
+
+    def _model(self, query: str) -> Dict[str, float]:
+        features = self.features(query)
+        total_docs = sum(self._class_docs.values())
+        vocabulary_size = len(self._vocabulary) + 1
+        log_scores = {}
+        for label, docs in self._class_docs.items():
+            score = math.log(docs / total_docs)
+            denominator = self._totals.get(label, 0) + self.alpha * vocabulary_size
+            counts = self._feature_counts[label]
+            for feature in features:
+                score += math.log((counts.get(feature, 0) + self.alpha) / denominator)
+            log_scores[label] = score
+        peak = max(log_scores.values())
+        weights = {label: math.exp(score - peak) for label, score in log_scores.items()}
+        norm = sum(weights.values())
+        return {label: weight / norm for label, weight in weights.items()}
+
+    def route(self, query: str) -> RouteDecision:
+        """Classify a query locally; check ``is_confident`` before trusting it."""
+        rule_route = self._rules(query)
+        if rule_route is not None:
+            return RouteDecision(rule_route, self.RULE_CONFIDENCE, 'rules')
+        probabilities = self._model(query)
+        label = max(probabilities, key=probabilities.get)
+        return RouteDecision(label, probabilities[label], 'model', probabilities)
+
+    def is_confident(self, decision: RouteDecision) -> bool:
+        return decision.uncertainty <= self.uncertainty_threshold
+
+    def record(self, path: str, route: Optional[str]) -> None:
+        """Count which path ('rules', 'model' or 'llm') produced the final route."""
+        with self._lock:
+            self._counts[f"path:{path}"] += 1
+            self._counts[f"route:{route or NONE}"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            total = sum(count for key, count in self._counts.items() if key.startswith('path:'))
+            stats = {'total': total}
+            for path in ('rules', 'model', 'llm'):
+                count = self._counts.get(f"path:{path}", 0)
+                stats[path] = count
+                stats[f"{path}_share"] = count / total if total else 0.0
+            for route in (SQL, FORECAST, NONE):
+                stats[f"route_{route}"] = self._counts.get(f"route:{route}", 0)
+            return stats
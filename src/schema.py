@@ -0,0 +1,296 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+
+
+class ColumnInfo(BaseModel):
+    """A single table column."""
+
+    name: str
+    data_type: str = ''
+    nullable: bool = True
+    primary_key: bool = False
+    default: Optional[str] = None
+    comment: Optional[str] = None
+
+
+class ForeignKey(BaseModel):
+    """A (possibly composite) foreign key from one table to another."""
+
+    columns: List[str]
+    ref_table: str
+    ref_columns: List[str]
+    name: Optional[str] = None
+
+
+class TableInfo(BaseModel):
+    """A table or view with its columns and keys."""
+
+    name: str
+    schema_name: Optional[str] = None
+    kind: str = 'table'
+    columns: List[ColumnInfo] = Field(default_factory=list)
+    foreign_keys: List[ForeignKey] = Field(default_factory=list)
+    comment: Optional[str] = None
+
+    @property
+    def primary_key(self) -> List[str]:
+        return [column.name for column in self.columns if column.primary_key]
+
+    def column(self, name: str) -> Optional[ColumnInfo]:
+        for column in self.columns:
+            if column.name == name:
+                return column
+        return None
+
+
+class SchemaModel(BaseModel):
+    """Introspected database schema, keyed by (schema-qualified) table name."""
+
+    tables: Dict[str, TableInfo] = Field(default_factory=dict)
+
+    def to_column_map(self) -> Dict[str, List[str]]:
+        """Plain ``{table: [column, ...]}`` view used for agent knowledge."""
+        return {name: [column.name for column in table.columns] for name, table in self.tables.items()}
+
+    def relationships(self) -> List[str]:
+        """Foreign keys rendered as ``"orders.customer_id -> customers.id"``."""
+        return [
+            f"{name}.{','.join(fk.columns)} -> {fk.ref_table}.{','.join(fk.ref_columns)}"
+            for name, table in self.tables.items()
+            for fk in table.foreign_keys
+        ]
+
+
+def qualified_table_name(schema_name: Optional[str], table_name: str, default_schema: str) -> str:
+    """Only tables outside the default schema are prefixed with their schema."""
+    if not schema_name or schema_name == default_schema:
+        return table_name
+    return f"{schema_name}.{table_name}"
+
+
+# SQLite catalog queries are formatted with ``{schema}``: 'main' or the alias of an attached database.
+SQLITE_COLUMNS_SQL = """
+SELECT m.name, m.type, p.name, p.type, p."notnull", p.pk, p.dflt_value
+FROM "{schema}".sqlite_master AS m
+JOIN pragma_table_info(m.name, '{schema}') AS p
+WHERE m.type IN ('table', 'view') AND m.name NOT LIKE 'sqlite_%'
+ORDER BY m.name, p.cid;
+"""
+
+SQLITE_FOREIGN_KEYS_SQL = """
+SELECT m.name, f.id, f."table", f."from", f."to"
+FROM "{schema}".sqlite_master AS m
+JOIN pragma_foreign_key_list(m.name, '{schema}') AS f
+WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%'
+ORDER BY m.name, f.id, f.seq;
+"""
+
+# The same two queries restricted to some tables; ``{names}`` takes one placeholder per table.
+SQLITE_TABLE_COLUMNS_SQL = """
+SELECT m.name, m.type, p.name, p.type, p."notnull", p.pk, p.dflt_value
+FROM "{schema}".sqlite_master AS m
+JOIN pragma_table_info(m.name, '{schema}') AS p
+WHERE m.type IN ('table', 'view') AND m.name IN ({names})
+ORDER BY m.name, p.cid;
+"""
+
+SQLITE_TABLE_FOREIGN_KEYS_SQL = """
+SELECT m.name, f.id, f."table", f."from", f."to"
+FROM "{schema}".sqlite_master AS m
+JOIN pragma_foreign_key_list(m.name, '{schema}') AS f
+WHERE m.type = 'table' AND m.name IN ({names})
+ORDER BY m.name, f.id, f.seq;
+"""
+
+POSTGRES_SCHEMA_SQL = """
+SELECT
+    n.nspname,
+    c.relname,
+    c.relkind,
+    obj_description(c.oid, 'pg_class'),
+    a.attname,
+    format_type(a.atttypid, a.atttypmod),
+    NOT a.attnotnull,
+    COALESCE(a.attnum = ANY(pk.conkey), false),
+    pg_get_expr(d.adbin, d.adrelid),
+    col_description(c.oid, a.attnum),
+    fk.conname,
+    fk.ref_schema,
+    fk.ref_table,
+    fk.ref_column
+FROM pg_catalog.pg_class AS c
+JOIN pg_catalog.pg_namespace AS n ON n.oid = c.relnamespace
+JOIN pg_catalog.pg_attribute AS a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+LEFT JOIN pg_catalog.pg_attrdef AS d ON d.adrelid = c.oid AND d.adnum = a.attnum
+LEFT JOIN pg_catalog.pg_constraint AS pk ON pk.conrelid = c.oid AND pk.contype = 'p'
+LEFT JOIN LATERAL (
+    SELECT con.conname, rn.nspname AS ref_schema, rc.relname AS ref_table, ra.attname AS ref_column
+    FROM pg_catalog.pg_constraint AS con
+    CROSS JOIN LATERAL unnest(con.conkey, con.confkey) AS k(attnum, ref_attnum)
+    JOIN pg_catalog.pg_class AS rc ON rc.oid = con.confrelid
+    JOIN pg_catalog.pg_namespace AS rn ON rn.oid = rc.relnamespace
+    JOIN pg_catalog.pg_attribute AS ra ON ra.attrelid = con.confrelid AND ra.attnum = k.ref_attnum
+    WHERE con.conrelid = c.oid AND con.contype = 'f' AND k.attnum = a.attnum
+) AS fk ON true
+WHERE c.relkind IN ('r', 'p', 'v', 'm', 'f')
+  AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+  AND n.nspname NOT LIKE 'pg_toast%%'
+  AND n.nspname NOT LIKE 'pg_temp%%'
+  AND (%(schemas)s::text[] IS NULL OR n.nspname = ANY(%(schemas)s::text[]))
+  AND (%(tables)s::text[] IS NULL OR n.nspname || '.' || c.relname = ANY(%(tables)s::text[]))
+ORDER BY n.nspname, c.relname, a.attnum, fk.conname;
+"""
+
+_PG_KINDS = {'r': 'table', 'p': 'table', 'v': 'view', 'm': 'view', 'f': 'table'}
+
+
+def build_sqlite_schema(column_rows: List[tuple], fk_rows: List[tuple], schema_name: str = 'main') -> SchemaModel:
+    """Assemble a SchemaModel from the two batched SQLite catalog queries.
+
+    Tables of an attached database (``schema_name`` other than 'main') are
+    keyed ``alias.table``, like PostgreSQL tables outside 'public'.
+    """
+    schema = SchemaModel()
+    for table_name, kind, name, data_type, not_null, pk, default in column_rows:
+        key = qualified_table_name(schema_name, table_name, 'main')
+        table = schema.tables.get(key)
+        if table is None:
+            table = schema.tables[key] = TableInfo(
+                name=table_name,
+                schema_name=None if schema_name == 'main' else schema_name,
+                kind=kind
+            )
+        table.columns.append(ColumnInfo(
+            name=name,
+            data_type=data_type or '',
+            nullable=not not_null and not pk,
+            primary_key=bool(pk),
+            default=default
+        ))
+
+    grouped: Dict[tuple, ForeignKey] = {}
+    for table_name, fk_id, ref_table, column, ref_column in fk_rows:
+        key = qualified_table_name(schema_name, table_name, 'main')
+        table = schema.tables.get(key)
+        if table is None:
+            continue
+        # SQLite foreign keys cannot leave their own database file.
+        ref_table = qualified_table_name(schema_name, ref_table, 'main')
+        fk = grouped.get((key, fk_id))
+        if fk is None:
+            fk = grouped[(key, fk_id)] = ForeignKey(columns=[], ref_table=ref_table, ref_columns=[])
+            table.foreign_keys.append(fk)
+        fk.columns.append(column)
+        # An omitted target column means the referenced table's primary key.
+        if ref_column is None and ref_table in schema.tables:
+            pk_columns = schema.tables[ref_table].primary_key
+            ref_column = pk_columns[len(fk.ref_columns)] if len(fk.ref_columns) < len(pk_columns) else None
+        fk.ref_columns.append(ref_column or '')
+    return schema
+
+
+def build_postgres_schema(rows: List[tuple], default_schema: str = 'public') -> SchemaModel:
+    """Assemble a SchemaModel from the single PostgreSQL catalog query."""
+    schema = SchemaModel()
+    foreign_keys: Dict[tuple, ForeignKey] = {}
+    for (nspname, relname, relkind, table_comment, attname, data_type, nullable, is_pk,
+         default, column_comment, conname, ref_schema, ref_table, ref_column) in rows:
+        key = qualified_table_name(nspname, relname, default_schema)
+        table = schema.tables.get(key)
+        if table is None:
+            table = schema.tables[key] = TableInfo(
+                name=relname,
+                schema_name=nspname,
+                kind=_PG_KINDS.get(relkind, 'table'),
+                comment=table_comment
+            )
+        # A column referenced by several foreign keys appears once per key.
+        if table.column(attname) is None:
+            table.columns.append(ColumnInfo(
+                name=attname,
+                data_type=data_type,
+                nullable=nullable,
+                primary_key=is_pk,
+                default=default,
+                comment=column_comment
+            ))
+        if conname is not None:
+            fk = foreign_keys.get((key, conname))
+            if fk is None:
+                fk = foreign_keys[(key, conname)] = ForeignKey(
+                    name=conname,
+                    columns=[],
+                    ref_table=qualified_table_name(ref_schema, ref_table, default_schema),
+                    ref_columns=[]
+                )
+                table.foreign_keys.append(fk)
+            fk.columns.append(attname)
+            fk.ref_columns.append(ref_column)
+    return schema
+
+
+SQLITE_FINGERPRINT_SQL = 'PRAGMA "{schema}".schema_version;'
+
+# Per-table signatures for incremental refreshes: SQLite keeps each table's
+# CREATE statement (rewritten by ALTER TABLE); PostgreSQL hashes the same
+# system columns as the fingerprint below, per relation.
+SQLITE_TABLE_SIGNATURES_SQL = """
+SELECT '{schema}', name, type || ':' || COALESCE(sql, '')
+FROM "{schema}".sqlite_master
+WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%'
+ORDER BY name;
+"""
+
+POSTGRES_TABLE_SIGNATURES_SQL = """
+SELECT n.nspname, c.relname, md5(concat_ws('|',
+    c.xmin::text,
+    c.relfilenode::text,
+    (SELECT string_agg(a.attnum::text || '.' || a.xmin::text, ',' ORDER BY a.attnum)
+     FROM pg_catalog.pg_attribute AS a
+     WHERE a.attrelid = c.oid AND a.attnum > 0),
+    (SELECT string_agg(con.oid::text || '.' || con.xmin::text, ',' ORDER BY con.oid)
+     FROM pg_catalog.pg_constraint AS con
+     WHERE con.conrelid = c.oid AND con.contype IN ('p', 'f')),
+    (SELECT string_agg(d.objsubid::text || '.' || d.xmin::text, ',' ORDER BY d.objsubid)
+     FROM pg_catalog.pg_description AS d
+     WHERE d.objoid = c.oid AND d.classoid = 'pg_catalog.pg_class'::regclass)
+))
+FROM pg_catalog.pg_class AS c
+JOIN pg_catalog.pg_namespace AS n ON n.oid = c.relnamespace
+WHERE c.relkind IN ('r', 'p', 'v', 'm', 'f')
+  AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+  AND n.nspname NOT LIKE 'pg_toast%%'
+  AND n.nspname NOT LIKE 'pg_temp%%'
+  AND (%(schemas)s::text[] IS NULL OR n.nspname = ANY(%(schemas)s::text[]))
+ORDER BY n.nspname, c.relname;
+"""
+
+# Any DDL on a user relation rewrites its pg_class / pg_attribute / pg_constraint
+# rows, which changes their xmin, so hashing those system columns detects schema
+# changes without transferring the catalog itself.
+POSTGRES_FINGERPRINT_SQL = """
+SELECT md5(concat_ws('|',
+    (SELECT string_agg(c.oid::text || '.' || c.xmin::text || '.' || c.relfilenode::text, ',' ORDER BY c.oid)
+     FROM pg_catalog.pg_class AS c
+     JOIN pg_catalog.pg_namespace AS n ON n.oid = c.relnamespace
+     WHERE c.relkind IN ('r', 'p', 'v', 'm', 'f')
+       AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+       AND n.nspname NOT LIKE 'pg_toast%%'
+       AND n.nspname NOT LIKE 'pg_temp%%'),
+    (SELECT string_agg(a.attrelid::text || '.' || a.attnum::text || '.' || a.xmin::text, ',' ORDER BY a.attrelid, a.attnum)
+     FROM pg_catalog.pg_attribute AS a
+     JOIN pg_catalog.pg_class AS c ON c.oid = a.attrelid
+     JOIN pg_catalog.pg_namespace AS n ON n.oid = c.relnamespace
+     WHERE a.attnum > 0
+       AND c.relkind IN ('r', 'p', 'v', 'm', 'f')
+       AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+       AND n.nspname NOT LIKE 'pg_toast%%'
+       AND n.nspname NOT LIKE 'pg_temp%%'),
+    (SELECT string_agg(con.oid::text || '.' || con.xmin::text, ',' ORDER BY con.oid)
+     FROM pg_catalog.pg_constraint AS con
+     WHERE con.contype IN ('p', 'f')),
+    (SELECT string_agg(d.objoid::text || '.' || d.objsubid::text || '.' || d.xmin::text, ',' ORDER BY d.objoid, d.objsubid)
+     FROM pg_catalog.pg_description AS d
+     WHERE d.classoid = 'pg_catalog.pg_class'::regclass)
+));
+"""
@@ -0,0 +1,63 @@
+import hashlib
+import json
+import os
+import tempfile
+from typing import Optional
+
+from src.config import Config
+from src.schema import SchemaModel
+
+
+class SchemaCache:
+    """Disk-backed cache of introspected schemas, validated by a schema fingerprint.
+
+    Each database gets one JSON file holding the fingerprint that was current
+    when the schema was introspected. A lookup with a different fingerprint is
+    a miss, so stale entries are rebuilt (and overwritten) automatically.
+    """
+
+    def __init__(self, cache_dir: str = None):
+        self.cache_dir = os.path.expanduser(cache_dir or Config.SCHEMA_CACHE_DIR)
+
+    @staticmethod
+    def make_key(*parts: Optional[str]) -> str:
+        """Stable file-name-safe key for a database identity (never stores secrets)."""
+        raw = '\x1f'.join('' if part is None else str(part) for part in parts)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str, fingerprint: str) -> Optional[SchemaModel]:
+        """Return the cached schema if it was stored under the same fingerprint."""
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('fingerprint') != fingerprint:
+            return None
+        try:
+            return SchemaModel.model_validate(entry['schema'])
+        except Exception:
+            return None
+
+    def put(self, key: str, fingerprint: str, schema: SchemaModel) -> None:
+        """Atomically write an entry so concurrent workers never read a partial file."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = {'fingerprint': fingerprint, 'schema': schema.model_dump()}
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, separators=(',', ':'))
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def invalidate(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,249 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from src.config import Config
+from src.schema import SchemaModel, TableInfo, ColumnInfo
+
+_CAMEL_BOUNDARY = re.compile(r'(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])')
+_WORD = re.compile(r'[A-Za-z]+|[0-9]+')
+# Question words that never name a table, column or value.
+STOPWORDS = frozenset(
+    'a an and are as at be by did do does for from had has have how in is it its many '
+    'me most much of on or per show than that the their them there these this to was '
+    'were what when where which who whose will with give list find tell get all each '
+    'top number total'.split()
+)
+
+
+def _stem(token: str) -> str:
+    """Tiny suffix stripper so 'attendances', 'attendance' and 'teams'/'team' meet."""
+    if len(token) > 4 and token.endswith('ies'):
+        return token[:-3] + 'y'
+    if len(token) > 4 and token.endswith(('sses', 'xes', 'ches', 'shes')):
+        return token[:-2]
+    if len(token) > 3 and token.endswith('s') and not token.endswith(('ss', 'us', 'is')):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split free text or identifiers (snake_case, camelCase, dotted) into stemmed terms."""
+    if not text:
+        return []
+    tokens = []
+    for part in _CAMEL_BOUNDARY.sub(' ', text).split():
+        for word in _WORD.findall(part):
+            word = word.lower()
+            if word in STOPWORDS:
+                continue
+            tokens.append(_stem(word))
+    return tokens
+
+
+class _BM25:
+    """Okapi BM25 over a fixed list of token lists."""
+
+    def __init__(self, documents: List[List[str]], k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(doc) for doc in documents]
+        self.lengths = [len(doc) for doc in documents]
+        self.avg_length = (sum(self.lengths) / len(documents)) if documents else 0.0
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+        for index, freqs in enumerate(self.term_freqs):
+            for term in freqs:
+                self.postings[term].append(index)
+        total = len(documents)
+        self.idf = {
+            term: math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def scores(self, query_terms: List[str]) -> Dict[int, float]:
+        """Scores for every document containing at least one query term."""
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(query_terms):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for index in self.postings[term]:
+                tf = self.term_freqs[index][term]
+                norm = 1 - self.b + self.b * self.lengths[index] / (self.avg_length or 1)
+                scores[index] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+        return scores
+
+
+class SchemaMatch:
+    """Tables and columns retrieved for one query."""
+
+    def __init__(
+        self,
+        tables: List[Tuple[str, float]],
+        columns: Dict[str, List[str]],
+        relationships: List[str],
+        confident: bool
+    ):
+        self.tables = tables
+        self.columns = columns
+        self.relationships = relationships
+        self.confident = confident
+
+    @property
+    def table_names(self) -> List[str]:
+        return [name for name, _ in self.tables]
+
+    def to_schema_slice(self) -> Dict[str, List[str]]:
+        return {name: self.columns.get(name, []) for name in self.table_names}
+
+    def to_prompt(self) -> str:
+        """Compact text rendering used as agent input in place of the full schema."""
+        lines = [f"{name}({', '.join(self.columns.get(name, []))})" for name in self.table_names]
+        if self.relationships:
+            lines.append("Joins: " + '; '.join(self.relationships))
+        return '\n'.join(lines)
+
+
+class SchemaIndex:
+    """In-process lexical index over table and column names and comments.
+
+    Table documents and column documents are scored separately with BM25 and
+    combined, so a question mentioning only a column ("attendance") still
+    ranks the table owning it. No network or embedding calls are involved.
+    """
+
+    TABLE_NAME_WEIGHT = 2.0
+
+    def __init__(self, schema: SchemaModel):
+        self.schema = schema
+        name_docs = []
+        table_docs = []
+        self._table_names: List[str] = []
+        column_docs = []
+        self._column_keys: List[Tuple[str, str]] = []
+        for key, table in schema.tables.items():
+            table_terms = tokenize(key)
+            doc = table_terms + tokenize(table.comment)
+            for column in table.columns:
+                doc += tokenize(column.name)
+                column_docs.append(tokenize(column.name) * 2 + tokenize(column.comment) + table_terms)
+                self._column_keys.append((key, column.name))
+            name_docs.append(table_terms)
+            table_docs.append(doc)
+            self._table_names.append(key)
+        # Table names get their own index: a term like "park" is rare among table
+        # names even when every "park_id" foreign key makes it common overall.
+        self._names = _BM25(name_docs)
+        self._tables = _BM25(table_docs)
+        self._columns = _BM25(column_docs)
+
+    @classmethod
+    def from_column_map(cls, column_map: Dict[str, List[str]]) -> 'SchemaIndex':
+        """Build an index when only the ``{table: [columns]}`` knowledge is available."""
+        schema = SchemaModel(tables={
+            name: TableInfo(name=name, columns=[ColumnInfo(name=column) for column in columns])
+            for name, columns in column_map.items()
+        })
+        return cls(schema)
+
+    def search(
+        self,
+        query: str,
+        top_k_tables: int = None,
+        top_k_columns: int = None,
+        relative_cutoff: float = None,
+        confidence_margin: float = None
+    ) -> SchemaMatch:
+        """Rank tables and columns for ``query``.
+
+        Tables scoring at least ``relative_cutoff`` of the best table are kept
+        (up to ``top_k_tables``). The match is ``confident`` when some table
+        scored and the best table not kept scores below ``confidence_margin``
+        of the weakest kept one, i.e. the cut is unambiguous.
+        """
+        top_k_tables = top_k_tables or Config.SCHEMA_INDEX_TOP_TABLES
+        top_k_columns = top_k_columns or Config.SCHEMA_INDEX_TOP_COLUMNS
+        relative_cutoff = Config.SCHEMA_INDEX_RELATIVE_CUTOFF if relative_cutoff is None else relative_cutoff
+        confidence_margin = Config.SCHEMA_INDEX_CONFIDENCE_MARGIN if confidence_margin is None else confidence_margin
+
+        terms = tokenize(query)
+        table_scores: Dict[str, float] = defaultdict(float)
+        for index, score in self._names.scores(terms).items():
+            table_scores[self._table_names[index]] += score * self.TABLE_NAME_WEIGHT
+        for index, score in self._tables.scores(terms).items():
+            table_scores[self._table_names[index]] += score
+        column_scores: Dict[str, Dict[str, float]] = defaultdict(dict)
+        for index, score in self._columns.scores(terms).items():
+            table, column = self._column_keys[index]
+            column_scores[table][column] = score
+        for table, scores in column_scores.items():
+            table_scores[table] += max(scores.values())
+
+        ranked = sorted(table_scores.items(), key=lambda item: (-item[1], item[0]))
+        if not ranked:
+            return SchemaMatch([], {}, [], confident=False)
+
+        best = ranked[0][1]
+        selected = [(name, score) for name, score in ranked[:top_k_tables] if score >= best * relative_cutoff]
+        rest = ranked[len(selected):]
+        confident = not rest or rest[0][1] < selected[-1][1] * confidence_margin
+
+        selected = self._add_bridge_tables(selected, table_scores)
+        names = {name for name, _ in selected}
+        columns = {
+            name: self._pick_columns(self.schema.tables[name], column_scores.get(name, {}), top_k_columns)
+            for name in names
+        }
+        return SchemaMatch(selected, columns, self._relationships(names), confident)
+
+    def include(self, match: SchemaMatch, columns: Dict[str, List[str]], top_k_columns: int = None) -> SchemaMatch:
+        """``match`` plus the tables in ``columns``, each showing at least the listed columns.
+
+        Used for tables that hold a value named in the question ("Fenway"),
+        which a purely lexical match on schema names cannot find.
+        """
+        top_k_columns = top_k_columns or Config.SCHEMA_INDEX_TOP_COLUMNS
+        extra = [(name, 0.0) for name in columns if name in self.schema.tables and name not in match.columns]
+        if not extra:
+            return match
+        selected = self._add_bridge_tables(match.tables + extra, {})
+        picked = dict(match.columns)
+        for name, _ in selected:
+            if name not in picked:
+                wanted = {column: 1.0 for column in columns.get(name, [])}
+                picked[name] = self._pick_columns(self.schema.tables[name], wanted, top_k_columns)
+        return SchemaMatch(selected, picked, self._relationships(set(picked)), match.confident)
+
+    def _relationships(self, names) -> List[str]:
+        return [
+            f"{name}.{','.join(fk.columns)} = {fk.ref_table}.{','.join(fk.ref_columns)}"
+            for name in sorted(names)
+            for fk in self.schema.tables[name].foreign_keys
+            if fk.ref_table in names
+        ]
+
+    def _add_bridge_tables(self, selected: List[Tuple[str, float]], table_scores: Dict[str, float]) -> List[Tuple[str, float]]:
+        """Add tables whose foreign keys connect two selected tables (e.g. link tables)."""
+        names = {name for name, _ in selected}
+        if len(names) < 2:
+            return selected
+        bridges = []
+        for key, table in self.schema.tables.items():
+            if key in names:
+                continue
+            targets = {fk.ref_table for fk in table.foreign_keys} & names
+            if len(targets) >= 2:
+                bridges.append((key, table_scores.get(key, 0.0)))
+        return selected + bridges
+
+    @staticmethod
+    def _pick_columns(table: TableInfo, scores: Dict[str, float], top_k: int) -> List[str]:
+        """Matched columns plus key columns needed for joins, in table order."""
+        if len(table.columns) <= top_k:
+            return [column.name for column in table.columns]
+        keep = set(sorted(scores, key=lambda name: -scores[name])[:top_k])
+        keep.update(table.primary_key)
+        for fk in table.foreign_keys:
+            keep.update(fk.columns)
+        return [column.name for column in table.columns if column.name in keep]
@@ -0,0 +1,53 @@
+import threading
+from typing import Any, Callable, List, Optional
+
+from src.config import Config
+
+
+class SchemaWatcher:
+    """Polls a ``DatabaseKnowledgeSource`` for DDL changes on a daemon thread.
+
+    Each poll is one fingerprint query (``PRAGMA schema_version`` on SQLite,
+    a catalog hash on PostgreSQL). When it moves, only the changed tables are
+    re-introspected (``refresh_schema``) and ``on_change`` receives their
+    names, after the source already holds the new schema model.
+    """
+
+    def __init__(self, source: Any, on_change: Callable[[List[str]], None], interval: float = None):
+        self.source = source
+        self.on_change = on_change
+        self.interval = Config.SCHEMA_WATCH_INTERVAL if interval is None else interval
+        self.last_error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def poll(self) -> List[str]:
+        """Check once; returns the changed tables (empty when the schema is unchanged)."""
+        with self._lock:
+            if self.source.table_signatures is None:
+                self.source.track_changes()
+            changed = self.source.refresh_schema()
+            if changed:
+                self.on_change(changed)
+            return changed
+
+    def start(self) -> None:
+        def run():
+            while not self._stop.wait(self.interval):
+                try:
+                    self.poll()
+                    self.last_error = None
+                except Exception as e:
+                    # A failed poll (e.g. the database restarting) is retried next interval.
+                    self.last_error = e
+
+        # The baseline is taken now, so changes made before the first poll are seen.
+        self.source.track_changes()
+        self._thread = threading.Thread(target=run, name='crewai-schema-watch', daemon=True)
+        self._thread.start()
+
+    def close(self, timeout: float = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
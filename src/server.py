@@ -0,0 +1,445 @@
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.batch import WorkerCrews
+from src.config import Config
+from src.governor import CancelToken, cancel_scope
+from src.replicas import replica_stats
+from src.tracing import tracer
+
+# Endpoints with their own latency series; anything else is counted as 'other'.
+ENDPOINTS = ('/query', '/batch', '/health', '/stats', '/metrics')
+
+
+class Overloaded(RuntimeError):
+    """The lane a request needs is full; the client should retry later."""
+
+
+class LatencyStats:
+    """Request counts and latency percentiles per endpoint, over a window of recent requests.
+
+    Every request also feeds the ``endpoint`` histogram and the
+    ``crewai_server_requests_total`` counter served on ``/metrics``.
+    """
+
+    def __init__(self, window: int = 1024):
+        self.window = window
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, endpoint: str, status: int, seconds: float) -> None:
+        tracer.metrics.observe('endpoint', endpoint, seconds)
+        tracer.metrics.inc('crewai_server_requests_total', endpoint=endpoint, status=status)
+        with self._lock:
+            entry = self._endpoints.get(endpoint)
+            if entry is None:
+                entry = self._endpoints[endpoint] = {'count': 0, 'statuses': {}, 'samples': deque(maxlen=self.window)}
+            entry['count'] += 1
+            entry['statuses'][status] = entry['statuses'].get(status, 0) + 1
+            entry['samples'].append(seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            entries = {name: (entry['count'], dict(entry['statuses']), sorted(entry['samples'])) for name, entry in self._endpoints.items()}
+        stats = {}
+        for name, (count, statuses, samples) in sorted(entries.items()):
+            stats[name] = {
+                'count': count,
+                'statuses': {str(status): total for status, total in sorted(statuses.items())},
+                **{f"p{q}": round(_percentile(samples, q / 100), 6) for q in (50, 95, 99)},
+                'max': round(samples[-1], 6)
+            }
+        return stats
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class _Job:
+    __slots__ = ('kind', 'payload', 'lane', 'future', 'token', 'started', 'queued_at', 'waited')
+
+    def __init__(self, kind: str, payload: Dict[str, Any]):
+        self.kind = kind
+        self.payload = payload
+        self.lane: Optional[str] = None
+        self.future: Future = Future()
+        self.token = CancelToken()
+        self.started = time.perf_counter()
+        self.queued_at = self.started
+        self.waited = 0.0
+
+
+# Returned by a cached-lane worker that moved its job to the crew lane.
+_FORWARDED = object()
+
+
+class RequestQueue:
+    """Bounded FIFO queue per lane. A full lane sheds new work instead of growing.
+
+    ``wake`` hands a waiting worker None, ahead of queued jobs and outside the
+    bound, so shutdown never waits for room in a full lane.
+    """
+
+    def __init__(self, sizes: Dict[str, int]):
+        self._sizes = {lane: max(size, 1) for lane, size in sizes.items()}
+        self._jobs: Dict[str, deque] = {lane: deque() for lane in sizes}
+        self._wakeups = {lane: 0 for lane in sizes}
+        self._cond = threading.Condition()
+
+    def put(self, lane: str, job: Any) -> None:
+        with self._cond:
+            if len(self._jobs[lane]) >= self._sizes[lane]:
+                tracer.metrics.inc('crewai_server_shed_total', lane=lane)
+                raise Overloaded(f"Too many queued requests in the {lane} lane")
+            self._jobs[lane].append(job)
+            self._cond.notify_all()
+
+    def get(self, lane: str) -> Any:
+        with self._cond:
+            while not self._wakeups[lane] and not self._jobs[lane]:
+                self._cond.wait()
+            if self._wakeups[lane]:
+                self._wakeups[lane] -= 1
+                return None
+            return self._jobs[lane].popleft()
+
+    def wake(self, lane: str) -> None:
+        """Unblock one worker waiting on ``lane``, even when the lane is full."""
+        with self._cond:
+            self._wakeups[lane] += 1
+            self._cond.notify_all()
+
+    def drain(self, lane: str) -> List[Any]:
+        """Remove and return everything still queued in ``lane``."""
+        with self._cond:
+            items = list(self._jobs[lane])
+            self._jobs[lane].clear()
+        return items
+
+    def depths(self) -> Dict[str, int]:
+        with self._cond:
+            return {lane: len(jobs) for lane, jobs in self._jobs.items()}
+
+
+class QueryServer:
+    """Answers questions with one warm ``CrewAIQuerySystem`` through two priority lanes.
+
+    Every question first enters the 'cached' lane, whose workers answer
+    repeated questions from the question-to-SQL cache without an LLM call.
+    Misses, batches and cache-less systems go to the 'crew' lane, whose
+    workers route and run the crews on per-thread crew copies. Cheap requests
+    therefore never wait behind crew runs. Both queues are bounded: a request
+    that finds its lane full is rejected at once (``Overloaded``), and one that
+    is not answered within its timeout is cancelled, including its SQL.
+    """
+
+    def __init__(self, system: Any, db_config: Dict[str, Any], cached_workers: int = None, crew_workers: int = None,
+                 cached_queue_size: int = None, crew_queue_size: int = None, timeout: float = None):
+        self.system = system
+        self.db_config = db_config
+        self.workers = {
+            'cached': Config.SERVER_CACHED_WORKERS if cached_workers is None else cached_workers,
+            'crew': Config.SERVER_CREW_WORKERS if crew_workers is None else crew_workers
+        }
+        self.queue = RequestQueue({
+            'cached': Config.SERVER_CACHED_QUEUE_SIZE if cached_queue_size is None else cached_queue_size,
+            'crew': Config.SERVER_CREW_QUEUE_SIZE if crew_queue_size is None else crew_queue_size
+        })
+        self.timeout = Config.SERVER_REQUEST_TIMEOUT if timeout is None else timeout
+        self.latency = LatencyStats()
+        self.started_at = time.time()
+        self._crews = WorkerCrews(system.crews)
+        self._threads: List[Tuple[str, threading.Thread]] = []
+        self._lock = threading.Lock()
+        self._counters = {'answered': {'cached': 0, 'crew': 0}, 'forwarded': 0, 'timed_out': 0}
+
+    def start(self) -> None:
+        # Build every crew now, so the first requests do not pay for it.
+        for name in self.system.crews:
+            self.system.crews[name]
+        for lane, count in self.workers.items():
+            for number in range(max(count, 1)):
+                thread = threading.Thread(target=self._work, args=(lane,), name=f"crewai-serve-{lane}-{number}", daemon=True)
+                thread.start()
+                self._threads.append((lane, thread))
+
+    def close(self, timeout: float = None) -> None:
+        for lane, thread in self._threads:
+            self.queue.wake(lane)
+        for lane, thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        for lane in self.workers:
+            for job in self.queue.drain(lane):
+                job.future.set_exception(Overloaded('The server is shutting down'))
+
+    def ask(self, query: str, mode: str = None, timeout: float = None) -> Dict[str, Any]:
+        """Answer one question; returns {'result', 'lane', 'queued', 'elapsed'}."""
+        lane = 'cached' if self.system.query_cache is not None else 'crew'
+        return self._wait(self._submit(lane, _Job('query', {'query': query, 'mode': mode})), timeout)
+
+    def ask_many(self, queries: List[str], mode: str = None, timeout: float = None) -> Dict[str, Any]:
+        """Answer a batch with ``process_queries`` on the crew lane."""
+        return self._wait(self._submit('crew', _Job('batch', {'queries': list(queries), 'mode': mode})), timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = {'answered': dict(self._counters['answered']), 'forwarded': self._counters['forwarded'],
+                        'timed_out': self._counters['timed_out']}
+        return {
+            'pid': os.getpid(),
+            'uptime': round(time.time() - self.started_at, 3),
+            'workers': dict(self.workers),
+            'queued': self.queue.depths(),
+            **counters,
+            'endpoints': self.latency.snapshot(),
+            'replicas': replica_stats()
+        }
+
+    def _submit(self, lane: str, job: _Job) -> _Job:
+        job.lane = lane
+        job.queued_at = time.perf_counter()
+        self.queue.put(lane, job)
+        return job
+
+    def _wait(self, job: _Job, timeout: float = None) -> Dict[str, Any]:
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            result = job.future.result(timeout=timeout if timeout > 0 else None)
+        except FutureTimeout:
+            # Workers skip the job if it is still queued; if it is running, its SQL stops.
+            job.token.cancel()
+            with self._lock:
+                self._counters['timed_out'] += 1
+            raise TimeoutError(f"No answer within {timeout:g} seconds")
+        return {'result': result, 'lane': job.lane, 'queued': round(job.waited, 6), 'elapsed': round(time.perf_counter() - job.started, 6)}
+
+    def _work(self, lane: str) -> None:
+        while True:
+            job = self.queue.get(lane)
+            if job is None:
+                return
+            if job.token.cancelled:
+                continue
+            waited = time.perf_counter() - job.queued_at
+            job.waited += waited
+            tracer.metrics.observe('queue', lane, waited)
+            try:
+                result = self._run(lane, job)
+            except Overloaded as e:
+                job.future.set_exception(e)
+                continue
+            except Exception as e:
+                result = {"error": str(e), "result": None}
+            if result is _FORWARDED:
+                continue
+            with self._lock:
+                self._counters['answered'][lane] += 1
+            job.future.set_result(result)
+
+    def _run(self, lane: str, job: _Job) -> Any:
+        payload = job.payload
+        if lane == 'cached':
+            with cancel_scope(job.token), tracer.request('serve', query=payload['query'], lane=lane):
+                result = self.system.run_cached_sql(payload['query'], **self.db_config)
+            if result is not None:
+                return result
+            with self._lock:
+                self._counters['forwarded'] += 1
+            self._submit('crew', job)
+            return _FORWARDED
+        if job.kind == 'batch':
+            return self.system.process_queries(payload['queries'], mode=payload['mode'], cancel_token=job.token, crews=self._crews, **self.db_config)
+        return self.system.process_query(payload['query'], mode=payload['mode'], cancel_token=job.token, crews=self._crews, **self.db_config)
+
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, 'arrays'):
+        return value.rows()
+    if hasattr(value, 'raw'):
+        return value.raw
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = 'crewai-text2sql'
+
+    def do_GET(self) -> None:
+        self._handle(self._get)
+
+    def do_POST(self) -> None:
+        self._handle(self._post)
+
+    def _get(self, path: str) -> Any:
+        app = self.server.app
+        if path == '/health':
+            return 200, {'status': 'ok', 'pid': os.getpid()}
+        if path == '/stats':
+            return 200, app.stats()
+        if path == '/metrics':
+            return 200, tracer.prometheus()
+        return 404, {'error': f"Unknown endpoint {path}"}
+
+    def _post(self, path: str) -> Any:
+        app = self.server.app
+        if path not in ('/query', '/batch'):
+            return 404, {'error': f"Unknown endpoint {path}"}
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        except ValueError:
+            return 400, {'error': 'Request body must be JSON'}
+        if not isinstance(body, dict):
+            return 400, {'error': 'Request body must be a JSON object'}
+        mode, timeout = body.get('mode'), body.get('timeout')
+        if mode not in (None, 'crew', 'express'):
+            return 400, {'error': "'mode' must be 'crew' or 'express'"}
+        if timeout is not None and (isinstance(timeout, bool) or not isinstance(timeout, (int, float))):
+            return 400, {'error': "'timeout' must be a number of seconds"}
+        if path == '/query':
+            if not isinstance(body.get('query'), str) or not body['query'].strip():
+                return 400, {'error': "'query' must be a non-empty string"}
+            return 200, app.ask(body['query'], mode=mode, timeout=timeout)
+        queries = body.get('queries')
+        if not isinstance(queries, list) or not queries or not all(isinstance(query, str) for query in queries):
+            return 400, {'error': "'queries' must be a non-empty list of strings"}
+        return 200, app.ask_many(queries, mode=mode, timeout=timeout)
+
+    def _handle(self, handler: Callable[[str], Any]) -> None:
+        started = time.perf_counter()
+        path = self.path.split('?')[0]
+        headers = {}
+        try:
+            status, body = handler(path)
+        except Overloaded as e:
+            status, body = 503, {'error': str(e)}
+            headers['Retry-After'] = '1'
+        except TimeoutError as e:
+            status, body = 504, {'error': str(e)}
+        except Exception as e:
+            status, body = 500, {'error': str(e)}
+        if isinstance(body, str):
+            data, content_type = body.encode(), 'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            data, content_type = json.dumps(body, default=_json_default).encode(), 'application/json'
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        self.server.app.latency.record(path if path in ENDPOINTS else 'other', status, time.perf_counter() - started)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+class QueryHTTPServer(ThreadingHTTPServer):
+    """Threaded HTTP front end for a ``QueryServer``; handler threads only wait, lanes do the work."""
+
+    daemon_threads = True
+
+    def __init__(self, address, app: Optional[QueryServer] = None):
+        super().__init__(address, _Handler)
+        self.app = app
+
+
+def _serve_worker(httpd: QueryHTTPServer, factory: Callable[[], Any], db_config: Dict[str, Any], shared_cache: bool = False,
+                  ready: int = None) -> None:
+    system = factory()
+    if shared_cache and system.query_cache is not None and not system.query_cache.path:
+        # Forked workers share generated SQL through the cache's SQLite backend.
+        from src.query_cache import QueryCache
+        os.makedirs(Config.SCHEMA_CACHE_DIR, exist_ok=True)
+        system.query_cache = QueryCache(path=os.path.join(Config.SCHEMA_CACHE_DIR, 'query_cache.sqlite'))
+    app = QueryServer(system, db_config)
+    app.start()
+    httpd.app = app
+    if ready is not None:
+        os.write(ready, b'1')
+        os.close(ready)
+    try:
+        httpd.serve_forever()
+    finally:
+        app.close(timeout=1)
+        system.close()
+
+
+def serve(factory: Callable[[], Any], db_config: Dict[str, Any], host: str = None, port: int = None, processes: int = None) -> None:
+    """Serve the HTTP API until interrupted.
+
+    ``factory`` builds a ``CrewAIQuerySystem`` ready for ``db_config``. The
+    socket is bound once and ``processes`` forked workers accept on it, each
+    with its own warm system. The first worker introspects the schema and
+    writes the schema cache; the others are forked after it is ready and load
+    the cached schema. Platforms without ``fork`` run one worker.
+    """
+    host = Config.SERVER_HOST if host is None else host
+    port = Config.SERVER_PORT if port is None else port
+    processes = max(Config.SERVER_PROCESSES if processes is None else processes, 1)
+    httpd = QueryHTTPServer((host, port))
+    if processes > 1 and not hasattr(os, 'fork'):
+        print("Worker processes need os.fork; serving from one process")
+        processes = 1
+    print(f"Serving on http://{host}:{httpd.server_port} with {processes} worker process(es)")
+    if processes == 1:
+        try:
+            _serve_worker(httpd, factory, db_config)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            httpd.server_close()
+        return
+
+    children = []
+    try:
+        for number in range(processes):
+            # Only the first worker reports that it is ready, after writing the schema cache.
+            ready_read, ready_write = os.pipe() if number == 0 else (None, None)
+            sys.stdout.flush()
+            pid = os.fork()
+            if pid == 0:
+                code = 0
+                try:
+                    if ready_read is not None:
+                        os.close(ready_read)
+                    _serve_worker(httpd, factory, db_config, shared_cache=True, ready=ready_write)
+                except KeyboardInterrupt:
+                    pass
+                except BaseException as e:
+                    print(f"Worker {os.getpid()} failed: {e}")
+                    code = 1
+                finally:
+                    sys.stdout.flush()
+                    os._exit(code)
+            children.append(pid)
+            if ready_read is not None:
+                os.close(ready_write)
+                started = os.read(ready_read, 1)
+                os.close(ready_read)
+                if not started:
+                    raise RuntimeError('The first worker process exited during startup')
+        for pid in children:
+            os.waitpid(pid, 0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+                os.waitpid(pid, 0)
+            except (ChildProcessError, ProcessLookupError):
+                pass
+        httpd.server_close()
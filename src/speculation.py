@@ -0,0 +1,150 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from src.config import Config
+from src.governor import CancelToken, cancel_scope
+from src.tracing import tracer
+
+POLICIES = ('off', 'likely', 'always')
+
+# Side effects a speculative branch holds back until its route is confirmed.
+_held: contextvars.ContextVar[Optional[List[Callable[[], None]]]] = contextvars.ContextVar('crewai_speculative_effects', default=None)
+
+
+def after_confirmation(effect: Callable[[], None]) -> None:
+    """Run ``effect`` now, or, inside a speculative branch, only once the query is confirmed as SQL.
+
+    Used for writes such as caching generated SQL: a question the router
+    sends to forecasting must not leave SQL behind for its next ask.
+    """
+    held = _held.get()
+    if held is None:
+        effect()
+    else:
+        held.append(effect)
+
+
+class SpeculativeBranch:
+    """The SQL pipeline for one query, started while the Router crew is still deciding."""
+
+    def __init__(self, speculator: 'Speculator', token: CancelToken, held: List[Callable[[], None]]):
+        self.speculator = speculator
+        self.future: Optional[Future] = None
+        self.token = token
+        self.held = held
+        self.started = time.perf_counter()
+        self.duration: Optional[float] = None
+
+    def confirm(self) -> Any:
+        """The router chose SQL: wait for the branch and apply what it held back."""
+        routed = time.perf_counter() - self.started
+        try:
+            result = self.future.result()
+        finally:
+            # The router's time overlapped the branch, up to the branch's own length.
+            self.speculator._record('confirmed', saved=min(routed, self.duration or 0.0))
+        for effect in self.held:
+            effect()
+        return result
+
+    def discard(self) -> None:
+        """The router chose something else: stop the branch's SQL and drop its result."""
+        self.token.cancel()
+        self.speculator._record('discarded')
+        # LLM calls already in flight cannot be interrupted; their time counts once they finish.
+        self.future.add_done_callback(lambda future: self.speculator._record(None, wasted=self.duration or 0.0))
+
+
+class Speculator:
+    """Starts a query's SQL pipeline concurrently with the Router crew.
+
+    Most questions are SQL, so when the local router is unsure the SQL branch
+    (schema selection and generation) can run while the Router crew decides.
+    A confirmed branch saves the router's latency; a discarded one wastes LLM
+    calls. ``policy`` picks when to take that bet: 'off', 'likely' (the local
+    router's SQL probability is at least ``min_probability``) or 'always'.
+    At most ``max_branches`` run at once; beyond that routing is serial.
+    """
+
+    def __init__(self, policy: str = None, min_probability: float = None, max_branches: int = None):
+        self.policy = (policy or Config.SPECULATION_POLICY).lower()
+        if self.policy not in POLICIES:
+            raise ValueError(f"Unknown speculation policy {self.policy!r}; expected one of {POLICIES}")
+        self.min_probability = Config.SPECULATION_MIN_SQL_PROBABILITY if min_probability is None else min_probability
+        self.max_branches = max(Config.SPECULATION_MAX_BRANCHES if max_branches is None else max_branches, 1)
+        self._slots = threading.BoundedSemaphore(self.max_branches)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._counts = {'confirmed': 0, 'discarded': 0, 'skipped': 0, 'saved_seconds': 0.0, 'wasted_seconds': 0.0}
+
+    def should_speculate(self, decision: Any) -> bool:
+        """Whether to speculate for a query the local router left unsure (``decision`` is None without one)."""
+        if self.policy == 'always':
+            return True
+        if self.policy == 'off' or decision is None:
+            return False
+        return decision.probabilities.get('sql', 1.0 if decision.route == 'sql' else 0.0) >= self.min_probability
+
+    def start(self, function: Callable[..., Any], *args: Any, cancel_token: CancelToken = None, **kwargs: Any) -> Optional[SpeculativeBranch]:
+        """Run ``function(*args, **kwargs)`` speculatively; None when every branch slot is busy.
+
+        The branch gets its own cancel token, which ``cancel_token`` (the
+        request's) also cancels, and joins the caller's trace.
+        """
+        if not self._slots.acquire(blocking=False):
+            self._record('skipped')
+            return None
+        token = CancelToken()
+        unregister = cancel_token.on_cancel(token.cancel) if cancel_token is not None else None
+        held: List[Callable[[], None]] = []
+        trace_context = tracer.context()
+        branch = SpeculativeBranch(self, token, held)
+
+        def run():
+            started = time.perf_counter()
+            _held.set(held)
+            try:
+                with cancel_scope(token), tracer.resume(trace_context), tracer.span('stage', 'speculative_sql'):
+                    return function(*args, **kwargs)
+            finally:
+                branch.duration = time.perf_counter() - started
+                if unregister is not None:
+                    unregister()
+                self._slots.release()
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_branches, thread_name_prefix='crewai-speculate')
+            # A fresh context per branch, so held effects never leak into a later branch on the same thread.
+            branch.future = self._executor.submit(contextvars.Context().run, run)
+        return branch
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counts)
+        started = stats['confirmed'] + stats['discarded']
+        stats['hit_rate'] = stats['confirmed'] / started if started else 0.0
+        return stats
+
+    def close(self, wait: bool = False) -> None:
+        """Stop the branch threads; ``wait`` also waits for branches still running (discarded ones included)."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _record(self, outcome: Optional[str], saved: float = 0.0, wasted: float = 0.0) -> None:
+        with self._lock:
+            if outcome is not None:
+                self._counts[outcome] += 1
+            self._counts['saved_seconds'] += saved
+            self._counts['wasted_seconds'] += wasted
+        if outcome is not None:
+            tracer.metrics.inc('crewai_speculation_total', outcome=outcome)
+        if saved:
+            tracer.metrics.inc('crewai_speculation_saved_seconds_total', saved)
+        if wasted:
+            tracer.metrics.inc('crewai_speculation_wasted_seconds_total', wasted)
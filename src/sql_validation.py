@@ -0,0 +1,634 @@
+import difflib
+import json
+import re
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+
+from src.config import Config
+from src.output_parsing import extract_sql
+from src.pool import get_pool
+from src.schema import SchemaModel
+
+_LITERALS_AND_COMMENTS = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|/\*.*?\*/", re.DOTALL)
+_READ_ONLY_HEAD = re.compile(r"\s*\(*\s*(select|with|values)\b", re.IGNORECASE)
+# Statements that write; only checked where a statement can start, so a column named "copy" or "do" is fine.
+_WRITE_STATEMENTS = frozenset(
+    'insert update delete merge upsert replace drop alter create truncate grant revoke copy attach detach vacuum reindex call do'.split()
+)
+_STATEMENT_TOKEN = re.compile(r"[A-Za-z_][A-Za-z0-9_$]*|[(),]")
+# Row-locking reads (FOR UPDATE / FOR SHARE) are refused like writes: read-only transactions and replicas reject them.
+_LOCKING_CLAUSE = re.compile(r"\bfor\s+(?:no\s+key\s+update|key\s+share|update|share)\b", re.IGNORECASE)
+_TOKEN = re.compile(
+    r"(?P<string>'(?:[^']|'')*')"
+    r"|\"(?P<quoted>(?:[^\"]|\"\")*)\""
+    r"|`(?P<backtick>[^`]*)`"
+    r"|(?P<comment>--[^\n]*|/\*.*?\*/)"
+    r"|(?P<word>[A-Za-z_][A-Za-z0-9_$]*)"
+    r"|(?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?)"
+    r"|(?P<param>[?$:]\w*|%\(\w+\)s|%s)"
+    r"|(?P<punct>::|<>|<=|>=|!=|\|\||[(),.;*=<>+\-/%\[\]])",
+    re.DOTALL
+)
+
+# Words that are never column references when they appear unqualified.
+_KEYWORDS = frozenset('''
+    select from where group by having order asc desc limit offset join inner left right full outer cross natural
+    on using as and or not in is null like ilike glob regexp between exists case when then else end distinct all
+    union intersect except with recursive over partition rows range preceding following unbounded current row
+    filter within nulls first last true false cast interval date time timestamp year month day hour minute second
+    week quarter epoch dow doy isodow extract at zone collate nocase escape any some values lateral fetch next only
+    ties window int integer bigint smallint real float double precision numeric decimal text varchar char character
+    boolean bool varying current_date current_time current_timestamp localtime localtimestamp similar to top
+    materialized both leading trailing for
+'''.split())
+# Keywords that behave like function names before "(", e.g. EXTRACT(YEAR FROM d).
+_CALL_KEYWORDS = frozenset('extract cast filter over within'.split())
+_AGGREGATES = frozenset('count sum avg min max total group_concat string_agg array_agg'.split())
+# Clauses that end the FROM list of the current query level.
+_FROM_TERMINATORS = frozenset('where group order having limit offset union intersect except window fetch'.split())
+
+# (pattern, message) pairs for constructs the target dialect does not accept.
+_DIALECT_RULES = {
+    'sqlite': [
+        (re.compile(r'\bilike\b', re.IGNORECASE), "SQLite has no ILIKE; LIKE is already case-insensitive for ASCII."),
+        (re.compile(r'::'), "SQLite has no :: casts; use CAST(expr AS type)."),
+        (re.compile(r'\bdistinct\s+on\b', re.IGNORECASE), "SQLite has no DISTINCT ON; use GROUP BY or a window function."),
+        (re.compile(r'\b(extract|date_trunc|date_part)\s*\(', re.IGNORECASE), "SQLite has no EXTRACT/DATE_TRUNC/DATE_PART; use strftime()."),
+        (re.compile(r'\bnow\s*\(\s*\)', re.IGNORECASE), "SQLite has no NOW(); use datetime('now')."),
+        (re.compile(r'\bselect\s+top\s+\d+', re.IGNORECASE), "SELECT TOP is not supported; use LIMIT."),
+    ],
+    'postgres': [
+        (re.compile(r'`'), "PostgreSQL quotes identifiers with double quotes, not backticks."),
+        (re.compile(r'\blimit\s+\d+\s*,\s*\d+', re.IGNORECASE), "PostgreSQL does not accept LIMIT offset, count; use LIMIT count OFFSET offset."),
+        (re.compile(r'\b(strftime|ifnull|group_concat|datetime|julianday)\s*\(', re.IGNORECASE),
+         "Use PostgreSQL functions (to_char, extract, COALESCE, string_agg, now()) instead of SQLite ones."),
+        (re.compile(r'\bselect\s+top\s+\d+', re.IGNORECASE), "SELECT TOP is not supported; use LIMIT."),
+    ]
+}
+
+
+class SQLValidationError(ValueError):
+    """Raised when generated SQL is rejected before it reaches the database."""
+
+
+def strip_literals(sql: str) -> str:
+    """Blank out string literals, quoted identifiers and comments so keywords can be scanned safely."""
+    return _LITERALS_AND_COMMENTS.sub(lambda match: ' ' * len(match.group(0)), sql)
+
+
+def check_read_only(sql: str) -> str:
+    """Return ``sql`` without a trailing semicolon if it is a single read-only statement."""
+    sql = sql.strip().rstrip(';').strip()
+    if not sql:
+        raise SQLValidationError("Empty SQL statement.")
+    scannable = strip_literals(sql)
+    if ';' in scannable:
+        raise SQLValidationError("Only a single SQL statement is allowed.")
+    # Data-modifying CTEs (WITH ... DELETE) start like a read, so their statements are checked too.
+    if not _READ_ONLY_HEAD.match(scannable) or _starts_write(scannable) or _LOCKING_CLAUSE.search(scannable):
+        raise SQLValidationError("Only SELECT queries are allowed.")
+    return sql
+
+
+def _starts_write(scannable: str) -> bool:
+    """Whether a statement inside a WITH query (a CTE body or the main statement) is a write."""
+    depth = 0
+    in_with = False
+    # True where the next word starts a statement: the very start, "AS (" of a CTE, and after a CTE's ")".
+    expect = True
+    previous = ''
+    for token in _STATEMENT_TOKEN.findall(scannable):
+        word = token.lower()
+        if expect and word in _WRITE_STATEMENTS:
+            return True
+        if token == '(':
+            depth += 1
+            expect = in_with and previous in ('as', 'materialized')
+        elif token == ')':
+            depth -= 1
+            expect = in_with and depth == 0
+        elif word == 'with' and previous in ('', '('):
+            in_with = True
+            expect = False
+        elif expect and depth == 0 and word not in (',', 'as'):
+            # The main statement after the CTE list; later parentheses belong to it.
+            in_with = False
+            expect = False
+        else:
+            expect = False
+        previous = word
+    return False
+
+
+def is_query(sql: str) -> bool:
+    """Whether ``sql`` starts like a query (SELECT, WITH or VALUES), the statements the cost gate can EXPLAIN."""
+    return bool(_READ_ONLY_HEAD.match(strip_literals(sql)))
+
+
+def is_read_only(sql: str) -> bool:
+    """Whether ``sql`` passes ``check_read_only``, e.g. to decide if a replica may run it."""
+    try:
+        check_read_only(sql)
+        return True
+    except SQLValidationError:
+        return False
+
+
+def dialect_errors(sql: str, db_type: str) -> List[str]:
+    """Constructs from other SQL dialects that ``db_type`` would reject."""
+    scannable = strip_literals(sql.replace('`', ' ` '))
+    return [message for pattern, message in _DIALECT_RULES.get(db_type, []) if pattern.search(scannable)]
+
+
+def _tokens(sql: str) -> List[Tuple[str, str]]:
+    tokens = []
+    for match in _TOKEN.finditer(sql):
+        kind = match.lastgroup
+        if kind == 'comment':
+            continue
+        value = match.group(kind)
+        if kind in ('quoted', 'backtick'):
+            kind, value = 'ident', value.replace('""', '"')
+        elif kind == 'word':
+            value = value.lower()
+        tokens.append((kind, value))
+    return tokens
+
+
+def _is_name(token: Tuple[str, str]) -> bool:
+    return token[0] == 'ident' or (token[0] == 'word' and token[1] not in _KEYWORDS)
+
+
+def _matching_paren(tokens: List[Tuple[str, str]], start: int) -> int:
+    depth = 0
+    for index in range(start, len(tokens)):
+        if tokens[index] == ('punct', '('):
+            depth += 1
+        elif tokens[index] == ('punct', ')'):
+            depth -= 1
+            if depth == 0:
+                return index
+    return len(tokens) - 1
+
+
+def _dotted(tokens: List[Tuple[str, str]], start: int) -> Tuple[List[str], int]:
+    """Read ``a.b.c`` starting at ``start``; returns the parts and the index of the last one."""
+    parts = [tokens[start][1]]
+    index = start
+    while index + 2 < len(tokens) and tokens[index + 1] == ('punct', '.') and (
+        tokens[index + 2][0] in ('word', 'ident') or tokens[index + 2] == ('punct', '*')
+    ):
+        parts.append(tokens[index + 2][1])
+        index += 2
+    return parts, index
+
+
+class SQLReferences:
+    """Tables, aliases and column references found in a statement by a lightweight scan.
+
+    This is not a full SQL parser: it recognizes FROM/JOIN sources, CTE names,
+    aliases and ``qualifier.column`` references, which is enough to report
+    unknown tables and columns with useful hints before anything is executed.
+    """
+
+    def __init__(self, sql: str):
+        self.tables: Dict[str, str] = {}        # alias (or bare name) -> table name as written
+        self.ctes: Set[str] = set()
+        self.derived: Set[str] = set()          # aliases of subqueries in FROM
+        self.aliases: Set[str] = set()          # table, output and window aliases
+        self.qualified: List[Tuple[str, str]] = []
+        self.unqualified: Set[str] = set()
+        self.aggregates = False
+        self._scan(_tokens(sql))
+
+    def _scan(self, tokens: List[Tuple[str, str]]) -> None:
+        calls: List[bool] = []       # per open parenthesis: is it a function call?
+        from_levels: List[int] = []  # paren depths whose FROM list is being read
+        with_level: Optional[int] = None
+        expect_table = False
+        previous: Tuple[str, str] = ('punct', '(')
+        index = 0
+        while index < len(tokens):
+            token = tokens[index]
+            kind, value = token
+            following = tokens[index + 1] if index + 1 < len(tokens) else ('', '')
+            depth = len(calls)
+            in_call = bool(calls) and calls[-1]
+
+            if token == ('punct', '('):
+                calls.append(previous[0] == 'ident' or (previous[0] == 'word' and (
+                    previous[1] not in _KEYWORDS or previous[1] in _CALL_KEYWORDS
+                )))
+                if expect_table:
+                    # Subquery in FROM; its alias follows the closing parenthesis.
+                    expect_table = False
+                    alias_at = _matching_paren(tokens, index) + 1
+                    if alias_at < len(tokens) and tokens[alias_at] == ('word', 'as'):
+                        alias_at += 1
+                    if alias_at < len(tokens) and _is_name(tokens[alias_at]):
+                        self.derived.add(tokens[alias_at][1].lower())
+            elif token == ('punct', ')'):
+                if calls:
+                    calls.pop()
+                while from_levels and from_levels[-1] > len(calls):
+                    from_levels.pop()
+            elif kind == 'word' and value == 'with' and (_is_name(following) or following == ('word', 'recursive')):
+                with_level = depth
+                self._read_cte(tokens, index + 1)
+            elif token == ('punct', ',') and with_level == depth:
+                self._read_cte(tokens, index + 1)
+            elif kind == 'word' and value == 'select' and with_level == depth:
+                with_level = None
+            elif kind == 'word' and value == 'from' and not in_call and previous != ('word', 'distinct'):
+                expect_table = True
+                from_levels.append(depth)
+            elif kind == 'word' and value == 'join':
+                expect_table = True
+            elif kind == 'word' and value in _FROM_TERMINATORS and from_levels and from_levels[-1] == depth:
+                from_levels.pop()
+            elif token == ('punct', ',') and from_levels and from_levels[-1] == depth:
+                expect_table = True
+            elif expect_table and _is_name(token):
+                expect_table = False
+                parts, index = _dotted(tokens, index)
+                alias = parts[-1].lower()
+                alias_at = index + 1
+                if alias_at < len(tokens) and tokens[alias_at] == ('word', 'as'):
+                    alias_at += 1
+                if alias_at < len(tokens) and _is_name(tokens[alias_at]):
+                    alias = tokens[alias_at][1].lower()
+                    self.aliases.add(alias)
+                    index = alias_at
+                self.tables[alias] = '.'.join(parts)
+            elif _is_name(token) and following == ('punct', '.'):
+                parts, index = _dotted(tokens, index)
+                if len(parts) >= 2 and parts[-1] != '*':
+                    self.qualified.append(('.'.join(parts[:-1]).lower(), parts[-1]))
+            elif _is_name(token) and following == ('punct', '('):
+                self.aggregates = self.aggregates or value in _AGGREGATES
+            elif _is_name(token) and previous[0] == 'word' and previous[1] in ('as', 'over', 'window'):
+                self.aliases.add(value.lower())
+            elif _is_name(token) and (previous == ('punct', ')') or previous[0] in ('ident', 'number') or _is_name(previous)):
+                # Implicit alias: "count(*) n", "p.name pname".
+                self.aliases.add(value.lower())
+            elif _is_name(token) and previous != ('punct', '.'):
+                self.unqualified.add(value)
+            elif kind != 'word' or value not in ('lateral', 'only'):
+                expect_table = expect_table and kind == 'word'
+            previous = tokens[index]
+            index += 1
+
+    def _read_cte(self, tokens: List[Tuple[str, str]], index: int) -> None:
+        if index < len(tokens) and tokens[index] == ('word', 'recursive'):
+            index += 1
+        if index >= len(tokens) or not _is_name(tokens[index]):
+            return
+        self.ctes.add(tokens[index][1].lower())
+        if index + 1 < len(tokens) and tokens[index + 1] == ('punct', '('):
+            close = _matching_paren(tokens, index + 1)
+            self.aliases.update(token[1].lower() for token in tokens[index + 2:close] if _is_name(token))
+
+    def table_for(self, qualifier: str) -> Optional[str]:
+        return self.tables.get(qualifier.lower())
+
+
+def _suggest(name: str, candidates: List[str]) -> str:
+    lowered = {candidate.lower(): candidate for candidate in candidates}
+    close = difflib.get_close_matches(name.lower(), list(lowered), n=1, cutoff=0.6)
+    return f" Did you mean '{lowered[close[0]]}'?" if close else ''
+
+
+def _resolve_table(schema: SchemaModel, name: str) -> Optional[str]:
+    lookup = {key.lower(): key for key in schema.tables}
+    name = name.lower()
+    if name in lookup:
+        return lookup[name]
+    # "public.park" (or SQLite's "main.park") is stored as "park"; other schemas keep their prefix.
+    for default in ('public.', 'main.'):
+        if name.startswith(default) and name[len(default):] in lookup:
+            return lookup[name[len(default):]]
+    return None
+
+
+def schema_errors(sql: str, schema: SchemaModel) -> List[str]:
+    """Unknown tables and columns referenced by ``sql`` according to ``schema``."""
+    refs = SQLReferences(sql)
+    errors = []
+    columns: Dict[str, Dict[str, str]] = {}
+    for alias, written in refs.tables.items():
+        if written.lower() in refs.ctes:
+            continue
+        table = _resolve_table(schema, written)
+        if table is None:
+            errors.append(f"Unknown table '{written}'.{_suggest(written, list(schema.tables))}")
+            continue
+        names = {column.name.lower(): column.name for column in schema.tables[table].columns}
+        columns[alias] = names
+        columns.setdefault(written.lower(), names)
+        columns.setdefault(table.lower(), names)
+
+    for qualifier, column in refs.qualified:
+        if qualifier in refs.ctes or qualifier in refs.derived:
+            continue
+        names = columns.get(qualifier)
+        if names is None:
+            if qualifier not in refs.tables and qualifier.split('.')[-1] not in columns:
+                errors.append(f"Unknown table or alias '{qualifier}'.")
+            continue
+        if column.lower() not in names:
+            errors.append(f"Unknown column '{qualifier}.{column}'.{_suggest(column, list(names.values()))}")
+
+    # Unqualified names can only be checked when every source is a known table.
+    resolved = [alias for alias in refs.tables if alias in columns]
+    if resolved and len(resolved) == len(refs.tables) and not refs.ctes and not refs.derived:
+        available: Dict[str, str] = {}
+        for alias in resolved:
+            available.update(columns[alias])
+        for name in sorted(refs.unqualified):
+            lowered = name.lower()
+            if lowered in available or lowered in refs.aliases or lowered in columns:
+                continue
+            errors.append(f"Unknown column '{name}'.{_suggest(name, list(available.values()))}")
+    return errors
+
+
+def static_errors(sql: str, db_type: str, schema: SchemaModel = None) -> List[str]:
+    """Problems found without touching the database: read-only, dialect and schema checks."""
+    try:
+        sql = check_read_only(sql)
+    except SQLValidationError as e:
+        return [str(e)]
+    errors = dialect_errors(sql, db_type)
+    if schema is not None:
+        errors += schema_errors(sql, schema)
+    return errors
+
+
+def explain_error(sql: str, db_type: str, db_path: str = None, conn_string: str = None) -> Optional[str]:
+    """Compile ``sql`` with EXPLAIN without running it; returns the database error, or None if it compiles."""
+    prefix = 'EXPLAIN QUERY PLAN ' if db_type == 'sqlite' else 'EXPLAIN '
+    with get_pool(db_type, db_path=db_path, conn_string=conn_string).connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(prefix + sql)
+            cursor.fetchall()
+        except Exception as e:
+            return str(e).strip()
+        finally:
+            cursor.close()
+    return None
+
+
+class PlanEstimate:
+    """What EXPLAIN says a statement will cost before it runs.
+
+    ``cost`` is the planner's total cost (PostgreSQL only; SQLite has none).
+    ``full_scans`` lists (table, estimated rows) for every full table or index
+    scan. ``blocking`` is True when a sort or aggregate must read all of its
+    input before returning a row, so a LIMIT cannot shorten the scans.
+    """
+
+    def __init__(self, cost: Optional[float], full_scans: List[Tuple[str, float]], blocking: bool, rows: Optional[float] = None):
+        self.cost = cost
+        self.full_scans = full_scans
+        self.blocking = blocking
+        self.rows = rows
+
+    @property
+    def scan_rows(self) -> float:
+        """Rows read by the largest full scan."""
+        return max((rows for _, rows in self.full_scans), default=0.0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'cost': self.cost,
+            'rows': self.rows,
+            'scan_rows': self.scan_rows,
+            'full_scans': self.full_scans,
+            'blocking': self.blocking
+        }
+
+    def __repr__(self) -> str:
+        return f"PlanEstimate(cost={self.cost}, scan_rows={self.scan_rows}, blocking={self.blocking})"
+
+
+_BLOCKING_NODES = ('Sort', 'Incremental Sort', 'Aggregate', 'Hash', 'Unique', 'SetOp', 'WindowAgg', 'Materialize')
+_SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(?P<name>"[^"]+"|\S+)')
+# An outer LIMIT ends the statement: "LIMIT n", "LIMIT n OFFSET m" or SQLite's "LIMIT m, n".
+_OUTER_LIMIT = re.compile(r'\blimit\s+(\d+)\s*(?:offset\s+(\d+)|,\s*(\d+))?\s*;?\s*$', re.IGNORECASE)
+POSTGRES_RELTUPLES_SQL = """
+SELECT name, (SELECT reltuples FROM pg_class WHERE oid = to_regclass(name)) FROM unnest(%s::text[]) AS name
+"""
+
+
+def _plan_nodes(plan: Dict[str, Any]):
+    yield plan
+    for child in plan.get('Plans') or []:
+        yield from _plan_nodes(child)
+
+
+def _plan_root(document: Any) -> Dict[str, Any]:
+    if isinstance(document, str):
+        document = json.loads(document)
+    return document[0]['Plan']
+
+
+def _full_scan_relations(plan: Dict[str, Any]) -> List[str]:
+    return sorted({
+        node['Relation Name']
+        for node in _plan_nodes(plan)
+        if node.get('Relation Name') and node.get('Node Type') in ('Seq Scan', 'Parallel Seq Scan')
+    })
+
+
+def _postgres_estimate(plan: Dict[str, Any], reltuples: Dict[str, float]) -> PlanEstimate:
+    scans = []
+    blocking = False
+    for node in _plan_nodes(plan):
+        node_type = node.get('Node Type', '')
+        if node_type in ('Seq Scan', 'Parallel Seq Scan'):
+            relation = node.get('Relation Name')
+            # reltuples is -1 for never-analyzed tables; the node's own estimate is the fallback.
+            scans.append((relation, max(reltuples.get(relation) or 0.0, float(node.get('Plan Rows', 0)))))
+        if node_type in _BLOCKING_NODES:
+            blocking = True
+    return PlanEstimate(float(plan.get('Total Cost', 0.0)), scans, blocking, float(plan.get('Plan Rows', 0.0)))
+
+
+def _sqlite_estimate(conn: Any, sql: str, plan_rows: List[Tuple]) -> PlanEstimate:
+    refs = SQLReferences(sql)
+    scans = []
+    blocking = refs.aggregates
+    for row in plan_rows:
+        detail = row[-1]
+        if 'TEMP B-TREE' in detail:
+            blocking = True
+        match = _SQLITE_SCAN.match(detail)
+        if not match:
+            continue
+        name = match.group('name').strip('"')
+        table = refs.table_for(name) or name
+        # Keep an ATTACH alias ("aux.orders"): the bare name could be a different table in main.
+        quoted = '.'.join('"{}"'.format(part.replace('"', '""')) for part in table.split('.', 1))
+        try:
+            # max(rowid) is an O(log n) stand-in for count(*) on rowid tables.
+            count = conn.execute(f'SELECT max(rowid) FROM {quoted}').fetchone()[0] or 0
+        except Exception:
+            continue
+        scans.append((table, float(count)))
+    limit = _OUTER_LIMIT.search(strip_literals(sql))
+    if limit and not blocking:
+        # Without a sort or aggregate in the way, SQLite stops scanning once the LIMIT is met.
+        count, offset, comma_count = limit.groups()
+        stop = float(int(comma_count) + int(count)) if comma_count else float(int(count) + int(offset or 0))
+        scans = [(table, min(rows, stop)) for table, rows in scans]
+    return PlanEstimate(None, scans, blocking)
+
+
+def explain_plan(conn: Any, sql: str, db_type: str) -> PlanEstimate:
+    """Estimate the cost of ``sql`` with EXPLAIN on ``conn``; database errors propagate."""
+    cursor = conn.cursor()
+    try:
+        if db_type == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return _sqlite_estimate(conn, sql, cursor.fetchall())
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql)
+        plan = _plan_root(cursor.fetchone()[0])
+        relations = _full_scan_relations(plan)
+        reltuples = {}
+        if relations:
+            cursor.execute(POSTGRES_RELTUPLES_SQL, (relations,))
+            reltuples = {name: float(rows or 0) for name, rows in cursor.fetchall()}
+        return _postgres_estimate(plan, reltuples)
+    finally:
+        cursor.close()
+
+
+async def aexplain_plan(aconn: Any, sql: str) -> PlanEstimate:
+    """``explain_plan`` for a PostgreSQL ``AsyncConnection``."""
+    cursor = aconn.cursor()
+    try:
+        await cursor.execute('EXPLAIN (FORMAT JSON) ' + sql)
+        plan = _plan_root((await cursor.fetchone())[0])
+        relations = _full_scan_relations(plan)
+        reltuples = {}
+        if relations:
+            await cursor.execute(POSTGRES_RELTUPLES_SQL, (relations,))
+            reltuples = {name: float(rows or 0) for name, rows in await cursor.fetchall()}
+        return _postgres_estimate(plan, reltuples)
+    finally:
+        await cursor.close()
+
+
+class CostGateResult:
+    """Decision of the cost gate: 'pass', 'limited' (``sql`` gained a LIMIT) or 'rejected'."""
+
+    def __init__(self, action: str, sql: str, estimate: PlanEstimate, message: str = ''):
+        self.action = action
+        self.sql = sql
+        self.estimate = estimate
+        self.message = message
+
+    @property
+    def rejected(self) -> bool:
+        return self.action == 'rejected'
+
+    def __repr__(self) -> str:
+        return f"CostGateResult(action={self.action!r}, estimate={self.estimate!r})"
+
+
+def add_limit(sql: str, limit: int) -> str:
+    return f"SELECT * FROM ({sql.strip().rstrip(';')}) AS limited_query LIMIT {int(limit)}"
+
+
+def _over_budget(estimate: PlanEstimate, max_cost: float, max_scan_rows: float, scan_rows: float = None) -> Optional[str]:
+    scan_rows = estimate.scan_rows if scan_rows is None else scan_rows
+    if estimate.cost is not None and max_cost > 0 and estimate.cost > max_cost:
+        return f"estimated cost {estimate.cost:,.0f} exceeds {max_cost:,.0f}"
+    if max_scan_rows > 0 and scan_rows > max_scan_rows:
+        table = max(estimate.full_scans, key=lambda scan: scan[1])[0]
+        return f"full scan of '{table}' reads about {scan_rows:,.0f} rows (limit {max_scan_rows:,.0f})"
+    return None
+
+
+class _GateSettings:
+    def __init__(self, policy: str = None, max_cost: float = None, max_scan_rows: float = None, limit: int = None):
+        self.policy = (policy or Config.SQL_COST_POLICY).lower()
+        self.max_cost = Config.SQL_MAX_PLAN_COST if max_cost is None else max_cost
+        self.max_scan_rows = Config.SQL_MAX_SCAN_ROWS if max_scan_rows is None else max_scan_rows
+        self.limit = limit or Config.MAX_RESULT_ROWS
+
+    def first_pass(self, sql: str, estimate: PlanEstimate) -> Tuple[Optional[CostGateResult], Optional[str]]:
+        """Decide from the plan alone; returns (result, None) or (None, reason) when a LIMIT is worth trying."""
+        reason = _over_budget(estimate, self.max_cost, self.max_scan_rows)
+        if reason is None:
+            return CostGateResult('pass', sql, estimate), None
+        if self.policy != 'limit' or estimate.blocking:
+            return CostGateResult('rejected', sql, estimate, f"Query rejected before execution: {reason}."), None
+        return None, reason
+
+    def with_limit(self, sql: str, estimate: PlanEstimate, limited: PlanEstimate, reason: str) -> CostGateResult:
+        if limited.cost is not None and estimate.cost:
+            # The executor stops early under a LIMIT; the planner's cost ratio says how much it still reads.
+            scan_rows = estimate.scan_rows * min(1.0, limited.cost / estimate.cost)
+        else:
+            scan_rows = min(estimate.scan_rows, float(self.limit))
+        still_over = _over_budget(limited, self.max_cost, self.max_scan_rows, scan_rows=scan_rows)
+        if still_over is not None:
+            return CostGateResult('rejected', sql, estimate, f"Query rejected before execution: {still_over}.")
+        return CostGateResult(
+            'limited', add_limit(sql, self.limit), limited,
+            f"automatically limited to {self.limit} rows because the {reason}"
+        )
+
+
+def cost_gate(conn: Any, sql: str, db_type: str, policy: str = None, max_cost: float = None,
+              max_scan_rows: float = None, limit: int = None) -> CostGateResult:
+    """EXPLAIN ``sql`` and pass, auto-LIMIT or reject it before it executes.
+
+    Plans costing more than ``SQL_MAX_PLAN_COST`` (PostgreSQL) or fully
+    scanning a table of more than ``SQL_MAX_SCAN_ROWS`` rows are over budget.
+    The 'reject' policy refuses them; 'limit' wraps the statement in a LIMIT
+    and re-checks it, which only helps when no sort or aggregate has to read
+    all rows first; 'off' disables the gate.
+    """
+    settings = _GateSettings(policy, max_cost, max_scan_rows, limit)
+    estimate = explain_plan(conn, sql, db_type)
+    result, reason = settings.first_pass(sql, estimate)
+    if result is not None:
+        return result
+    return settings.with_limit(sql, estimate, explain_plan(conn, add_limit(sql, settings.limit), db_type), reason)
+
+
+async def acost_gate(aconn: Any, sql: str, policy: str = None, max_cost: float = None,
+                     max_scan_rows: float = None, limit: int = None) -> CostGateResult:
+    """``cost_gate`` for a PostgreSQL ``AsyncConnection``."""
+    settings = _GateSettings(policy, max_cost, max_scan_rows, limit)
+    estimate = await aexplain_plan(aconn, sql)
+    result, reason = settings.first_pass(sql, estimate)
+    if result is not None:
+        return result
+    return settings.with_limit(sql, estimate, await aexplain_plan(aconn, add_limit(sql, settings.limit)), reason)
+
+
+def sql_guardrail(db_type: str, schema: Union[SchemaModel, Callable[[], SchemaModel]] = None, db_path: str = None,
+                  conn_string: str = None) -> Callable[[Any], Tuple[bool, Any]]:
+    """Task guardrail that checks generated SQL locally before the next task sees it.
+
+    Failing SQL goes straight back to the generating agent with the errors, so
+    syntax and schema mistakes never reach the validator agent or the database.
+    ``schema`` may be a callable returning the current schema, for schemas
+    refreshed while the process runs.
+    """
+    def guardrail(output: Any) -> Tuple[bool, Any]:
+        sql = extract_sql(output)
+        if sql is None:
+            return False, 'Return the SQL query as a dictionary, for example {"sql": "SELECT ..."}.'
+        errors = static_errors(sql, db_type, schema() if callable(schema) else schema)
+        if not errors:
+            error = explain_error(check_read_only(sql), db_type, db_path=db_path, conn_string=conn_string)
+            errors = [error] if error else []
+        if errors:
+            return False, "The SQL query was rejected: " + ' '.join(errors) + " Return a corrected query."
+        return True, output
+
+    return guardrail
@@ -0,0 +1,101 @@
+import threading
+import time
+from collections.abc import Mapping
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List
+
+from src.tracing import tracer
+
+
+class StartupReport:
+    """Wall time of one-off startup phases: imports, driver loading, first build of each agent/crew, first request.
+
+    Phases nest (building a crew builds its tasks and agents), so times are
+    inclusive. Each phase is recorded once and also observed in the stage
+    histogram with ``kind="startup"``, so it shows up in ``/metrics``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._phases: Dict[str, float] = {}
+
+    def record(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            if phase in self._phases:
+                return
+            self._phases[phase] = seconds
+        tracer.metrics.observe('startup', phase, seconds)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the block as ``name``, unless that phase was already recorded."""
+        if name in self._phases:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def phases(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._phases)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._phases.clear()
+
+    def report(self) -> str:
+        """Human-readable phase table, in the order the phases finished."""
+        phases = self.phases()
+        if not phases:
+            return 'No startup phases recorded.'
+        width = max(len(name) for name in phases)
+        return '\n'.join(f"{name:<{width}}  {seconds * 1000:9.1f} ms" for name, seconds in phases.items())
+
+
+startup = StartupReport()
+
+
+class LazyDict(Mapping):
+    """Read-only mapping whose values are built by their factory on first access.
+
+    The system declares every agent, task and crew up front but only pays for
+    the ones a process actually uses; a worker that only serves SQL never builds
+    the forecasting agent. Concurrent first accesses build a value once.
+    ``phase`` names the startup phase each build is recorded under.
+    """
+
+    def __init__(self, factories: Dict[str, Callable[[], Any]], phase: str = None):
+        self._factories = dict(factories)
+        self._values: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+        self._phase = phase
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return self._values[key]
+        except KeyError:
+            factory = self._factories[key]
+        with self._lock:
+            if key not in self._values:
+                started = time.perf_counter()
+                self._values[key] = factory()
+                if self._phase:
+                    startup.record(f"{self._phase}:{key}", time.perf_counter() - started)
+            return self._values[key]
+
+    def __contains__(self, key: object) -> bool:
+        # Mapping's default would build the value just to test membership.
+        return key in self._factories
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._factories)
+
+    def __len__(self) -> int:
+        return len(self._factories)
+
+    def built(self) -> List[str]:
+        """Names whose values exist already."""
+        return [key for key in self._factories if key in self._values]
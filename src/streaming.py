@@ -0,0 +1,285 @@
+import re
+import uuid
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.config import Config
+from src.sql_validation import is_read_only
+from src.tracing import tracer
+
+_LEADING_NOISE = re.compile(r"^(\s+|--[^\n]*\n?|/\*.*?\*/|\()+", re.DOTALL)
+_ROW_RETURNING = ('select', 'with', 'values', 'table', 'explain', 'pragma', 'show')
+
+
+def returns_rows(sql: str) -> bool:
+    """Best-effort check whether a statement produces a result set."""
+    head = _LEADING_NOISE.sub('', sql).lower()
+    return head.startswith(_ROW_RETURNING)
+
+
+def uses_server_cursor(sql: str, db_type: str) -> bool:
+    """Whether ``sql`` is fetched through a PostgreSQL named cursor.
+
+    ``DECLARE CURSOR`` only takes plain queries, so EXPLAIN, SHOW and
+    data-modifying CTEs run on an ordinary cursor (still read in batches).
+    """
+    return db_type == 'postgres' and is_read_only(sql)
+
+
+def estimate_row_bytes(row: Tuple[Any, ...]) -> int:
+    """Approximate serialized size of a row, used to enforce byte caps cheaply."""
+    size = 2
+    for value in row:
+        if value is None:
+            size += 4
+        elif isinstance(value, (str, bytes, bytearray, memoryview)):
+            size += len(value) + 2
+        elif isinstance(value, (int, float, bool)):
+            size += 8
+        else:
+            size += len(str(value))
+    return size
+
+
+def _open_cursor(conn: Any, sql: str, db_type: str, batch_size: int) -> Tuple[Any, Optional[str]]:
+    """Execute ``sql`` on a cursor that does not materialize the whole result.
+
+    PostgreSQL queries use a server-side (named) cursor so rows are transferred
+    in batches; SQLite cursors already step through results lazily.
+    """
+    if uses_server_cursor(sql, db_type):
+        name = f"crewai_stream_{uuid.uuid4().hex}"
+        cursor = conn.cursor(name=name)
+        cursor.itersize = batch_size
+        cursor.execute(sql)
+        return cursor, name
+    cursor = conn.cursor()
+    cursor.execute(sql)
+    return cursor, None
+
+
+def _column_names(cursor: Any) -> List[str]:
+    return [column[0] for column in (cursor.description or [])]
+
+
+def _column_types(cursor: Any) -> List[Optional[str]]:
+    # psycopg reports type names; sqlite3 descriptions carry no types.
+    return [getattr(column, 'type_display', None) for column in (cursor.description or [])]
+
+
+def iter_rows(conn: Any, sql: str, db_type: str, batch_size: int = None) -> Iterator[Tuple[Any, ...]]:
+    """Yield result rows one at a time, fetching them from the database in batches."""
+    batch_size = batch_size or Config.FETCH_BATCH_SIZE
+    cursor, _ = _open_cursor(conn, sql, db_type, batch_size)
+    try:
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            yield from batch
+    finally:
+        cursor.close()
+
+
+def _count_remaining(conn: Any, cursor: Any, cursor_name: Optional[str], batch_size: int, scan_limit: int,
+                     checkpoint: Optional[Callable[[], None]] = None) -> Tuple[int, bool]:
+    """Count rows left on ``cursor`` without keeping them.
+
+    Returns ``(count, exact)``. PostgreSQL skips the rest of a named cursor
+    server-side with ``MOVE``; elsewhere rows are drained in batches and
+    discarded, stopping after ``scan_limit`` rows.
+    """
+    if cursor_name is not None:
+        mover = conn.cursor()
+        try:
+            mover.execute(f'MOVE FORWARD ALL FROM "{cursor_name}"')
+            return max(mover.rowcount, 0), True
+        finally:
+            mover.close()
+
+    counted = 0
+    while counted < scan_limit:
+        batch = cursor.fetchmany(min(batch_size, scan_limit - counted))
+        if not batch:
+            return counted, True
+        counted += len(batch)
+        if checkpoint is not None:
+            checkpoint()
+    return counted, not cursor.fetchmany(1)
+
+
+class _BoundedCollector:
+    """Accumulates fetched batches until the row or byte cap is hit.
+
+    With ``columnar`` the kept rows of each batch go straight into a
+    ``ColumnarBuilder``, so no more than one batch of row tuples is alive.
+    """
+
+    def __init__(self, columns: List[str], max_rows: int, max_bytes: int, types: List[Optional[str]] = None,
+                 columnar: bool = False):
+        self.columns = columns
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.rows: List[Tuple[Any, ...]] = []
+        self.row_count = 0
+        self.used_bytes = 0
+        self.truncated = False
+        self.limited_by: Optional[str] = None
+        self.overflow = 0
+        self.builder = None
+        if columnar:
+            # numpy is only loaded for columnar fetches.
+            from src.columnar import ColumnarBuilder
+            self.builder = ColumnarBuilder(columns, types)
+
+    def add(self, batch: List[Any]) -> bool:
+        """Keep rows from ``batch``; returns False once the caps are reached."""
+        kept = []
+        for index, row in enumerate(batch):
+            row = tuple(row)
+            row_bytes = estimate_row_bytes(row)
+            if self.row_count >= self.max_rows or self.used_bytes + row_bytes > self.max_bytes:
+                self.truncated = True
+                self.limited_by = 'rows' if self.row_count >= self.max_rows else 'bytes'
+                self.overflow = len(batch) - index
+                break
+            kept.append(row)
+            self.row_count += 1
+            self.used_bytes += row_bytes
+        if self.builder is not None:
+            self.builder.append(kept)
+        else:
+            self.rows.extend(kept)
+        return not self.truncated
+
+    def result(self, remaining: int = 0, exact: bool = True) -> Dict[str, Any]:
+        total = self.row_count + (self.overflow + remaining if self.truncated else 0)
+        return {
+            'columns': self.columns,
+            'rows': self.builder.build() if self.builder is not None else self.rows,
+            'row_count': self.row_count,
+            'truncated': self.truncated,
+            'limited_by': self.limited_by,
+            'total_rows_estimate': total,
+            'total_rows_exact': exact,
+            'bytes': self.used_bytes
+        }
+
+
+def _no_result_set(rowcount: int) -> Dict[str, Any]:
+    return {'columns': None, 'rows': None, 'row_count': rowcount,
+            'truncated': False, 'total_rows_estimate': None, 'total_rows_exact': True}
+
+
+def _limits(max_rows, max_bytes, batch_size, count_scan_limit) -> Tuple[int, int, int, int]:
+    return (
+        Config.MAX_RESULT_ROWS if max_rows is None else max_rows,
+        Config.MAX_RESULT_BYTES if max_bytes is None else max_bytes,
+        batch_size or Config.FETCH_BATCH_SIZE,
+        Config.RESULT_COUNT_SCAN_LIMIT if count_scan_limit is None else count_scan_limit
+    )
+
+
+def fetch_bounded(
+    conn: Any,
+    sql: str,
+    db_type: str,
+    max_rows: int = None,
+    max_bytes: int = None,
+    batch_size: int = None,
+    count_scan_limit: int = None,
+    checkpoint: Optional[Callable[[], None]] = None,
+    columnar: bool = False
+) -> Dict[str, Any]:
+    """Execute ``sql`` and keep at most ``max_rows`` rows / ``max_bytes`` bytes.
+
+    Memory use is bounded by the caps and the batch size regardless of how
+    large the full result set is. The returned dict reports whether the
+    result was truncated, by which cap, and how many rows the full result
+    contains. ``checkpoint`` is called after every batch and may raise to
+    stop fetching (see ``QueryGovernor.check``). With ``columnar``, ``rows``
+    is a ``ColumnarResult`` instead of a list of tuples.
+    """
+    max_rows, max_bytes, batch_size, count_scan_limit = _limits(max_rows, max_bytes, batch_size, count_scan_limit)
+
+    with tracer.span('db', 'execute', db_type=db_type):
+        cursor, cursor_name = _open_cursor(conn, sql, db_type, batch_size)
+    try:
+        if cursor.description is None and cursor_name is None:
+            return _no_result_set(cursor.rowcount)
+
+        with tracer.span('db', 'fetch', db_type=db_type) as span:
+            collector = _BoundedCollector(_column_names(cursor), max_rows, max_bytes, _column_types(cursor), columnar)
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch or not collector.add(batch):
+                    break
+                if checkpoint is not None:
+                    checkpoint()
+
+            if not collector.truncated:
+                remaining, exact = 0, True
+            else:
+                remaining, exact = _count_remaining(
+                    conn, cursor, cursor_name, batch_size, max(count_scan_limit - collector.overflow, 0), checkpoint
+                )
+            result = collector.result(remaining, exact)
+            span.set(rows=result['row_count'], bytes=result['bytes'], truncated=result['truncated'])
+        return result
+    finally:
+        cursor.close()
+
+
+async def afetch_bounded(
+    aconn: Any,
+    sql: str,
+    max_rows: int = None,
+    max_bytes: int = None,
+    batch_size: int = None,
+    checkpoint: Optional[Callable[[], None]] = None,
+    columnar: bool = False
+) -> Dict[str, Any]:
+    """Async ``fetch_bounded`` for a psycopg ``AsyncConnection`` (same cursor choice and caps)."""
+    max_rows, max_bytes, batch_size, count_scan_limit = _limits(max_rows, max_bytes, batch_size, None)
+
+    name = None
+    if uses_server_cursor(sql, 'postgres'):
+        name = f"crewai_stream_{uuid.uuid4().hex}"
+        cursor = aconn.cursor(name=name)
+        cursor.itersize = batch_size
+    else:
+        cursor = aconn.cursor()
+    try:
+        with tracer.span('db', 'execute', db_type='postgres'):
+            await cursor.execute(sql)
+        if cursor.description is None and name is None:
+            return _no_result_set(cursor.rowcount)
+        with tracer.span('db', 'fetch', db_type='postgres') as span:
+            collector = _BoundedCollector(_column_names(cursor), max_rows, max_bytes, _column_types(cursor), columnar)
+            while True:
+                batch = await cursor.fetchmany(batch_size)
+                if not batch or not collector.add(batch):
+                    break
+                if checkpoint is not None:
+                    checkpoint()
+            remaining, exact = 0, True
+            if collector.truncated and name is not None:
+                mover = aconn.cursor()
+                try:
+                    await mover.execute(f'MOVE FORWARD ALL FROM "{name}"')
+                    remaining = max(mover.rowcount, 0)
+                finally:
+                    await mover.close()
+            elif collector.truncated:
+                scan_limit = max(count_scan_limit - collector.overflow, 0)
+                while remaining < scan_limit:
+                    batch = await cursor.fetchmany(min(batch_size, scan_limit - remaining))
+                    if not batch:
+                        break
+                    remaining += len(batch)
+                else:
+                    exact = not await cursor.fetchmany(1)
+            result = collector.result(remaining, exact)
+            span.set(rows=result['row_count'], bytes=result['bytes'], truncated=result['truncated'])
+        return result
+    finally:
+        await cursor.close()
@@ -1,47 +1,75 @@
 from src.base_task import BaseTask
+from src.startup import LazyDict
 
-def create_tasks(agents):
-    router_task = BaseTask(
-        description="""Analyze the {query} to understand its intent. Determine if the query requires SQL analysis or forecasting and route it to the appropriate agent.""",
-        expected_output="""Output must be either 'sql' or 'forecast' or None based on the query type in dictionary format. For example: {{"response":"sql"}} or {{"response":"forecast"}} or {{"response":None}}""",
-        agent=agents['router']
-    )
+def create_tasks(agents, sql_guardrail=None):
+    # Optional local check of generated SQL (see src.sql_validation.sql_guardrail).
+    guardrail = {'guardrail': sql_guardrail} if sql_guardrail is not None else {}
 
-    fetch_tables_task = BaseTask(
-        description="""Retrieve all relevant tables from the database needed for {query}.""",
-        expected_output="""Output must be a dictionary containing only the relevant tables. For example: {{"relevant_tables": ['table1', 'table2', ...]}}""",
-        agent=agents['fetch_table']
-    )
-
-    fetch_columns_task = BaseTask(
-        description="""Retrieve all relevant columns from the tables identified for {query}.""",
-        expected_output="""Output must be a dictionary containing tables and their relevant columns. For example: {{'table1': ['column1', ...], 'table2': ['column1', ...]}}""",
-        agent=agents['fetch_column']
-    )
-
-    generate_sql_task = BaseTask(
-        description="""Generate an SQL query based on the available tables and columns for {query}.""",
-        expected_output="""Output must be a dictionary containing the generated SQL query. For example: {{"sql": "SELECT ..."}}""",
-        agent=agents['sql_generator']
-    )
-
-    validate_sql_task = BaseTask(
-        description="""Validate the generated SQL query for correctness, ensure it follows syntax and logical rules, and execute the query against the database. The query should be executed and the result or any error should be returned.""",
-        expected_output="""Output must be in dictionary format with 'status', 'message', and optional 'data'. For example: {{'status': 'success', 'message': 'Query executed successfully', 'data': [...]}} or {{'status': 'error', 'message': 'SQL syntax error', 'data': None}}""",
-        agent=agents['sql_validator']
-    )
+    # Tasks (and through them their agents) are built on first use.
+    factories = {
+        'router': lambda: BaseTask(
+            description="""Analyze the {query} to understand its intent. Determine if the query requires SQL analysis or forecasting and route it to the appropriate agent.""",
+            expected_output="""Output must be either 'sql' or 'forecast' or None based on the query type in dictionary format. For example: {{"response":"sql"}} or {{"response":"forecast"}} or {{"response":None}}""",
+            agent=agents['router']
+        ),
+        # Used by process_queries to route many questions with one LLM call.
+        'router_batch': lambda: BaseTask(
+            description="""Analyze each of the following numbered queries to understand its intent and determine if it requires SQL analysis or forecasting:\n{queries}""",
+            expected_output="""Output must be a dictionary mapping every query number to 'sql', 'forecast' or None. For example: {{"1": "sql", "2": "forecast", "3": None}}""",
+            agent=agents['router']
+        ),
+        'fetch_tables': lambda: BaseTask(
+            description="""Retrieve all relevant tables from the database needed for {query}. Candidate tables (with their first columns):\n{tables}""",
+            expected_output="""Output must be a dictionary containing only the relevant tables. For example: {{"relevant_tables": ['table1', 'table2', ...]}}""",
+            agent=agents['fetch_table']
+        ),
+        'fetch_columns': lambda: BaseTask(
+            description="""Retrieve all relevant columns from the tables identified for {query}. Candidate tables and columns:\n{schema}""",
+            expected_output="""Output must be a dictionary containing tables and their relevant columns. For example: {{'table1': ['column1', ...], 'table2': ['column1', ...]}}""",
+            agent=agents['fetch_column']
+        ),
+        'generate_sql': lambda: BaseTask(
+            description="""Generate an SQL query based on the available tables and columns for {query}.""",
+            expected_output="""Output must be a dictionary containing the generated SQL query. For example: {{"sql": "SELECT ..."}}""",
+            agent=agents['sql_generator'],
+            **guardrail
+        ),
+        'validate_sql': lambda: BaseTask(
+            description="""Validate the generated SQL query for correctness, ensure it follows syntax and logical rules, and execute the query against the database. The query should be executed and the result or any error should be returned. If the executor reports status 'timeout' or 'cancelled', return that status and message unchanged instead of retrying; if it reports 'limited_by', say in the message that the data is partial.""",
+            expected_output="""Output must be in dictionary format with 'status', 'message', and optional 'data'. For example: {{'status': 'success', 'message': 'Query executed successfully', 'data': [...]}} or {{'status': 'error', 'message': 'SQL syntax error', 'data': None}}""",
+            agent=agents['sql_validator']
+        ),
+        # Used by the 'sql_direct' crew when the schema index already pinned down the
+        # relevant tables and columns, so the two fetcher stages can be skipped.
+        'generate_sql_direct': lambda: BaseTask(
+            description="""Generate an SQL query for {query} using only these tables and columns:\n{schema}""",
+            expected_output="""Output must be a dictionary containing the generated SQL query. For example: {{"sql": "SELECT ..."}}""",
+            agent=agents['sql_generator'],
+            **guardrail
+        ),
+        'validate_sql_direct': lambda: BaseTask(
+            description="""Validate the generated SQL query for correctness, ensure it follows syntax and logical rules, and execute the query against the database. The query should be executed and the result or any error should be returned. If the executor reports status 'timeout' or 'cancelled', return that status and message unchanged instead of retrying; if it reports 'limited_by', say in the message that the data is partial.""",
+            expected_output="""Output must be in dictionary format with 'status', 'message', and optional 'data'. For example: {{'status': 'success', 'message': 'Query executed successfully', 'data': [...]}} or {{'status': 'error', 'message': 'SQL syntax error', 'data': None}}""",
+            agent=agents['sql_validator']
+        ),
+        'generate_sql_express': lambda: BaseTask(
+            description="""Write one {dialect} SELECT statement that answers {query} using only these tables and columns:\n{schema}{feedback}""",
+            expected_output="""Output must be a dictionary containing the SQL query. For example: {{"sql": "SELECT ..."}}""",
+            agent=agents['sql_express']
+        ),
+        'forecasting': lambda: BaseTask(
+            description="""Forecast what {query} asks for with the Time Series Forecaster: pick the table, time column, value column and aggregate that answer it, set group_by to forecast every entity (e.g. every park) in one call and bucket to group dates into periods. Candidate tables and columns:\n{schema}""",
+            expected_output="""Output MUST be in dict format with the forecaster's 'status', 'message' and 'data'. For example: {{"status": "success", "message": "Forecast 1 series 2 periods ahead", "data": [{{"series": None, "model": "ets", "forecast": [{{"time": 2025, "value": 120.5, "lower": 101.2, "upper": 139.8}}, ...]}}]}}""",
+            agent=agents['forecasting']
+        )
+    }
 
-    forecasting_task = BaseTask(
-        description="""Analyze time series data and generate forecasts using Prophet for the {query}.""",
-        expected_output="""Output MUST be in dict format. For example: {{"predicted": value}}""",
-        agent=agents['forecasting']
-    )
+    def named(name, factory):
+        # Stable names label the tasks in traces and metrics.
+        def build():
+            task = factory()
+            task.name = name
+            return task
+        return build
 
-    return {
-        'router': router_task,
-        'fetch_tables': fetch_tables_task,
-        'fetch_columns': fetch_columns_task,
-        'generate_sql': generate_sql_task,
-        'validate_sql': validate_sql_task,
-        'forecasting': forecasting_task
-    }
+    return LazyDict({name: named(name, factory) for name, factory in factories.items()}, phase='task')
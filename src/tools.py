@@ -1,45 +1,363 @@
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
 from src.base_tool import BaseCustomTool
-import sqlite3
-import psycopg
-from typing import Dict, Any
+from src.config import Config
+from src.context import summarize_result
+from src.forecasting import ForecastCache, ForecastError, forecast
+from src.governor import CancelToken, QueryCancelled, QueryGovernor, QueryTimeout, current_cancel_token
+from src.pool import get_pool, get_async_pool
+from src.replicas import replicas_for
+from src.result_cache import ResultCache, data_version, adata_version, bump_data_version
+from src.streaming import fetch_bounded, afetch_bounded, iter_rows
+from src.sql_validation import CostGateResult, SQLValidationError, cost_gate, acost_gate, is_query, is_read_only
+from src.tracing import tracer
+from pydantic import BaseModel, PrivateAttr
+from typing import Dict, Any, AsyncIterator, Iterator, Optional, Tuple, Type
+
+# 'columnar' results are NumPy-backed and meant for code, not agents.
+RESULT_FORMATS = ('rows', 'columnar')
+
+# Declared explicitly so timeout, cancel_token and result_format stay out of what agents can pass.
+class ExecuteSQLQuerySchema(BaseModel):
+    """Arguments of the SQL Query Executor."""
+    query: Dict[str, str]
+    db_path: str = None
+    db_type: str = 'sqlite'
+    conn_string: str = None
+    max_rows: int = None
+    max_bytes: int = None
 
 class ExecuteSQLQuery(BaseCustomTool):
-    def __init__(self):
+    args_schema: Type[BaseModel] = ExecuteSQLQuerySchema
+    # Set on the instance given to agents: larger results come back summarized (see src.context).
+    max_context_tokens: Optional[int] = None
+    _result_cache: Optional[ResultCache] = PrivateAttr(default=None)
+
+    def __init__(self, result_cache: Optional[ResultCache] = None, max_context_tokens: Optional[int] = None):
         super().__init__(
             name="SQL Query Executor",
-            description="This tool validates and executes SQL queries on the connected database (SQLite or PostgreSQL) to fetch data."
+            description="This tool validates and executes SQL queries on the connected database (SQLite or PostgreSQL) to fetch data.",
+            max_context_tokens=max_context_tokens
         )
+        if result_cache is None and Config.RESULT_CACHE_ENABLED:
+            result_cache = ResultCache()
+        self._result_cache = result_cache
+
+    @property
+    def result_cache(self) -> Optional[ResultCache]:
+        return self._result_cache
 
-    def _run(self, query: Dict[str, str], db_path: str = None, db_type: str = 'sqlite', conn_string: str = None) -> Dict[str, Any]:
+    def enable_result_cache(self, max_bytes: int = None) -> ResultCache:
+        """Opt in to caching read query results, invalidated by data changes."""
+        if self._result_cache is None:
+            self._result_cache = ResultCache(max_bytes=max_bytes)
+        return self._result_cache
+
+    def _run(
+        self,
+        query: Dict[str, str],
+        db_path: str = None,
+        db_type: str = 'sqlite',
+        conn_string: str = None,
+        max_rows: int = None,
+        max_bytes: int = None,
+        timeout: float = None,
+        cancel_token: Optional[CancelToken] = None,
+        result_format: str = 'rows'
+    ) -> Dict[str, Any]:
+        """Execute a query under the cost gate, ``timeout`` (default ``Config.QUERY_TIMEOUT``) and row/byte caps.
+
+        ``status`` is 'success', 'error', 'timeout' or 'cancelled' (via ``cancel_token``
+        or an enclosing ``cancel_scope``); partial results carry ``limited_by``.
+        ``result_format='columnar'`` returns ``data`` as a ``ColumnarResult``
+        (NumPy arrays per column) instead of a list of tuples.
+        """
         if not self.validate_input({'query': query, 'db_type': db_type}):
             return self.handle_error(ValueError("Invalid input parameters"))
+        if result_format not in RESULT_FORMATS:
+            return self.handle_error(ValueError(f"Unsupported result format {result_format!r}"))
             
         try:
-            if db_type == 'sqlite':
-                if not db_path:
-                    raise ValueError("SQLite requires db_path.")
-                conn = sqlite3.connect(db_path)
-            elif db_type == 'postgres':
-                if not conn_string:
-                    raise ValueError("PostgreSQL requires conn_string.")
-                conn = psycopg.connect(conn_string)
-            else:
-                raise ValueError("Unsupported db_type. Use 'sqlite' or 'postgres'.")
-
-            with conn.cursor() as cursor:
-                sql = query['sql']
-                cursor.execute(sql)
+            pool = get_pool(db_type, db_path=db_path, conn_string=conn_string)
+        except Exception as e:
+            return self.handle_error(e)
+
+        try:
+            sql = query['sql']
+            cache = self._result_cache if is_read_only(sql) else None
+            governor = QueryGovernor(timeout, cancel_token)
+            # Connections are borrowed from the shared pool and returned afterwards,
+            # so repeated queries skip the connect/auth handshake. Reads go to a
+            # replica when the database has any registered (see src.replicas);
+            # anything that might write, such as WITH ... DELETE, stays on the primary.
+            replicas = replicas_for(db_type, db_path or conn_string) if is_read_only(sql) else None
+            source = replicas.connection() if replicas is not None else _borrow(pool, db_path or conn_string)
+            with source as (target, conn), governor.attach(conn, db_type):
+                # Keyed by the node that answers: replicas lag the primary by different amounts.
+                db_key = f"{db_type}:{target}"
+                if cache is not None:
+                    cache_key = ResultCache.make_key(db_key, sql, max_rows, max_bytes, result_format)
+                    version = data_version(conn, db_type, db_key, db_path=target if db_type == 'sqlite' else None)
+                    cached = cache.get(cache_key, version)
+                    if cached is not None:
+                        return self._for_context({**cached, 'cached': True})
+
+                gate = None
+                if is_query(sql) and Config.SQL_COST_POLICY != 'off':
+                    # EXPLAIN first so over-budget plans never start executing.
+                    with tracer.span('db', 'explain', db_type=db_type) as span:
+                        gate = cost_gate(conn, sql, db_type, limit=max_rows)
+                        span.set(action=gate.action)
+                    if gate.rejected:
+                        return {'status': 'error', 'message': gate.message, 'data': None}
+
+                result = fetch_bounded(
+                    conn, gate.sql if gate else sql, db_type, max_rows=max_rows, max_bytes=max_bytes,
+                    checkpoint=governor.check, columnar=result_format == 'columnar'
+                )
                 conn.commit()
 
-                if sql.strip().lower().startswith("select"):
-                    result = cursor.fetchall()
-                    output = {'status': 'success', 'message': 'Query executed successfully', 'data': result}
-                else:
-                    output = {'status': 'success', 'message': 'Query executed successfully', 'data': None}
-                
-                return output if self.validate_output(output) else self.handle_error(ValueError("Invalid output"))
+            output = self._format_result(result, db_key, gate)
+            if cache is not None and result['rows'] is not None:
+                cache.put(cache_key, version, output)
+            
+            return self._for_context(output) if self.validate_output(output) else self.handle_error(ValueError("Invalid output"))
 
+        except (QueryTimeout, QueryCancelled) as e:
+            return self._stopped(e, governor)
+        except Exception as e:
+            return self.handle_error(RuntimeError(f"Error executing query: {str(e)}"))
+
+    async def _arun(
+        self,
+        query: Dict[str, str],
+        db_path: str = None,
+        db_type: str = 'sqlite',
+        conn_string: str = None,
+        max_rows: int = None,
+        max_bytes: int = None,
+        timeout: float = None,
+        cancel_token: Optional[CancelToken] = None,
+        result_format: str = 'rows'
+    ) -> Dict[str, Any]:
+        """Async execution: PostgreSQL uses an async connection pool, SQLite a worker thread.
+
+        Cancelling the awaiting task cancels the running query as well.
+        """
+        if db_type != 'postgres':
+            # The worker thread cannot be cancelled, so a cancelled await interrupts its query instead.
+            token = cancel_token or current_cancel_token() or CancelToken()
+            worker = asyncio.ensure_future(asyncio.to_thread(
+                self._run, query, db_path=db_path, db_type=db_type, conn_string=conn_string,
+                max_rows=max_rows, max_bytes=max_bytes, timeout=timeout, cancel_token=token,
+                result_format=result_format
+            ))
+            try:
+                return await asyncio.shield(worker)
+            except asyncio.CancelledError:
+                token.cancel()
+                raise
+        if not self.validate_input({'query': query, 'db_type': db_type}):
+            return self.handle_error(ValueError("Invalid input parameters"))
+        if result_format not in RESULT_FORMATS:
+            return self.handle_error(ValueError(f"Unsupported result format {result_format!r}"))
+
+        try:
+            pool = get_async_pool(conn_string)
         except Exception as e:
             return self.handle_error(e)
 
+        try:
+            sql = query['sql']
+            cache = self._result_cache if is_read_only(sql) else None
+            governor = QueryGovernor(timeout, cancel_token)
+            replicas = replicas_for(db_type, conn_string) if is_read_only(sql) else None
+            source = replicas.aconnection() if replicas is not None else _aborrow(pool, conn_string)
+            async with source as (target, conn), governor.aattach(conn):
+                db_key = f"{db_type}:{target}"
+                if cache is not None:
+                    cache_key = ResultCache.make_key(db_key, sql, max_rows, max_bytes, result_format)
+                    version = await adata_version(conn, db_key)
+                    cached = cache.get(cache_key, version)
+                    if cached is not None:
+                        return self._for_context({**cached, 'cached': True})
+
+                gate = None
+                if is_query(sql) and Config.SQL_COST_POLICY != 'off':
+                    with tracer.span('db', 'explain', db_type=db_type) as span:
+                        gate = await acost_gate(conn, sql, limit=max_rows)
+                        span.set(action=gate.action)
+                    if gate.rejected:
+                        return {'status': 'error', 'message': gate.message, 'data': None}
+
+                result = await afetch_bounded(
+                    conn, gate.sql if gate else sql, max_rows=max_rows, max_bytes=max_bytes,
+                    checkpoint=governor.check, columnar=result_format == 'columnar'
+                )
+                await conn.commit()
+
+            output = self._format_result(result, db_key, gate)
+            if cache is not None and result['rows'] is not None:
+                cache.put(cache_key, version, output)
+
+            return self._for_context(output) if self.validate_output(output) else self.handle_error(ValueError("Invalid output"))
+
+        except (QueryTimeout, QueryCancelled) as e:
+            return self._stopped(e, governor)
+        except Exception as e:
+            return self.handle_error(RuntimeError(f"Error executing query: {str(e)}"))
+
+    def _for_context(self, output: Dict[str, Any]) -> Dict[str, Any]:
+        """The output as an agent should see it; the result cache keeps the full rows."""
+        if self.max_context_tokens is None:
+            return output
+        return summarize_result(output, self.max_context_tokens)
+
+    def _stopped(self, error: Exception, governor: QueryGovernor) -> Dict[str, Any]:
+        """Structured status for a query the governor stopped, so callers can react (narrow the query, retry, give up)."""
+        return {
+            'status': 'cancelled' if isinstance(error, QueryCancelled) else 'timeout',
+            'message': str(error),
+            'data': None,
+            'elapsed': round(governor.elapsed(), 3)
+        }
+
+    def _format_result(self, result: Dict[str, Any], db_key: str, gate: Optional[CostGateResult] = None) -> Dict[str, Any]:
+        if result['rows'] is None:
+            # Writes made through this process are invisible to data_version.
+            bump_data_version(db_key)
+            if self._result_cache is not None:
+                self._result_cache.invalidate_database(db_key)
+            return {'status': 'success', 'message': 'Query executed successfully', 'data': None}
+        message = 'Query executed successfully'
+        limited_by = result['limited_by']
+        if result['truncated']:
+            qualifier = '' if result['total_rows_exact'] else 'at least '
+            message += f" (showing {result['row_count']} of {qualifier}{result['total_rows_estimate']} rows)"
+        if gate is not None and gate.action == 'limited':
+            message += f" ({gate.message})"
+            limited_by = 'cost'
+        return {
+            'status': 'success',
+            'message': message,
+            'data': result['rows'],
+            'columns': result['columns'],
+            'truncated': result['truncated'],
+            'limited_by': limited_by,
+            'total_rows_estimate': result['total_rows_estimate']
+        }
+
+    def stream(
+        self,
+        query: Dict[str, str],
+        db_path: str = None,
+        db_type: str = 'sqlite',
+        conn_string: str = None,
+        batch_size: int = None
+    ) -> Iterator[Tuple[Any, ...]]:
+        """Yield every row of a query without materializing the result.
+
+        The pooled connection is held until the generator is exhausted or closed.
+        """
+        pool = get_pool(db_type, db_path=db_path, conn_string=conn_string)
+        with pool.connection() as conn:
+            yield from iter_rows(conn, query['sql'], db_type, batch_size=batch_size)
+
+
+@contextmanager
+def _borrow(pool: Any, target: str) -> Iterator[Tuple[str, Any]]:
+    with pool.connection() as conn:
+        yield target, conn
+
+
+@asynccontextmanager
+async def _aborrow(pool: Any, target: str) -> AsyncIterator[Tuple[str, Any]]:
+    async with pool.connection() as conn:
+        yield target, conn
+
 execute_sql_query_tool = ExecuteSQLQuery()
+
+
+class ForecastTimeSeriesSchema(BaseModel):
+    """Arguments of the Time Series Forecaster."""
+    table: str
+    time_column: str
+    value_column: str = None
+    aggregate: str = 'sum'
+    group_by: str = None
+    bucket: str = None
+    where: str = None
+    horizon: int = None
+    model: str = None
+
+class ForecastTimeSeries(BaseCustomTool):
+    """Forecasting tool bound to one database, so the agent only describes the series."""
+    args_schema: Type[BaseModel] = ForecastTimeSeriesSchema
+    db_type: str = 'sqlite'
+    db_path: Optional[str] = None
+    conn_string: Optional[str] = None
+    max_context_tokens: Optional[int] = None
+    _cache: Optional[ForecastCache] = PrivateAttr(default=None)
+
+    def __init__(self, db_type: str = 'sqlite', db_path: str = None, conn_string: str = None, cache: Optional[ForecastCache] = None,
+                 max_context_tokens: Optional[int] = None):
+        super().__init__(
+            name="Time Series Forecaster",
+            description=(
+                "Forecasts a time series from the connected database. Give the table, its time column and the "
+                "value column with an aggregate (sum, avg, count, min, max); group_by forecasts one series per "
+                "value of that column in a single call, bucket (day, week, month, quarter, year) groups dates "
+                "into periods and where filters rows with a condition on the table's own columns (no subqueries). Returns each series' forecast with 95% intervals."
+            ),
+            db_type=db_type,
+            db_path=db_path,
+            conn_string=conn_string,
+            max_context_tokens=max_context_tokens
+        )
+        if cache is None and Config.FORECAST_CACHE_SIZE > 0:
+            cache = ForecastCache()
+        self._cache = cache
+
+    @property
+    def cache(self) -> Optional[ForecastCache]:
+        return self._cache
+
+    def _run(
+        self,
+        table: str,
+        time_column: str,
+        value_column: str = None,
+        aggregate: str = 'sum',
+        group_by: str = None,
+        bucket: str = None,
+        where: str = None,
+        horizon: int = None,
+        model: str = None,
+        timeout: float = None
+    ) -> Dict[str, Any]:
+        """Load the series with one aggregating query and forecast it (see ``src.forecasting.forecast``)."""
+        try:
+            output = forecast(
+                table, time_column, value_column, aggregate=aggregate, group_by=group_by, bucket=bucket, where=where,
+                horizon=horizon, model=model, db_type=self.db_type, db_path=self.db_path,
+                conn_string=self.conn_string, timeout=timeout, cache=self._cache
+            )
+        except (ForecastError, SQLValidationError) as e:
+            return self.handle_error(e)
+        except (QueryTimeout, QueryCancelled) as e:
+            return {'status': 'cancelled' if isinstance(e, QueryCancelled) else 'timeout', 'message': str(e), 'data': None}
+        except Exception as e:
+            return self.handle_error(RuntimeError(f"Error forecasting: {str(e)}"))
+
+        forecasts = output['forecasts']
+        failed = sum('error' in item for item in forecasts)
+        horizon = max((len(item.get('forecast', [])) for item in forecasts), default=0)
+        message = f"Forecast {len(forecasts) - failed} series {horizon} periods ahead"
+        if failed:
+            message += f" ({failed} could not be forecast)"
+        result = {'status': 'success', 'message': message, 'data': forecasts, 'sql': output['sql'], 'cached': output['cached']}
+        return result if self.max_context_tokens is None else summarize_result(result, self.max_context_tokens)
+
+    async def _arun(self, *args: Any, **kwargs: Any) -> Dict[str, Any]:
+        # Fitting is CPU-bound; keep it off the event loop.
+        return await asyncio.to_thread(self._run, *args, **kwargs)
@@ -0,0 +1,394 @@
+import contextvars
+import functools
+import inspect
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from src.config import Config
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Span ids only need to be unique within the process.
+_span_ids = itertools.count(1)
+
+# Span attributes that are also aggregated as Prometheus counters.
+_TOKEN_ATTRS = ('prompt_tokens', 'completion_tokens', 'cached_prompt_tokens', 'total_tokens')
+
+
+class Span:
+    """One timed stage: a crew, agent, task, tool call, DB round trip or schema load."""
+
+    __slots__ = ('id', 'parent_id', 'kind', 'name', 'attrs', 'start', 'duration')
+
+    def __init__(self, kind: str, name: str, attrs: Dict[str, Any], parent_id: Optional[int]):
+        self.id = next(_span_ids)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.duration: Optional[float] = None
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'parent_id': self.parent_id,
+            'kind': self.kind,
+            'name': self.name,
+            'offset': round(self.start - origin, 6),
+            'duration': None if self.duration is None else round(self.duration, 6),
+            'attrs': self.attrs
+        }
+
+
+class _NoopSpan:
+    """Returned by ``Tracer.span`` while tracing is disabled; every operation is a no-op."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> '_NoopSpan':
+        return self
+
+    def __exit__(self, *exc: Any) -> bool:
+        return False
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Trace:
+    """All spans recorded while handling one request, serializable to JSON."""
+
+    def __init__(self, name: str, **attrs: Any):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.attrs = attrs
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def finish(self) -> None:
+        self.duration = time.perf_counter() - self.origin
+
+    def stage_totals(self) -> Dict[str, float]:
+        """Seconds spent per ``kind:name``, e.g. {'agent:SQL Generator': 2.1, 'db:execute': 0.03}."""
+        totals: Dict[str, float] = {}
+        for span in list(self.spans):
+            if span.duration is not None:
+                key = f"{span.kind}:{span.name}"
+                totals[key] = totals.get(key, 0.0) + span.duration
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+        return {
+            'trace_id': self.id,
+            'name': self.name,
+            'attrs': self.attrs,
+            'started_at': self.started_at,
+            'duration': None if self.duration is None else round(self.duration, 6),
+            'spans': [span.to_dict(self.origin) for span in spans]
+        }
+
+    def to_json(self, **kwargs: Any) -> str:
+        return json.dumps(self.to_dict(), default=str, **kwargs)
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs: Tuple[Tuple[str, str], ...]) -> str:
+    return ','.join(f'{key}="{_escape_label(value)}"' for key, value in pairs)
+
+
+class Metrics:
+    """Stage latency histograms plus token/retry counters, rendered in Prometheus text format."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, str], List[Any]] = {}
+        self._counters: Dict[str, Dict[Tuple[Tuple[str, str], ...], float]] = {}
+
+    def observe(self, kind: str, name: str, seconds: float) -> None:
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            entry = self._histograms.get((kind, name))
+            if entry is None:
+                entry = self._histograms[(kind, name)] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += seconds
+            entry[2] += 1
+
+    def inc(self, metric: str, value: float = 1.0, **labels: Any) -> None:
+        key = tuple(sorted((name, str(label)) for name, label in labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(metric, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            histograms = {key: (list(entry[0]), entry[1], entry[2]) for key, entry in self._histograms.items()}
+            counters = {metric: dict(series) for metric, series in self._counters.items()}
+
+        lines = [
+            '# HELP crewai_stage_duration_seconds Wall time per pipeline stage.',
+            '# TYPE crewai_stage_duration_seconds histogram'
+        ]
+        for (kind, name), (counts, total, count) in sorted(histograms.items()):
+            labels = _labels((('kind', kind), ('stage', name)))
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                lines.append(f'crewai_stage_duration_seconds_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+            lines.append(f'crewai_stage_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f'crewai_stage_duration_seconds_sum{{{labels}}} {total:.6f}')
+            lines.append(f'crewai_stage_duration_seconds_count{{{labels}}} {count}')
+        for metric, series in sorted(counters.items()):
+            lines.append(f'# TYPE {metric} counter')
+            for key, value in sorted(series.items()):
+                lines.append(f'{metric}{{{_labels(key)}}} {value:g}')
+        return '\n'.join(lines) + '\n'
+
+
+class _ActiveSpan:
+    """Context manager behind ``Tracer.span`` while tracing is enabled."""
+
+    __slots__ = ('tracer', 'span', 'token')
+
+    def __init__(self, tracer: 'Tracer', kind: str, name: str, attrs: Dict[str, Any]):
+        self.tracer = tracer
+        parent = tracer._span.get()
+        self.span = Span(kind, name, attrs, parent.id if parent is not None else None)
+
+    def __enter__(self) -> Span:
+        self.token = self.tracer._span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> bool:
+        span = self.span
+        span.duration = time.perf_counter() - span.start
+        self.tracer._span.reset(self.token)
+        if exc_type is not None:
+            span.attrs['error'] = exc_type.__name__
+        self.tracer._finish(span)
+        return False
+
+
+class Tracer:
+    """Per-request traces and aggregated stage metrics.
+
+    Spans are opened with ``tracer.span(kind, name)``; while tracing is
+    disabled that returns a shared no-op object, so instrumented code pays
+    one attribute check. Spans inside ``tracer.request(...)`` are collected
+    into that request's ``Trace``; every span also feeds the histograms.
+    """
+
+    def __init__(self, enabled: bool = None, trace_dir: str = None, history: int = None):
+        self.enabled = Config.TRACING_ENABLED if enabled is None else enabled
+        self.trace_dir = Config.TRACE_DIR if trace_dir is None else trace_dir
+        self.metrics = Metrics()
+        self.recent: Deque[Trace] = deque(maxlen=Config.TRACE_HISTORY if history is None else history)
+        self._trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar('crewai_trace', default=None)
+        self._span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar('crewai_span', default=None)
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def span(self, kind: str, name: str, **attrs: Any) -> Any:
+        if not self.enabled:
+            return _NOOP
+        return _ActiveSpan(self, kind, name, attrs)
+
+    def request(self, name: str, **attrs: Any) -> Any:
+        """Context manager tracing one request; ``with`` gives the ``Trace`` (None while disabled)."""
+        if not self.enabled:
+            return _NoopRequest()
+        return _ActiveRequest(self, Trace(name, **attrs))
+
+    def current_trace(self) -> Optional[Trace]:
+        return self._trace.get()
+
+    def last_trace(self) -> Optional[Trace]:
+        return self.recent[-1] if self.recent else None
+
+    def context(self) -> Tuple[Optional[Trace], Optional[Span]]:
+        """Snapshot of the current trace and span, for handing to worker threads."""
+        return self._trace.get(), self._span.get()
+
+    def resume(self, context: Tuple[Optional[Trace], Optional[Span]]) -> '_Resumed':
+        """Continue a ``context()`` snapshot in another thread, so its spans join the same trace."""
+        return _Resumed(self, context)
+
+    def prometheus(self) -> str:
+        return self.metrics.render()
+
+    def _finish(self, span: Span) -> None:
+        self.metrics.observe(span.kind, span.name, span.duration)
+        attrs = span.attrs
+        for attr in _TOKEN_ATTRS:
+            if attrs.get(attr):
+                self.metrics.inc('crewai_llm_tokens_total', attrs[attr], kind=span.kind, stage=span.name, type=attr[:-len('_tokens')])
+        if attrs.get('retries'):
+            self.metrics.inc('crewai_stage_retries_total', attrs['retries'], kind=span.kind, stage=span.name)
+        if 'error' in attrs:
+            self.metrics.inc('crewai_stage_errors_total', kind=span.kind, stage=span.name)
+        trace = self._trace.get()
+        if trace is not None:
+            trace.add(span)
+
+    def _store(self, trace: Trace) -> None:
+        self.recent.append(trace)
+        if self.trace_dir:
+            os.makedirs(self.trace_dir, exist_ok=True)
+            with open(os.path.join(self.trace_dir, f"{trace.id}.json"), 'w') as f:
+                f.write(trace.to_json(indent=2))
+
+
+class _NoopRequest:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc: Any) -> bool:
+        return False
+
+
+class _ActiveRequest:
+    __slots__ = ('tracer', 'trace', 'token', 'root')
+
+    def __init__(self, tracer: Tracer, trace: Trace):
+        self.tracer = tracer
+        self.trace = trace
+
+    def __enter__(self) -> Trace:
+        self.token = self.tracer._trace.set(self.trace)
+        self.root = _ActiveSpan(self.tracer, 'request', self.trace.name, dict(self.trace.attrs))
+        self.root.__enter__()
+        return self.trace
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> bool:
+        try:
+            self.root.__exit__(exc_type, exc, tb)
+        finally:
+            self.tracer._trace.reset(self.token)
+            self.trace.finish()
+            self.tracer._store(self.trace)
+        return False
+
+
+class _Resumed:
+    __slots__ = ('tracer', 'context', 'tokens')
+
+    def __init__(self, tracer: Tracer, context: Tuple[Optional[Trace], Optional[Span]]):
+        self.tracer = tracer
+        self.context = context
+
+    def __enter__(self) -> None:
+        trace, span = self.context
+        self.tokens = (self.tracer._trace.set(trace), self.tracer._span.set(span))
+
+    def __exit__(self, *exc: Any) -> bool:
+        self.tracer._span.reset(self.tokens[1])
+        self.tracer._trace.reset(self.tokens[0])
+        return False
+
+
+tracer = Tracer()
+
+
+def usage_delta(after: Any, before: Any) -> Dict[str, int]:
+    """Token counts accrued between two ``UsageMetrics`` snapshots."""
+    return {
+        attr: max(getattr(after, attr, 0) - getattr(before, attr, 0), 0)
+        for attr in _TOKEN_ATTRS + ('successful_requests',)
+    }
+
+
+def traced_tool_method(method: Callable) -> Callable:
+    """Wrap a tool's ``_run``/``_arun`` in a 'tool' span named after the tool."""
+    if getattr(method, '__traced__', False):
+        return method
+
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(self, *args, **kwargs):
+            if not tracer.enabled:
+                return await method(self, *args, **kwargs)
+            with tracer.span('tool', self.name) as span:
+                result = await method(self, *args, **kwargs)
+                _record_status(span, result)
+                return result
+        async_wrapper.__traced__ = True
+        return async_wrapper
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not tracer.enabled:
+            return method(self, *args, **kwargs)
+        with tracer.span('tool', self.name) as span:
+            result = method(self, *args, **kwargs)
+            _record_status(span, result)
+            return result
+    wrapper.__traced__ = True
+    return wrapper
+
+
+def _record_status(span: Any, result: Any) -> None:
+    if isinstance(result, dict) and 'status' in result:
+        span.set(status=result['status'], cached=result.get('cached', False))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = tracer.prometheus().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+def start_metrics_server(port: int = None, host: str = '0.0.0.0') -> ThreadingHTTPServer:
+    """Serve ``/metrics`` for Prometheus from a daemon thread."""
+    server = ThreadingHTTPServer((host, Config.METRICS_PORT if port is None else port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='crewai-metrics', daemon=True).start()
+    return server
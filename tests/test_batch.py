@@ -0,0 +1,46 @@
+import threading
+import unittest
+from unittest.mock import MagicMock
+from src.batch import WorkerCrews, dedupe, dedupe_key, format_numbered, parse_batch_routes
+
+class TestBatchHelpers(unittest.TestCase):
+    def test_near_identical_questions_share_a_key(self):
+        self.assertEqual(
+            dedupe_key('Which park had the most attendances in 2008?'),
+            dedupe_key('which park had most attendances in 2008')
+        )
+        self.assertNotEqual(dedupe_key('Top 5 parks'), dedupe_key('Top 3 parks'))
+        self.assertNotEqual(dedupe_key('Average of 1.5'), dedupe_key('Average of 15'))
+
+    def test_dedupe_maps_inputs_to_first_spelling(self):
+        unique, mapping = dedupe(['How many parks?', 'List teams', 'how many parks', 'List the teams.'])
+
+        self.assertEqual(unique, ['How many parks?', 'List teams'])
+        self.assertEqual(mapping, [0, 1, 0, 1])
+
+    def test_batch_routes_are_parsed_by_number(self):
+        self.assertEqual(format_numbered(['a', 'b']), '1. a\n2. b')
+        routes = parse_batch_routes({'1': 'SQL', 2: None, '3.': 'forecast', '9': 'sql', 'x': 'sql'}, 4)
+
+        self.assertEqual(routes, {0: 'sql', 1: None, 2: 'forecast'})
+
+    def test_worker_crews_are_copied_once_per_thread(self):
+        crew = MagicMock()
+        crew.copy.side_effect = lambda: MagicMock()
+        crews = WorkerCrews({'sql': crew})
+        seen = []
+
+        def worker():
+            seen.append((crews['sql'], crews['sql']))
+
+        threads = [threading.Thread(target=worker) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertTrue(all(first is second for first, second in seen))
+        self.assertEqual(len({id(first) for first, _ in seen}), 3)
+
+if __name__ == '__main__':
+    unittest.main()
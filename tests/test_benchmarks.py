@@ -0,0 +1,52 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from benchmarks.run import bench_process_query, compare
+from benchmarks.synthetic import create_database, workload
+from src.pool import close_all_pools
+
+class TestBenchmarks(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, 'synthetic.sqlite')
+
+    def tearDown(self):
+        close_all_pools()
+        self.temp_dir.cleanup()
+
+    def test_synthetic_database_is_deterministic(self):
+        schema = create_database(self.db_path, tables=3, columns=7, rows=50, seed=1)
+        with sqlite3.connect(self.db_path) as conn:
+            first = conn.execute("SELECT * FROM product ORDER BY id").fetchall()
+
+        self.assertEqual(list(schema), ['customer', 'product', 'supplier'])
+        self.assertEqual(schema['product'], ['id', 'name', 'year', 'amount', 'customer_id', 'product_attr_0', 'product_attr_1'])
+        self.assertEqual(len(first), 50)
+
+        create_database(self.db_path, tables=3, columns=7, rows=50, seed=1)
+        with sqlite3.connect(self.db_path) as conn:
+            self.assertEqual(conn.execute("SELECT * FROM product ORDER BY id").fetchall(), first)
+        self.assertEqual(workload(schema, 5, seed=1), workload(schema, 5, seed=1))
+
+    def test_process_query_runs_offline_with_stub_llm(self):
+        schema = create_database(self.db_path, tables=2, columns=5, rows=20)
+        metrics = bench_process_query(self.db_path, workload(schema, 2), 'express', latency=0.0)
+
+        self.assertEqual(metrics['process_query_express_success_rate'], 1.0)
+        self.assertEqual(metrics['process_query_express_llm_calls'], 1.0)
+        self.assertGreater(metrics['process_query_express_qps'], 0)
+
+    def test_compare_flags_regressions_by_direction(self):
+        baseline = {'metrics': {'tool_p50_s': 0.010, 'tool_qps': 100.0, 'tool_peak_bytes': 1000.0}}
+        current = {'metrics': {'tool_p50_s': 0.012, 'tool_qps': 120.0, 'tool_peak_bytes': 1050.0, 'new_metric': 1.0}}
+
+        rows = {row['metric']: row for row in compare(baseline, current, tolerance=0.1)}
+
+        self.assertTrue(rows['tool_p50_s']['regressed'])
+        self.assertFalse(rows['tool_qps']['regressed'])
+        self.assertFalse(rows['tool_peak_bytes']['regressed'])
+        self.assertNotIn('new_metric', rows)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from src.column_stats import ColumnStatsIndex, column_kind
+from src.knowledge_sources import DatabaseKnowledgeSource
+from src.pool import close_all_pools
+
+class TestColumnStatsIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, 'baseball.sqlite')
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executescript("""
+                CREATE TABLE team (team_id TEXT PRIMARY KEY, name TEXT, city TEXT);
+                CREATE TABLE park (park_id TEXT PRIMARY KEY, park_name TEXT);
+                CREATE TABLE home_game (year INTEGER, team_id TEXT REFERENCES team, attendance INTEGER, note TEXT);
+                INSERT INTO team VALUES ('BOS', 'Boston Red Sox', 'Boston'), ('NYA', 'New York Yankees', 'New York'),
+                                        ('NYN', 'New York Mets', 'New York'), ('CIN', 'Cincinnati Reds', 'Cincinnati');
+                INSERT INTO park VALUES ('BOS07', 'Fenway Park'), ('NYC21', 'Yankee Stadium');
+            """)
+            conn.executemany("INSERT INTO home_game VALUES (?, ?, ?, ?)", [
+                (year, team, 1000000 + year * 10 + index, f"note {year} {team}")
+                for year in range(1990, 2009) for index, team in enumerate(['BOS', 'NYA', 'NYN', 'CIN'])
+            ])
+        source = DatabaseKnowledgeSource(db_type='sqlite', db_path=self.db_path, use_schema_cache=False)
+        source.load_content()
+        self.schema = source.schema_model
+        self.index = self._index()
+
+    def tearDown(self):
+        self.index.close()
+        close_all_pools()
+        self.temp_dir.cleanup()
+
+    def _index(self):
+        return ColumnStatsIndex('sqlite', self.schema, 'test', db_path=self.db_path, cache_dir=self.temp_dir.name)
+
+    def test_column_kinds(self):
+        self.assertEqual([column_kind(t) for t in ('INTEGER', 'character varying(20)', 'timestamp with time zone',
+                                                   'numeric(12,2)', '', 'jsonb', 'text[]', 'boolean')],
+                         ['number', 'text', 'time', 'number', 'text', None, None, None])
+
+    def test_statistics_and_value_links(self):
+        with patch('src.config.Config.VALUE_INDEX_MAX_DISTINCT', 50):
+            self.assertEqual(sorted(self.index.refresh()), ['home_game', 'park', 'team'])
+
+        year = self.index.column('home_game', 'year')
+        self.assertEqual((year.min, year.max, year.distinct, year.nulls), (1990, 2008, 19, 0))
+        self.assertEqual(self.index.column('team', 'city').top[0], ('New York', 2))
+        # Too many distinct values to index, and all unique, so no common values either.
+        note = self.index.column('home_game', 'note')
+        self.assertEqual((note.values, note.top), (None, []))
+        self.assertEqual(len(self.index.column('home_game', 'team_id').top), 4)
+
+        links = self.index.link('Compare the Red Sox and the Mets at Fenway in 2004')
+        self.assertEqual([(m.table, m.column, m.value) for m in links], [
+            ('team', 'name', 'Boston Red Sox'), ('team', 'name', 'New York Mets'), ('park', 'park_name', 'Fenway Park')
+        ])
+        # "park" names a table, so it is not a literal.
+        self.assertEqual(self.index.link('Which park had most attendances in 2008?'), [])
+
+        hints = self.index.hints('How many games did the Yankees play?', {'team': ['team_id', 'name'], 'home_game': ['year', 'team_id']})
+        self.assertEqual(hints, "Values: team.name = 'New York Yankees'\nRanges: home_game.year 1990..2008")
+
+    def test_refresh_only_runs_after_writes(self):
+        self.index.refresh()
+        self.assertEqual(self.index.refresh(), [])
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("INSERT INTO team VALUES ('LAN', 'Los Angeles Dodgers', 'Los Angeles')")
+
+        self.assertEqual(sorted(self.index.refresh()), ['home_game', 'park', 'team'])
+        self.assertEqual(self.index.link('dodgers')[0].value, 'Los Angeles Dodgers')
+
+        # Updates keep the row count and rowids but are still picked up.
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("UPDATE park SET park_name = 'Wrigley Field' WHERE park_id = 'BOS07'")
+        self.assertIn('park', self.index.refresh())
+        self.assertEqual(self.index.link('wrigley')[0].value, 'Wrigley Field')
+
+        # A restart starts from the saved build and finds nothing to redo.
+        restarted = self._index()
+        self.assertEqual(restarted.link('dodgers')[0].value, 'Los Angeles Dodgers')
+        self.assertEqual(restarted.refresh(), [])
+
+    def test_background_build(self):
+        self.index.start(interval=0)
+
+        self.assertTrue(self.index.built.wait(10))
+        self.assertIsNone(self.index.last_error)
+        self.assertEqual(self.index.link('cincinnati reds')[0].value, 'Cincinnati Reds')
+
+    def test_tables_over_the_time_budget_are_skipped(self):
+        self.index.refresh()
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("INSERT INTO team VALUES ('LAN', 'Los Angeles Dodgers', 'Los Angeles')")
+
+        with patch('src.config.Config.VALUE_INDEX_TABLE_TIMEOUT', 1e-9):
+            self.assertEqual(self.index.refresh(), [])
+        # The previous statistics stay until a refresh gets through.
+        self.assertEqual(self.index.link('dodgers'), [])
+        self.assertEqual(self.index.link('cincinnati reds')[0].value, 'Cincinnati Reds')
+        self.assertIn('team', self.index.refresh())
+
+    def test_close_does_not_wait_for_a_stuck_build(self):
+        entered, release = threading.Event(), threading.Event()
+
+        def stuck(*args):
+            entered.set()
+            release.wait(10)
+            raise RuntimeError('released')
+
+        with patch('src.column_stats.collect_table_stats', side_effect=stuck):
+            self.index.start(interval=0)
+            self.assertTrue(entered.wait(10))
+            started = time.monotonic()
+            self.index.close(timeout=0.1)
+            self.assertLess(time.monotonic() - started, 2)
+            release.set()
+            self.assertTrue(self.index.built.wait(10))
+
+if __name__ == '__main__':
+    unittest.main()
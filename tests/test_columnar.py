@@ -0,0 +1,79 @@
+import os
+import pickle
+import sqlite3
+import tempfile
+import unittest
+from datetime import date
+from decimal import Decimal
+import numpy as np
+from src.columnar import ColumnarBuilder, ColumnarResult
+from src.pool import close_all_pools
+from src.tools import ExecuteSQLQuery
+
+class TestColumnarResult(unittest.TestCase):
+    def test_numeric_columns_are_packed_with_null_masks(self):
+        builder = ColumnarBuilder(['id', 'score', 'name'])
+        builder.append([(1, 10, 'a'), (2, None, 'b')])
+        builder.append([(3, 2.5, None)])
+        table = builder.build()
+
+        self.assertEqual(table.column('id').dtype, np.int64)
+        self.assertEqual(table.column('score').dtype, np.float64)
+        self.assertEqual(table.null_mask('score').tolist(), [False, True, False])
+        self.assertIsNone(table.null_mask('id'))
+        self.assertEqual(table.rows(), [(1, 10.0, 'a'), (2, None, 'b'), (3, 2.5, None)])
+        self.assertEqual(len(table), 3)
+
+    def test_bytes_round_trip_keeps_values_and_types(self):
+        rows = [(1, 0.5, True, 'é', date(2024, 1, 31), Decimal('1.10'), [1, 2], 2 ** 70),
+                (None, None, None, None, None, None, None, None),
+                (-300, 2.0, False, '', date(2024, 2, 29), Decimal('-3'), [], 1)]
+        table = ColumnarResult.from_rows(list('abcdefgh'), rows)
+
+        restored = ColumnarResult.from_bytes(table.to_bytes())
+        self.assertEqual(restored.rows(), table.rows())
+        self.assertEqual(restored.types, table.types)
+        self.assertEqual(restored.column('a').dtype, np.int64)
+        self.assertEqual(pickle.loads(pickle.dumps(table)).rows(), table.rows())
+
+    def test_serialized_numeric_columns_are_not_copied(self):
+        table = ColumnarResult.from_rows(['x', 'small'], [(float(i), i % 100) for i in range(1000)])
+        payload = table.to_bytes()
+
+        restored = ColumnarResult.from_bytes(payload)
+        self.assertTrue(np.shares_memory(restored.column('x'), np.frombuffer(payload, dtype=np.uint8)))
+        self.assertLess(len(payload), 1000 * (8 + 8))
+        self.assertTrue(np.shares_memory(table.to_pandas()['x'].to_numpy(), table.column('x')))
+
+class TestColumnarQueries(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, 'metrics.sqlite')
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("CREATE TABLE metrics (id INTEGER, value REAL, label TEXT)")
+            conn.executemany("INSERT INTO metrics VALUES (?, ?, ?)", [(i, i / 4, None if i % 5 else f"l{i}") for i in range(2000)])
+        self.tool = ExecuteSQLQuery()
+
+    def tearDown(self):
+        close_all_pools()
+        self.temp_dir.cleanup()
+
+    def test_columnar_result_matches_rows_and_caps(self):
+        query = {'sql': 'SELECT id, value, label FROM metrics'}
+        rows = self.tool._run(query, db_path=self.db_path, max_rows=1500)
+        columnar = self.tool._run(query, db_path=self.db_path, max_rows=1500, result_format='columnar')
+
+        self.assertEqual(columnar['status'], 'success')
+        self.assertIsInstance(columnar['data'], ColumnarResult)
+        self.assertEqual(columnar['data'].rows(), rows['data'])
+        self.assertEqual(columnar['columns'], ['id', 'value', 'label'])
+        self.assertTrue(columnar['truncated'])
+        self.assertEqual(columnar['total_rows_estimate'], 2000)
+        self.assertLess(columnar['data'].nbytes, 1500 * 50)
+
+    def test_unknown_result_format_is_an_error(self):
+        result = self.tool._run({'sql': 'SELECT 1'}, db_path=self.db_path, result_format='arrow')
+        self.assertEqual(result['status'], 'error')
+
+if __name__ == '__main__':
+    unittest.main()
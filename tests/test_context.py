@@ -0,0 +1,101 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from src.columnar import ColumnarResult
+from src.context import estimate_tokens, render_schema, summarize_result
+from src.pool import close_all_pools
+from src.schema import ColumnInfo, ForeignKey, SchemaModel, TableInfo
+from src.tools import ExecuteSQLQuery
+from src.tracing import tracer
+
+class TestRenderSchema(unittest.TestCase):
+    def setUp(self):
+        columns = [ColumnInfo(name='id', data_type='INTEGER', primary_key=True)] + [
+            ColumnInfo(name=f"attr_{i}", data_type='character varying(20)') for i in range(30)
+        ] + [ColumnInfo(name='team_id', data_type='integer')]
+        self.schema = SchemaModel(tables={
+            'player': TableInfo(name='player', columns=columns, foreign_keys=[ForeignKey(columns=['team_id'], ref_table='team', ref_columns=['id'])]),
+            'team': TableInfo(name='team', columns=[ColumnInfo(name='id', data_type='integer', primary_key=True), ColumnInfo(name='name', data_type='text')])
+        })
+        self.column_map = self.schema.to_column_map()
+
+    def test_small_schema_is_rendered_in_full(self):
+        text = render_schema({'team': ['id', 'name']}, ['player.team_id = team.id'], self.schema, max_tokens=100, with_types=True)
+
+        self.assertEqual(text, "team(id int, name text)\nJoins: player.team_id = team.id")
+
+    def test_wide_tables_keep_key_columns_within_budget(self):
+        text = render_schema(self.column_map, self.schema.relationships(), self.schema, max_tokens=60)
+
+        self.assertLessEqual(estimate_tokens(text), 60)
+        player = text.splitlines()[0]
+        self.assertTrue(player.startswith('player(id, '))
+        self.assertIn('team_id', player)
+        self.assertRegex(player, r'\+\d+ more\)$')
+        self.assertIn('team(id, name)', text)
+
+    def test_tiny_budget_lists_table_names(self):
+        many = {f"table_{i}": ['id'] for i in range(100)}
+
+        text = render_schema(many, max_tokens=20)
+        self.assertTrue(text.startswith('Tables: table_0, table_1'))
+        self.assertRegex(text, r'\(\+\d+ more\)$')
+        self.assertLessEqual(estimate_tokens(text), 20)
+
+class TestSummarizeResult(unittest.TestCase):
+    def setUp(self):
+        self.rows = [(i, f"name {i % 7}", i * 1.5 if i % 10 else None) for i in range(1000)]
+        self.output = {'status': 'success', 'message': 'Query executed successfully', 'data': self.rows,
+                       'columns': ['id', 'name', 'score'], 'truncated': False}
+
+    def test_small_results_are_unchanged(self):
+        small = {**self.output, 'data': self.rows[:3]}
+        self.assertIs(summarize_result(small, max_tokens=500), small)
+
+    def test_large_results_become_sample_and_statistics(self):
+        compact = summarize_result(self.output, max_tokens=400, sample_rows=20)
+
+        self.assertLessEqual(estimate_tokens(compact), 400)
+        self.assertEqual(compact['row_count'], 1000)
+        self.assertEqual(compact['data'], self.rows[:len(compact['data'])])
+        self.assertGreater(len(compact['data']), 0)
+        self.assertEqual(compact['summary']['id'], {'min': 0, 'max': 999, 'mean': 499.5, 'nulls': 0})
+        self.assertEqual(compact['summary']['score']['nulls'], 100)
+        self.assertEqual(compact['summary']['name']['distinct'], 7)
+        self.assertIn('summarized for context: 1000 rows', compact['message'])
+        self.assertIs(self.output['data'], self.rows)
+        self.assertIn('crewai_context_tokens_total{form="compact",kind="result"}', tracer.prometheus())
+
+    def test_columnar_results_are_summarized(self):
+        columnar = {**self.output, 'data': ColumnarResult.from_rows(self.output['columns'], self.rows)}
+
+        compact = summarize_result(columnar, max_tokens=400)
+        self.assertEqual(compact['summary'], summarize_result(self.output, max_tokens=400)['summary'])
+
+class TestAgentSQLTool(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, 'wide.sqlite')
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("CREATE TABLE events (id INTEGER, kind TEXT)")
+            conn.executemany("INSERT INTO events VALUES (?, ?)", [(i, 'click' if i % 3 else 'view') for i in range(500)])
+
+    def tearDown(self):
+        close_all_pools()
+        self.temp_dir.cleanup()
+
+    def test_only_the_agent_tool_summarizes(self):
+        query = {'sql': 'SELECT id, kind FROM events'}
+
+        full = ExecuteSQLQuery()._run(query, db_path=self.db_path)
+        agent = ExecuteSQLQuery(max_context_tokens=300)._run(query, db_path=self.db_path)
+
+        self.assertEqual(len(full['data']), 500)
+        self.assertEqual(agent['status'], 'success')
+        self.assertEqual(agent['row_count'], 500)
+        self.assertLessEqual(estimate_tokens(agent), 300)
+        self.assertEqual(agent['summary']['kind']['top'][0], ['click', 333])
+
+if __name__ == '__main__':
+    unittest.main()
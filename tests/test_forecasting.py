@@ -0,0 +1,136 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+from src.config import Config
+from src.forecasting import ForecastCache, ForecastError, fit_forecast, forecast, forecast_many, series_sql, shutdown_forecast_pool, _process_pool
+from src.pool import close_all_pools
+from src.tools import ForecastTimeSeries
+
+class TestSeriesSQL(unittest.TestCase):
+    def test_grouping_and_bucketing_are_pushed_down(self):
+        sql = series_sql('sales', 'sold_at', 'amount', 'sum', group_by='region', bucket='month')
+
+        self.assertIn("region AS series", sql)
+        self.assertIn("strftime('%Y-%m-01', sold_at) AS period", sql)
+        self.assertIn("sum(amount) AS value", sql)
+        self.assertTrue(sql.endswith("GROUP BY 1, 2 ORDER BY 1, 2"))
+        self.assertIn("date_trunc('month', sold_at)::date", series_sql('sales', 'sold_at', 'amount', bucket='month', db_type='postgres'))
+
+    def test_rejects_unsafe_input(self):
+        with self.assertRaises(ForecastError):
+            series_sql('sales; DROP TABLE sales', 'sold_at', 'amount')
+        with self.assertRaises(ForecastError):
+            series_sql('sales', 'sold_at', 'amount', aggregate='median')
+        with self.assertRaises(ValueError):
+            series_sql('sales', 'sold_at', 'amount', where="1=1; DELETE FROM sales")
+        for where in ("region IN (SELECT name FROM users)", "1=1) UNION SELECT 1, 2 FROM users WHERE (1=1", "1=1) OR (1=1"):
+            with self.assertRaises(ForecastError):
+                series_sql('sales', 'sold_at', 'amount', where=where)
+        self.assertIn("(region IN ('north', 'select;'))", series_sql('sales', 'sold_at', 'amount', where="region IN ('north', 'select;')"))
+
+class TestFitForecast(unittest.TestCase):
+    def test_linear_trend_is_extrapolated(self):
+        result = fit_forecast(list(range(2000, 2012)), [10.0 + 3 * i for i in range(12)], horizon=3, model='linear')
+
+        self.assertEqual([point['time'] for point in result['forecast']], [2012, 2013, 2014])
+        self.assertEqual([point['value'] for point in result['forecast']], [46.0, 49.0, 52.0])
+        self.assertAlmostEqual(result['params']['slope'], 3.0)
+
+    def test_auto_model_follows_a_noisy_trend(self):
+        values = [100 + 5 * i + (3 if i % 2 else -3) for i in range(24)]
+        result = fit_forecast(list(range(24)), values, horizon=4)
+
+        self.assertIn(result['model'], ('ets', 'arima', 'linear'))
+        for step, point in enumerate(result['forecast'], start=24):
+            self.assertAlmostEqual(point['value'], 100 + 5 * step, delta=10)
+            self.assertLessEqual(point['lower'], point['value'])
+            self.assertGreaterEqual(point['upper'], point['value'])
+
+    def test_short_series_fall_back_and_dates_keep_their_frequency(self):
+        result = fit_forecast(['2024-01-01', '2024-02-01'], [1.0, 2.0], horizon=2, model='arima', frequency='MS')
+
+        self.assertEqual(result['model'], 'linear')
+        self.assertEqual([point['time'] for point in result['forecast']], ['2024-03-01', '2024-04-01'])
+        with self.assertRaises(ForecastError):
+            fit_forecast([1, 2], [1.0, 2.0], horizon=2, model='magic')
+
+class TestForecast(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, 'sales.sqlite')
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("CREATE TABLE sales (region TEXT, sold_at TEXT, amount REAL)")
+            conn.executemany(
+                "INSERT INTO sales VALUES (?, ?, ?)",
+                [(region, f"2023-{month:02d}-{day:02d}", base + month)
+                 for region, base in (('north', 100), ('south', 50))
+                 for month in range(1, 13) for day in (5, 20)]
+            )
+
+    def tearDown(self):
+        close_all_pools()
+        shutdown_forecast_pool()
+        self.temp_dir.cleanup()
+
+    def test_one_forecast_per_group_and_cached_until_data_changes(self):
+        cache = ForecastCache()
+        kwargs = dict(group_by='region', bucket='month', horizon=2, db_path=self.db_path, cache=cache)
+
+        first = forecast('sales', 'sold_at', 'amount', **kwargs)
+        self.assertFalse(first['cached'])
+        self.assertEqual([item['series'] for item in first['forecasts']], ['north', 'south'])
+        self.assertEqual([point['time'] for point in first['forecasts'][0]['forecast']], ['2024-01-01', '2024-02-01'])
+        self.assertTrue(forecast('sales', 'sold_at', 'amount', **kwargs)['cached'])
+
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("INSERT INTO sales VALUES ('south', '2023-12-28', 1.0)")
+        hits = cache.stats()['hits']
+        changed = forecast('sales', 'sold_at', 'amount', **kwargs)
+
+        self.assertFalse(changed['cached'])
+        # Only the south series moved; north's fit is reused.
+        self.assertEqual(cache.stats()['hits'], hits + 1)
+        self.assertEqual(changed['forecasts'][0], first['forecasts'][0])
+        self.assertNotEqual(changed['forecasts'][1], first['forecasts'][1])
+
+    def test_changing_a_result_leaves_the_cache_intact(self):
+        cache = ForecastCache()
+        first = forecast('sales', 'sold_at', 'amount', bucket='month', horizon=2, db_path=self.db_path, cache=cache)
+        expected = [dict(point) for point in first['forecasts'][0]['forecast']]
+        first['forecasts'][0]['forecast'].clear()
+        first['forecasts'].append({'series': 'junk'})
+
+        again = forecast('sales', 'sold_at', 'amount', bucket='month', horizon=2, db_path=self.db_path, cache=cache)
+        self.assertTrue(again['cached'])
+        self.assertEqual(len(again['forecasts']), 1)
+        self.assertEqual(again['forecasts'][0]['forecast'], expected)
+
+    def test_process_pool_matches_serial_fits(self):
+        series = {name: (list(range(20)), [float(i * step) for i in range(20)]) for name, step in (('a', 1), ('b', 2), ('c', 3))}
+
+        with patch.object(Config, 'FORECAST_PARALLEL_MIN_SERIES', 2):
+            parallel = forecast_many(series, horizon=3, model='ets', workers=2)
+        self.assertEqual(parallel, forecast_many(series, horizon=3, model='ets', workers=1))
+
+    def test_other_worker_count_leaves_running_pool_usable(self):
+        series = {name: (list(range(20)), [float(i * step) for i in range(20)]) for name, step in (('a', 1), ('b', 2))}
+        pool = _process_pool(2)
+
+        with patch.object(Config, 'FORECAST_PARALLEL_MIN_SERIES', 2):
+            forecast_many(series, horizon=3, model='ets', workers=3)
+        # A thread still mapping over the 2-worker pool must not find it shut down.
+        self.assertEqual(list(pool.map(abs, [-1, -2])), [1, 2])
+        self.assertIs(_process_pool(2), pool)
+
+    def test_tool_reports_invalid_requests(self):
+        tool = ForecastTimeSeries(db_path=self.db_path)
+
+        result = tool._run('sales', 'sold_at', 'amount', model='magic')
+        self.assertEqual(result['status'], 'error')
+        self.assertIn('magic', result['message'])
+        self.assertEqual(tool._run('sales', 'sold_at', 'amount', bucket='month', horizon=1)['status'], 'success')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+from src.governor import CancelToken, QueryCancelled, QueryGovernor, QueryTimeout, cancel_scope, current_cancel_token
+
+SLOW_SQL = 'SELECT count(*) FROM n a, n b, n c'
+
+class TestQueryGovernor(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(fd)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE n (x INTEGER)")
+        self.conn.executemany("INSERT INTO n VALUES (?)", [(i,) for i in range(2000)])
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+        os.remove(self.db_path)
+
+    def test_sqlite_query_is_stopped_at_the_deadline(self):
+        governor = QueryGovernor(timeout=0.2)
+        started = time.monotonic()
+        with self.assertRaises(QueryTimeout):
+            with governor.attach(self.conn, 'sqlite'):
+                self.conn.execute(SLOW_SQL).fetchall()
+
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(governor.stopped, 'timeout')
+        # The progress handler is removed, so the connection is usable again.
+        self.assertEqual(self.conn.execute('SELECT count(*) FROM n').fetchone(), (2000,))
+
+    def test_cancel_token_interrupts_running_query(self):
+        token = CancelToken()
+        threading.Timer(0.1, token.cancel).start()
+        with self.assertRaises(QueryCancelled):
+            with QueryGovernor(timeout=0, cancel_token=token).attach(self.conn, 'sqlite'):
+                self.conn.execute(SLOW_SQL).fetchall()
+
+    def test_check_is_a_cooperative_checkpoint(self):
+        token = CancelToken()
+        governor = QueryGovernor(timeout=0, cancel_token=token)
+        governor.check()
+        token.cancel()
+        with self.assertRaises(QueryCancelled):
+            governor.check()
+
+    def test_cancel_scope_sets_the_default_token(self):
+        token = CancelToken()
+        with cancel_scope(token):
+            self.assertIs(QueryGovernor().cancel_token, token)
+        self.assertIsNone(current_cancel_token())
+
+    def test_postgres_timeout_is_transaction_local(self):
+        conn = MagicMock()
+        with QueryGovernor(timeout=5).attach(conn, 'postgres'):
+            pass
+
+        sql, params = conn.execute.call_args.args
+        self.assertIn("set_config('statement_timeout', %s, true)", sql)
+        self.assertLessEqual(int(params[0]), 5000)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+from src.knowledge_sources import DatabaseKnowledgeSource
+from src.pool import attach_databases, close_all_pools
+from src.tools import ExecuteSQLQuery
+
+class TestDatabaseKnowledgeSource(unittest.TestCase):
+    def setUp(self):
+        close_all_pools()
+        fd, self.db_path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(fd)
+        self.cache_dir = tempfile.mkdtemp()
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript("""
+            CREATE TABLE park (park_id TEXT PRIMARY KEY, park_name TEXT NOT NULL, city TEXT);
+            CREATE TABLE season (year INTEGER, league TEXT, PRIMARY KEY (year, league));
+            CREATE TABLE home_game (
+                year INTEGER,
+                league TEXT,
+                park_id TEXT REFERENCES park,
+                attendance INTEGER DEFAULT 0,
+                FOREIGN KEY (year, league) REFERENCES season (year, league)
+            );
+            CREATE VIEW big_parks AS SELECT park_id FROM park;
+        """)
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        close_all_pools()
+        os.remove(self.db_path)
+        shutil.rmtree(self.cache_dir)
+
+    def _source(self, **kwargs):
+        return DatabaseKnowledgeSource(db_type='sqlite', db_path=self.db_path, schema_cache_dir=self.cache_dir, **kwargs)
+
+    def test_sqlite_schema_keeps_column_map_format(self):
+        source = self._source()
+        content = source.load_content()
+
+        self.assertEqual(content['Database Schema']['park'], ['park_id', 'park_name', 'city'])
+        self.assertEqual(content['Database Schema']['big_parks'], ['park_id'])
+        self.assertIn('home_game.park_id -> park.park_id', content['Foreign Keys'])
+
+    def test_sqlite_schema_model_has_types_keys_and_foreign_keys(self):
+        source = self._source()
+        source.load_content()
+        model = source.schema_model
+
+        park = model.tables['park']
+        self.assertEqual(park.primary_key, ['park_id'])
+        self.assertFalse(park.column('park_name').nullable)
+        self.assertEqual(park.column('city').data_type, 'TEXT')
+        self.assertEqual(model.tables['season'].primary_key, ['year', 'league'])
+        self.assertEqual(model.tables['big_parks'].kind, 'view')
+
+        home_game = model.tables['home_game']
+        self.assertEqual(home_game.column('attendance').default, '0')
+        foreign_keys = {fk.ref_table: fk for fk in home_game.foreign_keys}
+        self.assertEqual(foreign_keys['season'].columns, ['year', 'league'])
+        self.assertEqual(foreign_keys['season'].ref_columns, ['year', 'league'])
+        # The implicit target column resolves to the referenced primary key.
+        self.assertEqual(foreign_keys['park'].ref_columns, ['park_id'])
+
+    def test_missing_db_path_raises(self):
+        source = DatabaseKnowledgeSource(db_type='sqlite', schema_cache_dir=self.cache_dir)
+        with self.assertRaises(ValueError):
+            source.load_content()
+
+    def test_warm_start_skips_introspection(self):
+        cold = self._source()
+        cold.load_content()
+        self.assertFalse(cold.loaded_from_cache)
+
+        warm = self._source()
+        with patch.object(DatabaseKnowledgeSource, '_fetch_schema', side_effect=AssertionError('introspected')):
+            content = warm.load_content()
+
+        self.assertTrue(warm.loaded_from_cache)
+        self.assertEqual(content['Database Schema']['park'], ['park_id', 'park_name', 'city'])
+        self.assertEqual(warm.schema_model, cold.schema_model)
+
+    def test_schema_change_invalidates_cache(self):
+        self._source().load_content()
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("ALTER TABLE park ADD COLUMN capacity INTEGER")
+        conn.commit()
+        conn.close()
+
+        source = self._source()
+        content = source.load_content()
+
+        self.assertFalse(source.loaded_from_cache)
+        self.assertIn('capacity', content['Database Schema']['park'])
+
+        rebuilt = self._source()
+        rebuilt.load_content()
+        self.assertTrue(rebuilt.loaded_from_cache)
+
+    def test_cache_can_be_disabled(self):
+        self._source().load_content()
+        source = self._source(use_schema_cache=False)
+        source.load_content()
+        self.assertFalse(source.loaded_from_cache)
+
+    def test_refresh_reintrospects_only_changed_tables(self):
+        source = self._source()
+        source.load_content()
+        source.track_changes()
+        self.assertEqual(source.refresh_schema(), [])
+
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executescript("""
+                ALTER TABLE park ADD COLUMN capacity INTEGER;
+                CREATE TABLE team (team_id TEXT PRIMARY KEY, park_id TEXT REFERENCES park);
+                DROP VIEW big_parks;
+            """)
+        fetch = DatabaseKnowledgeSource._fetch_tables
+        with patch.object(DatabaseKnowledgeSource, '_fetch_tables', autospec=True, side_effect=fetch) as fetch_tables:
+            changed = source.refresh_schema()
+
+        self.assertEqual(changed, ['big_parks', 'park', 'team'])
+        # home_game is re-read too, because its foreign key points at park.
+        self.assertEqual(fetch_tables.call_args.args[1], ['home_game', 'park', 'team'])
+        model = source.schema_model
+        self.assertEqual(list(model.tables), ['home_game', 'park', 'season', 'team'])
+        self.assertEqual(model.tables['park'].columns[-1].name, 'capacity')
+        self.assertEqual(model.tables['team'].foreign_keys[0].ref_columns, ['park_id'])
+        self.assertEqual(source.refresh_schema(), [])
+
+        restarted = self._source()
+        restarted.load_content()
+        self.assertTrue(restarted.loaded_from_cache)
+        self.assertEqual(restarted.schema_model, model)
+
+    def test_attached_databases_join_the_schema_and_queries(self):
+        teams_path = os.path.join(self.cache_dir, 'teams.sqlite')
+        with sqlite3.connect(teams_path) as conn:
+            conn.executescript("""
+                CREATE TABLE team (team_id TEXT PRIMARY KEY, park_id TEXT);
+                CREATE TABLE player (player_id TEXT PRIMARY KEY, team_id TEXT REFERENCES team);
+                INSERT INTO team VALUES ('BOS', 'BOS07');
+            """)
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("INSERT INTO park VALUES ('BOS07', 'Fenway Park', 'Boston')")
+        attach_databases(self.db_path, {'teams': teams_path})
+        self.addCleanup(attach_databases, self.db_path, {})
+
+        source = self._source()
+        content = source.load_content()
+
+        self.assertEqual(content['Database Schema']['teams.team'], ['team_id', 'park_id'])
+        self.assertIn('park', content['Database Schema'])
+        self.assertIn('teams.player.team_id -> teams.team.team_id', content['Foreign Keys'])
+        self.assertEqual(source.schema_model.tables['teams.team'].schema_name, 'teams')
+        result = ExecuteSQLQuery()._run(
+            query={'sql': "SELECT p.park_name FROM teams.team AS t JOIN park AS p ON p.park_id = t.park_id"},
+            db_path=self.db_path
+        )
+        self.assertEqual(result['data'], [('Fenway Park',)])
+
+        # The attached file is part of the fingerprint and of incremental refreshes.
+        source.track_changes()
+        with sqlite3.connect(teams_path) as conn:
+            conn.execute("ALTER TABLE team ADD COLUMN league TEXT")
+        self.assertEqual(source.refresh_schema(), ['teams.team'])
+        self.assertEqual(source.schema_model.tables['teams.team'].columns[-1].name, 'league')
+
+        restarted = self._source()
+        restarted.load_content()
+        self.assertTrue(restarted.loaded_from_cache)
+        self.assertEqual(restarted.schema_model, source.schema_model)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,17 @@
+import unittest
+from src.output_parsing import parse_dict_output, extract_sql
+
+class TestOutputParsing(unittest.TestCase):
+    def test_parses_json_and_python_literals(self):
+        self.assertEqual(parse_dict_output('{"response": "sql"}'), {'response': 'sql'})
+        self.assertEqual(parse_dict_output("{'response': None}"), {'response': None})
+        self.assertEqual(parse_dict_output('```json\n{"status": "success"}\n```'), {'status': 'success'})
+        self.assertIsNone(parse_dict_output('no dictionary here'))
+
+    def test_extract_sql(self):
+        self.assertEqual(extract_sql('{"sql": "SELECT 1"}'), 'SELECT 1')
+        self.assertEqual(extract_sql('Here you go:\n```sql\nSELECT name FROM park;\n```'), 'SELECT name FROM park')
+        self.assertIsNone(extract_sql('I cannot answer that.'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,245 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.pool import (
+    AsyncConnectionPool, ConnectionPool, SQLiteConnectionPool, PoolTimeoutError, aclose_all_pools, get_async_pool, get_pool, pool_stats,
+    close_all_pools
+)
+
+class TestConnectionPool(unittest.TestCase):
+    def test_connections_are_reused(self):
+        connect = MagicMock(side_effect=lambda: MagicMock())
+        pool = ConnectionPool(connect, min_size=0, max_size=2)
+
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+
+        self.assertIs(first, second)
+        self.assertEqual(connect.call_count, 1)
+        self.assertEqual(pool.stats()['reused'], 1)
+
+    def test_max_size_blocks_until_timeout(self):
+        pool = ConnectionPool(MagicMock, min_size=0, max_size=1, acquire_timeout=0.05)
+        conn = pool.acquire()
+
+        with self.assertRaises(PoolTimeoutError):
+            pool.acquire()
+
+        pool.release(conn)
+        self.assertIs(pool.acquire(), conn)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_unhealthy_connection_is_replaced(self):
+        broken = MagicMock()
+        broken.execute.side_effect = Exception('server closed the connection')
+        connect = MagicMock(side_effect=[broken, MagicMock()])
+        pool = ConnectionPool(connect, min_size=0, max_size=1, health_check_interval=0)
+
+        with pool.connection():
+            pass
+        with pool.connection() as conn:
+            self.assertIsNot(conn, broken)
+
+        self.assertEqual(pool.stats()['failed_health_checks'], 1)
+
+    def test_idle_connections_are_evicted_down_to_min_size(self):
+        pool = ConnectionPool(MagicMock, min_size=1, max_size=3, idle_timeout=0.01)
+        conns = [pool.acquire() for _ in range(3)]
+        for conn in conns:
+            pool.release(conn)
+
+        time.sleep(0.02)
+        self.assertEqual(pool.evict_idle(), 2)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_slow_connect_does_not_block_other_borrowers(self):
+        connecting, release = threading.Event(), threading.Event()
+
+        def connect():
+            if connect.calls:
+                connecting.set()
+                release.wait(10)
+            connect.calls += 1
+            return MagicMock()
+        connect.calls = 0
+        pool = ConnectionPool(connect, min_size=1, max_size=2, acquire_timeout=0.05)
+        idle = pool.acquire()
+        opener = threading.Thread(target=pool.acquire)
+        opener.start()
+        self.assertTrue(connecting.wait(10))
+
+        # The slot being opened counts toward max_size, but the idle connection is still handed out.
+        pool.release(idle)
+        self.assertIs(pool.acquire(), idle)
+        self.assertEqual(pool.stats()['size'], 2)
+        with self.assertRaises(PoolTimeoutError):
+            pool.acquire()
+
+        release.set()
+        opener.join(10)
+        self.assertEqual(pool.stats()['in_use'], 2)
+
+    def test_failed_connect_frees_its_slot(self):
+        connect = MagicMock(side_effect=[Exception('connection refused'), MagicMock()])
+        pool = ConnectionPool(connect, min_size=0, max_size=1)
+
+        with self.assertRaises(Exception):
+            pool.acquire()
+
+        self.assertEqual(pool.stats()['size'], 0)
+        self.assertIsNotNone(pool.acquire())
+
+
+class TestSQLiteConnectionPool(unittest.TestCase):
+    def setUp(self):
+        close_all_pools()
+        fd, self.db_path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(fd)
+
+    def tearDown(self):
+        close_all_pools()
+        os.remove(self.db_path)
+
+    def test_each_thread_gets_its_own_connection(self):
+        pool = get_pool('sqlite', db_path=self.db_path)
+        seen = []
+        barrier = threading.Barrier(3)
+
+        def worker():
+            with pool.connection() as conn:
+                conn.execute("SELECT 1")
+                seen.append(id(conn))
+                barrier.wait()
+
+        threads = [threading.Thread(target=worker) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertIsInstance(pool, SQLiteConnectionPool)
+        self.assertEqual(len(set(seen)), 3)
+        # Connections of finished threads are released on the next maintenance pass.
+        pool.evict_idle()
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_same_thread_reuses_connection(self):
+        pool = get_pool('sqlite', db_path=self.db_path)
+        with pool.connection() as first:
+            first.execute("CREATE TABLE t (x INTEGER)")
+            first.commit()
+        with pool.connection() as second:
+            self.assertEqual(second.execute("SELECT count(*) FROM t").fetchone(), (0,))
+
+        self.assertIs(first, second)
+        self.assertIs(get_pool('sqlite', db_path=self.db_path), pool)
+        self.assertEqual(pool_stats()[f"sqlite:{self.db_path}"]['connections_created'], 1)
+
+    def test_dead_threads_are_swept_only_when_due_or_full(self):
+        pool = SQLiteConnectionPool(lambda: sqlite3.connect(self.db_path, check_same_thread=False), max_size=1,
+                                    health_check_interval=60)
+        finished = threading.Thread(target=lambda: pool.release(pool.acquire()))
+        finished.start()
+        finished.join()
+
+        # The pool is full of a finished thread's connection: this thread's acquire reclaims the slot.
+        with pool.connection():
+            pass
+        with patch('src.pool.threading.enumerate') as enumerate_threads, pool.connection():
+            enumerate_threads.assert_not_called()
+        self.assertEqual(pool.stats()['connections_created'], 2)
+
+class TestAsyncConnectionPool(unittest.TestCase):
+    def test_waiters_get_released_connections(self):
+        async def scenario():
+            connect = AsyncMock(side_effect=lambda: AsyncMock())
+            pool = AsyncConnectionPool(connect, min_size=0, max_size=2)
+            active = []
+            peak = 0
+
+            async def borrow():
+                nonlocal peak
+                async with pool.connection() as conn:
+                    active.append(conn)
+                    peak = max(peak, len(active))
+                    await asyncio.sleep(0.01)
+                    active.remove(conn)
+
+            await asyncio.gather(*(borrow() for _ in range(6)))
+            return connect.call_count, peak, pool.stats()
+
+        created, peak, stats = asyncio.run(scenario())
+
+        self.assertEqual(created, 2)
+        self.assertEqual(peak, 2)
+        self.assertEqual(stats['acquired'], 6)
+        self.assertGreater(stats['waits'], 0)
+
+    def test_acquire_times_out(self):
+        async def scenario():
+            pool = AsyncConnectionPool(AsyncMock(side_effect=lambda: AsyncMock()), min_size=0, max_size=1, acquire_timeout=0.05)
+            await pool.acquire()
+            with self.assertRaises(PoolTimeoutError):
+                await pool.acquire()
+
+        asyncio.run(scenario())
+
+class TestAsyncPoolRegistry(unittest.TestCase):
+    def setUp(self):
+        self.connections = []
+        driver = MagicMock()
+        driver.AsyncConnection.connect = AsyncMock(side_effect=lambda conn_string: self.connections.append(AsyncMock()) or self.connections[-1])
+        patcher = patch('src.pool.load_driver', return_value=driver)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(close_all_pools)
+
+    async def _borrow(self, close: bool = False):
+        async with get_async_pool('host=db').connection():
+            pass
+        pool = get_async_pool('host=db')
+        if close:
+            await aclose_all_pools()
+        return pool
+
+    def _async_stats(self):
+        return [key for key in pool_stats() if key.startswith('postgres-async:')]
+
+    def test_each_loop_gets_its_own_pool_until_closed(self):
+        first = asyncio.run(self._borrow(close=True))
+        second = asyncio.run(self._borrow(close=True))
+
+        self.assertIsNot(first, second)
+        self.assertEqual(len(self.connections), 2)
+        for conn in self.connections:
+            conn.close.assert_awaited_once()
+        self.assertEqual(self._async_stats(), [])
+
+    def test_pools_of_ended_loops_are_forgotten(self):
+        asyncio.run(self._borrow())
+        self.assertEqual(len(self._async_stats()), 1)
+
+        asyncio.run(self._borrow(close=True))
+
+        self.assertEqual(self._async_stats(), [])
+
+    def test_close_all_pools_closes_pools_of_idle_loops(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        loop.run_until_complete(self._borrow())
+        self.assertEqual(len(self._async_stats()), 1)
+
+        close_all_pools()
+
+        self.connections[0].close.assert_awaited_once()
+        self.assertEqual(self._async_stats(), [])
+
+if __name__ == '__main__':
+    unittest.main()
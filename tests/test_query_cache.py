@@ -0,0 +1,61 @@
+import os
+import tempfile
+import time
+import unittest
+from src.query_cache import QueryCache, normalize_query
+
+class TestQueryCache(unittest.TestCase):
+    def test_normalize_query(self):
+        self.assertEqual(
+            normalize_query('  Which park had MOST   attendances in 2008?? '),
+            'which park had most attendances in 2008'
+        )
+
+    def test_hit_and_miss_counters(self):
+        cache = QueryCache(max_entries=10, ttl=60, path='')
+        self.assertIsNone(cache.get('Which park?', 'db:1'))
+
+        cache.put('Which park?', 'SELECT 1', 'db:1')
+
+        self.assertEqual(cache.get('which park', 'db:1'), 'SELECT 1')
+        self.assertIsNone(cache.get('which park', 'db:2'))
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+
+    def test_lru_eviction(self):
+        cache = QueryCache(max_entries=2, ttl=60, path='')
+        cache.put('a', 'SELECT 1')
+        cache.put('b', 'SELECT 2')
+        cache.get('a')
+        cache.put('c', 'SELECT 3')
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 'SELECT 1')
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_ttl_expiry(self):
+        cache = QueryCache(max_entries=10, ttl=0.01, path='')
+        cache.put('a', 'SELECT 1')
+        time.sleep(0.02)
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['expirations'], 1)
+
+    def test_sqlite_backend_survives_restart(self):
+        fd, path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(fd)
+        try:
+            first = QueryCache(max_entries=10, ttl=60, path=path)
+            first.put('Which park?', 'SELECT park_name FROM park', 'db:1')
+            first.close()
+
+            second = QueryCache(max_entries=10, ttl=60, path=path)
+            self.assertEqual(second.get('which park', 'db:1'), 'SELECT park_name FROM park')
+            second.invalidate('which park', 'db:1')
+            self.assertIsNone(second.get('which park', 'db:1'))
+            second.close()
+        finally:
+            os.remove(path)
+
+if __name__ == '__main__':
+    unittest.main()
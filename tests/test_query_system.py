@@ -0,0 +1,309 @@
+import asyncio
+import io
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import MagicMock, patch
+from main import CrewAIQuerySystem
+from src.pool import close_all_pools
+from src.tracing import tracer
+
+class TestCrewAIQuerySystem(unittest.TestCase):
+    def setUp(self):
+        close_all_pools()
+        fd, self.db_path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(fd)
+        self.cache_dir = tempfile.mkdtemp()
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript("""
+            CREATE TABLE park (park_id TEXT PRIMARY KEY, park_name TEXT);
+            CREATE TABLE home_game (year INTEGER, park_id TEXT REFERENCES park, attendance INTEGER);
+            INSERT INTO park VALUES ('BOS07', 'Fenway Park'), ('NYC21', 'Yankee Stadium');
+            INSERT INTO home_game VALUES (2008, 'BOS07', 3048250), (2008, 'NYC21', 4298655);
+        """)
+        conn.commit()
+        conn.close()
+        self.db_config = {'db_type': 'sqlite', 'db_path': self.db_path, 'conn_string': None}
+        for name, value in (('SCHEMA_CACHE_DIR', self.cache_dir), ('VALUE_INDEX_ENABLED', False), ('SCHEMA_WATCH_INTERVAL', 0)):
+            patcher = patch(f'src.config.Config.{name}', value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        close_all_pools()
+        os.remove(self.db_path)
+        shutil.rmtree(self.cache_dir)
+
+    def _system(self, **kwargs):
+        system = CrewAIQuerySystem(**kwargs)
+        system.setup_database(**self.db_config)
+        return system
+
+    def test_repeated_question_skips_crews(self):
+        system = self._system(use_query_cache=True)
+        system.query_cache.put(
+            'Which park had most attendances in 2008?',
+            "SELECT p.park_name FROM home_game h JOIN park p USING (park_id) WHERE h.year = 2008 ORDER BY h.attendance DESC LIMIT 1",
+            system.cache_namespace()
+        )
+        system.crews = {'router': MagicMock(), 'sql': MagicMock()}
+
+        result = system.process_query('which park had most attendances in 2008', **self.db_config)
+
+        self.assertTrue(result['cached'])
+        self.assertEqual(result['data'], [('Yankee Stadium',)])
+        system.crews['router'].kickoff.assert_not_called()
+
+    def test_successful_sql_crew_result_is_cached(self):
+        system = self._system(use_query_cache=True)
+        system.tasks = {'generate_sql': MagicMock(), 'generate_sql_direct': MagicMock()}
+        system.tasks['generate_sql_direct'].output.raw = '{"sql": "SELECT count(*) FROM park"}'
+
+        system.remember_sql('How many parks?', 'sql_direct', "{'status': 'success', 'message': 'ok', 'data': [(2,)]}")
+
+        self.assertEqual(system.query_cache.get('how many parks', system.cache_namespace()), 'SELECT count(*) FROM park')
+
+    def test_schema_index_selects_direct_crew(self):
+        system = self._system(prune_schema=True, use_query_cache=False)
+
+        crew_name, schema = system.select_schema('Which park had most attendances in 2008?')
+
+        self.assertEqual(crew_name, 'sql_direct')
+        self.assertIn('home_game(year, park_id, attendance)', schema)
+
+    def test_full_schema_views_fit_context_budget(self):
+        system = self._system(prune_schema=False, use_query_cache=False)
+
+        with patch('src.config.Config.CONTEXT_SCHEMA_MAX_TOKENS', 14):
+            crew_name, inputs = system.schema_inputs('Which park had most attendances in 2008?')
+
+        self.assertEqual(crew_name, 'sql')
+        self.assertEqual(inputs['tables'], 'home_game(park_id, +2 more)\npark(park_id, +1 more)')
+        self.assertNotIn('Joins:', inputs['schema'])
+
+    def test_schema_view_carries_linked_values(self):
+        with patch('src.config.Config.VALUE_INDEX_ENABLED', True):
+            system = self._system(prune_schema=True, use_query_cache=False)
+        self.assertTrue(system.column_stats.built.wait(10))
+        system.close()
+
+        crew_name, schema = system.select_schema('What was the attendance at Fenway in 2008?')
+
+        self.assertIn("Values: park.park_name = 'Fenway Park'", schema)
+        self.assertIn('Ranges: home_game.year 2008..2008', schema)
+
+    def test_schema_changes_reach_running_system(self):
+        with patch('src.config.Config.SCHEMA_WATCH_INTERVAL', 3600):
+            system = self._system(prune_schema=True, use_query_cache=False)
+        self.addCleanup(system.close)
+        namespace = system.cache_namespace()
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("CREATE TABLE umpire (umpire_id TEXT PRIMARY KEY, umpire_name TEXT, park_id TEXT REFERENCES park)")
+
+        tracer.enable()
+        self.addCleanup(tracer.disable)
+        with redirect_stdout(io.StringIO()) as stdout:
+            self.assertEqual(system.schema_watcher.poll(), ['umpire'])
+        # The watcher thread reports through the tracer, not stdout.
+        self.assertEqual(stdout.getvalue(), '')
+        self.assertIn('stage="schema_apply"', tracer.metrics.render())
+
+        crew_name, schema = system.select_schema('List every umpire name')
+        self.assertIn('umpire(umpire_id, umpire_name, park_id)', schema)
+        self.assertIn('umpire', system.schema_info['Database Schema'])
+        self.assertNotEqual(system.cache_namespace(), namespace)
+
+    def test_confident_local_route_skips_router_crew(self):
+        system = self._system(use_query_cache=False)
+        system.crews = {'router': MagicMock()}
+
+        self.assertEqual(system.route_query('Which park had most attendances in 2008?'), 'sql')
+        system.crews['router'].kickoff.assert_not_called()
+        self.assertEqual(system.fast_router.stats()['rules'], 1)
+
+    def test_uncertain_route_falls_back_to_router_crew(self):
+        system = self._system(use_query_cache=False)
+        system.fast_router.uncertainty_threshold = 0.0
+        system.crews = {'router': MagicMock()}
+        system.crews['router'].kickoff.return_value = '{"response": "forecast"}'
+
+        tracer.enable()
+        self.addCleanup(tracer.disable)
+        with redirect_stdout(io.StringIO()) as stdout, tracer.request('test') as trace:
+            self.assertEqual(system.route_query('attendance of parks over time'), 'forecast')
+        # Served requests reach this path, so the router's answer is traced, not printed.
+        self.assertEqual(stdout.getvalue(), '')
+        router = [span for span in trace.spans if span.name == 'router'][0]
+        self.assertEqual(router.attrs['output'], '{"response": "forecast"}')
+        self.assertEqual(system.fast_router.stats()['llm'], 1)
+
+    def test_sql_branch_runs_while_router_decides(self):
+        system = self._system(prune_schema=False, use_query_cache=True)
+        system.fast_router.uncertainty_threshold = 0.0
+        branch_started = threading.Event()
+
+        def route(inputs):
+            overlapped.append(branch_started.wait(5))
+            return '{"response": "sql"}'
+
+        overlapped = []
+        system.crews = {'router': MagicMock(), 'sql_express': MagicMock()}
+        system.crews['router'].kickoff.side_effect = route
+        system.crews['sql_express'].copy.return_value.kickoff.side_effect = lambda inputs: branch_started.set() or '{"sql": "SELECT count(*) FROM park"}'
+
+        with patch('src.config.Config.SQL_MODE', 'express'):
+            result = system.process_query('Which park had most attendances in 2008?', **self.db_config)
+
+        self.assertEqual(overlapped, [True])
+        self.assertEqual(result['data'], [(2,)])
+        self.assertEqual(system.speculator.stats()['confirmed'], 1)
+        self.assertEqual(system.query_cache.get('Which park had most attendances in 2008?', system.cache_namespace()), 'SELECT count(*) FROM park')
+
+    def test_discarded_sql_branch_leaves_nothing_cached(self):
+        system = self._system(prune_schema=False, use_query_cache=True)
+        system.fast_router.uncertainty_threshold = 0.0
+        system.crews = {'router': MagicMock(), 'sql_express': MagicMock(), 'forecasting': MagicMock()}
+        system.crews['router'].kickoff.return_value = '{"response": "forecast"}'
+        system.crews['sql_express'].copy.return_value.kickoff.return_value = '{"sql": "SELECT count(*) FROM park"}'
+        system.crews['forecasting'].kickoff.return_value = 'forecast answer'
+        branch_crews = system.speculative_crews
+
+        with patch('src.config.Config.SQL_MODE', 'express'), patch('src.tools.ExecuteSQLQuery._run') as execute:
+            result = system.process_query('Which park will have most attendances in 2030?', **self.db_config)
+            system.speculator.close(wait=True)
+
+        self.assertEqual(result, 'forecast answer')
+        # The branch only generated and checked SQL; nothing ran before the router answered.
+        system.crews['sql_express'].copy.return_value.kickoff.assert_called_once()
+        execute.assert_not_called()
+        self.assertIs(system.speculative_crews, branch_crews)
+        self.assertEqual(system.speculator.stats()['discarded'], 1)
+        self.assertIsNone(system.query_cache.get('Which park will have most attendances in 2030?', system.cache_namespace()))
+
+    def test_async_queries_are_bounded_by_semaphore(self):
+        system = self._system(prune_schema=False, use_query_cache=False)
+        running = 0
+        peak = 0
+
+        async def kickoff_async(inputs):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return inputs['query']
+
+        system.crews = {'router': MagicMock(), 'sql': MagicMock()}
+        system.crews['sql'].copy.return_value.kickoff_async = kickoff_async
+
+        async def run_all():
+            questions = [f'Which park had most attendances in {year}?' for year in range(2000, 2010)]
+            return await asyncio.gather(*(system.aprocess_query(q, **self.db_config) for q in questions))
+
+        with patch('src.config.Config.MAX_CONCURRENT_QUERIES', 3):
+            results = asyncio.run(run_all())
+
+        self.assertEqual(results[0], 'Which park had most attendances in 2000?')
+        self.assertEqual(peak, 3)
+        system.crews['router'].kickoff_async.assert_not_called()
+
+    def test_async_cached_question_skips_crews(self):
+        system = self._system(use_query_cache=True)
+        system.query_cache.put('How many parks?', 'SELECT count(*) FROM park', system.cache_namespace())
+        system.crews = {'router': MagicMock()}
+
+        result = asyncio.run(system.aprocess_query('how many parks', **self.db_config))
+
+        self.assertTrue(result['cached'])
+        self.assertEqual(result['data'], [(2,)])
+
+    def test_batch_dedupes_routes_in_bulk_and_keeps_order(self):
+        system = self._system(prune_schema=False, use_query_cache=False)
+        system.fast_router.uncertainty_threshold = 0.0
+        system.fast_router._rules = lambda query: None
+        system.crews = {'router': MagicMock(), 'router_batch': MagicMock(), 'sql': MagicMock(), 'forecasting': MagicMock()}
+        system.crews['router_batch'].kickoff.return_value = '{"1": "sql", "2": "forecast", "3": null}'
+        system.crews['sql'].copy.side_effect = lambda: MagicMock(kickoff=lambda inputs: f"sql:{inputs['query']}")
+        system.crews['forecasting'].copy.side_effect = lambda: MagicMock(kickoff=lambda inputs: f"forecast:{inputs['query']}")
+
+        items = system.process_queries(
+            ['How many parks?', 'Attendance next year', 'how many parks', 'Hello'],
+            max_workers=2, **self.db_config
+        )
+
+        self.assertEqual([item['result'] for item in items[:3]], [
+            'sql:How many parks?', 'forecast:Attendance next year', 'sql:How many parks?'
+        ])
+        self.assertEqual(items[3]['result']['error'], 'Query type not recognized')
+        self.assertEqual([item['duplicate_of'] for item in items], [None, None, 0, None])
+        self.assertTrue(all(item['elapsed'] >= 0 for item in items))
+        system.crews['router_batch'].kickoff.assert_called_once()
+        system.crews['router'].kickoff.assert_not_called()
+        system.crews['sql'].kickoff.assert_not_called()
+
+    def _express_crew(self, *answers):
+        crew = MagicMock()
+        crew.kickoff.side_effect = list(answers)
+        return crew
+
+    def test_express_mode_makes_one_generation_call(self):
+        system = self._system(use_query_cache=True)
+        system.crews = {'router': MagicMock(), 'sql': MagicMock(), 'sql_express': self._express_crew(
+            '{"sql": "SELECT p.park_name FROM home_game h JOIN park p ON h.park_id = p.park_id WHERE h.year = 2008 ORDER BY h.attendance DESC LIMIT 1"}'
+        )}
+
+        result = system.process_query('Which park had most attendances in 2008?', mode='express', **self.db_config)
+
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['data'], [('Yankee Stadium',)])
+        self.assertEqual(result['mode'], 'express')
+        self.assertEqual(system.crews['sql_express'].kickoff.call_count, 1)
+        inputs = system.crews['sql_express'].kickoff.call_args.kwargs['inputs']
+        self.assertIn('home_game(', inputs['schema'])
+        self.assertEqual(inputs['dialect'], 'SQLite')
+        system.crews['sql'].kickoff.assert_not_called()
+        self.assertIsNotNone(system.query_cache.get('which park had most attendances in 2008', system.cache_namespace()))
+
+    def test_express_mode_repairs_sql_that_does_not_compile(self):
+        system = self._system(use_query_cache=False)
+        system.crews = {'router': MagicMock(), 'sql_express': self._express_crew(
+            '{"sql": "SELECT park_name FROM park WHERE park_name = ?"}',
+            '{"sql": "SELECT park_name FROM park ORDER BY park_name"}'
+        )}
+
+        result = system.run_express_sql('List all parks', **self.db_config)
+
+        self.assertEqual(result['data'], [('Fenway Park',), ('Yankee Stadium',)])
+        feedback = system.crews['sql_express'].kickoff.call_args.kwargs['inputs']['feedback']
+        self.assertIn('was rejected', feedback)
+
+    def test_express_mode_reports_unknown_columns_with_suggestion(self):
+        system = self._system(use_query_cache=False)
+        system.crews = {'router': MagicMock(), 'sql_express': self._express_crew(
+            '{"sql": "SELECT name FROM park"}', '{"sql": "SELECT park_name FROM park ORDER BY park_name"}'
+        )}
+
+        result = system.run_express_sql('List all parks', **self.db_config)
+
+        self.assertEqual(result['status'], 'success')
+        feedback = system.crews['sql_express'].kickoff.call_args.kwargs['inputs']['feedback']
+        self.assertIn("Unknown column 'name'. Did you mean 'park_name'?", feedback)
+
+    def test_express_failure_falls_back_to_crew(self):
+        system = self._system(prune_schema=False, use_query_cache=False)
+        system.crews = {'router': MagicMock(), 'sql': MagicMock(), 'sql_express': self._express_crew(
+            '{"sql": "DELETE FROM park"}', 'I cannot help with that'
+        )}
+        system.crews['sql'].kickoff.return_value = 'crew answer'
+
+        result = system.run_route('Remove every park', 'sql', mode='express', **self.db_config)
+
+        self.assertEqual(result, 'crew answer')
+        self.assertEqual(system.crews['sql_express'].kickoff.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from src.pool import attach_databases, close_all_pools
+from src.replicas import ReplicaSet, register_replicas, replicas_for
+from src.tools import ExecuteSQLQuery
+
+class TestReplicaSet(unittest.TestCase):
+    def setUp(self):
+        close_all_pools()
+        self.tmp = tempfile.mkdtemp()
+        # Each copy names itself, so a query shows which node answered it.
+        self.primary, self.replica_a, self.replica_b = (os.path.join(self.tmp, f"{name}.sqlite") for name in ('primary', 'a', 'b'))
+        for path in (self.primary, self.replica_a, self.replica_b):
+            with sqlite3.connect(path) as conn:
+                conn.executescript(f"CREATE TABLE node (name TEXT); INSERT INTO node VALUES ('{os.path.basename(path)}');")
+
+    def tearDown(self):
+        register_replicas('sqlite', self.primary, [])
+        for path in (self.primary, self.replica_a, self.replica_b):
+            attach_databases(path, {})
+        close_all_pools()
+        shutil.rmtree(self.tmp)
+
+    def _read(self, replicas):
+        with replicas.connection() as (target, conn):
+            return conn.execute("SELECT name FROM node").fetchone()[0]
+
+    def test_reads_go_to_least_outstanding_replica(self):
+        replicas = ReplicaSet('sqlite', self.primary, [self.replica_a, self.replica_b])
+
+        with replicas.connection() as (busy, _):
+            self.assertEqual(busy, self.replica_a)
+            # A is still busy, so B gets the next two reads even after it served one.
+            self.assertEqual([self._read(replicas) for _ in range(2)], ['b.sqlite', 'b.sqlite'])
+        # Idle again, A catches up on served reads before they alternate.
+        self.assertEqual([self._read(replicas) for _ in range(3)], ['a.sqlite', 'a.sqlite', 'b.sqlite'])
+
+        stats = replicas.stats()
+        self.assertEqual((stats[self.replica_a]['served'], stats[self.replica_b]['served']), (3, 3))
+        self.assertEqual(stats[self.primary]['served'], 0)
+        self.assertEqual(stats[self.replica_b]['outstanding'], 0)
+
+    def test_failed_replica_is_skipped_until_retry(self):
+        missing = os.path.join(self.tmp, 'missing.sqlite')
+        replicas = ReplicaSet('sqlite', self.primary, [missing, self.replica_a], retry_interval=60)
+
+        self.assertEqual([self._read(replicas) for _ in range(3)], ['a.sqlite'] * 3)
+        stats = replicas.stats()
+        self.assertEqual((stats[missing]['failures'], stats[missing]['healthy']), (1, False))
+        self.assertFalse(os.path.exists(missing))
+
+        os.remove(self.replica_a)
+        close_all_pools()
+        # With every replica down, the primary serves reads.
+        self.assertEqual(self._read(replicas), 'primary.sqlite')
+
+        # Once its retry interval has passed, a replica that is back gets reads again.
+        shutil.copy(self.replica_b, missing)
+        replicas.replicas[0].down_until = 0.0
+        self.assertEqual(self._read(replicas), 'b.sqlite')
+
+    def test_query_failures_bench_the_replica(self):
+        replicas = ReplicaSet('sqlite', self.primary, [self.replica_a, self.replica_b], retry_interval=60)
+
+        with self.assertRaises(sqlite3.OperationalError):
+            with replicas.connection() as (target, conn):
+                self.assertEqual(target, self.replica_a)
+                conn.execute("SELECT * FROM missing_table")
+
+        stats = replicas.stats()
+        self.assertEqual((stats[self.replica_a]['served'], stats[self.replica_a]['failures']), (0, 1))
+        self.assertFalse(stats[self.replica_a]['healthy'])
+        self.assertEqual([self._read(replicas) for _ in range(2)], ['b.sqlite'] * 2)
+
+        # A statement the driver rejects outright says nothing about the node.
+        with self.assertRaises(sqlite3.ProgrammingError):
+            with replicas.connection() as (target, conn):
+                conn.execute("SELECT ?", ())
+        self.assertTrue(replicas.stats()[self.replica_b]['healthy'])
+
+    def test_sql_tool_reads_from_replicas_and_writes_to_primary(self):
+        register_replicas('sqlite', self.primary, [self.replica_a], retry_interval=60)
+        self.assertIsNotNone(replicas_for('sqlite', self.primary))
+        tool = ExecuteSQLQuery()
+
+        read = tool._run(query={'sql': "SELECT name FROM node"}, db_path=self.primary)
+        self.assertEqual(read['data'], [('a.sqlite',)])
+
+        write = tool._run(query={'sql': "INSERT INTO node VALUES ('written')"}, db_path=self.primary)
+        self.assertEqual(write['status'], 'success')
+        with sqlite3.connect(self.primary) as conn:
+            self.assertEqual(conn.execute("SELECT count(*) FROM node").fetchone()[0], 2)
+        with sqlite3.connect(self.replica_a) as conn:
+            self.assertEqual(conn.execute("SELECT count(*) FROM node").fetchone()[0], 1)
+
+    def test_data_modifying_cte_runs_on_primary(self):
+        register_replicas('sqlite', self.primary, [self.replica_a], retry_interval=60)
+
+        result = ExecuteSQLQuery()._run(query={'sql': "WITH d AS (SELECT 1) DELETE FROM node"}, db_path=self.primary)
+
+        self.assertEqual(result['status'], 'success')
+        with sqlite3.connect(self.primary) as conn:
+            self.assertEqual(conn.execute("SELECT count(*) FROM node").fetchone()[0], 0)
+        with sqlite3.connect(self.replica_a) as conn:
+            self.assertEqual(conn.execute("SELECT count(*) FROM node").fetchone()[0], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import gc
+import os
+import sqlite3
+import tempfile
+import unittest
+from src.pool import PooledSQLiteConnection
+from src.result_cache import ResultCache, _sqlite_seen, canonicalize_sql, data_version
+
+class TestResultCache(unittest.TestCase):
+    def test_canonicalize_sql(self):
+        self.assertEqual(
+            canonicalize_sql("SELECT  name\n FROM park -- all parks\n WHERE city = 'New  York';"),
+            "select name from park where city = 'New  York'"
+        )
+        self.assertNotEqual(canonicalize_sql('SELECT "Name" FROM t'), canonicalize_sql('SELECT "name" FROM t'))
+
+    def test_version_change_is_a_miss(self):
+        cache = ResultCache(max_bytes=10000)
+        key = ResultCache.make_key('db', 'SELECT 1')
+        cache.put(key, 1, {'status': 'success', 'message': '', 'data': [(1,)]})
+
+        self.assertIsNotNone(cache.get(ResultCache.make_key('db', 'select 1;'), 1))
+        self.assertIsNone(cache.get(key, 2))
+        self.assertEqual(cache.stats()['stale'], 1)
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_size_aware_eviction(self):
+        cache = ResultCache(max_bytes=3000, max_entry_bytes=2000)
+        big = {'status': 'success', 'message': '', 'data': [('x' * 100,)] * 8}
+        for index in range(5):
+            cache.put(ResultCache.make_key('db', f'SELECT {index}'), 1, big)
+
+        stats = cache.stats()
+        self.assertLessEqual(stats['bytes'], 3000)
+        self.assertGreater(stats['evictions'], 0)
+        self.assertIsNotNone(cache.get(ResultCache.make_key('db', 'SELECT 4'), 1))
+        self.assertIsNone(cache.get(ResultCache.make_key('db', 'SELECT 0'), 1))
+
+    def test_oversized_results_are_not_cached(self):
+        cache = ResultCache(max_bytes=1000, max_entry_bytes=100)
+        stored = cache.put(ResultCache.make_key('db', 'SELECT 1'), 1, {'data': [('x' * 500,)]})
+        self.assertFalse(stored)
+        self.assertEqual(cache.stats()['too_large'], 1)
+
+    def test_data_version_forgets_closed_connections(self):
+        fd, path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        conn = sqlite3.connect(path, factory=PooledSQLiteConnection)
+        writer = sqlite3.connect(path)
+        self.addCleanup(writer.close)
+
+        first = data_version(conn, 'sqlite', 'db', db_path=path)
+        self.assertIn(conn, _sqlite_seen)
+        writer.execute("CREATE TABLE t (x INTEGER)")
+        writer.commit()
+        self.assertNotEqual(data_version(conn, 'sqlite', 'db', db_path=path), first)
+
+        seen = len(_sqlite_seen)
+        conn.close()
+        del conn
+        gc.collect()
+        # A later connection reusing the same id() starts without a stale counter.
+        self.assertEqual(len(_sqlite_seen), seen - 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+from src.router import FastRouter
+
+class TestFastRouter(unittest.TestCase):
+    def setUp(self):
+        self.router = FastRouter(schema_terms={'park', 'attendance', 'team', 'salary'}, uncertainty_threshold=0.2)
+
+    def test_rules_route_clear_queries(self):
+        for query, route in [
+            ('Which park had most attendances in 2008?', 'sql'),
+            ('Show me the top 5 teams by wins last season', 'sql'),
+            ('Forecast attendance for every park next season', 'forecast'),
+            ('What will attendance be in 2099?', 'forecast'),
+            ('Hello there', 'none'),
+        ]:
+            decision = self.router.route(query)
+            self.assertEqual(decision.route, route, query)
+            self.assertEqual(decision.source, 'rules')
+            self.assertTrue(self.router.is_confident(decision))
+
+    def test_model_handles_queries_without_rule_hits(self):
+        decision = self.router.route('How many visitors do we expect next week?')
+
+        self.assertEqual(decision.source, 'model')
+        self.assertEqual(decision.route, 'forecast')
+        self.assertAlmostEqual(sum(decision.probabilities.values()), 1.0)
+
+    def test_none_route_maps_to_none_response(self):
+        self.assertIsNone(self.router.route('Tell me a joke').response)
+
+    def test_fit_adds_examples(self):
+        query = 'stadium crowd evolution'
+        before = self.router.route(query).probabilities['forecast']
+        self.router.fit([('stadium crowd evolution going forward', 'forecast')] * 3)
+        self.assertGreater(self.router.route(query).probabilities['forecast'], before)
+
+    def test_stats_report_path_shares(self):
+        self.router.record('rules', 'sql')
+        self.router.record('rules', 'forecast')
+        self.router.record('llm', None)
+
+        stats = self.router.stats()
+
+        self.assertEqual(stats['total'], 3)
+        self.assertEqual(stats['rules'], 2)
+        self.assertAlmostEqual(stats['llm_share'], 1 / 3)
+        self.assertEqual(stats['route_none'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+from src.schema import SchemaModel, TableInfo, ColumnInfo, ForeignKey
+from src.schema_index import SchemaIndex, tokenize
+
+def _table(name, columns, foreign_keys=None, comment=None):
+    return TableInfo(
+        name=name,
+        columns=[ColumnInfo(name=column, primary_key=(index == 0)) for index, column in enumerate(columns)],
+        foreign_keys=foreign_keys or [],
+        comment=comment
+    )
+
+class TestSchemaIndex(unittest.TestCase):
+    def setUp(self):
+        tables = {
+            'park': _table('park', ['park_id', 'park_name', 'city', 'state']),
+            'home_game': _table('home_game', ['year', 'league_id', 'team_id', 'park_id', 'games', 'attendance'], [
+                ForeignKey(columns=['park_id'], ref_table='park', ref_columns=['park_id']),
+                ForeignKey(columns=['team_id'], ref_table='team', ref_columns=['team_id'])
+            ]),
+            'team': _table('team', ['team_id', 'name', 'wins', 'losses']),
+            'player': _table('player', ['player_id', 'name_first', 'name_last', 'birthYear']),
+            'salary': _table('salary', ['player_id', 'year', 'salary'], comment='Yearly player salaries')
+        }
+        for index in range(50):
+            tables[f'misc_{index}'] = _table(f'misc_{index}', ['id', f'value_{index}'])
+        self.index = SchemaIndex(SchemaModel(tables=tables))
+
+    def test_tokenize_splits_identifiers_and_stems(self):
+        self.assertEqual(tokenize('birthYear'), ['birth', 'year'])
+        self.assertEqual(tokenize('home_game.park_id'), ['home', 'game', 'park', 'id'])
+        self.assertEqual(tokenize('Which parks had most attendances?'), ['park', 'attendance'])
+
+    def test_question_selects_small_relevant_slice(self):
+        match = self.index.search('Which park had most attendances in 2008?')
+
+        self.assertEqual(set(match.table_names), {'home_game', 'park'})
+        self.assertTrue(match.confident)
+        self.assertIn('home_game.park_id = park.park_id', match.relationships)
+        self.assertIn('attendance', match.to_schema_slice()['home_game'])
+
+    def test_comments_are_searchable(self):
+        match = self.index.search('How much are players paid?')
+        self.assertIn('salary', match.table_names)
+
+    def test_unknown_terms_return_empty_unconfident_match(self):
+        match = self.index.search('forecast the weather')
+        self.assertEqual(match.tables, [])
+        self.assertFalse(match.confident)
+
+    def test_wide_tables_keep_matched_and_key_columns(self):
+        wide = _table('events', ['event_id'] + [f'col_{i}' for i in range(40)] + ['attendance'])
+        index = SchemaIndex(SchemaModel(tables={'events': wide}))
+
+        columns = index.search('event attendance', top_k_columns=3).columns['events']
+
+        self.assertIn('attendance', columns)
+        self.assertIn('event_id', columns)
+        self.assertLess(len(columns), 10)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+from unittest.mock import MagicMock, patch
+from main import CrewAIQuerySystem
+from src.governor import current_cancel_token
+from src.pool import close_all_pools
+from src.server import LatencyStats, Overloaded, QueryHTTPServer, QueryServer, RequestQueue
+
+class TestQueryServer(unittest.TestCase):
+    def setUp(self):
+        close_all_pools()
+        fd, self.db_path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(fd)
+        self.cache_dir = tempfile.mkdtemp()
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executescript("""
+                CREATE TABLE park (park_id TEXT PRIMARY KEY, park_name TEXT);
+                CREATE TABLE home_game (year INTEGER, park_id TEXT REFERENCES park, attendance INTEGER);
+                INSERT INTO park VALUES ('BOS07', 'Fenway Park'), ('NYC21', 'Yankee Stadium');
+            """)
+        self.db_config = {'db_type': 'sqlite', 'db_path': self.db_path, 'conn_string': None}
+        for name, value in (('SCHEMA_CACHE_DIR', self.cache_dir), ('VALUE_INDEX_ENABLED', False), ('SCHEMA_WATCH_INTERVAL', 0)):
+            patcher = patch(f'src.config.Config.{name}', value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.system = CrewAIQuerySystem(prune_schema=False, use_query_cache=True)
+        self.system.setup_database(**self.db_config)
+        self.system.query_cache.put('How many parks?', 'SELECT count(*) FROM park', self.system.cache_namespace())
+        self.crew = MagicMock()
+        self.system.crews = {'router': MagicMock(), 'sql': MagicMock()}
+        self.system.crews['sql'].copy.return_value = self.crew
+
+    def tearDown(self):
+        close_all_pools()
+        os.remove(self.db_path)
+        shutil.rmtree(self.cache_dir)
+
+    def _serve(self, **kwargs):
+        app = QueryServer(self.system, self.db_config, **kwargs)
+        app.start()
+        httpd = QueryHTTPServer(('127.0.0.1', 0), app)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        self.addCleanup(app.close, 1)
+        self.addCleanup(httpd.server_close)
+        self.addCleanup(httpd.shutdown)
+        return app, f"http://127.0.0.1:{httpd.server_port}"
+
+    def _call(self, url, body=None):
+        data = None if body is None else json.dumps(body).encode()
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, data=data), timeout=10) as response:
+                return response.status, json.loads(response.read()), response.headers
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read()), e.headers
+
+    def test_lanes_answer_over_http_and_report_latency(self):
+        self.crew.kickoff.return_value = 'crew answer'
+        app, url = self._serve(crew_workers=1)
+
+        status, body, _ = self._call(f"{url}/query", {'query': 'how many parks'})
+        self.assertEqual((status, body['lane'], body['result']['data']), (200, 'cached', [[2]]))
+
+        status, body, _ = self._call(f"{url}/query", {'query': 'Which park had most attendances in 2008?'})
+        self.assertEqual((status, body['lane'], body['result']), (200, 'crew', 'crew answer'))
+
+        status, body, _ = self._call(f"{url}/query", {'question': 'typo'})
+        self.assertEqual(status, 400)
+
+        status, stats, _ = self._call(f"{url}/stats")
+        self.assertEqual(stats['answered'], {'cached': 1, 'crew': 1})
+        self.assertEqual(stats['forwarded'], 1)
+        self.assertEqual(stats['endpoints']['/query']['count'], 3)
+        self.assertEqual(stats['endpoints']['/query']['statuses'], {'200': 2, '400': 1})
+
+    def test_full_crew_lane_sheds_while_cached_lane_answers(self):
+        entered, release = threading.Event(), threading.Event()
+
+        def kickoff(inputs):
+            entered.set()
+            release.wait(10)
+            return inputs['query']
+
+        self.crew.kickoff.side_effect = kickoff
+        app, url = self._serve(crew_workers=1, crew_queue_size=1)
+        answers = []
+        threads = [threading.Thread(target=lambda q=q: answers.append(app.ask(q)['result']))
+                   for q in ('Which park had most attendances in 2007?', 'Which park had most attendances in 2008?')]
+        threads[0].start()
+        self.assertTrue(entered.wait(10))
+        threads[1].start()
+        while app.queue.depths()['crew'] < 1:
+            time.sleep(0.01)
+
+        status, body, headers = self._call(f"{url}/query", {'query': 'Which park had most attendances in 2009?'})
+        self.assertEqual((status, headers['Retry-After']), (503, '1'))
+        # Cheap questions do not wait behind the crews.
+        self.assertEqual(app.ask('How many parks?')['result']['data'], [(2,)])
+
+        release.set()
+        for thread in threads:
+            thread.join(10)
+        self.assertEqual(sorted(answers), ['Which park had most attendances in 2007?', 'Which park had most attendances in 2008?'])
+
+    def test_timed_out_request_is_cancelled(self):
+        tokens = []
+        cancelled = threading.Event()
+
+        def kickoff(inputs):
+            tokens.append(current_cancel_token())
+            tokens[0].on_cancel(cancelled.set)
+            cancelled.wait(10)
+            return 'late'
+
+        self.crew.kickoff.side_effect = kickoff
+        app, url = self._serve(crew_workers=1)
+
+        status, body, _ = self._call(f"{url}/query", {'query': 'Which park had most attendances in 2008?', 'timeout': 0.2})
+
+        self.assertEqual(status, 504)
+        self.assertTrue(tokens[0].cancelled)
+        self.assertEqual(app.stats()['timed_out'], 1)
+
+    def test_latency_percentiles(self):
+        stats = LatencyStats(window=100)
+        for millis in range(1, 101):
+            stats.record('/query', 200, millis / 1000)
+
+        snapshot = stats.snapshot()['/query']
+        self.assertEqual((snapshot['p50'], snapshot['p99'], snapshot['max']), (0.051, 0.1, 0.1))
+
+    def test_request_queue_wakes_full_lanes_and_drains(self):
+        lanes = RequestQueue({'crew': 1})
+        lanes.put('crew', 'first')
+        with self.assertRaises(Overloaded):
+            lanes.put('crew', 'second')
+
+        # A wake-up gets past the bound and ahead of the queued job.
+        lanes.wake('crew')
+        self.assertIsNone(lanes.get('crew'))
+        self.assertEqual(lanes.drain('crew'), ['first'])
+        self.assertEqual(lanes.depths(), {'crew': 0})
+        lanes.put('crew', 'third')
+        self.assertEqual(lanes.get('crew'), 'third')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import threading
+import unittest
+from src.governor import CancelToken, current_cancel_token
+from src.router import RouteDecision
+from src.speculation import Speculator, after_confirmation
+
+class TestSpeculator(unittest.TestCase):
+    def test_policies(self):
+        leaning_sql = RouteDecision('sql', 0.6, 'model', {'sql': 0.6, 'forecast': 0.3, 'none': 0.1})
+        leaning_forecast = RouteDecision('forecast', 0.5, 'model', {'sql': 0.3, 'forecast': 0.5, 'none': 0.2})
+
+        self.assertEqual([Speculator('likely').should_speculate(d) for d in (leaning_sql, leaning_forecast, None)], [True, False, False])
+        self.assertTrue(Speculator('always').should_speculate(leaning_forecast))
+        self.assertFalse(Speculator('off').should_speculate(leaning_sql))
+        with self.assertRaises(ValueError):
+            Speculator('sometimes')
+
+    def test_held_effects_apply_only_when_confirmed(self):
+        speculator = Speculator('always', max_branches=1)
+        self.addCleanup(speculator.close)
+        writes = []
+
+        def branch_work(name):
+            after_confirmation(lambda: writes.append(name))
+            return name
+
+        confirmed = speculator.start(branch_work, 'sql answer')
+        self.assertEqual(confirmed.confirm(), 'sql answer')
+        discarded = speculator.start(branch_work, 'dropped')
+        discarded.future.result()
+        discarded.discard()
+
+        self.assertEqual(writes, ['sql answer'])
+        stats = speculator.stats()
+        self.assertEqual((stats['confirmed'], stats['discarded'], stats['hit_rate']), (1, 1, 0.5))
+
+    def test_request_cancellation_reaches_branch_and_full_slots_skip(self):
+        speculator = Speculator('always', max_branches=1)
+        self.addCleanup(speculator.close)
+        request_token = CancelToken()
+        cancelled = threading.Event()
+
+        def branch_work():
+            current_cancel_token().on_cancel(cancelled.set)
+            return cancelled.wait(10)
+
+        branch = speculator.start(branch_work, cancel_token=request_token)
+        self.assertIsNone(speculator.start(branch_work))
+        request_token.cancel()
+
+        self.assertTrue(branch.future.result(10))
+        self.assertEqual(speculator.stats()['skipped'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
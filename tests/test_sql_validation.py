@@ -0,0 +1,127 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from src.pool import close_all_pools, get_pool
+from src.schema import ColumnInfo, SchemaModel, TableInfo
+from src.sql_validation import (
+    SQLValidationError, check_read_only, cost_gate, dialect_errors, explain_error, schema_errors, sql_guardrail
+)
+
+class TestSQLValidation(unittest.TestCase):
+    def setUp(self):
+        close_all_pools()
+        fd, self.db_path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(fd)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE park (park_id TEXT PRIMARY KEY, park_name TEXT)")
+        conn.execute("CREATE TABLE home_game (park_id TEXT, year INTEGER, attendance INTEGER)")
+        conn.executemany("INSERT INTO home_game VALUES (?, ?, ?)", [('BOS07', 1900 + i, i) for i in range(50)])
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        close_all_pools()
+        os.remove(self.db_path)
+
+    def test_read_only_statements_pass(self):
+        self.assertEqual(check_read_only('SELECT park_name FROM park;'), 'SELECT park_name FROM park')
+        self.assertEqual(check_read_only("WITH p AS (SELECT 'drop; table' AS x) SELECT x FROM p"), "WITH p AS (SELECT 'drop; table' AS x) SELECT x FROM p")
+
+    def test_writes_and_multiple_statements_are_rejected(self):
+        for sql in ('DELETE FROM park', 'SELECT 1; DROP TABLE park', 'WITH d AS (DELETE FROM park RETURNING *) SELECT * FROM d', ''):
+            with self.assertRaises(SQLValidationError):
+                check_read_only(sql)
+
+    def test_write_keywords_only_count_where_a_statement_starts(self):
+        for sql in ('SELECT copy, do FROM t', 'SELECT t.create, call FROM t WHERE do = 1',
+                    'WITH a(x, y) AS (SELECT 1, 2), b AS MATERIALIZED (SELECT 3) SELECT x AS update, do FROM a, b'):
+            self.assertEqual(check_read_only(sql), sql)
+        for sql in ('WITH x AS (SELECT 1) DELETE FROM park', "WITH i AS (INSERT INTO park VALUES (1, 'x') RETURNING *) SELECT * FROM i",
+                    'WITH a AS (SELECT 1), b AS NOT MATERIALIZED (UPDATE park SET park_name = 1 RETURNING 1) SELECT 1',
+                    'SELECT * FROM park FOR UPDATE'):
+            with self.assertRaises(SQLValidationError):
+                check_read_only(sql)
+
+    def test_explain_reports_unknown_columns_without_running(self):
+        self.assertIsNone(explain_error('SELECT park_name FROM park', 'sqlite', db_path=self.db_path))
+        self.assertIn('no such column', explain_error('SELECT attendance FROM park', 'sqlite', db_path=self.db_path))
+
+    def _schema(self):
+        return SchemaModel(tables={
+            'park': TableInfo(name='park', columns=[ColumnInfo(name='park_id', data_type='TEXT'), ColumnInfo(name='park_name', data_type='TEXT')]),
+            'home_game': TableInfo(name='home_game', columns=[
+                ColumnInfo(name='park_id', data_type='TEXT'), ColumnInfo(name='year', data_type='INTEGER'), ColumnInfo(name='attendance', data_type='INTEGER')
+            ])
+        })
+
+    def test_schema_errors_name_unknown_tables_and_columns(self):
+        schema = self._schema()
+        self.assertEqual(schema_errors('SELECT park_nme FROM park', schema), ["Unknown column 'park_nme'. Did you mean 'park_name'?"])
+        self.assertEqual(schema_errors('SELECT * FROM parks', schema), ["Unknown table 'parks'. Did you mean 'park'?"])
+        self.assertEqual(schema_errors('SELECT h.year FROM home_game h JOIN park p ON p.park_id = h.park_idd', schema),
+                         ["Unknown column 'h.park_idd'. Did you mean 'park_id'?"])
+
+    def test_schema_errors_accept_aliases_ctes_and_subqueries(self):
+        schema = self._schema()
+        for sql in (
+            'WITH totals AS (SELECT park_id, SUM(attendance) AS total FROM home_game GROUP BY park_id) '
+            'SELECT p.park_name, t.total FROM totals t JOIN park p ON p.park_id = t.park_id ORDER BY total DESC',
+            'SELECT park_name FROM park WHERE park_id IN (SELECT park_id FROM home_game WHERE year = 2008)',
+            'SELECT year, attendance AS a FROM home_game ORDER BY a',
+        ):
+            self.assertEqual(schema_errors(sql, schema), [], sql)
+
+    def test_dialect_errors(self):
+        self.assertTrue(dialect_errors("SELECT * FROM park WHERE park_name ILIKE 'f%'", 'sqlite'))
+        self.assertTrue(dialect_errors('SELECT * FROM park LIMIT 5, 10', 'postgres'))
+        self.assertEqual(dialect_errors("SELECT * FROM park WHERE park_name ILIKE 'f%'", 'postgres'), [])
+
+    def test_cost_gate_limits_or_rejects_large_scans(self):
+        with get_pool('sqlite', db_path=self.db_path).connection() as conn:
+            self.assertEqual(cost_gate(conn, 'SELECT * FROM home_game', 'sqlite', policy='limit', max_scan_rows=100).action, 'pass')
+
+            limited = cost_gate(conn, 'SELECT * FROM home_game', 'sqlite', policy='limit', max_scan_rows=10, limit=5)
+            self.assertEqual(limited.action, 'limited')
+            self.assertEqual(len(conn.execute(limited.sql).fetchall()), 5)
+
+            # A sort has to read every row before the first one comes out, so a LIMIT cannot help.
+            sorted_scan = cost_gate(conn, 'SELECT * FROM home_game ORDER BY attendance', 'sqlite', policy='limit', max_scan_rows=10)
+            self.assertTrue(sorted_scan.rejected)
+            self.assertIn("home_game", sorted_scan.message)
+
+            self.assertTrue(cost_gate(conn, 'SELECT * FROM home_game', 'sqlite', policy='reject', max_scan_rows=10).rejected)
+            # A LIMIT already in the statement bounds the scan, unless a sort has to read every row first.
+            self.assertEqual(cost_gate(conn, 'SELECT * FROM home_game LIMIT 5', 'sqlite', policy='reject', max_scan_rows=10).action, 'pass')
+            self.assertEqual(cost_gate(conn, 'SELECT * FROM home_game LIMIT 5 OFFSET 3', 'sqlite', policy='reject', max_scan_rows=10).action, 'pass')
+            self.assertTrue(cost_gate(conn, 'SELECT * FROM home_game LIMIT 20', 'sqlite', policy='reject', max_scan_rows=10).rejected)
+            self.assertTrue(cost_gate(conn, 'SELECT * FROM home_game ORDER BY attendance LIMIT 5', 'sqlite', policy='reject', max_scan_rows=10).rejected)
+
+    def test_cost_gate_counts_rows_of_attached_tables(self):
+        fd, aux_path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(fd)
+        self.addCleanup(os.remove, aux_path)
+        with sqlite3.connect(aux_path) as aux:
+            aux.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, total REAL)")
+            aux.executemany("INSERT INTO orders (total) VALUES (?)", [(i,) for i in range(50)])
+        conn = sqlite3.connect(self.db_path)
+        self.addCleanup(conn.close)
+        conn.execute("ATTACH DATABASE ? AS aux", (aux_path,))
+
+        # main has no orders table, so only the qualified name finds the rows.
+        for sql in ('SELECT * FROM aux.orders', 'SELECT o.total FROM aux.orders o'):
+            gate = cost_gate(conn, sql, 'sqlite', policy='reject', max_scan_rows=10)
+            self.assertTrue(gate.rejected, sql)
+            self.assertIn('aux.orders', gate.message)
+
+    def test_guardrail_sends_errors_back_to_the_generator(self):
+        guardrail = sql_guardrail('sqlite', self._schema(), db_path=self.db_path)
+
+        ok, feedback = guardrail('{"sql": "SELECT park_nme FROM park"}')
+        self.assertFalse(ok)
+        self.assertIn("Did you mean 'park_name'?", feedback)
+        self.assertFalse(guardrail('{"sql": "DROP TABLE park"}')[0])
+        self.assertEqual(guardrail('{"sql": "SELECT park_name FROM park"}'), (True, '{"sql": "SELECT park_name FROM park"}'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+import unittest
+from src.startup import LazyDict, StartupReport, startup
+from src.tracing import tracer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class TestLazyDict(unittest.TestCase):
+    def test_values_are_built_once_on_first_access(self):
+        built = []
+        lazy = LazyDict({'a': lambda: built.append('a') or 'A', 'b': lambda: built.append('b') or 'B'})
+
+        self.assertIn('a', lazy)
+        self.assertEqual(list(lazy), ['a', 'b'])
+        self.assertEqual(built, [])
+
+        self.assertEqual(lazy['a'], 'A')
+        self.assertEqual(lazy['a'], 'A')
+        self.assertEqual(built, ['a'])
+        self.assertEqual(lazy.built(), ['a'])
+        with self.assertRaises(KeyError):
+            lazy['missing']
+
+    def test_concurrent_first_access_builds_once(self):
+        calls = []
+
+        def build():
+            calls.append(1)
+            time.sleep(0.05)
+            return object()
+
+        lazy = LazyDict({'crew': build})
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(lazy['crew'])) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len({id(result) for result in results}), 1)
+
+    def test_builds_are_recorded_as_startup_phases(self):
+        LazyDict({'unit_test_agent': lambda: 'agent'}, phase='agent')['unit_test_agent']
+
+        self.assertIn('agent:unit_test_agent', startup.phases())
+        self.assertIn('kind="startup",stage="agent:unit_test_agent"', tracer.prometheus())
+
+class TestStartupReport(unittest.TestCase):
+    def test_phase_is_recorded_once(self):
+        report = StartupReport()
+        report.record('first_request', 0.5)
+        with report.phase('first_request'):
+            pass
+
+        self.assertEqual(report.phases(), {'first_request': 0.5})
+        self.assertIn('first_request', report.report())
+
+    def test_importing_main_defers_crewai_and_drivers(self):
+        code = "import sys, main; print('crewai' in sys.modules, 'psycopg' in sys.modules)"
+        completed = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=ROOT, check=True)
+
+        self.assertEqual(completed.stdout.split()[-2:], ['False', 'False'])
+
+    def test_running_main_as_a_script_calls_main(self):
+        env = {**os.environ, 'OPENAI_API_KEY': ''}
+        completed = subprocess.run([sys.executable, 'main.py', 'serve'], capture_output=True, text=True, cwd=ROOT, env=env, timeout=60)
+
+        self.assertIn('Configuration Error: OPENAI_API_KEY', completed.stdout)
+
+if __name__ == '__main__':
+    unittest.main()
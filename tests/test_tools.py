@@ -1,17 +1,28 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock
 from src.tools import ExecuteSQLQuery
+from src.pool import close_all_pools
+from src.result_cache import ResultCache
+from src.streaming import fetch_bounded
 from typing import Dict, Any
 
 class TestExecuteSQLQuery(unittest.TestCase):
     def setUp(self):
+        close_all_pools()
         self.tool = ExecuteSQLQuery()
 
-    @patch('src.tools.sqlite3.connect')
+    def tearDown(self):
+        close_all_pools()
+
+    @patch('src.pool.sqlite3.connect')
     def test_sqlite_select_query_success(self, mock_connect):
         # Mock SQLite connection and cursor
         mock_cursor = MagicMock()
-        mock_cursor.fetchall.return_value = [(1,)]
+        mock_cursor.fetchmany.side_effect = [[(1,)], []]
         mock_conn = MagicMock()
         mock_conn.cursor.return_value = mock_cursor
         mock_connect.return_value = mock_conn
@@ -28,7 +39,7 @@ class TestExecuteSQLQuery(unittest.TestCase):
         self.assertEqual(result['data'], [(1,)])
         mock_cursor.execute.assert_called_with('SELECT 1')
 
-    @patch('src.tools.sqlite3.connect')
+    @patch('src.pool.sqlite3.connect')
     def test_sqlite_invalid_query(self, mock_connect):
         # Mock SQLite to raise an exception
         mock_cursor = MagicMock()
@@ -48,11 +59,11 @@ class TestExecuteSQLQuery(unittest.TestCase):
         self.assertIn('Error executing query: SQL error', result['message'])
         self.assertIsNone(result['data'])
 
-    @patch('src.tools.psycopg.connect')
+    @patch('src.pool.psycopg.connect')
     def test_postgres_select_query_success(self, mock_connect):
         # Mock Psycopg connection and cursor
         mock_cursor = MagicMock()
-        mock_cursor.fetchall.return_value = [(2,)]
+        mock_cursor.fetchmany.side_effect = [[(2,)], []]
         mock_conn = MagicMock()
         mock_conn.cursor.return_value = mock_cursor
         mock_connect.return_value = mock_conn
@@ -92,5 +103,177 @@ class TestExecuteSQLQuery(unittest.TestCase):
         self.assertEqual(result_postgres['status'], 'error')
         self.assertIn('PostgreSQL requires conn_string', result_postgres['message'])
 
+class TestExecuteSQLQueryBoundedFetch(unittest.TestCase):
+    def setUp(self):
+        close_all_pools()
+        fd, self.db_path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(fd)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE numbers (n INTEGER, label TEXT)")
+        conn.executemany("INSERT INTO numbers VALUES (?, ?)", [(i, f"row {i}") for i in range(250)])
+        conn.commit()
+        conn.close()
+        self.tool = ExecuteSQLQuery()
+
+    def tearDown(self):
+        close_all_pools()
+        os.remove(self.db_path)
+
+    def test_row_cap_truncates_and_counts_total(self):
+        result = self.tool._run(
+            query={'sql': 'SELECT n, label FROM numbers ORDER BY n'},
+            db_path=self.db_path,
+            db_type='sqlite',
+            max_rows=10
+        )
+
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(len(result['data']), 10)
+        self.assertEqual(result['columns'], ['n', 'label'])
+        self.assertTrue(result['truncated'])
+        self.assertEqual(result['total_rows_estimate'], 250)
+
+    def test_byte_cap_truncates(self):
+        result = self.tool._run(
+            query={'sql': 'SELECT label FROM numbers'},
+            db_path=self.db_path,
+            db_type='sqlite',
+            max_bytes=100
+        )
+
+        self.assertTrue(result['truncated'])
+        self.assertLess(len(result['data']), 20)
+
+    def test_small_result_is_not_truncated(self):
+        result = self.tool._run(
+            query={'sql': 'SELECT count(*) FROM numbers'},
+            db_path=self.db_path,
+            db_type='sqlite'
+        )
+
+        self.assertEqual(result['data'], [(250,)])
+        self.assertFalse(result['truncated'])
+        self.assertEqual(result['message'], 'Query executed successfully')
+
+    def test_stream_yields_every_row(self):
+        rows = self.tool.stream(
+            query={'sql': 'SELECT n FROM numbers'},
+            db_path=self.db_path,
+            db_type='sqlite',
+            batch_size=7
+        )
+
+        self.assertEqual(sum(1 for _ in rows), 250)
+
+    def test_only_plain_queries_get_a_postgres_named_cursor(self):
+        statements = {
+            'SELECT n FROM numbers': True,
+            'WITH t AS (SELECT 1) SELECT * FROM t': True,
+            'EXPLAIN SELECT n FROM numbers': False,
+            'SHOW work_mem': False,
+            'WITH d AS (DELETE FROM numbers RETURNING n) SELECT n FROM d': False
+        }
+        for sql, named in statements.items():
+            conn = MagicMock()
+            conn.cursor.return_value.fetchmany.return_value = []
+
+            fetch_bounded(conn, sql, 'postgres')
+
+            self.assertEqual('name' in conn.cursor.call_args.kwargs, named, sql)
+
+    def test_async_run_matches_sync_run(self):
+        query = {'sql': 'SELECT n, label FROM numbers ORDER BY n'}
+
+        result = asyncio.run(self.tool._arun(query=query, db_path=self.db_path, db_type='sqlite', max_rows=10))
+
+        self.assertEqual(result, self.tool._run(query=query, db_path=self.db_path, db_type='sqlite', max_rows=10))
+
+    @patch('src.sql_validation.Config.SQL_MAX_SCAN_ROWS', 100)
+    def test_cost_gate_limits_plain_scans_and_rejects_sorted_ones(self):
+        limited = self.tool._run(query={'sql': 'SELECT n FROM numbers'}, db_path=self.db_path, db_type='sqlite', max_rows=10)
+        rejected = self.tool._run(query={'sql': 'SELECT n FROM numbers ORDER BY label'}, db_path=self.db_path, db_type='sqlite')
+
+        self.assertEqual(limited['status'], 'success')
+        self.assertEqual(len(limited['data']), 10)
+        self.assertIn('automatically limited to 10 rows', limited['message'])
+        self.assertEqual(rejected['status'], 'error')
+        self.assertIn('rejected before execution', rejected['message'])
+
+    @patch('src.sql_validation.Config.SQL_MAX_SCAN_ROWS', 100)
+    def test_cost_gate_skips_statements_it_cannot_explain(self):
+        plan = self.tool._run(query={'sql': 'EXPLAIN QUERY PLAN SELECT n FROM numbers'}, db_path=self.db_path, db_type='sqlite')
+        pragma = self.tool._run(query={'sql': 'PRAGMA table_info(numbers)'}, db_path=self.db_path, db_type='sqlite')
+
+        self.assertEqual(plan['status'], 'success')
+        self.assertIn('SCAN', plan['data'][0][-1])
+        self.assertEqual(pragma['status'], 'success')
+
+    def test_limited_results_report_which_cap(self):
+        by_rows = self.tool._run(query={'sql': 'SELECT n FROM numbers'}, db_path=self.db_path, db_type='sqlite', max_rows=10)
+        by_bytes = self.tool._run(query={'sql': 'SELECT label FROM numbers'}, db_path=self.db_path, db_type='sqlite', max_bytes=100)
+        complete = self.tool._run(query={'sql': 'SELECT count(*) FROM numbers'}, db_path=self.db_path, db_type='sqlite')
+
+        self.assertEqual((by_rows['limited_by'], by_bytes['limited_by'], complete['limited_by']), ('rows', 'bytes', None))
+
+    def test_timeout_returns_structured_status(self):
+        result = self.tool._run(
+            query={'sql': 'SELECT count(*) FROM numbers a, numbers b, numbers c, numbers d'},
+            db_path=self.db_path,
+            db_type='sqlite',
+            timeout=0.2
+        )
+
+        self.assertEqual(result['status'], 'timeout')
+        self.assertIn('0.2s time limit', result['message'])
+        self.assertLess(result['elapsed'], 2)
+
+class TestExecuteSQLQueryResultCache(unittest.TestCase):
+    def setUp(self):
+        close_all_pools()
+        fd, self.db_path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(fd)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE park (name TEXT)")
+        conn.execute("INSERT INTO park VALUES ('Fenway Park')")
+        conn.commit()
+        conn.close()
+        self.tool = ExecuteSQLQuery(result_cache=ResultCache(max_bytes=100000))
+
+    def tearDown(self):
+        close_all_pools()
+        os.remove(self.db_path)
+
+    def _select(self, sql='SELECT name FROM park ORDER BY name'):
+        return self.tool._run(query={'sql': sql}, db_path=self.db_path, db_type='sqlite')
+
+    def test_repeated_select_is_served_from_cache(self):
+        first = self._select()
+        second = self._select('select name  from park order by name;')
+
+        self.assertNotIn('cached', first)
+        self.assertTrue(second['cached'])
+        self.assertEqual(second['data'], [('Fenway Park',)])
+
+    def test_write_through_tool_invalidates(self):
+        self._select()
+        self.tool._run(query={'sql': "INSERT INTO park VALUES ('Wrigley Field')"}, db_path=self.db_path, db_type='sqlite')
+
+        result = self._select()
+
+        self.assertNotIn('cached', result)
+        self.assertEqual(len(result['data']), 2)
+
+    def test_external_write_invalidates(self):
+        self._select()
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("INSERT INTO park VALUES ('Wrigley Field')")
+        conn.commit()
+        conn.close()
+
+        result = self._select()
+
+        self.assertNotIn('cached', result)
+        self.assertEqual(len(result['data']), 2)
+
 if __name__ == '__main__':
     unittest.main()
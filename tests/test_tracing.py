@@ -0,0 +1,88 @@
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+from crewai import Agent
+from crewai.types.usage_metrics import UsageMetrics
+from src.base_agent import BaseAgent
+from src.pool import close_all_pools
+from src.tools import ExecuteSQLQuery
+from src.tracing import Tracer, tracer
+
+class TestTracer(unittest.TestCase):
+    def test_disabled_tracer_records_nothing(self):
+        local = Tracer(enabled=False)
+        with local.request('process_query') as trace, local.span('agent', 'Router') as span:
+            span.set(prompt_tokens=10)
+
+        self.assertIsNone(trace)
+        self.assertEqual(len(local.recent), 0)
+        self.assertNotIn('crewai_stage_duration_seconds_bucket', local.prometheus())
+
+    def test_request_trace_nests_spans(self):
+        local = Tracer(enabled=True, trace_dir='')
+        with local.request('process_query', query='q') as trace:
+            with local.span('crew', 'sql'):
+                with local.span('agent', 'SQL Generator') as span:
+                    span.set(prompt_tokens=120, completion_tokens=30)
+
+        spans = {span['name']: span for span in json.loads(trace.to_json())['spans']}
+        self.assertEqual(spans['SQL Generator']['parent_id'], spans['sql']['id'])
+        self.assertEqual(spans['sql']['parent_id'], spans['process_query']['id'])
+        self.assertIs(local.last_trace(), trace)
+        self.assertIn('agent:SQL Generator', trace.stage_totals())
+
+    def test_prometheus_histograms_and_counters(self):
+        local = Tracer(enabled=True, trace_dir='')
+        for _ in range(3):
+            with local.span('task', 'generate_sql') as span:
+                span.set(retries=1, prompt_tokens=5)
+        text = local.prometheus()
+
+        self.assertIn('crewai_stage_duration_seconds_bucket{kind="task",stage="generate_sql",le="+Inf"} 3', text)
+        self.assertIn('crewai_stage_duration_seconds_count{kind="task",stage="generate_sql"} 3', text)
+        self.assertIn('crewai_stage_retries_total{kind="task",stage="generate_sql"} 3', text)
+        self.assertIn('crewai_llm_tokens_total{kind="task",stage="generate_sql",type="prompt"} 15', text)
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        close_all_pools()
+        fd, self.db_path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(fd)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE park (park_id TEXT PRIMARY KEY, park_name TEXT)")
+        conn.commit()
+        conn.close()
+        tracer.enable()
+        tracer.metrics.reset()
+
+    def tearDown(self):
+        tracer.disable()
+        tracer.metrics.reset()
+        close_all_pools()
+        os.remove(self.db_path)
+
+    def test_tool_call_records_db_stages(self):
+        with tracer.request('test') as trace:
+            ExecuteSQLQuery()._run({'sql': 'SELECT park_name FROM park'}, db_path=self.db_path, db_type='sqlite')
+
+        stages = trace.stage_totals()
+        for stage in ('tool:SQL Query Executor', 'db:explain', 'db:execute', 'db:fetch'):
+            self.assertIn(stage, stages)
+
+    def test_agent_span_reports_token_delta(self):
+        agent = BaseAgent(role='Router', goal='Route', backstory='Routes', llm='gpt-4o-mini')
+        usage = [UsageMetrics(prompt_tokens=100, completion_tokens=10, total_tokens=110),
+                 UsageMetrics(prompt_tokens=160, completion_tokens=25, total_tokens=185)]
+        with patch.object(BaseAgent, 'token_usage', side_effect=usage), \
+                patch.object(Agent, 'execute_task', return_value='{"response": "sql"}'):
+            with tracer.request('test') as trace:
+                agent.execute_task(task=None)
+
+        span = next(span for span in trace.spans if span.kind == 'agent')
+        self.assertEqual((span.attrs['prompt_tokens'], span.attrs['completion_tokens']), (60, 15))
+
+if __name__ == '__main__':
+    unittest.main()